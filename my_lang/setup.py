@@ -22,6 +22,7 @@ setup(
         "python-dotenv>=1.0.0",
         "fastapi>=0.109.2",
         "uvicorn>=0.27.1",
+        "numpy>=1.26.0",
     ],
     entry_points={
         "console_scripts": [
@@ -1,7 +1,32 @@
 """
 Módulo de agente de chat com LangMem.
+
+Os nomes públicos são carregados sob demanda (PEP 562), para que importar
+`src.agent` não carregue o cliente do modelo nem o LangGraph.
 """
 
-from src.agent.chat_agent import create_chat_agent, chat
+import importlib
+
+# Nome exportado -> módulo que o define
+_EXPORTS = {
+    "create_chat_agent": "src.agent.chat_agent",
+    "chat": "src.agent.chat_agent",
+    "PromptRegistry": "src.agent.prompt_registry",
+    "PromptVersion": "src.agent.prompt_registry",
+}
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_EXPORTS))
+
 
-__all__ = ["create_chat_agent", "chat"] 
\ No newline at end of file
+__all__ = list(_EXPORTS)
\ No newline at end of file
@@ -6,33 +6,32 @@ informações importantes sobre o usuário e a conversa.
 """
 
 import logging
+import time
 import traceback
 from typing import Dict, Any, Optional, List
 
 # Importações corretas
-from langchain_openai import ChatOpenAI
-from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.memory import InMemorySaver
+# O cliente do modelo, o LangGraph prebuilt e os subsistemas de memória em segundo
+# plano e de perfis são importados dentro das funções que os usam, para manter
+# baixo o tempo de importação do servidor e da CLI.
+from langchain_core.language_models.chat_models import BaseChatModel
 from langgraph.store.memory import InMemoryStore
 
-from langmem import create_manage_memory_tool, create_search_memory_tool
-
 from src.config import (
     MODEL_NAME,
     SYSTEM_INSTRUCTIONS,
-    MEMORY_NAMESPACE,
-    MEMORY_INSTRUCTIONS,
-    SEARCH_INSTRUCTIONS,
 )
-from src.memory import (
+from src.memory.manager import (
     create_memory_store,
-    create_background_memory_manager,
-    schedule_memory_processing,
-    create_profile_manager,
-    get_user_profile,
-    update_user_profile,
+    create_memory_tools,
     create_memory_prompt_function,
 )
+from src.models import create_chat_model
+from src.deadlines import DeadlineExceeded, check_deadline, deadline_scope
+from src.instrumentation import InstrumentedSaver, PROFILE_UPDATE_SECONDS, ToolMetricsCallbackHandler
+from src.tracing import TracingCallbackHandler, get_tracer
+from src.timings import TimingsCallbackHandler, TurnTimings, measure, timings_scope
+from src.agent.prompt_registry import PromptRegistry
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -44,19 +43,28 @@ def create_chat_agent(
     model_name: str = MODEL_NAME,
     enable_background_memory: bool = True,
     enable_user_profiles: bool = True,
+    prompt_registry: Optional[PromptRegistry] = None,
+    model: Optional[BaseChatModel] = None,
 ) -> Dict:
     """
     Cria um agente de chat com LangMem.
     
+    O prompt do sistema é lido do registro de prompts a cada turno, de modo que
+    novas versões publicadas passam a valer sem reconstruir o grafo.
+    
     Args:
         store (InMemoryStore): Armazenamento para memórias
-        system_instructions (str): Instruções do sistema
+        system_instructions (str): Instruções do sistema (versão inicial do registro)
         model_name (str): Nome do modelo a ser usado
         enable_background_memory (bool): Se deve habilitar memória em segundo plano
         enable_user_profiles (bool): Se deve habilitar perfis de usuário
+        prompt_registry (Optional[PromptRegistry]): Registro de prompts compartilhado
+        model (Optional[BaseChatModel]): Modelo já construído (por exemplo, um modelo
+            simulado para execuções offline); se omitido, usa create_chat_model(model_name)
         
     Returns:
-        Dict: Componentes do agente (agent, background_memory_manager, profile_manager)
+        Dict: Componentes do agente (agent, model, background_memory_manager,
+            profile_manager, profile_index, prompt_registry)
     """
     logger.info(f"Criando agente de chat com modelo {model_name}")
     
@@ -65,30 +73,31 @@ def create_chat_agent(
         logger.info("Criando armazenamento de memória")
         store = create_memory_store()
     
-    # Configuramos o checkpointer para manter o estado das conversas
-    checkpointer = InMemorySaver()
+    # Configuramos o checkpointer para manter o estado das conversas; leituras e
+    # escritas são medidas em `/metrics`
+    checkpointer = InstrumentedSaver()
     
     # Configura as ferramentas de memória
     logger.info("Configurando ferramentas de memória")
-    memory_tools = [
-        create_manage_memory_tool(
-            namespace=MEMORY_NAMESPACE,
-            instructions=MEMORY_INSTRUCTIONS
-        ),
-        create_search_memory_tool(
-            namespace=MEMORY_NAMESPACE,
-            instructions=SEARCH_INSTRUCTIONS
-        )
-    ]
+    memory_tools = create_memory_tools()
+    
+    # Cria o registro de prompts do sistema se não for fornecido
+    if prompt_registry is None:
+        prompt_registry = PromptRegistry(initial_prompt=system_instructions, store=store)
     
-    # Obtém a função de prompt que adiciona memórias relevantes
-    memory_prompt_fn = create_memory_prompt_function()
+    # Obtém a função de prompt que adiciona o prompt do sistema e memórias relevantes
+    memory_prompt_fn = create_memory_prompt_function(prompt_registry=prompt_registry)
 
-    # Criamos o modelo LLM
-    logger.info(f"Inicializando modelo {model_name}")
-    model = ChatOpenAI(model=model_name)
+    # Criamos o modelo LLM. Um modelo injetado é usado também pelos gerenciadores;
+    # caso contrário, cada um cria o seu na própria classe do limitador de taxa
+    injected_model = model
+    if model is None:
+        logger.info(f"Inicializando modelo {model_name}")
+        model = create_chat_model(model_name)
     
     # Cria o agente LangGraph com suporte a ferramentas de memória LangMem
+    from langgraph.prebuilt import create_react_agent
+
     logger.info("Criando agente ReAct com ferramentas de memória")
     agent = create_react_agent(
         model,
@@ -101,23 +110,51 @@ def create_chat_agent(
     # Cria o gerenciador de memória em segundo plano se habilitado
     background_memory_manager = None
     if enable_background_memory:
+        from src.memory.background import create_background_memory_manager
+
         logger.info("Criando gerenciador de memória em segundo plano")
-        background_memory_manager = create_background_memory_manager(store=store)
+        background_memory_manager = create_background_memory_manager(store=store, model=injected_model)
     
     # Cria o gerenciador de perfis se habilitado
     profile_manager = None
+    profile_index = None
     if enable_user_profiles:
+        from src.memory.profiles import create_profile_manager
+        from src.memory.profile_index import create_profile_index
+
         logger.info("Criando gerenciador de perfis de usuário")
-        profile_manager = create_profile_manager(model_name=model_name)
+        profile_manager = create_profile_manager(model_name=model_name, model=injected_model)
+        profile_index = create_profile_index(store)
     
     logger.info("Agente de chat criado com sucesso")
     return {
         "agent": agent,
+        "model": model,
         "background_memory_manager": background_memory_manager,
-        "profile_manager": profile_manager
+        "profile_manager": profile_manager,
+        "profile_index": profile_index,
+        "prompt_registry": prompt_registry,
     }
 
 
+def _turn_messages(messages: List[Any]) -> List[Any]:
+    """Retorna as mensagens geradas após a última mensagem do usuário."""
+    for index in range(len(messages) - 1, -1, -1):
+        if getattr(messages[index], "type", None) == "human":
+            return list(messages[index + 1:])
+    return list(messages)
+
+
+def _count_turn_tokens(messages: List[Any]) -> int:
+    """Soma os tokens das mensagens do modelo geradas após a última mensagem do usuário."""
+    total = 0
+    for message in _turn_messages(messages):
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            total += usage.get("total_tokens", 0)
+    return total
+
+
 def chat(
     agent: Any, 
     message: str, 
@@ -125,6 +162,10 @@ def chat(
     thread_id: str = "default_thread",
     background_memory_manager = None,
     profile_manager = None,
+    profile_index = None,
+    prompt_registry: Optional[PromptRegistry] = None,
+    timeout_seconds: Optional[float] = None,
+    timings: Optional[TurnTimings] = None,
 ) -> str:
     """
     Função para enviar uma mensagem ao agente e obter a resposta.
@@ -136,73 +177,125 @@ def chat(
         thread_id (str): ID da conversa
         background_memory_manager: Gerenciador de memória em segundo plano
         profile_manager: Gerenciador de perfis de usuário
+        profile_index: Índice de perfis atualizado a cada escrita de perfil
+        prompt_registry (Optional[PromptRegistry]): Registro de prompts; a versão ativa
+            é fixada no início do turno e recebe as métricas do turno
+        timeout_seconds (Optional[float]): Prazo do turno; vale para todas as chamadas
+            ao modelo feitas pelo agente
+        timings (Optional[TurnTimings]): Coletor que recebe o tempo de cada etapa do turno
         
     Returns:
         str: Resposta do agente
+        
+    Raises:
+        DeadlineExceeded: Se o prazo terminar antes da resposta
     """
     logger.info(f"Processando chat. Usuário: {user_id}, Thread: {thread_id}")
     
-    # Invocar o agente com a mensagem
-    try:
-        logger.debug("Invocando agente")
-        response = agent.invoke(
-            {"messages": [{"role": "user", "content": message}]},
-            config={"configurable": {"user_id": user_id, "thread_id": thread_id}}
-        )
-        
-        # Extrai a resposta do agente - garantindo que seja uma string
-        agent_response = ""
+    # Fixa a versão do prompt do sistema para todo o turno
+    configurable = {"user_id": user_id, "thread_id": thread_id}
+    prompt_version = None
+    if prompt_registry is not None:
+        prompt_version = prompt_registry.active.version
+        configurable["prompt_version"] = prompt_version
+    
+    # O turno inteiro é um span; passos do agente, ferramentas e armazenamento ficam dentro dele
+    tracer = get_tracer()
+    with tracer.span("chat", {"user_id": user_id, "thread_id": thread_id}) as turn_span, timings_scope(timings):
+        # Invocar o agente com a mensagem
+        start_time = time.perf_counter()
+        callbacks = [ToolMetricsCallbackHandler()]
+        if turn_span is not None:
+            callbacks.append(TracingCallbackHandler(tracer, turn_span))
+        if timings is not None:
+            callbacks.append(TimingsCallbackHandler(timings))
         try:
-            # Tenta extrair a resposta do formato retornado
-            if isinstance(response, dict) and "messages" in response:
-                last_message = response["messages"][-1]
-                if isinstance(last_message, dict) and "content" in last_message:
-                    agent_response = last_message["content"]
-                elif hasattr(last_message, "content"):
-                    agent_response = last_message.content
-            elif hasattr(response, "messages"):
-                messages = response.messages
-                if hasattr(messages[-1], "content"):
-                    agent_response = messages[-1].content
-            elif isinstance(response, str):
-                agent_response = response
-            else:
-                logger.error(f"Formato de resposta desconhecido: {type(response)}")
-                agent_response = "Desculpe, não foi possível processar sua mensagem."
-        except (KeyError, AttributeError, IndexError) as e:
-            logger.error(f"Erro ao extrair resposta: {str(e)}")
-            logger.error(traceback.format_exc())
-            agent_response = "Desculpe, ocorreu um erro ao processar sua mensagem."
+            logger.debug("Invocando agente")
+            try:
+                with deadline_scope(timeout_seconds):
+                    check_deadline("início do turno")
+                    response = agent.invoke(
+                        {"messages": [{"role": "user", "content": message}]},
+                        config={"configurable": configurable, "callbacks": callbacks}
+                    )
+            except Exception:
+                if prompt_version is not None:
+                    prompt_registry.record_turn(prompt_version, time.perf_counter() - start_time, error=True)
+                raise
         
-        # Estrutura a conversa
-        user_message = {"role": "user", "content": message}
-        assistant_message = {"role": "assistant", "content": agent_response}
-        conversation_messages = [user_message, assistant_message]
+            if prompt_version is not None:
+                tokens = _count_turn_tokens(response.get("messages", [])) if isinstance(response, dict) else 0
+                prompt_registry.record_turn(prompt_version, time.perf_counter() - start_time, tokens=tokens)
         
-        # Atualiza o perfil do usuário se o gerenciador estiver disponível
-        if profile_manager is not None:
+            # Extrai a resposta do agente - garantindo que seja uma string
+            agent_response = ""
             try:
-                logger.debug(f"Atualizando perfil do usuário {user_id}")
-                update_user_profile(profile_manager, conversation_messages, user_id)
-            except Exception as e:
-                logger.error(f"Erro ao atualizar perfil do usuário: {str(e)}")
+                # Tenta extrair a resposta do formato retornado
+                if isinstance(response, dict) and "messages" in response:
+                    last_message = response["messages"][-1]
+                    if isinstance(last_message, dict) and "content" in last_message:
+                        agent_response = last_message["content"]
+                    elif hasattr(last_message, "content"):
+                        agent_response = last_message.content
+                elif hasattr(response, "messages"):
+                    messages = response.messages
+                    if hasattr(messages[-1], "content"):
+                        agent_response = messages[-1].content
+                elif isinstance(response, str):
+                    agent_response = response
+                else:
+                    logger.error(f"Formato de resposta desconhecido: {type(response)}")
+                    agent_response = "Desculpe, não foi possível processar sua mensagem."
+            except (KeyError, AttributeError, IndexError) as e:
+                logger.error(f"Erro ao extrair resposta: {str(e)}")
                 logger.error(traceback.format_exc())
+                agent_response = "Desculpe, ocorreu um erro ao processar sua mensagem."
         
-        # Agenda o processamento de memória em segundo plano
-        if background_memory_manager is not None:
-            try:
-                logger.debug(f"Agendando processamento de memória para usuário {user_id}")
-                schedule_memory_processing(
-                    background_memory_manager,
-                    conversation_messages,
-                    user_id=user_id
-                )
-            except Exception as e:
-                logger.error(f"Erro ao agendar processamento de memória: {str(e)}")
-                logger.error(traceback.format_exc())
+            # Estrutura a conversa
+            user_message = {"role": "user", "content": message}
+            assistant_message = {"role": "assistant", "content": agent_response}
+            conversation_messages = [user_message, assistant_message]
         
-        return agent_response
-    except Exception as e:
-        logger.error(f"Erro ao processar chat: {str(e)}")
-        logger.error(traceback.format_exc())
-        return f"Desculpe, ocorreu um erro ao processar sua mensagem. Detalhes: {str(e)}"
\ No newline at end of file
+            # Atualiza o perfil do usuário se o gerenciador estiver disponível
+            if profile_manager is not None:
+                try:
+                    from src.memory.profiles import update_user_profile
+
+                    logger.debug(f"Atualizando perfil do usuário {user_id}")
+                    with PROFILE_UPDATE_SECONDS.time(), tracer.span("profile.update"), measure("profile"):
+                        update_user_profile(
+                            profile_manager,
+                            conversation_messages,
+                            user_id,
+                            profile_index=profile_index,
+                        )
+                except Exception as e:
+                    logger.error(f"Erro ao atualizar perfil do usuário: {str(e)}")
+                    logger.error(traceback.format_exc())
+        
+            # Agenda o processamento de memória em segundo plano
+            if background_memory_manager is not None:
+                try:
+                    from src.memory.background import schedule_memory_processing
+
+                    logger.debug(f"Agendando processamento de memória para usuário {user_id}")
+                    with tracer.span("background.schedule"), measure("background"):
+                        schedule_memory_processing(
+                            background_memory_manager,
+                            conversation_messages,
+                            user_id=user_id
+                        )
+                except Exception as e:
+                    logger.error(f"Erro ao agendar processamento de memória: {str(e)}")
+                    logger.error(traceback.format_exc())
+        
+            return agent_response
+        except DeadlineExceeded:
+            logger.warning(f"Prazo do turno esgotado. Usuário: {user_id}, Thread: {thread_id}")
+            raise
+        except Exception as e:
+            if turn_span is not None:
+                turn_span.record_exception(e)
+            logger.error(f"Erro ao processar chat: {str(e)}")
+            logger.error(traceback.format_exc())
+            return f"Desculpe, ocorreu um erro ao processar sua mensagem. Detalhes: {str(e)}"
\ No newline at end of file
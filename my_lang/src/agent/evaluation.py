@@ -0,0 +1,287 @@
+"""
+Harness de avaliação de prompts por replay de conversas.
+
+Antes de promover um prompt gerado pelos otimizadores, este módulo reproduz um
+corpus fixo de conversas no agente de `create_chat_agent` com o prompt atual e com
+o candidato, em paralelo, e compara custo e latência: chamadas de ferramenta por
+turno, tokens, latência p50/p95 e uma nota de qualidade. Funciona offline com o
+`FakeChatModel` ou com o modelo real.
+
+Formato do corpus (JSONL, uma conversa por linha):
+
+    {"id": "c1", "user_id": "u1", "turns": [{"message": "Oi!", "expected": "Olá"}]}
+
+Uso:
+
+    python -m src.agent.evaluation corpus.jsonl --candidate-file novo_prompt.txt --fake
+"""
+
+import argparse
+import json
+import logging
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from langgraph.store.memory import InMemoryStore
+
+from src.config import SYSTEM_INSTRUCTIONS, EMBEDDING_MODEL
+from src.metrics import percentile
+from src.models import create_embeddings
+from src.agent.chat_agent import create_chat_agent, _turn_messages
+from src.agent.prompt_registry import PromptRegistry
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Função de qualidade: (mensagem, resposta, resposta esperada) -> nota entre 0 e 1 ou None
+Scorer = Callable[[str, str, Optional[str]], Optional[float]]
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    """
+    Carrega um corpus de conversas em JSONL.
+
+    Args:
+        path (str): Caminho do arquivo
+
+    Returns:
+        List[Dict[str, Any]]: Conversas com `id`, `user_id` e `turns`
+    """
+    corpus = []
+    with open(path, encoding="utf-8") as corpus_file:
+        for line_number, line in enumerate(corpus_file, 1):
+            if not line.strip():
+                continue
+            conversation = json.loads(line)
+            conversation.setdefault("id", f"conversation_{line_number}")
+            conversation["turns"] = [
+                {"message": turn} if isinstance(turn, str) else turn
+                for turn in conversation.get("turns", [])
+            ]
+            corpus.append(conversation)
+    return corpus
+
+
+def _tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def token_f1(message: str, response: str, expected: Optional[str]) -> Optional[float]:
+    """
+    Nota de qualidade padrão: F1 entre as palavras da resposta e da resposta esperada.
+
+    Args:
+        message (str): Mensagem do usuário
+        response (str): Resposta do agente
+        expected (Optional[str]): Resposta esperada
+
+    Returns:
+        Optional[float]: Nota entre 0 e 1, ou None se não houver resposta esperada
+    """
+    if not expected:
+        return None
+    response_tokens = _tokenize(response)
+    expected_tokens = _tokenize(expected)
+    if not response_tokens or not expected_tokens:
+        return 0.0
+
+    remaining = list(expected_tokens)
+    common = 0
+    for token in response_tokens:
+        if token in remaining:
+            remaining.remove(token)
+            common += 1
+    if common == 0:
+        return 0.0
+    precision = common / len(response_tokens)
+    recall = common / len(expected_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def _response_text(messages: List[Any]) -> str:
+    if not messages:
+        return ""
+    content = getattr(messages[-1], "content", "")
+    return content if isinstance(content, str) else str(content)
+
+
+def replay_conversation(
+    agent: Any,
+    conversation: Dict[str, Any],
+    scorer: Scorer = token_f1,
+) -> List[Dict[str, Any]]:
+    """
+    Reproduz uma conversa no agente e mede cada turno.
+
+    Args:
+        agent: Agente criado por `create_chat_agent`
+        conversation (Dict[str, Any]): Conversa do corpus
+        scorer (Scorer): Função de qualidade
+
+    Returns:
+        List[Dict[str, Any]]: Métricas por turno
+    """
+    user_id = conversation.get("user_id", f"eval_{conversation['id']}")
+    config = {"configurable": {"user_id": user_id, "thread_id": f"eval_{uuid.uuid4().hex}"}}
+    results = []
+
+    for turn in conversation["turns"]:
+        start_time = time.perf_counter()
+        try:
+            response = agent.invoke({"messages": [{"role": "user", "content": turn["message"]}]}, config=config)
+        except Exception as e:
+            logger.error(f"Erro no replay da conversa {conversation['id']}: {str(e)}")
+            results.append({"latency": time.perf_counter() - start_time, "error": True})
+            continue
+        latency = time.perf_counter() - start_time
+
+        new_messages = _turn_messages(response.get("messages", []))
+        tool_calls = sum(len(getattr(m, "tool_calls", None) or []) for m in new_messages)
+        tokens = sum((getattr(m, "usage_metadata", None) or {}).get("total_tokens", 0) for m in new_messages)
+        answer = _response_text(new_messages)
+
+        results.append({
+            "latency": latency,
+            "tool_calls": tool_calls,
+            "tokens": tokens,
+            "quality": scorer(turn["message"], answer, turn.get("expected")),
+            "error": False,
+        })
+    return results
+
+
+def summarize_turns(turns: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Agrega as métricas por turno de um prompt.
+
+    Args:
+        turns (List[Dict[str, Any]]): Métricas por turno
+
+    Returns:
+        Dict[str, Any]: Métricas agregadas
+    """
+    ok = [turn for turn in turns if not turn["error"]]
+    latencies = [turn["latency"] for turn in ok]
+    qualities = [turn["quality"] for turn in ok if turn.get("quality") is not None]
+    return {
+        "turns": len(turns),
+        "errors": len(turns) - len(ok),
+        "tool_calls_per_turn": sum(turn["tool_calls"] for turn in ok) / len(ok) if ok else 0.0,
+        "tokens_per_turn": sum(turn["tokens"] for turn in ok) / len(ok) if ok else 0.0,
+        "total_tokens": sum(turn["tokens"] for turn in ok),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "quality": sum(qualities) / len(qualities) if qualities else None,
+    }
+
+
+def evaluate_prompts(
+    corpus: Iterable[Dict[str, Any]],
+    prompts: Dict[str, str],
+    model_factory: Optional[Callable[[], Any]] = None,
+    store_factory: Optional[Callable[[], Any]] = None,
+    scorer: Scorer = token_f1,
+    concurrency: int = 8,
+) -> Dict[str, Any]:
+    """
+    Avalia prompts reproduzindo o mesmo corpus de conversas com cada um deles.
+
+    Cada prompt recebe um agente e um armazenamento próprios, e todas as conversas
+    de todos os prompts são reproduzidas em paralelo. O primeiro prompt do
+    dicionário é a referência para as diferenças reportadas em `delta`.
+
+    Args:
+        corpus (Iterable[Dict[str, Any]]): Conversas (ver `load_corpus`)
+        prompts (Dict[str, str]): Rótulo -> prompt do sistema (ex.: baseline, candidate)
+        model_factory (Optional[Callable]): Cria o modelo de cada agente (padrão: ChatOpenAI)
+        store_factory (Optional[Callable]): Cria o armazenamento de cada agente
+        scorer (Scorer): Função de qualidade
+        concurrency (int): Número máximo de conversas reproduzidas simultaneamente
+
+    Returns:
+        Dict[str, Any]: Métricas por prompt e diferenças em relação à referência
+    """
+    corpus = list(corpus)
+    if store_factory is None:
+        store_factory = lambda: InMemoryStore(index={"dims": 1536, "embed": create_embeddings(EMBEDDING_MODEL)})
+
+    agents = {}
+    for label, prompt in prompts.items():
+        components = create_chat_agent(
+            store=store_factory(),
+            enable_background_memory=False,
+            enable_user_profiles=False,
+            prompt_registry=PromptRegistry(initial_prompt=prompt),
+            model=model_factory() if model_factory is not None else None,
+        )
+        agents[label] = components["agent"]
+
+    logger.info(f"Reproduzindo {len(corpus)} conversas com {len(prompts)} prompts (concorrência {concurrency})")
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            label: [executor.submit(replay_conversation, agent, conversation, scorer) for conversation in corpus]
+            for label, agent in agents.items()
+        }
+        report = {
+            label: summarize_turns([turn for future in label_futures for turn in future.result()])
+            for label, label_futures in futures.items()
+        }
+
+    reference = next(iter(prompts))
+    deltas = {}
+    for label in prompts:
+        if label == reference:
+            continue
+        deltas[label] = {
+            metric: report[label][metric] - report[reference][metric]
+            for metric in ("tool_calls_per_turn", "tokens_per_turn", "latency_p50", "latency_p95", "quality")
+            if report[label][metric] is not None and report[reference][metric] is not None
+        }
+
+    return {"prompts": report, "reference": reference, "delta": deltas}
+
+
+def main():
+    """Ponto de entrada da linha de comando do harness de avaliação."""
+    parser = argparse.ArgumentParser(description="Compara prompts do sistema por replay de conversas")
+    parser.add_argument("corpus", help="Arquivo JSONL com as conversas")
+    parser.add_argument("--candidate-file", required=True, help="Arquivo com o prompt candidato")
+    parser.add_argument("--baseline-file", help="Arquivo com o prompt atual (padrão: SYSTEM_INSTRUCTIONS)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--fake", action="store_true", help="Usa o modelo simulado local")
+    parser.add_argument("--fake-latency", type=float, default=0.05, help="Latência do modelo simulado (s)")
+    args = parser.parse_args()
+
+    def read(path):
+        with open(path, encoding="utf-8") as prompt_file:
+            return prompt_file.read()
+
+    prompts = {
+        "baseline": read(args.baseline_file) if args.baseline_file else SYSTEM_INSTRUCTIONS,
+        "candidate": read(args.candidate_file),
+    }
+
+    model_factory = None
+    store_factory = None
+    if args.fake:
+        from src.agent.fake_model import FakeChatModel
+
+        model_factory = lambda: FakeChatModel(latency=args.fake_latency)
+        store_factory = InMemoryStore
+
+    report = evaluate_prompts(
+        load_corpus(args.corpus),
+        prompts,
+        model_factory=model_factory,
+        store_factory=store_factory,
+        concurrency=args.concurrency,
+    )
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,109 @@
+"""
+Modelo de chat simulado para execuções offline.
+
+O `FakeChatModel` implementa a interface de modelos do LangChain (incluindo
+`bind_tools`), gera respostas determinísticas, chama ferramentas segundo uma
+política configurável e reporta uso de tokens. Permite exercitar o agente de ponta
+a ponta (avaliações, benchmarks e testes) sem acesso ao provedor.
+"""
+
+import random
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+# Política que decide a chamada de ferramenta: (mensagens, nomes das ferramentas) -> tool call ou None
+ToolCallPolicy = Callable[[List[BaseMessage], List[str]], Optional[Dict[str, Any]]]
+
+
+def search_on_questions(messages: List[BaseMessage], tool_names: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Política padrão: busca memórias uma vez quando o usuário faz uma pergunta.
+
+    Args:
+        messages (List[BaseMessage]): Mensagens enviadas ao modelo
+        tool_names (List[str]): Ferramentas disponíveis
+
+    Returns:
+        Optional[Dict[str, Any]]: Chamada de ferramenta ou None
+    """
+    last = messages[-1] if messages else None
+    if last is None or last.type != "human" or "?" not in str(last.content):
+        return None
+    search_tools = [name for name in tool_names if "search" in name]
+    if not search_tools:
+        return None
+    return {"name": search_tools[0], "args": {"query": str(last.content)}}
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Modelo de chat determinístico e local.
+
+    A latência de cada chamada pode ser fixa ou sorteada por uma função, e o uso
+    de tokens é estimado a partir das mensagens de entrada e da resposta.
+    """
+
+    latency: Union[float, Callable[[], float]] = 0.0
+    tool_call_policy: Optional[ToolCallPolicy] = search_on_questions
+    tool_names: List[str] = Field(default_factory=list)
+    seed: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "FakeChatModel":
+        names = []
+        for tool in tools:
+            if isinstance(tool, dict):
+                names.append(tool.get("name") or tool.get("function", {}).get("name", ""))
+            else:
+                names.append(getattr(tool, "name", getattr(tool, "__name__", "")))
+        return self.model_copy(update={"tool_names": names})
+
+    def _sleep(self) -> None:
+        delay = self.latency() if callable(self.latency) else self.latency
+        if delay > 0:
+            time.sleep(delay)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self._sleep()
+
+        tool_call = None
+        if self.tool_call_policy is not None and self.tool_names:
+            tool_call = self.tool_call_policy(messages, self.tool_names)
+
+        if tool_call is not None:
+            message = AIMessage(
+                content="",
+                tool_calls=[{"id": f"call_{uuid.uuid4().hex[:12]}", "type": "tool_call", **tool_call}],
+            )
+        else:
+            question = next(
+                (str(m.content) for m in reversed(messages) if m.type == "human"),
+                "",
+            )
+            rng = random.Random(f"{self.seed}:{question}")
+            message = AIMessage(content=f"Resposta {rng.randint(0, 9999)}: {question}")
+
+        input_tokens = count_tokens_approximately(messages)
+        output_tokens = count_tokens_approximately([message])
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,326 @@
+"""
+Chamadas ao modelo com prazo e requisições de cobertura (hedging).
+
+O p99 do `/chat` é dominado por respostas lentas ocasionais do provedor. O
+`HedgedChatModel` envolve o modelo de chat e:
+
+- respeita o prazo do turno (`src.deadlines`), abandonando a chamada quando ele
+  termina;
+- se a primeira tentativa não produz o primeiro token dentro de um limiar (o
+  percentil configurado do tempo até o primeiro token observado), dispara uma
+  segunda tentativa; a primeira a produzir um token é mantida e a outra é
+  cancelada;
+- o tempo até o primeiro token (e o limiar de cobertura) é contado a partir da
+  liberação da chamada pelo limitador de taxa (`src.rate_limiter`): a espera na
+  fila e as pausas por 429 não entram nas amostras nem disparam coberturas, que só
+  aumentariam a fila;
+- se a tentativa mantida falha no meio do streaming, uma nova tentativa é feita
+  uma vez, dentro do prazo restante.
+
+As tentativas rodam como tarefas em um único event loop de fundo (`astream`), e
+não em uma thread por tentativa: cancelar uma tentativa fecha a requisição HTTP
+em andamento, em vez de esperar pelo primeiro token. Cada tentativa recebe uma
+cópia do contexto do chamador (prazo do turno, span ativo).
+
+As tentativas extras e os tokens de entrada que elas consomem ficam visíveis em
+`HedgeStats`.
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, message_chunk_to_message
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+from src.config import HEDGE_ENABLED, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES, HEDGE_MIN_DELAY_MS
+from src.deadlines import DeadlineExceeded, check_deadline, remaining
+from src.metrics import percentile
+from src.rate_limiter import PriorityRateLimiterAdapter, on_acquired
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+class HedgeStats:
+    """Tempos até o primeiro token e custo das tentativas de cobertura."""
+
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._ttft: Deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.extra_input_tokens = 0
+        self.deadline_exceeded = 0
+        self.fallbacks = 0
+
+    def record_ttft(self, seconds: float) -> None:
+        with self._lock:
+            self._ttft.append(seconds)
+
+    def hedge_delay(self, pct: float, min_samples: int, min_delay: float) -> Optional[float]:
+        """
+        Limiar para disparar a tentativa de cobertura.
+
+        Args:
+            pct (float): Percentil do tempo até o primeiro token
+            min_samples (int): Amostras necessárias antes de cobrir chamadas
+            min_delay (float): Limiar mínimo em segundos
+
+        Returns:
+            Optional[float]: Segundos de espera, ou None se ainda não há amostras suficientes
+        """
+        with self._lock:
+            if len(self._ttft) < min_samples:
+                return None
+            return max(min_delay, percentile(list(self._ttft), pct))
+
+    def increment(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Retorna as métricas acumuladas.
+
+        Returns:
+            Dict[str, Any]: Contadores e percentis do tempo até o primeiro token
+        """
+        with self._lock:
+            samples = list(self._ttft)
+            return {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_rate": self.hedged / self.calls if self.calls else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "extra_input_tokens": self.extra_input_tokens,
+                "deadline_exceeded": self.deadline_exceeded,
+                "fallbacks": self.fallbacks,
+                "ttft_p50": percentile(samples, 50),
+                "ttft_p95": percentile(samples, 95),
+            }
+
+
+_default_stats = HedgeStats()
+
+
+def get_hedge_stats() -> HedgeStats:
+    """Retorna as métricas de cobertura compartilhadas pelo processo."""
+    return _default_stats
+
+
+_loop_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _attempts_loop() -> asyncio.AbstractEventLoop:
+    """Event loop de fundo que executa as tentativas, criado no primeiro uso."""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-attempts", daemon=True).start()
+        return _loop
+
+
+class _Attempt:
+    """Uma chamada em streaming ao modelo, executada como tarefa no event loop de fundo."""
+
+    def __init__(self, race: "_Race", index: int, hedge: bool):
+        self.race = race
+        self.index = index
+        self.hedge = hedge
+        # Momento em que o limitador de taxa liberou a chamada
+        self.started: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+        self.message: Any = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.cancelled = False
+        self.future: Any = None
+
+    def grant(self) -> None:
+        """Inicia o relógio do primeiro token (chamado quando o limitador libera a chamada)."""
+        with self.race.cond:
+            if self.started is None:
+                self.started = time.monotonic()
+                self.race.cond.notify_all()
+
+    async def run(self, context: contextvars.Context) -> None:
+        # A tarefa tem o próprio contexto; recebe os valores do chamador
+        for var, value in context.items():
+            var.set(value)
+        race = self.race
+        message = None
+        if race.rate_limited:
+            on_acquired.set(self.grant)
+        else:
+            self.grant()
+        try:
+            async for chunk in race.model.astream(race.messages, stop=race.stop, **race.kwargs):
+                with race.cond:
+                    if self.first_token_at is None:
+                        self.first_token_at = time.monotonic()
+                        if self.started is None:
+                            self.started = self.first_token_at
+                        race.stats.record_ttft(self.first_token_at - self.started)
+                        if race.winner is None:
+                            race.winner = self
+                            race.cond.notify_all()
+                    if race.winner is not self:
+                        # Outra tentativa respondeu primeiro
+                        return
+                message = chunk if message is None else message + chunk
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            with race.cond:
+                self.message = message
+                self.done = True
+                if race.winner is None and self.error is None and not self.cancelled and message is not None:
+                    race.winner = self
+                race.cond.notify_all()
+
+
+def _rate_limiter(model: Any) -> Optional[PriorityRateLimiterAdapter]:
+    """Limitador de taxa compartilhado do modelo (também sob `bind_tools`), se houver."""
+    while model is not None:
+        limiter = getattr(model, "rate_limiter", None)
+        if isinstance(limiter, PriorityRateLimiterAdapter):
+            return limiter
+        model = getattr(model, "bound", None)
+    return None
+
+
+class _Race:
+    """Estado compartilhado entre as tentativas de uma chamada."""
+
+    def __init__(self, model: Any, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict, stats: HedgeStats):
+        self.model = model
+        self.messages = messages
+        self.stop = stop
+        self.kwargs = kwargs
+        self.stats = stats
+        self.rate_limited = _rate_limiter(model) is not None
+        self.cond = threading.Condition()
+        self.attempts: List[_Attempt] = []
+        self.winner: Optional[_Attempt] = None
+
+    def launch(self, hedge: bool = False) -> None:
+        attempt = _Attempt(self, len(self.attempts), hedge)
+        self.attempts.append(attempt)
+        attempt.future = asyncio.run_coroutine_threadsafe(
+            attempt.run(contextvars.copy_context()), _attempts_loop()
+        )
+
+    def cancel(self, keep: Optional[_Attempt] = None) -> None:
+        """Cancela as tentativas em andamento, exceto `keep` (chamado com `cond` adquirido)."""
+        for attempt in self.attempts:
+            if attempt is not keep and not attempt.done:
+                attempt.cancelled = True
+                attempt.done = True
+                attempt.future.cancel()
+
+
+class HedgedChatModel(BaseChatModel):
+    """
+    Modelo de chat com prazo e tentativas de cobertura.
+
+    Envolve qualquer modelo (ou modelo com ferramentas vinculadas) que suporte
+    `stream`; as chamadas do modelo interno passam pelo limitador de taxa dele.
+    """
+
+    model: Any
+    hedge_enabled: bool = HEDGE_ENABLED
+    hedge_percentile: float = HEDGE_PERCENTILE
+    hedge_min_samples: int = HEDGE_MIN_SAMPLES
+    hedge_min_delay: float = HEDGE_MIN_DELAY_MS / 1000
+    stats: HedgeStats = Field(default_factory=get_hedge_stats, exclude=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "HedgedChatModel":
+        return self.model_copy(update={"model": self.model.bind_tools(tools, **kwargs)})
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        check_deadline("chamada ao modelo")
+        self.stats.increment("calls")
+
+        race = _Race(self.model, messages, stop, kwargs, self.stats)
+        hedge_delay = None
+        if self.hedge_enabled:
+            hedge_delay = self.stats.hedge_delay(self.hedge_percentile, self.hedge_min_samples, self.hedge_min_delay)
+
+        fallback_used = False
+        with race.cond:
+            race.launch()
+            while True:
+                winner = race.winner
+                if winner is not None:
+                    # A tentativa mantida já respondeu: as demais são canceladas
+                    race.cancel(keep=winner)
+                    if winner.done and winner.error is None:
+                        break
+                    if winner.done:
+                        left = remaining()
+                        if fallback_used or (left is not None and left <= 0):
+                            raise winner.error
+                        logger.warning(f"Tentativa falhou no meio da resposta ({winner.error}); tentando de novo")
+                        fallback_used = True
+                        race.winner = None
+                        race.launch()
+                        self.stats.increment("fallbacks")
+                        continue
+                elif all(attempt.done for attempt in race.attempts):
+                    # Todas as tentativas terminaram sem produzir um token
+                    error = next((attempt.error for attempt in race.attempts if attempt.error is not None), None)
+                    raise error or RuntimeError("O modelo encerrou a resposta sem conteúdo")
+
+                waits = []
+                left = remaining()
+                if left is not None:
+                    if left <= 0:
+                        race.cancel()
+                        self.stats.increment("deadline_exceeded")
+                        raise DeadlineExceeded("Prazo da requisição esgotado na chamada ao modelo")
+                    waits.append(left)
+
+                # O limiar conta a partir da liberação pelo limitador de taxa: enquanto a
+                # tentativa espera na fila, uma cobertura só aumentaria a fila
+                started = race.attempts[-1].started
+                if hedge_delay is not None and winner is None and started is not None:
+                    now = time.monotonic()
+                    hedge_at = started + hedge_delay
+                    if now >= hedge_at:
+                        logger.info("Primeiro token atrasado; disparando tentativa de cobertura")
+                        race.launch(hedge=True)
+                        self.stats.increment("hedged")
+                        self.stats.increment("extra_input_tokens", count_tokens_approximately(messages))
+                        hedge_delay = None
+                        continue
+                    waits.append(hedge_at - now)
+
+                race.cond.wait(min(waits) if waits else None)
+
+        if winner.hedge:
+            self.stats.increment("hedge_wins")
+        return ChatResult(generations=[ChatGeneration(message=message_chunk_to_message(winner.message))])
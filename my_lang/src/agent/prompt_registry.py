@@ -0,0 +1,284 @@
+"""
+Registro versionado de prompts do sistema.
+
+Este módulo permite publicar novas versões do prompt do sistema (por exemplo, as
+geradas pelo otimizador de prompts), ativá-las em um agente em execução sem
+reconstruir o grafo e reverter para versões anteriores. Cada versão acumula
+métricas de latência e tokens dos turnos que atendeu.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from src.config import SYSTEM_INSTRUCTIONS, PROMPT_NAMESPACE, PROMPT_REFRESH_SECONDS
+from src.metrics import percentile
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Número máximo de amostras de latência mantidas por versão
+_MAX_SAMPLES = 1000
+
+
+class PromptVersion(BaseModel):
+    """Versão publicada de um prompt do sistema."""
+    version: int = Field(..., description="Número da versão")
+    prompt: str = Field(..., description="Texto do prompt")
+    source: str = Field("manual", description="Origem da versão (manual, optimizer, ...)")
+    created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+
+
+class _VersionMetrics:
+    """Métricas acumuladas dos turnos atendidos por uma versão."""
+
+    def __init__(self):
+        self.turns = 0
+        self.errors = 0
+        self.total_tokens = 0
+        self.latencies: Deque[float] = deque(maxlen=_MAX_SAMPLES)
+
+    def snapshot(self) -> Dict[str, Any]:
+        latencies = list(self.latencies)
+        return {
+            "turns": self.turns,
+            "errors": self.errors,
+            "total_tokens": self.total_tokens,
+            "avg_tokens_per_turn": self.total_tokens / self.turns if self.turns else 0.0,
+            "latency_p50": percentile(latencies, 50),
+            "latency_p95": percentile(latencies, 95),
+        }
+
+
+class PromptRegistry:
+    """
+    Registro de versões do prompt do sistema.
+
+    A versão ativa é mantida em uma única referência, trocada atomicamente em
+    `activate`/`rollback`. O agente lê essa referência no início de cada turno,
+    então a troca vale a partir do próximo turno sem afetar turnos em andamento.
+
+    Quando um armazenamento é informado, as versões e o ponteiro da versão ativa
+    são persistidos nele, e cada processo sincroniza a versão ativa a cada
+    `refresh_seconds`, permitindo trocar o prompt de vários workers ao mesmo tempo.
+    """
+
+    def __init__(
+        self,
+        initial_prompt: str = SYSTEM_INSTRUCTIONS,
+        store: Any = None,
+        namespace: tuple = PROMPT_NAMESPACE,
+        refresh_seconds: float = PROMPT_REFRESH_SECONDS,
+    ):
+        """
+        Inicializa o registro.
+
+        Args:
+            initial_prompt (str): Prompt usado como versão 1 se não houver versões persistidas
+            store: Armazenamento opcional para compartilhar versões entre processos
+            namespace (tuple): Namespace das versões no armazenamento
+            refresh_seconds (float): Intervalo mínimo entre sincronizações com o armazenamento
+        """
+        self._store = store
+        self._namespace = namespace
+        self._refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._versions: Dict[int, PromptVersion] = {}
+        self._history: List[int] = []
+        self._metrics: Dict[int, _VersionMetrics] = {}
+        self._active: Optional[PromptVersion] = None
+        self._last_refresh = 0.0
+
+        if not self._load_from_store():
+            self.publish(initial_prompt, source="initial")
+
+    @property
+    def active(self) -> PromptVersion:
+        """Versão ativa do prompt (sincronizada com o armazenamento, se houver)."""
+        if self._store is not None and time.monotonic() - self._last_refresh >= self._refresh_seconds:
+            self.refresh()
+        return self._active
+
+    def get(self, version: int) -> Optional[PromptVersion]:
+        """
+        Recupera uma versão específica.
+
+        Args:
+            version (int): Número da versão
+
+        Returns:
+            Optional[PromptVersion]: Versão encontrada ou None
+        """
+        found = self._versions.get(version)
+        if found is None and self._store is not None:
+            item = self._store.get(self._namespace, f"v{version}")
+            if item is not None:
+                found = PromptVersion(**item.value)
+                with self._lock:
+                    self._versions[version] = found
+        return found
+
+    def versions(self) -> List[PromptVersion]:
+        """Lista as versões conhecidas, em ordem crescente."""
+        return [self._versions[v] for v in sorted(self._versions)]
+
+    def publish(
+        self,
+        prompt: str,
+        activate: bool = True,
+        source: str = "manual",
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> PromptVersion:
+        """
+        Publica uma nova versão do prompt.
+
+        Args:
+            prompt (str): Texto do prompt
+            activate (bool): Se a nova versão deve se tornar a ativa
+            source (str): Origem da versão (manual, optimizer, ...)
+            metadata (Optional[Dict[str, Any]]): Informações adicionais da versão
+
+        Returns:
+            PromptVersion: Versão publicada
+        """
+        with self._lock:
+            if self._store is not None:
+                self._sync_versions()
+            number = max(self._versions, default=0) + 1
+            version = PromptVersion(
+                version=number,
+                prompt=prompt,
+                source=source,
+                metadata=metadata or {},
+            )
+            self._versions[number] = version
+            if self._store is not None:
+                self._store.put(self._namespace, f"v{number}", version.model_dump(), index=False)
+
+            logger.info(f"Versão {number} do prompt publicada (origem: {source})")
+            if activate:
+                self.activate(number)
+            return version
+
+    def activate(self, version: int) -> PromptVersion:
+        """
+        Ativa uma versão existente a partir do próximo turno.
+
+        Args:
+            version (int): Número da versão
+
+        Returns:
+            PromptVersion: Versão ativada
+        """
+        with self._lock:
+            target = self.get(version)
+            if target is None:
+                raise ValueError(f"Versão de prompt inexistente: {version}")
+            if self._active is not None and self._active.version == version:
+                return target
+            self._history.append(version)
+            self._set_active(target)
+            logger.info(f"Versão {version} do prompt ativada")
+            return target
+
+    def rollback(self) -> PromptVersion:
+        """
+        Reverte para a versão ativa anterior.
+
+        Returns:
+            PromptVersion: Versão reativada
+        """
+        with self._lock:
+            if len(self._history) < 2:
+                raise ValueError("Não há versão anterior para reverter")
+            self._history.pop()
+            target = self.get(self._history[-1])
+            self._set_active(target)
+            logger.info(f"Prompt revertido para a versão {target.version}")
+            return target
+
+    def record_turn(
+        self,
+        version: int,
+        latency_seconds: float,
+        tokens: int = 0,
+        error: bool = False,
+    ) -> None:
+        """
+        Registra as métricas de um turno atendido por uma versão.
+
+        Args:
+            version (int): Versão usada no turno
+            latency_seconds (float): Latência total do turno
+            tokens (int): Tokens consumidos no turno
+            error (bool): Se o turno terminou com erro
+        """
+        with self._lock:
+            metrics = self._metrics.setdefault(version, _VersionMetrics())
+            metrics.turns += 1
+            metrics.total_tokens += tokens
+            metrics.latencies.append(latency_seconds)
+            if error:
+                metrics.errors += 1
+
+    def metrics(self) -> Dict[int, Dict[str, Any]]:
+        """Retorna as métricas acumuladas por versão."""
+        with self._lock:
+            return {version: metrics.snapshot() for version, metrics in self._metrics.items()}
+
+    def refresh(self) -> None:
+        """Sincroniza a versão ativa com o armazenamento compartilhado."""
+        if self._store is None:
+            return
+        try:
+            self._load_from_store()
+        except Exception as e:
+            logger.error(f"Erro ao sincronizar registro de prompts: {str(e)}")
+        finally:
+            self._last_refresh = time.monotonic()
+
+    # Helpers
+
+    def _set_active(self, version: PromptVersion) -> None:
+        self._active = version
+        if self._store is not None:
+            self._store.put(
+                self._namespace,
+                "active",
+                {"version": version.version, "history": list(self._history)},
+                index=False,
+            )
+
+    def _sync_versions(self) -> None:
+        for item in self._store.search(self._namespace, limit=10000):
+            if item.key.startswith("v") and "prompt" in item.value:
+                version = PromptVersion(**item.value)
+                self._versions.setdefault(version.version, version)
+
+    def _load_from_store(self) -> bool:
+        if self._store is None:
+            return False
+        pointer = self._store.get(self._namespace, "active")
+        self._last_refresh = time.monotonic()
+        if pointer is None:
+            return False
+
+        number = pointer.value["version"]
+        if self._active is not None and self._active.version == number:
+            return True
+
+        version = self.get(number)
+        if version is None:
+            return False
+        with self._lock:
+            self._history = list(pointer.value.get("history", [number]))
+            if self._active is not None:
+                logger.info(f"Versão {number} do prompt sincronizada do armazenamento")
+            self._active = version
+        return True
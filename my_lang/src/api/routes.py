@@ -3,18 +3,32 @@ Rotas da API para o chatbot.
 """
 
 import os
+import hmac
+import heapq
 import logging
+import threading
+import time
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 import uuid
 import traceback
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel, Field
 
+from src.config import RATE_LIMIT_ENABLED, CHAT_TIMEOUT_MS, ADMIN_TOKEN, PROFILE_MAX_SECONDS
+from src.deadlines import DeadlineExceeded
+from src.agent.hedging import get_hedge_stats
 from src.agent.chat_agent import chat
+from src.memory.optimization_pipeline import save_trajectory
+from src.rate_limiter import get_rate_limiter
+from src.memory.retrieval import get_memory_retriever
+from src.metrics import REGISTRY
+from src.timings import TurnTimings
+from src.profiling import format_collapsed, get_request_profiler, sample_stacks
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -31,6 +45,8 @@ class ChatRequest(BaseModel):
     message: str = Field(..., description="Mensagem do usuário")
     user_id: str = Field("default_user", description="ID do usuário")
     thread_id: Optional[str] = Field(None, description="ID da conversa")
+    timeout_ms: Optional[int] = Field(None, gt=0, description="Prazo da resposta em milissegundos (padrão: CHAT_TIMEOUT_MS)")
+    include_timings: bool = Field(False, description="Inclui na resposta o tempo de cada etapa do turno")
 
 
 class ChatResponse(BaseModel):
@@ -38,9 +54,42 @@ class ChatResponse(BaseModel):
     response: str = Field(..., description="Resposta do assistente")
     user_id: str = Field(..., description="ID do usuário")
     thread_id: str = Field(..., description="ID da conversa")
+    timings: Optional[Dict[str, float]] = Field(
+        None,
+        description="Milissegundos por etapa do turno (também no cabeçalho Server-Timing)",
+    )
+
+
+class ProfileSearchResponse(BaseModel):
+    """Modelo para respostas de busca de perfis."""
+    total: int = Field(..., description="Número total de usuários encontrados")
+    user_ids: List[str] = Field(..., description="IDs dos usuários encontrados (limitados)")
+
+
+class FeedbackRequest(BaseModel):
+    """Modelo para feedback sobre uma conversa, usado na otimização de prompts."""
+    user_id: str = Field("default_user", description="ID do usuário")
+    thread_id: str = Field(..., description="ID da conversa avaliada")
+    feedback: Dict[str, Any] = Field(..., description="Feedback sobre a conversa")
+
+
+class PromptPublishRequest(BaseModel):
+    """Modelo para publicação de uma nova versão do prompt do sistema."""
+    prompt: str = Field(..., description="Texto do prompt")
+    activate: bool = Field(True, description="Se a versão deve ser ativada imediatamente")
+    source: str = Field("manual", description="Origem da versão")
 
 
-def create_api(agent: Any, background_memory_manager=None, profile_manager=None) -> FastAPI:
+def create_api(
+    agent: Any,
+    background_memory_manager=None,
+    profile_manager=None,
+    profile_index=None,
+    prompt_registry=None,
+    warmup_state=None,
+    admin_token: Optional[str] = ADMIN_TOKEN,
+    request_profiler=None,
+) -> FastAPI:
     """
     Cria a API do chatbot.
     
@@ -48,6 +97,14 @@ def create_api(agent: Any, background_memory_manager=None, profile_manager=None)
         agent (Any): O agente de chat (pode ser MessageGraph ou outro objeto)
         background_memory_manager: Gerenciador de memória em segundo plano
         profile_manager: Gerenciador de perfis de usuário
+        profile_index: Índice de perfis de usuário
+        prompt_registry: Registro versionado de prompts do sistema
+        warmup_state: Estado do aquecimento do worker; `/ready` só responde 200 após
+            o aquecimento
+        admin_token (Optional[str]): Token exigido pelos endpoints `/admin`, pela
+            segmentação em `/profiles/search` e pelas escritas em `/prompts` (sem token,
+            eles ficam desativados)
+        request_profiler: Perfilador de uma fração dos turnos (padrão: o do processo)
         
     Returns:
         FastAPI: Aplicação FastAPI
@@ -67,52 +124,85 @@ def create_api(agent: Any, background_memory_manager=None, profile_manager=None)
     # Monta os arquivos estáticos
     app.mount("/static", StaticFiles(directory=static_dir), name="static")
     
+    if request_profiler is None:
+        request_profiler = get_request_profiler()
+    # Apenas uma amostragem sob demanda por vez
+    profile_lock = threading.Lock()
+    
     @app.post("/chat", response_model=ChatResponse)
-    async def chat_endpoint(request: ChatRequest) -> Dict:
+    async def chat_endpoint(request: ChatRequest) -> Response:
         """
         Endpoint para receber mensagens do usuário e obter respostas do chatbot.
         
+        A resposta traz o cabeçalho `Server-Timing` com o tempo de cada etapa do turno.
+        
         Args:
             request (ChatRequest): Requisição de chat
             
         Returns:
-            Dict: Resposta do chatbot
+            Response: Resposta do chatbot (ChatResponse)
         """
+        start_time = time.perf_counter()
+        timings = TurnTimings()
         try:
             # Usa o thread_id da requisição ou gera um novo
             thread_id = request.thread_id or str(uuid.uuid4())
             
-            logger.info(f"Processando mensagem. Usuário: {request.user_id}, Thread: {thread_id}, Mensagem: {request.message[:30]}...")
-            print(f"Processando mensagem de {request.user_id} no thread {thread_id}: {request.message}")
+            logger.info(
+                f"Processando mensagem. Usuário: {request.user_id}, Thread: {thread_id}, Mensagem: {request.message[:30]}...",
+                extra={"user_id": request.user_id, "thread_id": thread_id},
+            )
+            
+            # Prazo do turno, propagado até as chamadas ao modelo
+            timeout_ms = request.timeout_ms or CHAT_TIMEOUT_MS
             
-            # Processa a mensagem com o agente de chat
+            # Processa a mensagem com o agente de chat fora do event loop
             logger.debug("Enviando mensagem para o agente")
-            response = chat(
+            response = await run_in_threadpool(
+                request_profiler.call,
+                chat,
                 agent=agent,
                 message=request.message,
                 user_id=request.user_id,
                 thread_id=thread_id,
                 background_memory_manager=background_memory_manager,
                 profile_manager=profile_manager,
+                profile_index=profile_index,
+                prompt_registry=prompt_registry,
+                timeout_seconds=timeout_ms / 1000 if timeout_ms else None,
+                timings=timings,
             )
             
-            logger.info(f"Resposta gerada para {request.user_id}: {response[:30]}...")
-            print(f"Resposta gerada: {response}")
+            logger.info(
+                f"Resposta gerada para {request.user_id}: {response[:30]}...",
+                extra={"user_id": request.user_id, "thread_id": thread_id},
+            )
             
             # A função chat agora garante que a resposta seja uma string
-            return {
-                "response": response,
-                "user_id": request.user_id,
-                "thread_id": thread_id,
-            }
+            chat_response = ChatResponse(response=response, user_id=request.user_id, thread_id=thread_id)
+            with timings.measure("serialize"):
+                body = chat_response.model_dump_json(exclude_none=True)
+            timings.add("total", time.perf_counter() - start_time)
+            if request.include_timings:
+                # Reserializa com as durações já completas (inclusive o total)
+                chat_response.timings = timings.as_dict()
+                body = chat_response.model_dump_json()
+            return Response(
+                content=body,
+                media_type="application/json",
+                headers={"Server-Timing": timings.header()},
+            )
+        except DeadlineExceeded as e:
+            logger.warning(f"Prazo esgotado no /chat para {request.user_id}: {str(e)}")
+            timings.add("total", time.perf_counter() - start_time)
+            raise HTTPException(
+                status_code=504,
+                detail="A resposta não ficou pronta dentro do prazo",
+                headers={"Server-Timing": timings.header()},
+            )
         except Exception as e:
-            # Captura e loga a exceção de forma detalhada
-            error_msg = f"Erro no endpoint /chat: {str(e)}"
-            error_trace = traceback.format_exc()
-            logger.error(error_msg)
-            logger.error(error_trace)
-            print(error_msg)
-            print(error_trace)
+            # Loga a exceção com o traceback
+            logger.error(f"Erro no endpoint /chat: {str(e)}", exc_info=True)
             
             # Retorna um erro HTTP 500 com detalhe útil
             raise HTTPException(
@@ -120,6 +210,236 @@ def create_api(agent: Any, background_memory_manager=None, profile_manager=None)
                 detail=f"Erro interno do servidor: {str(e)}. Verifique os logs para mais detalhes."
             )
     
+    def _require_admin(authorization: Optional[str], x_admin_token: Optional[str]) -> None:
+        if not admin_token:
+            raise HTTPException(status_code=404, detail="Endpoints de administração desativados (defina ADMIN_TOKEN)")
+        token = x_admin_token
+        if token is None and authorization and authorization.lower().startswith("bearer "):
+            token = authorization[7:]
+        if token is None or not hmac.compare_digest(token.encode(), admin_token.encode()):
+            raise HTTPException(status_code=401, detail="Token de administração inválido")
+    
+    @app.get("/profiles/search", response_model=ProfileSearchResponse)
+    async def search_profiles(
+        language: Optional[str] = None,
+        interest: Optional[List[str]] = Query(None),
+        expertise_level: Optional[str] = None,
+        limit: int = Query(100, ge=1, le=10000),
+        authorization: Optional[str] = Header(None),
+        x_admin_token: Optional[str] = Header(None),
+    ) -> Dict:
+        """
+        Endpoint para segmentar usuários pelos campos indexados do perfil.
+        
+        Expõe os IDs de todos os usuários: exige o token de administração.
+        
+        Args:
+            language (Optional[str]): Idioma do usuário
+            interest (Optional[List[str]]): Interesses (qualquer um dos informados)
+            expertise_level (Optional[str]): Nível de expertise
+            limit (int): Número máximo de IDs retornados
+            
+        Returns:
+            Dict: Total de usuários e IDs encontrados
+        """
+        _require_admin(authorization, x_admin_token)
+        if profile_index is None:
+            raise HTTPException(status_code=503, detail="Índice de perfis não está habilitado")
+        
+        try:
+            user_ids = profile_index.query(
+                language=language,
+                interests=interest,
+                expertise_level=expertise_level,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return {
+            "total": len(user_ids),
+            "user_ids": heapq.nsmallest(limit, user_ids),
+        }
+    
+    @app.post("/feedback")
+    async def feedback_endpoint(request: FeedbackRequest) -> Dict:
+        """
+        Registra feedback sobre uma conversa como trajetória para o pipeline de otimização.
+        
+        Só o dono da conversa (o `user_id` gravado no checkpoint pelo /chat) pode
+        registrar feedback sobre ela.
+        
+        Args:
+            request (FeedbackRequest): Conversa avaliada e feedback
+            
+        Returns:
+            Dict: Chave da trajetória armazenada
+        """
+        store = getattr(agent, "store", None)
+        if store is None or not hasattr(agent, "get_state"):
+            raise HTTPException(status_code=503, detail="Armazenamento de trajetórias indisponível")
+        
+        state = agent.get_state({"configurable": {"thread_id": request.thread_id}})
+        messages = state.values.get("messages", []) if state else []
+        owner = (state.metadata or {}).get("user_id") if state else None
+        # Conversas de outros usuários respondem como inexistentes
+        if not messages or owner != request.user_id:
+            raise HTTPException(status_code=404, detail="Conversa não encontrada")
+        
+        key = save_trajectory(
+            store,
+            messages,
+            feedback=request.feedback,
+            user_id=request.user_id,
+            thread_id=request.thread_id,
+        )
+        return {"trajectory": key}
+    
+    def _require_prompt_registry():
+        if prompt_registry is None:
+            raise HTTPException(status_code=503, detail="Registro de prompts não está habilitado")
+        return prompt_registry
+    
+    @app.get("/prompts")
+    async def list_prompts() -> Dict:
+        """Lista as versões do prompt do sistema, a versão ativa e suas métricas."""
+        registry = _require_prompt_registry()
+        return {
+            "active": registry.active.version,
+            "versions": [version.model_dump() for version in registry.versions()],
+            "metrics": registry.metrics(),
+        }
+    
+    @app.post("/prompts")
+    async def publish_prompt(
+        request: PromptPublishRequest,
+        authorization: Optional[str] = Header(None),
+        x_admin_token: Optional[str] = Header(None),
+    ) -> Dict:
+        """Publica uma nova versão do prompt do sistema (exige o token de administração)."""
+        _require_admin(authorization, x_admin_token)
+        registry = _require_prompt_registry()
+        version = registry.publish(request.prompt, activate=request.activate, source=request.source)
+        return version.model_dump()
+    
+    @app.post("/prompts/{version}/activate")
+    async def activate_prompt(
+        version: int,
+        authorization: Optional[str] = Header(None),
+        x_admin_token: Optional[str] = Header(None),
+    ) -> Dict:
+        """Ativa uma versão existente do prompt a partir do próximo turno (exige o token de administração)."""
+        _require_admin(authorization, x_admin_token)
+        registry = _require_prompt_registry()
+        try:
+            return registry.activate(version).model_dump()
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    
+    @app.post("/prompts/rollback")
+    async def rollback_prompt(
+        authorization: Optional[str] = Header(None),
+        x_admin_token: Optional[str] = Header(None),
+    ) -> Dict:
+        """Reverte para a versão do prompt ativa anteriormente (exige o token de administração)."""
+        _require_admin(authorization, x_admin_token)
+        registry = _require_prompt_registry()
+        try:
+            return registry.rollback().model_dump()
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+    
+    @app.get("/ready")
+    async def ready():
+        """Prontidão do worker: 503 enquanto o aquecimento não terminar."""
+        if warmup_state is None:
+            return {"status": "ready"}
+        snapshot = warmup_state.snapshot()
+        if not warmup_state.ready:
+            return JSONResponse(status_code=503, content=snapshot)
+        return snapshot
+    
+    @app.get("/rate-limits")
+    async def rate_limits() -> Dict:
+        """Estado do limitador de taxa compartilhado e espera na fila por prioridade."""
+        if not RATE_LIMIT_ENABLED:
+            raise HTTPException(status_code=404, detail="Limitador de taxa não está habilitado")
+        return get_rate_limiter().stats()
+    
+    @app.get("/hedging")
+    async def hedging_stats() -> Dict:
+        """Tempo até o primeiro token, tentativas de cobertura e seu custo extra."""
+        return get_hedge_stats().snapshot()
+    
+    @app.get("/memory/retrieval")
+    async def memory_retrieval_stats() -> Dict:
+        """Latência, degradação e estado do disjuntor da busca de memórias."""
+        return get_memory_retriever().stats()
+    
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics() -> PlainTextResponse:
+        """Histogramas de latência por etapa no formato de exposição do Prometheus."""
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+    
+    @app.get("/admin/profile", response_class=PlainTextResponse)
+    async def admin_profile(
+        seconds: float = Query(10.0, gt=0),
+        interval_ms: float = Query(5.0, ge=1, le=1000),
+        include_idle: bool = False,
+        authorization: Optional[str] = Header(None),
+        x_admin_token: Optional[str] = Header(None),
+    ) -> PlainTextResponse:
+        """
+        Amostra as pilhas de todas as threads do worker por alguns segundos.
+        
+        Returns:
+            PlainTextResponse: Pilhas colapsadas (`frame;frame;frame contagem`) para flamegraphs
+        """
+        _require_admin(authorization, x_admin_token)
+        if seconds > PROFILE_MAX_SECONDS:
+            raise HTTPException(status_code=422, detail=f"Duração máxima: {PROFILE_MAX_SECONDS:.0f} segundos")
+        if not profile_lock.acquire(blocking=False):
+            raise HTTPException(status_code=409, detail="Já existe uma amostragem em andamento")
+        try:
+            logger.info(f"Amostrando pilhas por {seconds:.1f}s")
+            counts = await run_in_threadpool(sample_stacks, seconds, interval_ms / 1000, include_idle)
+        finally:
+            profile_lock.release()
+        return PlainTextResponse(format_collapsed(counts))
+    
+    @app.get("/admin/profile/requests")
+    async def admin_request_profile(
+        format: str = Query("text", pattern="^(text|pstats)$"),
+        limit: int = Query(50, ge=1, le=1000),
+        sort: str = "cumulative",
+        reset: bool = False,
+        authorization: Optional[str] = Header(None),
+        x_admin_token: Optional[str] = Header(None),
+    ) -> Response:
+        """
+        Estatísticas do cProfile acumuladas nos turnos sorteados (PROFILE_REQUEST_SAMPLE_RATE).
+        
+        Returns:
+            Response: Relatório em texto ou arquivo pstats (`format=pstats`)
+        """
+        _require_admin(authorization, x_admin_token)
+        if format == "pstats":
+            data = request_profiler.dump()
+            if data is None:
+                raise HTTPException(status_code=404, detail="Nenhuma requisição perfilada")
+            response = Response(
+                content=data,
+                media_type="application/octet-stream",
+                headers={"Content-Disposition": 'attachment; filename="requests.pstats"'},
+            )
+        else:
+            try:
+                response = PlainTextResponse(request_profiler.report(limit=limit, sort=sort))
+            except KeyError:
+                raise HTTPException(status_code=422, detail=f"Critério de ordenação desconhecido: {sort}")
+        if reset:
+            request_profiler.reset()
+        return response
+    
     @app.get("/")
     async def root():
         """Rota raiz da API que serve a interface web."""
@@ -5,26 +5,21 @@ Aplicação principal do chatbot com LangMem.
 import os
 import sys
 import logging
-import uvicorn
-from fastapi.middleware.cors import CORSMiddleware
+import threading
 
 # Adiciona o diretório raiz ao path do Python
 sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
 
-from src.config import API_HOST, API_PORT
+from src.config import API_HOST, API_PORT, CONSOLIDATION_INTERVAL, WARMUP_ENABLED, WARMUP_IN_BACKGROUND
 from src.memory import create_memory_store
 from src.agent import create_chat_agent
 from src.api import create_api
+from src.warmup import WarmupState, run_warmup
+from src.http_client import close_http_clients
+from src.tracing import get_tracer
+from src.logging_setup import configure_logging, shutdown_logging
 
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("chatbot.log")
-    ]
-)
+# Configurar logger
 logger = logging.getLogger(__name__)
 
 
@@ -32,6 +27,13 @@ def main():
     """
     Função principal que inicia o chatbot.
     """
+    # Importados aqui: só o servidor precisa deles, não quem importa o módulo
+    import uvicorn
+    from fastapi.middleware.cors import CORSMiddleware
+
+    # Logging em fila: o caminho das requisições nunca espera pela escrita em disco
+    configure_logging()
+
     try:
         logger.info("Iniciando chatbot com LangMem")
         
@@ -49,13 +51,21 @@ def main():
         agent = agent_components["agent"]
         background_memory_manager = agent_components["background_memory_manager"]
         profile_manager = agent_components["profile_manager"]
+        profile_index = agent_components["profile_index"]
+        prompt_registry = agent_components["prompt_registry"]
+        
+        # Estado do aquecimento, consultado pelo endpoint /ready
+        warmup_state = WarmupState() if WARMUP_ENABLED else None
         
         # Cria a API
         logger.info("Criando API")
         app = create_api(
             agent=agent, 
             background_memory_manager=background_memory_manager,
-            profile_manager=profile_manager
+            profile_manager=profile_manager,
+            profile_index=profile_index,
+            prompt_registry=prompt_registry,
+            warmup_state=warmup_state,
         )
         
         # Adiciona middleware CORS
@@ -67,13 +77,43 @@ def main():
             allow_headers=["*"],
         )
         
+        # Aquece o worker; /ready só responde 200 ao fim do aquecimento
+        if warmup_state is not None:
+            warmup_kwargs = {
+                "store": store,
+                "model": agent_components["model"],
+                "profile_index": profile_index,
+                "state": warmup_state,
+            }
+            if WARMUP_IN_BACKGROUND:
+                # O servidor sobe imediatamente e /ready responde 503 até o fim
+                threading.Thread(target=run_warmup, kwargs=warmup_kwargs, name="warmup", daemon=True).start()
+            else:
+                run_warmup(**warmup_kwargs)
+        
+        # Remove periodicamente as memórias duplicadas, no mesmo processo do armazenamento
+        if CONSOLIDATION_INTERVAL > 0:
+            from src.memory.consolidation import start_consolidation_schedule
+
+            start_consolidation_schedule(store, CONSOLIDATION_INTERVAL)
+        
         # Inicia o servidor
         logger.info(f"Iniciando servidor na porta {API_PORT}...")
-        print(f"Iniciando servidor na porta {API_PORT}...")
         uvicorn.run(app, host=API_HOST, port=API_PORT)
+        
+        # Grava o último snapshot do armazenamento local (SnapshotStore), se houver
+        close_store = getattr(store, "close", None)
+        if callable(close_store):
+            close_store()
+        
+        # Libera as conexões com o provedor e exporta os spans pendentes ao encerrar
+        close_http_clients()
+        get_tracer().shutdown()
     except Exception as e:
         logger.error(f"Erro ao iniciar o chatbot: {str(e)}", exc_info=True)
         raise
+    finally:
+        shutdown_logging()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,3 @@
+"""
+Benchmarks de desempenho do chatbot.
+"""
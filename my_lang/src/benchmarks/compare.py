@@ -0,0 +1,138 @@
+"""
+Comparação de resultados de benchmarks com uma linha de base.
+
+Lê dois arquivos gerados por `src.benchmarks.suite` e aponta regressões: um
+percentil de latência que subiu ou uma vazão que caiu além da tolerância. A
+tolerância é relativa (`--tolerance`, em %) e há uma folga absoluta em ms
+(`--min-delta-ms`) para que variações pequenas em operações rápidas não sejam
+tratadas como regressão. O código de saída é 1 se houver regressão, para uso na CI.
+
+Uso:
+
+    python -m src.benchmarks.compare baseline.json atual.json
+    python -m src.benchmarks.compare baseline.json atual.json --tolerance 15 --min-delta-ms 10
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+# Métricas comparadas: nome -> True se valores maiores são piores
+METRICS = {
+    "p50_ms": True,
+    "p95_ms": True,
+    "p99_ms": True,
+    "throughput_rps": False,
+}
+
+
+def compare_results(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    tolerance: float = 20.0,
+    min_delta_ms: float = 5.0,
+) -> List[Dict[str, Any]]:
+    """
+    Compara as métricas de cada benchmark presente nos dois resultados.
+
+    Args:
+        baseline (Dict[str, Any]): Resultados de referência
+        current (Dict[str, Any]): Resultados a avaliar
+        tolerance (float): Piora relativa tolerada, em porcentagem
+        min_delta_ms (float): Piora absoluta de latência sempre tolerada
+
+    Returns:
+        List[Dict[str, Any]]: Uma linha por benchmark e métrica, com `baseline`,
+            `current`, `change_pct` e `regression`
+    """
+    rows = []
+    current_results = current.get("results", {})
+    for name, reference in baseline.get("results", {}).items():
+        result = current_results.get(name)
+        if result is None:
+            rows.append({"benchmark": name, "metric": None, "regression": False, "missing": True})
+            continue
+        for metric, higher_is_worse in METRICS.items():
+            before, after = reference.get(metric), result.get(metric)
+            if before is None or after is None:
+                continue
+            change_pct = (after - before) / before * 100 if before else 0.0
+            worse = change_pct > tolerance if higher_is_worse else -change_pct > tolerance
+            if worse and higher_is_worse and after - before <= min_delta_ms:
+                worse = False
+            rows.append({
+                "benchmark": name,
+                "metric": metric,
+                "baseline": before,
+                "current": after,
+                "change_pct": round(change_pct, 1),
+                "regression": worse,
+            })
+        if result.get("errors"):
+            rows.append({
+                "benchmark": name,
+                "metric": "errors",
+                "baseline": reference.get("errors", 0),
+                "current": result["errors"],
+                "change_pct": None,
+                "regression": result["errors"] > reference.get("errors", 0),
+            })
+    return rows
+
+
+def _print_rows(rows: List[Dict[str, Any]]) -> None:
+    print(f"{'benchmark':<22}{'métrica':<16}{'base':>10}{'atual':>10}{'variação':>10}")
+    for row in rows:
+        if row.get("missing"):
+            print(f"{row['benchmark']:<22}ausente nos resultados atuais")
+            continue
+        change = f"{row['change_pct']:+.1f}%" if row["change_pct"] is not None else "-"
+        flag = "  REGRESSÃO" if row["regression"] else ""
+        print(f"{row['benchmark']:<22}{row['metric']:<16}{row['baseline']:>10}{row['current']:>10}{change:>10}{flag}")
+
+
+def report_regressions(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    tolerance: float = 20.0,
+    min_delta_ms: float = 5.0,
+) -> bool:
+    """
+    Imprime a comparação dos resultados com a linha de base.
+
+    Args:
+        baseline (Dict[str, Any]): Resultados de referência
+        current (Dict[str, Any]): Resultados a avaliar
+        tolerance (float): Piora relativa tolerada, em porcentagem
+        min_delta_ms (float): Piora absoluta de latência sempre tolerada
+
+    Returns:
+        bool: Se alguma métrica regrediu
+    """
+    if baseline.get("settings") != current.get("settings"):
+        print("Aviso: os resultados foram gerados com parâmetros diferentes")
+    rows = compare_results(baseline, current, tolerance=tolerance, min_delta_ms=min_delta_ms)
+    _print_rows(rows)
+    return any(row["regression"] for row in rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Ponto de entrada da linha de comando da comparação."""
+    parser = argparse.ArgumentParser(description="Compara resultados de benchmarks com uma linha de base")
+    parser.add_argument("baseline", help="Resultados de referência (JSON de src.benchmarks.suite)")
+    parser.add_argument("current", help="Resultados a avaliar")
+    parser.add_argument("--tolerance", type=float, default=20.0, help="Piora relativa tolerada, em %%")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="Piora absoluta de latência sempre tolerada")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    with open(args.current, encoding="utf-8") as file:
+        current = json.load(file)
+
+    return 1 if report_regressions(baseline, current, args.tolerance, args.min_delta_ms) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+"""
+Servidor local compatível com a API da OpenAI para benchmarks offline.
+
+Implementa `POST /v1/chat/completions` (com e sem streaming, incluindo chamadas
+de ferramenta) e `POST /v1/embeddings`, o suficiente para que `ChatOpenAI` e
+`OpenAIEmbeddings` funcionem apontando para ele com `base_url`:
+
+- a latência de cada resposta é sorteada de uma distribuição configurável
+  (`LatencyModel`); no streaming, a latência sorteada é o tempo até o primeiro
+  token e os demais chegam a intervalos fixos;
+- as respostas seguem a mesma política do `FakeChatModel`: perguntas disparam uma
+  busca de memórias quando há ferramenta de busca disponível;
+- os embeddings são determinísticos (derivados do hash do texto), então o mesmo
+  texto sempre gera o mesmo vetor.
+
+Uso:
+
+    with FakeOpenAIServer(chat_latency=LatencyModel("lognormal", 0.3, 0.5)) as server:
+        model = create_chat_model(base_url=server.base_url, api_key="benchmark")
+"""
+
+import functools
+import hashlib
+import json
+import math
+import random
+import struct
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import MODEL_NAME
+
+
+class LatencyModel:
+    """Distribuição de latência das respostas simuladas, em segundos."""
+
+    KINDS = ("fixed", "uniform", "lognormal")
+
+    def __init__(self, kind: str = "fixed", a: float = 0.0, b: float = 0.0, seed: Optional[int] = None):
+        """
+        Args:
+            kind (str): "fixed" (sempre `a`), "uniform" (entre `a` e `b`) ou
+                "lognormal" (mediana `a`, desvio `b` do logaritmo)
+            a (float): Primeiro parâmetro da distribuição
+            b (float): Segundo parâmetro da distribuição
+            seed (Optional[int]): Semente do gerador (sorteios reprodutíveis)
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Distribuição desconhecida: {kind} (use {', '.join(self.KINDS)})")
+        self.kind = kind
+        self.a = a
+        self.b = b
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, seed: Optional[int] = None) -> "LatencyModel":
+        """
+        Lê uma distribuição no formato da linha de comando.
+
+        Args:
+            spec (str): Por exemplo "0.2", "fixed:0.2", "uniform:0.1:0.4" ou "lognormal:0.3:0.5"
+            seed (Optional[int]): Semente do gerador
+
+        Returns:
+            LatencyModel: Distribuição correspondente
+        """
+        parts = spec.split(":")
+        if len(parts) == 1:
+            return cls("fixed", float(parts[0]), seed=seed)
+        values = [float(value) for value in parts[1:]] + [0.0]
+        return cls(parts[0], values[0], values[1], seed=seed)
+
+    def sample(self) -> float:
+        """Sorteia uma latência (nunca negativa)."""
+        with self._lock:
+            if self.kind == "uniform":
+                value = self._rng.uniform(self.a, self.b)
+            elif self.kind == "lognormal":
+                value = self.a * math.exp(self._rng.gauss(0.0, self.b)) if self.a > 0 else 0.0
+            else:
+                value = self.a
+        return max(0.0, value)
+
+    def __repr__(self) -> str:
+        return f"{self.kind}:{self.a}:{self.b}"
+
+
+@functools.lru_cache(maxsize=65536)
+def _word_vector(word: str, dims: int) -> Tuple[float, ...]:
+    # Componentes em [-1, 1) derivados do hash da palavra (SHAKE gera quantos bytes forem pedidos)
+    digest = hashlib.shake_256(word.encode("utf-8")).digest(2 * dims)
+    return tuple(component / 32768.0 for component in struct.unpack(f"<{dims}h", digest))
+
+
+def deterministic_embedding(text: str, dims: int) -> List[float]:
+    """
+    Gera um vetor unitário determinístico para o texto.
+
+    Textos com palavras em comum têm vetores próximos: cada palavra contribui com
+    um vetor derivado do seu hash.
+
+    Args:
+        text (str): Texto a representar
+        dims (int): Dimensão do vetor
+
+    Returns:
+        List[float]: Vetor de norma 1
+    """
+    vector = [0.0] * dims
+    for word in (text.lower().split() or [""]):
+        for i, component in enumerate(_word_vector(word, dims)):
+            vector[i] += component
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+def _approximate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
+
+
+class FakeOpenAIServer:
+    """Servidor HTTP local que imita os endpoints de chat e embeddings da OpenAI."""
+
+    def __init__(
+        self,
+        chat_latency: Optional[LatencyModel] = None,
+        embedding_latency: Optional[LatencyModel] = None,
+        token_interval: float = 0.0,
+        embedding_dims: int = 1536,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        """
+        Args:
+            chat_latency (Optional[LatencyModel]): Latência das respostas de chat
+                (no streaming, tempo até o primeiro token)
+            embedding_latency (Optional[LatencyModel]): Latência das respostas de embeddings
+            token_interval (float): Intervalo entre os pedaços de uma resposta em streaming
+            embedding_dims (int): Dimensão padrão dos embeddings
+            host (str): Endereço de escuta
+            port (int): Porta de escuta (0 escolhe uma livre)
+        """
+        self.chat_latency = chat_latency or LatencyModel()
+        self.embedding_latency = embedding_latency or LatencyModel()
+        self.token_interval = token_interval
+        self.embedding_dims = embedding_dims
+        self.requests = {"chat": 0, "embeddings": 0}
+        self._counter_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """URL base para `base_url` dos clientes da OpenAI."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        """Começa a atender em uma thread em segundo plano."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Atende na thread atual até ser interrompido."""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        """Encerra o servidor."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _count(self, endpoint: str) -> None:
+        with self._counter_lock:
+            self.requests[endpoint] += 1
+
+    def completion(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Monta a mensagem de resposta de uma requisição de chat.
+
+        Perguntas do usuário disparam uma chamada à primeira ferramenta de busca
+        disponível; o restante recebe um texto determinístico.
+
+        Args:
+            body (Dict[str, Any]): Corpo da requisição `chat/completions`
+
+        Returns:
+            Dict[str, Any]: Mensagem do assistente (`content` ou `tool_calls`)
+        """
+        messages = body.get("messages", [])
+        tool_names = [tool.get("function", {}).get("name", "") for tool in body.get("tools") or []]
+        last = messages[-1] if messages else {}
+        question = _message_text(last)
+
+        search_tools = [name for name in tool_names if "search" in name]
+        if last.get("role") == "user" and "?" in question and search_tools:
+            return {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": search_tools[0], "arguments": json.dumps({"query": question})},
+                }],
+            }
+
+        user_text = next((_message_text(m) for m in reversed(messages) if m.get("role") == "user"), "")
+        rng = random.Random(user_text)
+        return {"role": "assistant", "content": f"Resposta {rng.randint(0, 9999)}: {user_text}"}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Cabeçalhos e corpo saem em escritas separadas: sem isso, o algoritmo de
+            # Nagle somado ao ACK atrasado acrescenta ~40 ms a cada resposta
+            disable_nagle_algorithm = True
+
+            def log_message(self, format: str, *args: Any) -> None:
+                # Sem log por requisição: o servidor roda dentro do benchmark
+                pass
+
+            def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path.endswith("/chat/completions"):
+                    server._count("chat")
+                    if body.get("stream"):
+                        self._stream_chat(body)
+                    else:
+                        self._chat(body)
+                elif self.path.endswith("/embeddings"):
+                    server._count("embeddings")
+                    self._embeddings(body)
+                else:
+                    self._send_json(404, {"error": {"message": f"Rota desconhecida: {self.path}"}})
+
+            def _usage(self, body: Dict[str, Any], message: Dict[str, Any]) -> Dict[str, int]:
+                prompt_tokens = sum(_approximate_tokens(_message_text(m)) for m in body.get("messages", []))
+                completion_tokens = _approximate_tokens(json.dumps(message))
+                return {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                }
+
+            def _chat(self, body: Dict[str, Any]) -> None:
+                time.sleep(server.chat_latency.sample())
+                message = server.completion(body)
+                self._send_json(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", MODEL_NAME),
+                    "choices": [{
+                        "index": 0,
+                        "message": message,
+                        "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+                    }],
+                    "usage": self._usage(body, message),
+                })
+
+            def _stream_chat(self, body: Dict[str, Any]) -> None:
+                message = server.completion(body)
+                completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+                base = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": body.get("model", MODEL_NAME),
+                }
+
+                deltas: List[Dict[str, Any]] = [{"role": "assistant", "content": ""}]
+                if message.get("tool_calls"):
+                    deltas += [
+                        {"tool_calls": [{"index": index, **call}]}
+                        for index, call in enumerate(message["tool_calls"])
+                    ]
+                else:
+                    deltas += [{"content": word} for word in message["content"].split(" ") if word]
+                    for delta in deltas[2:]:
+                        delta["content"] = " " + delta["content"]
+                finish_reason = "tool_calls" if message.get("tool_calls") else "stop"
+
+                # Codificação em pedaços mantém a conexão reaproveitável, como na API real
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                time.sleep(server.chat_latency.sample())
+                try:
+                    for index, delta in enumerate(deltas):
+                        if index > 1 and server.token_interval > 0:
+                            time.sleep(server.token_interval)
+                        self._event({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+                    self._event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]})
+                    if (body.get("stream_options") or {}).get("include_usage"):
+                        self._event({**base, "choices": [], "usage": self._usage(body, message)})
+                    self._chunk(b"data: [DONE]\n\n")
+                    self._chunk(b"")
+                except (BrokenPipeError, ConnectionResetError):
+                    # O cliente desistiu (por exemplo, a tentativa perdedora de uma cobertura)
+                    self.close_connection = True
+
+            def _event(self, payload: Dict[str, Any]) -> None:
+                self._chunk(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+
+            def _chunk(self, data: bytes) -> None:
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def _embeddings(self, body: Dict[str, Any]) -> None:
+                time.sleep(server.embedding_latency.sample())
+                inputs = body.get("input", [])
+                if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+                    inputs = [inputs]
+                dims = body.get("dimensions") or server.embedding_dims
+                data = []
+                for index, text in enumerate(inputs):
+                    if not isinstance(text, str):
+                        # Entrada já tokenizada: usa os identificadores como texto
+                        text = " ".join(str(token) for token in text)
+                    data.append({"object": "embedding", "index": index, "embedding": deterministic_embedding(text, dims)})
+                tokens = sum(_approximate_tokens(str(text)) for text in inputs)
+                self._send_json(200, {
+                    "object": "list",
+                    "data": data,
+                    "model": body.get("model", ""),
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                })
+
+        return Handler
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Roda o servidor em primeiro plano (para apontar um servidor real do chatbot para ele)."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Servidor local compatível com a API da OpenAI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--chat-latency", default="0", help='Ex.: "0.2", "uniform:0.1:0.4", "lognormal:0.3:0.5"')
+    parser.add_argument("--embedding-latency", default="0")
+    parser.add_argument("--token-interval", type=float, default=0.0, help="Segundos entre pedaços no streaming")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    server = FakeOpenAIServer(
+        chat_latency=LatencyModel.parse(args.chat_latency, seed=args.seed),
+        embedding_latency=LatencyModel.parse(args.embedding_latency, seed=args.seed),
+        token_interval=args.token_interval,
+        host=args.host,
+        port=args.port,
+    )
+    print(f"Servidor simulado em {server.base_url} (OPENAI_BASE_URL={server.base_url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Benchmark do tempo de importação dos pontos de entrada.
+
+Executa `python -X importtime -c "import <módulo>"` em um processo novo para cada
+ponto de entrada (servidor e CLI), soma o tempo acumulado da importação e falha
+se ele passar do orçamento ou se algum módulo pesado que deveria ser carregado
+sob demanda (backend PostgreSQL, LangMem, cliente OpenAI, numpy...) aparecer na
+importação.
+
+Uso:
+
+    python -m src.benchmarks.import_time
+    python -m src.benchmarks.import_time --budget-ms 800 --top 15 src.app
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, Iterable, List, Optional
+
+from src.config import STARTUP_IMPORT_BUDGET_MS
+
+# Diretório que contém o pacote `src`
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# Pontos de entrada medidos por padrão
+DEFAULT_TARGETS = ["src.app", "src.cli"]
+
+# Módulos que só podem ser importados quando o recurso correspondente é usado
+LAZY_MODULES = [
+    "langgraph.store.postgres",
+    "psycopg",
+    "langmem",
+    "langchain_openai",
+    "openai",
+    "numpy",
+    "uvicorn",
+]
+
+
+def parse_importtime(output: str) -> Dict[str, int]:
+    """
+    Lê a saída de `-X importtime`.
+
+    Args:
+        output (str): Saída de erro do interpretador
+
+    Returns:
+        Dict[str, int]: Módulo -> tempo acumulado de importação em microssegundos
+    """
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            # Linha de cabeçalho
+            continue
+        modules[parts[2].strip()] = int(parts[1])
+    return modules
+
+
+def measure_import(module: str, repeat: int = 3, python: str = sys.executable) -> Dict[str, object]:
+    """
+    Mede o tempo de importação de um módulo em processos novos.
+
+    Cada repetição roda em um interpretador limpo; o resultado é o da execução
+    mais rápida, que é o menos afetado por ruído da máquina.
+
+    Args:
+        module (str): Módulo a importar
+        repeat (int): Número de execuções
+        python (str): Interpretador a usar
+
+    Returns:
+        Dict[str, object]: `module`, `total_ms` e `modules` (módulo -> ms acumulados)
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    best = None
+    for _ in range(max(1, repeat)):
+        result = subprocess.run(
+            [python, "-X", "importtime", "-c", f"import {module}"],
+            cwd=PROJECT_ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Falha ao importar {module}: {result.stderr.strip().splitlines()[-1:]}")
+
+        modules = parse_importtime(result.stderr)
+        # Com `import a.b`, o módulo medido é o último pacote do caminho importado
+        total_us = sum(
+            cumulative for name, cumulative in modules.items()
+            if name in (module, module.split(".")[0])
+        )
+        if best is None or total_us < best[0]:
+            best = (total_us, modules)
+
+    total_us, modules = best
+    return {
+        "module": module,
+        "total_ms": total_us / 1000,
+        "modules": {name: cumulative / 1000 for name, cumulative in modules.items()},
+    }
+
+
+def check_startup(
+    targets: Iterable[str] = DEFAULT_TARGETS,
+    budget_ms: float = STARTUP_IMPORT_BUDGET_MS,
+    lazy_modules: Iterable[str] = LAZY_MODULES,
+    repeat: int = 3,
+) -> List[Dict[str, object]]:
+    """
+    Verifica o orçamento de importação de cada ponto de entrada.
+
+    Args:
+        targets (Iterable[str]): Módulos de entrada
+        budget_ms (float): Tempo máximo de importação por módulo
+        lazy_modules (Iterable[str]): Módulos que não podem ser importados na inicialização
+        repeat (int): Execuções por módulo
+
+    Returns:
+        List[Dict[str, object]]: Medições com a lista `violations` preenchida
+    """
+    lazy_modules = list(lazy_modules)
+    results = []
+    for target in targets:
+        measurement = measure_import(target, repeat=repeat)
+        violations = []
+        if measurement["total_ms"] > budget_ms:
+            violations.append(f"{measurement['total_ms']:.0f} ms excede o orçamento de {budget_ms:.0f} ms")
+        loaded = [
+            name for name in lazy_modules
+            if any(module == name or module.startswith(name + ".") for module in measurement["modules"])
+        ]
+        if loaded:
+            violations.append(f"módulos carregados na importação: {', '.join(loaded)}")
+        measurement["violations"] = violations
+        results.append(measurement)
+    return results
+
+
+def _print_report(results: List[Dict[str, object]], top: int) -> None:
+    for measurement in results:
+        status = "FALHOU" if measurement["violations"] else "ok"
+        print(f"{measurement['module']}: {measurement['total_ms']:.1f} ms [{status}]")
+        for violation in measurement["violations"]:
+            print(f"  - {violation}")
+        if top:
+            heaviest = sorted(measurement["modules"].items(), key=lambda item: item[1], reverse=True)
+            for name, cumulative_ms in heaviest[1:top + 1]:
+                print(f"    {cumulative_ms:8.1f} ms  {name}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Ponto de entrada da linha de comando do benchmark."""
+    parser = argparse.ArgumentParser(description="Verifica o tempo de importação dos pontos de entrada")
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS, help="Módulos a medir")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_IMPORT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por módulo (vale a mais rápida)")
+    parser.add_argument("--top", type=int, default=10, help="Módulos mais lentos a listar (0 desativa)")
+    args = parser.parse_args(argv)
+
+    results = check_startup(args.targets, budget_ms=args.budget_ms, repeat=args.repeat)
+    _print_report(results, args.top)
+    return 1 if any(measurement["violations"] for measurement in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,397 @@
+"""
+Benchmark de escala do armazenamento de memórias.
+
+Carrega memórias sintéticas em cada backend do `create_memory_store`
+(`InMemoryStore`, `SQLiteStore` e, com PostgreSQL configurado, o armazenamento do
+pgvector) em vários tamanhos e mede, para cada ponto:
+
+- vazão de escrita (memórias por segundo, em lotes, incluindo os embeddings);
+- tempo de construção do índice vetorial (no PostgreSQL, um `REINDEX` do índice
+  ANN após a carga; o `InMemoryStore` não tem índice separado);
+- latência de busca em um namespace de usuário e em todos os usuários;
+- memória residente do processo (RSS) e bytes por memória.
+
+Os embeddings são determinísticos e locais (`deterministic_embedding`), para que
+o resultado meça o armazenamento e não o provedor. Cada ponto roda em um processo
+novo, para que o RSS de um tamanho não contamine o seguinte.
+
+Uso:
+
+    python -m src.benchmarks.store_scaling --sizes 10000,100000 --output scaling.json --markdown scaling.md
+    python -m src.benchmarks.store_scaling --backends memory,postgres --sizes 1000000 --dims 64
+    python -m src.benchmarks.store_scaling --backends memory,sqlite --sizes 100000
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from src.benchmarks.fake_openai import deterministic_embedding
+from src.config import POSTGRES_CONNECTION_STRING, USE_POSTGRES
+from src.metrics import percentile
+
+# Diretório que contém o pacote `src`
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+BACKENDS = ["memory", "sqlite", "postgres"]
+
+# Vocabulário das memórias sintéticas: cada memória codifica o próprio índice em
+# palavras (base len(_WORDS)), o que garante textos distintos e determinísticos
+_WORDS = [
+    "café", "chá", "corrida", "leitura", "python", "música", "viagem", "cinema",
+    "cachorro", "gato", "jardim", "praia", "montanha", "cozinha", "xadrez", "futebol",
+    "fotografia", "pintura", "violão", "piano", "ciclismo", "natação", "yoga", "teatro",
+    "história", "ciência", "dados", "agentes", "memória", "idiomas", "poesia", "astronomia",
+    "vinho", "pão", "chocolate", "sorvete", "trilha", "camping", "pesca", "dança",
+]
+_TEMPLATES = [
+    "O usuário gosta de {0} e de {1} nos fins de semana, além de {2} e {3}",
+    "O usuário trabalha com {0} e estuda {1}; prefere {2} a {3}",
+    "O usuário quer aprender {0} com {1} e pratica {2} com {3}",
+]
+
+
+def synthetic_memory(index: int) -> str:
+    """
+    Gera o texto da memória sintética de um índice (sempre o mesmo texto para o mesmo índice).
+
+    Args:
+        index (int): Índice da memória
+
+    Returns:
+        str: Texto da memória, distinto para índices distintos (até len(_WORDS) ** 4 * 3)
+    """
+    words = []
+    value = index // len(_TEMPLATES)
+    for _ in range(4):
+        value, digit = divmod(value, len(_WORDS))
+        words.append(_WORDS[digit])
+    return _TEMPLATES[index % len(_TEMPLATES)].format(*words)
+
+
+class DeterministicEmbeddings(Embeddings):
+    """Embeddings locais e determinísticos, com o tempo gasto acumulado."""
+
+    def __init__(self, dims: int):
+        self.dims = dims
+        self.seconds = 0.0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        vectors = [deterministic_embedding(text, self.dims) for text in texts]
+        self.seconds += time.perf_counter() - start
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def current_rss_mb() -> float:
+    """Memória residente atual do processo em MB (máxima, onde a atual não está disponível)."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está em KB no Linux e em bytes no macOS
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def _latency_summary(seconds: List[float]) -> Dict[str, Any]:
+    milliseconds = [value * 1000 for value in seconds]
+    summary = {"queries": len(milliseconds)}
+    for name, pct in (("p50_ms", 50), ("p95_ms", 95), ("p99_ms", 99)):
+        value = percentile(milliseconds, pct)
+        summary[name] = round(value, 3) if value is not None else None
+    return summary
+
+
+class _PostgresBackend:
+    """Armazenamento do pgvector com namespaces exclusivos da execução e limpeza ao final."""
+
+    def __init__(self, embeddings: DeterministicEmbeddings, dims: int):
+        from langgraph.store.postgres import PostgresStore
+
+        self._context = PostgresStore.from_conn_string(
+            POSTGRES_CONNECTION_STRING,
+            index={"dims": dims, "embed": embeddings},
+        )
+        self.store = self._context.__enter__()
+        self.store.setup()
+
+    def rebuild_index(self) -> Optional[float]:
+        with self.store._cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE tablename = 'store_vectors' "
+                "AND (indexdef ILIKE '%hnsw%' OR indexdef ILIKE '%ivfflat%')"
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                return None
+            start = time.perf_counter()
+            for row in rows:
+                name = row["indexname"] if isinstance(row, dict) else row[0]
+                cursor.execute(f'REINDEX INDEX "{name}"')
+            return time.perf_counter() - start
+
+    def close(self, root: str) -> None:
+        with self.store._cursor() as cursor:
+            cursor.execute("DELETE FROM store_vectors WHERE prefix LIKE %s", (f"{root}.%",))
+            cursor.execute("DELETE FROM store WHERE prefix LIKE %s", (f"{root}.%",))
+        self._context.__exit__(None, None, None)
+
+
+def measure_point(
+    backend: str,
+    memories: int,
+    per_user: int,
+    dims: int = 256,
+    batch_size: int = 1000,
+    queries: int = 200,
+    global_queries: int = 20,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Carrega um armazenamento com memórias sintéticas e mede escrita, índice, busca e RSS.
+
+    Args:
+        backend (str): "memory", "sqlite" ou "postgres"
+        memories (int): Total de memórias carregadas
+        per_user (int): Memórias por usuário (define o número de namespaces)
+        dims (int): Dimensão dos embeddings
+        batch_size (int): Memórias por lote de escrita
+        queries (int): Buscas medidas em namespaces de usuário
+        global_queries (int): Buscas medidas em todos os usuários
+        seed (int): Semente da escolha de usuários e consultas
+
+    Returns:
+        Dict[str, Any]: Medições do ponto
+    """
+    from langgraph.store.base import PutOp
+
+    gc.collect()
+    rss_before = current_rss_mb()
+    embeddings = DeterministicEmbeddings(dims)
+    users = max(1, memories // max(1, per_user))
+    # Namespace exclusivo da execução (no PostgreSQL, removido ao final)
+    root = f"scaling_{os.getpid()}_{int(time.time())}"
+
+    postgres = None
+    sqlite_directory = None
+    if backend == "memory":
+        from langgraph.store.memory import InMemoryStore
+
+        store = InMemoryStore(index={"dims": dims, "embed": embeddings})
+    elif backend == "sqlite":
+        import tempfile
+
+        from src.memory.sqlite_store import SQLiteStore
+
+        sqlite_directory = tempfile.TemporaryDirectory()
+        store = SQLiteStore(os.path.join(sqlite_directory.name, "memories.sqlite3"),
+                            index={"dims": dims, "embed": embeddings})
+    elif backend == "postgres":
+        postgres = _PostgresBackend(embeddings, dims)
+        store = postgres.store
+    else:
+        raise ValueError(f"Backend desconhecido: {backend} (use {', '.join(BACKENDS)})")
+
+    try:
+        start = time.perf_counter()
+        for offset in range(0, memories, batch_size):
+            store.batch([
+                PutOp((root, f"user_{index % users}"), f"memory_{index}", {"content": synthetic_memory(index)})
+                for index in range(offset, min(offset + batch_size, memories))
+            ])
+        load_seconds = time.perf_counter() - start
+        index_seconds = postgres.rebuild_index() if postgres is not None else None
+
+        gc.collect()
+        rss_after = current_rss_mb()
+
+        rng = random.Random(seed)
+        query_texts = [" ".join(rng.sample(_WORDS, 4)) for _ in range(max(queries, global_queries))]
+        user_latencies = []
+        for query in query_texts[:queries]:
+            namespace = (root, f"user_{rng.randrange(users)}")
+            query_start = time.perf_counter()
+            store.search(namespace, query=query, limit=5)
+            user_latencies.append(time.perf_counter() - query_start)
+        global_latencies = []
+        for query in query_texts[:global_queries]:
+            query_start = time.perf_counter()
+            store.search((root,), query=query, limit=5)
+            global_latencies.append(time.perf_counter() - query_start)
+    finally:
+        if postgres is not None:
+            postgres.close(root)
+        if sqlite_directory is not None:
+            store.close()
+            sqlite_directory.cleanup()
+
+    return {
+        "backend": backend,
+        "memories": memories,
+        "per_user": per_user,
+        "users": users,
+        "dims": dims,
+        "load_s": round(load_seconds, 3),
+        "embed_s": round(embeddings.seconds, 3),
+        "put_throughput_per_s": round(memories / load_seconds, 1) if load_seconds > 0 else None,
+        "index_build_s": round(index_seconds, 3) if index_seconds is not None else None,
+        "rss_mb": round(rss_after, 1),
+        "rss_delta_mb": round(rss_after - rss_before, 1),
+        "bytes_per_memory": round((rss_after - rss_before) * 1024 * 1024 / memories) if memories else None,
+        "search_user": _latency_summary(user_latencies),
+        "search_global": _latency_summary(global_latencies),
+    }
+
+
+def run_scaling(
+    backends: List[str],
+    sizes: List[int],
+    per_user: List[int],
+    dims: int = 256,
+    queries: int = 200,
+    global_queries: int = 20,
+    python: str = sys.executable,
+) -> List[Dict[str, Any]]:
+    """
+    Mede todas as combinações de backend, tamanho e memórias por usuário.
+
+    Cada ponto roda em um processo novo (ver `measure_point`).
+
+    Args:
+        backends (List[str]): Backends a medir
+        sizes (List[int]): Totais de memórias
+        per_user (List[int]): Memórias por usuário
+        dims (int): Dimensão dos embeddings
+        queries (int): Buscas medidas por namespace de usuário
+        global_queries (int): Buscas medidas em todos os usuários
+        python (str): Interpretador a usar
+
+    Returns:
+        List[Dict[str, Any]]: Medições (ou `error`) de cada ponto
+    """
+    points = []
+    for backend in backends:
+        for size in sizes:
+            for count in per_user:
+                if count > size:
+                    continue
+                spec = {
+                    "backend": backend, "memories": size, "per_user": count, "dims": dims,
+                    "queries": queries, "global_queries": global_queries,
+                }
+                result = subprocess.run(
+                    [python, "-m", "src.benchmarks.store_scaling", "--point", json.dumps(spec)],
+                    cwd=PROJECT_ROOT,
+                    capture_output=True,
+                    text=True,
+                )
+                if result.returncode != 0:
+                    error = (result.stderr.strip().splitlines() or ["erro desconhecido"])[-1]
+                    points.append({**spec, "error": error})
+                else:
+                    points.append(json.loads(result.stdout.strip().splitlines()[-1]))
+                _print_point(points[-1])
+    return points
+
+
+def _print_point(point: Dict[str, Any]) -> None:
+    label = f"{point['backend']} {point['memories']} memórias ({point['per_user']}/usuário)"
+    if "error" in point:
+        print(f"{label}: erro: {point['error']}", file=sys.stderr)
+        return
+    print(
+        f"{label}: {point['put_throughput_per_s']:.0f} escritas/s, "
+        f"busca p95 {point['search_user']['p95_ms']:.2f} ms, RSS +{point['rss_delta_mb']:.0f} MB",
+        file=sys.stderr,
+    )
+
+
+def format_markdown(points: List[Dict[str, Any]]) -> str:
+    """
+    Formata as medições como uma tabela Markdown (uma linha por ponto).
+
+    Args:
+        points (List[Dict[str, Any]]): Medições de `run_scaling`
+
+    Returns:
+        str: Tabela Markdown
+    """
+    lines = [
+        "| backend | memórias | por usuário | escritas/s | índice (s) | busca usuário p50/p95/p99 (ms) "
+        "| busca global p50/p95 (ms) | RSS (MB) | bytes/memória |",
+        "|---|---:|---:|---:|---:|---|---|---:|---:|",
+    ]
+    for point in points:
+        if "error" in point:
+            lines.append(f"| {point['backend']} | {point['memories']} | {point['per_user']} | erro: {point['error']} |||||")
+            continue
+        user, everyone = point["search_user"], point["search_global"]
+        index = f"{point['index_build_s']:.2f}" if point["index_build_s"] is not None else "-"
+        lines.append(
+            f"| {point['backend']} | {point['memories']:,} | {point['per_user']:,} "
+            f"| {point['put_throughput_per_s']:,.0f} | {index} "
+            f"| {user['p50_ms']:.2f} / {user['p95_ms']:.2f} / {user['p99_ms']:.2f} "
+            f"| {everyone['p50_ms']:.1f} / {everyone['p95_ms']:.1f} "
+            f"| {point['rss_delta_mb']:,.0f} | {point['bytes_per_memory']:,} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item.replace("_", "")) for item in value.split(",") if item]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Ponto de entrada da linha de comando do benchmark de escala."""
+    parser = argparse.ArgumentParser(description="Benchmark de escala do armazenamento de memórias")
+    parser.add_argument("--backends", default="memory,postgres" if USE_POSTGRES else "memory",
+                        help=f"Backends separados por vírgula ({', '.join(BACKENDS)})")
+    parser.add_argument("--sizes", type=_int_list, default=[10_000, 100_000], help="Totais de memórias")
+    parser.add_argument("--per-user", type=_int_list, default=[100, 1000], help="Memórias por usuário")
+    parser.add_argument("--dims", type=int, default=256, help="Dimensão dos embeddings")
+    parser.add_argument("--queries", type=int, default=200, help="Buscas por namespace de usuário")
+    parser.add_argument("--global-queries", type=int, default=20, help="Buscas em todos os usuários")
+    parser.add_argument("--output", help="Arquivo JSON com as medições")
+    parser.add_argument("--markdown", help="Arquivo Markdown com a tabela das medições")
+    parser.add_argument("--point", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.point:
+        # Execução de um único ponto no processo filho
+        print(json.dumps(measure_point(**json.loads(args.point))))
+        return 0
+
+    backends = [backend for backend in args.backends.split(",") if backend]
+    points = run_scaling(backends, args.sizes, args.per_user, dims=args.dims,
+                         queries=args.queries, global_queries=args.global_queries)
+    table = format_markdown(points)
+    print(table)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(points, file, indent=2, ensure_ascii=False)
+            file.write("\n")
+    if args.markdown:
+        with open(args.markdown, "w", encoding="utf-8") as file:
+            file.write(table)
+    return 1 if any("error" in point for point in points) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
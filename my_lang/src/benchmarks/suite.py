@@ -0,0 +1,396 @@
+"""
+Benchmarks de latência e vazão sem acesso ao provedor.
+
+Sobe o servidor simulado de `src.benchmarks.fake_openai` e aponta para ele os
+modelos reais do projeto (`create_chat_model`, `create_embeddings`), de modo que
+todo o caminho de produção é exercitado: clientes HTTP, streaming, agente,
+ferramentas de memória, busca vetorial no armazenamento e a API. Cada benchmark
+roda N operações com C workers simultâneos e registra vazão e percentis.
+
+Benchmarks:
+
+- `store_put` / `store_search`: escrita e busca vetorial no armazenamento
+- `prompt_with_memories`: montagem do prompt com as memórias do usuário
+- `agent_chat`: turno completo com `chat()` (modelo, ferramenta de busca, checkpointer)
+- `api_chat`: turno completo pelo endpoint `/chat`
+
+O resultado é um JSON com um registro por benchmark; `src.benchmarks.compare`
+compara dois resultados (por exemplo, o de uma PR com a linha de base). A linha de
+base do repositório fica em `src/benchmarks/baseline.json`, gerada com os
+parâmetros padrão; `--baseline` roda a suíte e já compara com ela, terminando com
+código 1 se houver regressão.
+
+Uso:
+
+    python -m src.benchmarks.suite --baseline src/benchmarks/baseline.json
+    python -m src.benchmarks.suite --output src/benchmarks/baseline.json
+    python -m src.benchmarks.suite --concurrency 32 --requests 500 --chat-latency lognormal:0.4:0.5
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from src.benchmarks.compare import report_regressions
+from src.benchmarks.fake_openai import FakeOpenAIServer, LatencyModel
+from src.config import EMBEDDING_MODEL, MEMORY_NAMESPACE, MODEL_NAME
+from src.metrics import percentile
+
+# Versão do formato do arquivo de resultados
+RESULTS_VERSION = 1
+
+# Linha de base versionada, gerada com os parâmetros padrão
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+BENCHMARKS = ["store_put", "store_search", "prompt_with_memories", "agent_chat", "api_chat"]
+
+# Mensagens usadas nos turnos: perguntas disparam a ferramenta de busca de memórias
+MESSAGES = [
+    "Meu nome é Ana e eu trabalho com análise de dados.",
+    "Qual linguagem você recomenda para análise de dados?",
+    "Eu gosto de café sem açúcar e de caminhar no parque.",
+    "Você lembra do que eu gosto de beber?",
+    "Estou aprendendo LangGraph para construir agentes.",
+    "Como posso organizar a memória de longo prazo de um agente?",
+]
+
+MEMORIES = [
+    "O usuário gosta de café sem açúcar",
+    "O usuário trabalha com análise de dados",
+    "O usuário está aprendendo LangGraph",
+    "O usuário prefere respostas curtas",
+    "O usuário mora em Curitiba",
+    "O usuário tem um cachorro chamado Toby",
+    "O usuário pratica corrida aos domingos",
+    "O usuário usa Python no trabalho",
+]
+
+
+def run_load(operation: Callable[[int], Any], requests: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Executa uma operação repetidamente com vários workers simultâneos.
+
+    Args:
+        operation (Callable[[int], Any]): Operação a medir; recebe o índice da requisição
+        requests (int): Número total de execuções
+        concurrency (int): Workers simultâneos
+
+    Returns:
+        Dict[str, Any]: Contagens, duração, vazão (`throughput_rps`) e latências em ms
+            (`mean_ms`, `p50_ms`, `p95_ms`, `p99_ms`, `max_ms`) das execuções bem-sucedidas
+    """
+    latencies: List[float] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    def worker(index: int) -> None:
+        start = time.perf_counter()
+        try:
+            operation(index)
+        except Exception as e:
+            with lock:
+                errors.append(f"{type(e).__name__}: {e}")
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="benchmark") as executor:
+        list(executor.map(worker, range(requests)))
+    duration = time.perf_counter() - started
+
+    milliseconds = [latency * 1000 for latency in latencies]
+    result = {
+        "requests": requests,
+        "errors": len(errors),
+        "concurrency": concurrency,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 2) if duration > 0 else 0.0,
+    }
+    for name, value in (
+        ("mean_ms", sum(milliseconds) / len(milliseconds) if milliseconds else None),
+        ("p50_ms", percentile(milliseconds, 50)),
+        ("p95_ms", percentile(milliseconds, 95)),
+        ("p99_ms", percentile(milliseconds, 99)),
+        ("max_ms", max(milliseconds) if milliseconds else None),
+    ):
+        result[name] = round(value, 2) if value is not None else None
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+
+def _namespace(user_id: str) -> tuple:
+    return tuple(part.format(user_id=user_id) for part in MEMORY_NAMESPACE)
+
+
+class BenchmarkEnvironment:
+    """Servidor simulado, armazenamento e agente compartilhados pelos benchmarks."""
+
+    def __init__(self, server: FakeOpenAIServer, users: int = 20, memories_per_user: int = 8):
+        """
+        Args:
+            server (FakeOpenAIServer): Servidor simulado já iniciado
+            users (int): Usuários distintos usados nos turnos
+            memories_per_user (int): Memórias gravadas por usuário antes das buscas
+        """
+        from langgraph.store.base import PutOp
+        from langgraph.store.memory import InMemoryStore
+
+        from src.agent.chat_agent import create_chat_agent
+        from src.models import create_chat_model, create_embeddings
+
+        self.server = server
+        self.users = [f"bench_user_{i}" for i in range(users)]
+        client_kwargs = {"base_url": server.base_url, "api_key": "benchmark"}
+
+        # Textos vão direto ao servidor, sem tokenização local (que exigiria baixar o
+        # tiktoken) e sem o limitador de taxa, como o modelo de chat abaixo
+        embeddings = create_embeddings(
+            EMBEDDING_MODEL, rate_limiter=None, check_embedding_ctx_length=False, **client_kwargs
+        )
+        self.store = InMemoryStore(index={"dims": server.embedding_dims, "embed": embeddings})
+
+        # Sem o limitador de taxa: o benchmark mede a aplicação, não a cota do provedor
+        self.model = create_chat_model(MODEL_NAME, rate_limiter=None, **client_kwargs)
+
+        # Memória em segundo plano e perfis dependem de extração estruturada, que o
+        # servidor simulado não imita; ficam desativados nos turnos medidos
+        self.components = create_chat_agent(
+            store=self.store,
+            enable_background_memory=False,
+            enable_user_profiles=False,
+            model=self.model,
+        )
+
+        # Textos distintos por usuário (o InMemoryStore não aceita textos repetidos no mesmo lote)
+        self.store.batch([
+            PutOp(_namespace(user_id), f"memory_{i}", {"content": f"{MEMORIES[i % len(MEMORIES)]} ({user_id}, {i})"})
+            for user_id in self.users
+            for i in range(memories_per_user)
+        ])
+
+    def user(self, index: int) -> str:
+        return self.users[index % len(self.users)]
+
+
+def _bench_store_put(env: BenchmarkEnvironment) -> Callable[[int], Any]:
+    def operation(index: int) -> None:
+        env.store.put(_namespace(env.user(index)), f"bench_{index}", {"content": MEMORIES[index % len(MEMORIES)]})
+    return operation
+
+
+def _bench_store_search(env: BenchmarkEnvironment) -> Callable[[int], Any]:
+    def operation(index: int) -> None:
+        env.store.search(_namespace(env.user(index)), query=MESSAGES[index % len(MESSAGES)], limit=5)
+    return operation
+
+
+def _bench_prompt_with_memories(env: BenchmarkEnvironment) -> Callable[[int], Any]:
+    from langgraph.graph import START, MessagesState, StateGraph
+
+    from src.memory.manager import create_memory_prompt_function
+
+    prompt = create_memory_prompt_function(prompt_registry=env.components["prompt_registry"])
+
+    # A função de prompt lê o armazenamento do contexto do grafo: roda em um grafo de um nó
+    def build_prompt(state: MessagesState) -> Dict[str, Any]:
+        prompt(state)
+        return {}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("prompt", build_prompt)
+    builder.add_edge(START, "prompt")
+    graph = builder.compile(store=env.store)
+
+    def operation(index: int) -> None:
+        graph.invoke(
+            {"messages": [{"role": "user", "content": MESSAGES[index % len(MESSAGES)]}]},
+            {"configurable": {"user_id": env.user(index)}},
+        )
+    return operation
+
+
+def _bench_agent_chat(env: BenchmarkEnvironment) -> Callable[[int], Any]:
+    from src.agent.chat_agent import chat
+
+    def operation(index: int) -> None:
+        user_id = env.user(index)
+        chat(
+            agent=env.components["agent"],
+            message=MESSAGES[index % len(MESSAGES)],
+            user_id=user_id,
+            thread_id=f"agent_{user_id}_{index}",
+            prompt_registry=env.components["prompt_registry"],
+        )
+    return operation
+
+
+def _bench_api_chat(env: BenchmarkEnvironment) -> Callable[[int], Any]:
+    from fastapi.testclient import TestClient
+
+    from src.api.routes import create_api
+
+    app = create_api(agent=env.components["agent"], prompt_registry=env.components["prompt_registry"])
+    # Um cliente por worker: o TestClient não é compartilhável entre threads
+    local = threading.local()
+
+    def operation(index: int) -> None:
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = TestClient(app)
+        user_id = env.user(index)
+        response = client.post("/chat", json={
+            "message": MESSAGES[index % len(MESSAGES)],
+            "user_id": user_id,
+            "thread_id": f"api_{user_id}_{index}",
+        })
+        if response.status_code != 200:
+            raise RuntimeError(f"/chat respondeu {response.status_code}: {response.text[:200]}")
+    return operation
+
+
+_FACTORIES = {
+    "store_put": _bench_store_put,
+    "store_search": _bench_store_search,
+    "prompt_with_memories": _bench_prompt_with_memories,
+    "agent_chat": _bench_agent_chat,
+    "api_chat": _bench_api_chat,
+}
+
+
+def run_suite(
+    benchmarks: Optional[List[str]] = None,
+    requests: int = 100,
+    concurrency: int = 8,
+    chat_latency: str = "lognormal:0.2:0.4",
+    embedding_latency: str = "lognormal:0.02:0.3",
+    token_interval: float = 0.005,
+    users: int = 20,
+    seed: int = 0,
+    warmup: int = 5,
+) -> Dict[str, Any]:
+    """
+    Roda os benchmarks contra o servidor simulado.
+
+    Args:
+        benchmarks (Optional[List[str]]): Benchmarks a rodar (padrão: todos, ver `BENCHMARKS`)
+        requests (int): Operações medidas por benchmark
+        concurrency (int): Workers simultâneos
+        chat_latency (str): Distribuição da latência do chat (ver `LatencyModel.parse`)
+        embedding_latency (str): Distribuição da latência dos embeddings
+        token_interval (float): Intervalo entre pedaços das respostas em streaming
+        users (int): Usuários distintos
+        seed (int): Semente das distribuições de latência
+        warmup (int): Operações não medidas antes de cada benchmark
+
+    Returns:
+        Dict[str, Any]: Resultados (`version`, `created_at`, `environment`, `settings`, `results`)
+    """
+    benchmarks = benchmarks or BENCHMARKS
+    unknown = set(benchmarks) - set(_FACTORIES)
+    if unknown:
+        raise ValueError(f"Benchmarks desconhecidos: {', '.join(sorted(unknown))}")
+
+    settings = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "chat_latency": chat_latency,
+        "embedding_latency": embedding_latency,
+        "token_interval": token_interval,
+        "users": users,
+        "seed": seed,
+        "model": MODEL_NAME,
+    }
+    results = {}
+    server = FakeOpenAIServer(
+        chat_latency=LatencyModel.parse(chat_latency, seed=seed),
+        embedding_latency=LatencyModel.parse(embedding_latency, seed=seed),
+        token_interval=token_interval,
+    )
+    with server:
+        env = BenchmarkEnvironment(server, users=users)
+        for name in benchmarks:
+            operation = _FACTORIES[name](env)
+            for index in range(warmup):
+                operation(-1 - index)
+            results[name] = run_load(operation, requests=requests, concurrency=concurrency)
+
+    return {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "settings": settings,
+        "results": results,
+    }
+
+
+def _print_results(report: Dict[str, Any]) -> None:
+    print(f"{'benchmark':<22}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erros':>7}")
+    for name, result in report["results"].items():
+        values = [result.get(key) for key in ("p50_ms", "p95_ms", "p99_ms")]
+        formatted = "".join(f"{value:>10.1f}" if value is not None else f"{'-':>10}" for value in values)
+        print(f"{name:<22}{result['throughput_rps']:>9.1f}{formatted}{result['errors']:>7}")
+        if result.get("first_error"):
+            print(f"  primeiro erro: {result['first_error']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Ponto de entrada da linha de comando dos benchmarks."""
+    parser = argparse.ArgumentParser(description="Benchmarks de latência com um provedor simulado")
+    parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK",
+                        help=f"Benchmarks a rodar ({', '.join(BENCHMARKS)}; padrão: todos)")
+    parser.add_argument("--requests", type=int, default=100, help="Operações medidas por benchmark")
+    parser.add_argument("--concurrency", type=int, default=8, help="Workers simultâneos")
+    parser.add_argument("--chat-latency", default="lognormal:0.2:0.4", help="Tempo até o primeiro token do chat")
+    parser.add_argument("--embedding-latency", default="lognormal:0.02:0.3")
+    parser.add_argument("--token-interval", type=float, default=0.005)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Arquivo JSON com os resultados")
+    parser.add_argument("--baseline", help=f"Linha de base a comparar (ex.: {os.path.relpath(BASELINE_PATH)})")
+    parser.add_argument("--tolerance", type=float, default=20.0, help="Piora relativa tolerada, em %%")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="Piora absoluta de latência sempre tolerada")
+    args = parser.parse_args(argv)
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"benchmarks desconhecidos: {', '.join(sorted(unknown))}")
+
+    report = run_suite(
+        benchmarks=args.benchmarks or None,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        chat_latency=args.chat_latency,
+        embedding_latency=args.embedding_latency,
+        token_interval=args.token_interval,
+        users=args.users,
+        seed=args.seed,
+    )
+    _print_results(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+            file.write("\n")
+    failed = any(result["errors"] for result in report["results"].values())
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        print()
+        failed = report_regressions(baseline, report, args.tolerance, args.min_delta_ms) or failed
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Disjuntor (circuit breaker) para dependências lentas ou instáveis.
+
+Depois de `failure_threshold` falhas consecutivas o disjuntor abre e as chamadas
+são recusadas imediatamente por `reset_timeout` segundos. Em seguida ele fica
+meio aberto: uma única chamada de teste é liberada, e o resultado dela decide se
+o disjuntor fecha ou volta a abrir. Toda mudança de estado é registrada no log e
+contabilizada em `stats()`.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Disjuntor com estados fechado, aberto e meio aberto."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        on_state_change: Optional[Callable[[str, str, str], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            name (str): Nome da dependência protegida (usado nos logs e métricas)
+            failure_threshold (int): Falhas consecutivas que abrem o disjuntor
+            reset_timeout (float): Segundos aberto antes da chamada de teste
+            on_state_change (Optional[Callable]): Chamado com (nome, estado anterior, novo estado)
+            clock (Callable[[], float]): Relógio monotônico (substituível em testes)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._on_state_change = on_state_change
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._transitions: Dict[str, int] = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        """Estado atual (`closed`, `open` ou `half_open`)."""
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _transition(self, state: str) -> None:
+        previous, self._state = self._state, state
+        self._transitions[state] += 1
+        log = logger.warning if state == OPEN else logger.info
+        log(f"Disjuntor '{self.name}': {previous} -> {state}")
+        if self._on_state_change is not None:
+            try:
+                self._on_state_change(self.name, previous, state)
+            except Exception as e:
+                logger.error(f"Erro ao notificar mudança do disjuntor '{self.name}': {str(e)}")
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+            self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        """
+        Verifica se uma chamada pode ser feita agora.
+
+        Returns:
+            bool: False se o disjuntor está aberto (ou se a chamada de teste já saiu)
+        """
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        """Registra uma chamada bem-sucedida."""
+        with self._lock:
+            self._failures = 0
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        """Registra uma chamada que falhou ou excedeu o tempo."""
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = self._clock()
+                self._transition(OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna o estado e os contadores do disjuntor.
+
+        Returns:
+            Dict[str, Any]: Estado, falhas consecutivas, chamadas recusadas e transições
+        """
+        with self._lock:
+            self._maybe_half_open()
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "rejected": self._rejected,
+                "transitions": dict(self._transitions),
+            }
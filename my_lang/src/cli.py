@@ -1,7 +1,15 @@
 """
 Interface de linha de comando para testar o chatbot.
+
+Subcomandos:
+
+    python -m src.cli                       # conversa interativa (padrão)
+    python -m src.cli chat
+    python -m src.cli load corpus.jsonl     # gerador de carga (alias: bench)
+    python -m src.cli ingest conversas.jsonl  # ingestão em lote de conversas históricas
 """
 
+import argparse
 import os
 import sys
 from dotenv import load_dotenv
@@ -9,13 +17,11 @@ from dotenv import load_dotenv
 from src.memory import create_memory_store
 from src.agent import create_chat_agent
 from src.agent.chat_agent import chat
+from src import ingest, loadgen
 
 
-def main():
-    """Função principal para a interface CLI."""
-    # Carrega as variáveis de ambiente
-    load_dotenv()
-    
+def run_chat():
+    """Conversa interativa com o agente."""
     # Verifica se a chave API está configurada
     if not os.getenv("OPENAI_API_KEY"):
         print("Erro: OPENAI_API_KEY não está configurada. Crie um arquivo .env com sua chave API.")
@@ -63,5 +69,33 @@ def main():
             print(f"\nErro: {str(e)}\n")
 
 
+def main(argv=None):
+    """Função principal para a interface CLI."""
+    # Carrega as variáveis de ambiente
+    load_dotenv()
+    
+    parser = argparse.ArgumentParser(description="Chatbot com LangMem")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("chat", help="Conversa interativa (padrão)")
+    load_parser = subparsers.add_parser(
+        "load",
+        aliases=["bench"],
+        help="Reproduz um corpus de conversas com muitos usuários simultâneos",
+    )
+    loadgen.add_arguments(load_parser)
+    ingest_parser = subparsers.add_parser(
+        "ingest",
+        help="Extrai memórias e perfis de um arquivo JSONL ou CSV de conversas",
+    )
+    ingest.add_arguments(ingest_parser)
+    args = parser.parse_args(argv)
+    
+    if args.command in ("load", "bench"):
+        sys.exit(loadgen.run_from_args(args))
+    if args.command == "ingest":
+        sys.exit(ingest.run_from_args(args))
+    run_chat()
+
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
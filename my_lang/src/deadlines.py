@@ -0,0 +1,74 @@
+"""
+Prazos (deadlines) por requisição.
+
+O prazo de um turno é definido uma vez, na borda (endpoint `/chat` ou `chat()`),
+e fica disponível em uma variável de contexto para todas as etapas do turno:
+chamadas ao modelo, busca de memórias e ferramentas. Cada etapa consulta
+`remaining()` para limitar a própria espera em vez de usar timeouts fixos.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# Instante (time.monotonic) em que o turno atual expira
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """O prazo da requisição terminou antes da conclusão da etapa."""
+
+
+@contextmanager
+def deadline_scope(timeout_seconds: Optional[float]) -> Iterator[None]:
+    """
+    Define o prazo do bloco de código.
+
+    Um prazo já existente mais curto é mantido: um bloco interno nunca estende o
+    prazo do turno.
+
+    Args:
+        timeout_seconds (Optional[float]): Segundos a partir de agora (None não altera o prazo)
+    """
+    if timeout_seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + timeout_seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def get_deadline() -> Optional[float]:
+    """Retorna o instante (time.monotonic) em que o prazo atual expira, se houver."""
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """
+    Retorna o tempo restante do prazo atual.
+
+    Returns:
+        Optional[float]: Segundos restantes (pode ser negativo), ou None sem prazo
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline(step: str = "") -> None:
+    """
+    Interrompe a etapa se o prazo atual já terminou.
+
+    Args:
+        step (str): Nome da etapa, usado na mensagem de erro
+
+    Raises:
+        DeadlineExceeded: Se o prazo terminou
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Prazo da requisição esgotado{f' em {step}' if step else ''}")
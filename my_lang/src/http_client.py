@@ -0,0 +1,106 @@
+"""
+Clientes HTTP compartilhados pelo processo.
+
+Todos os modelos de chat e de embeddings (agente, perfis, memória em segundo
+plano, otimizadores) usam os mesmos clientes `httpx`, de modo que as conexões
+keep-alive com o provedor são reaproveitadas entre o trabalho em primeiro plano e
+em segundo plano e o limite de conexões vale para o processo inteiro. Toda
+resposta 429 que passa por eles, inclusive as que o cliente do provedor repete
+sozinho, é repassada ao limitador de taxa compartilhado.
+"""
+
+import importlib.util
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+
+from src.config import (
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_TIMEOUT,
+    HTTP2_ENABLED,
+    RATE_LIMIT_ENABLED,
+)
+from src.rate_limiter import get_rate_limiter, parse_retry_after
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def http2_available() -> bool:
+    """Se o HTTP/2 está habilitado e o pacote `h2` está instalado."""
+    return HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+def _on_response(response: httpx.Response) -> None:
+    if response.status_code == 429 and RATE_LIMIT_ENABLED:
+        get_rate_limiter().on_rate_limited(parse_retry_after(response.headers))
+
+
+async def _on_async_response(response: httpx.Response) -> None:
+    _on_response(response)
+
+
+def _client_kwargs() -> Dict[str, Any]:
+    return {
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        "http2": http2_available(),
+    }
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Retorna o cliente HTTP síncrono do processo, criando-o no primeiro uso.
+
+    Returns:
+        httpx.Client: Cliente compartilhado
+    """
+    global _client
+    with _lock:
+        if _client is None or _client.is_closed:
+            kwargs = _client_kwargs()
+            logger.info(
+                f"Criando cliente HTTP compartilhado (conexões: {HTTP_MAX_CONNECTIONS}, "
+                f"keep-alive: {HTTP_MAX_KEEPALIVE_CONNECTIONS}, HTTP/2: {kwargs['http2']})"
+            )
+            _client = httpx.Client(event_hooks={"response": [_on_response]}, **kwargs)
+        return _client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Retorna o cliente HTTP assíncrono do processo, criando-o no primeiro uso.
+
+    Returns:
+        httpx.AsyncClient: Cliente compartilhado
+    """
+    global _async_client
+    with _lock:
+        if _async_client is None or _async_client.is_closed:
+            _async_client = httpx.AsyncClient(event_hooks={"response": [_on_async_response]}, **_client_kwargs())
+        return _async_client
+
+
+def close_http_clients() -> None:
+    """Fecha os clientes compartilhados (chamado no encerramento do processo)."""
+    global _client, _async_client
+    with _lock:
+        if _client is not None:
+            _client.close()
+        # O cliente assíncrono só pode ser fechado dentro de um event loop; ao
+        # descartá-lo, as conexões são liberadas junto com o processo
+        _client = None
+        _async_client = None
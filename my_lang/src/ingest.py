@@ -0,0 +1,445 @@
+"""
+Ingestão em lote de conversas históricas: extração de memórias e perfis.
+
+O arquivo é lido em streaming, uma conversa por vez, e o uso de memória não
+depende do tamanho dele:
+
+- no máximo `concurrency * 4` conversas ficam entre a leitura e a gravação;
+- as extrações (chamadas ao modelo) rodam em um pool de `concurrency` threads;
+- as memórias extraídas são gravadas com `store.batch` em lotes de `batch_size`,
+  de modo que os embeddings de um lote saem em uma única chamada.
+
+O progresso é salvo em um arquivo JSON com a posição (em bytes) até a qual todas
+as conversas já foram gravadas. Uma nova execução continua dali; conversas que
+estavam em andamento na interrupção são processadas de novo, e as chaves das
+memórias novas derivam do id da conversa, então a repetição sobrescreve em vez de
+duplicar. Conversas com erro vão para um arquivo JSONL à parte e não interrompem
+a ingestão.
+
+Formatos aceitos:
+
+- JSONL: `{"id": "c1", "user_id": "u1", "messages": [{"role": "user", "content": "..."}, ...]}`;
+  no lugar de `messages`, `turns` no formato de `src.agent.evaluation` também é aceito;
+- CSV com cabeçalho `conversation_id,user_id,role,content`, uma mensagem por linha
+  e as linhas de cada conversa consecutivas.
+
+Uso:
+
+    python -m src.cli ingest atendimentos.jsonl --concurrency 16
+"""
+
+import csv
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.config import (
+    INGEST_BATCH_SIZE,
+    INGEST_CONCURRENCY,
+    MEMORY_NAMESPACE,
+    MEMORY_QUERY_LIMIT,
+    PROFILE_NAMESPACE,
+)
+from src.memory.transfer import unique_text_batches
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Papéis aceitos nas mensagens do CSV e do JSONL
+ROLES = {"user", "assistant", "system"}
+
+
+def _jsonl_conversation(record: Dict[str, Any], offset: int) -> Dict[str, Any]:
+    """Normaliza uma linha JSONL para `{"id", "user_id", "messages"}`."""
+    if "messages" in record:
+        messages = [{"role": message["role"], "content": message["content"]} for message in record["messages"]]
+    else:
+        messages = []
+        for turn in record.get("turns", []):
+            if isinstance(turn, str):
+                turn = {"message": turn}
+            messages.append({"role": "user", "content": turn["message"]})
+            if turn.get("response"):
+                messages.append({"role": "assistant", "content": turn["response"]})
+    if not record.get("user_id"):
+        raise ValueError("Conversa sem user_id")
+    if not messages:
+        raise ValueError("Conversa sem mensagens")
+    return {"id": str(record.get("id", f"@{offset}")), "user_id": str(record["user_id"]), "messages": messages}
+
+
+def _iter_jsonl(path: str, start: int) -> Iterator[Dict[str, Any]]:
+    with open(path, "rb") as file:
+        file.seek(start)
+        offset = start
+        for line in file:
+            end = offset + len(line)
+            if line.strip():
+                try:
+                    conversation = _jsonl_conversation(json.loads(line), offset)
+                except (ValueError, KeyError, TypeError) as e:
+                    conversation = {"id": f"@{offset}", "error": f"{type(e).__name__}: {e}"}
+                conversation.update(offset=offset, end=end)
+                yield conversation
+            offset = end
+
+
+def _iter_csv(path: str, start: int) -> Iterator[Dict[str, Any]]:
+    with open(path, "rb") as file:
+        header = next(csv.reader([file.readline().decode("utf-8-sig")]))
+        missing = {"conversation_id", "user_id", "role", "content"} - set(header)
+        if missing:
+            raise ValueError(f"Colunas ausentes no CSV: {', '.join(sorted(missing))}")
+        file.seek(max(start, file.tell()))
+        position = file.tell()
+
+        def lines() -> Iterator[str]:
+            nonlocal position
+            for raw in iter(file.readline, b""):
+                position += len(raw)
+                yield raw.decode("utf-8")
+
+        # O leitor consome as linhas sob demanda: antes de cada `next`, `position`
+        # é o início da próxima linha do CSV
+        reader = csv.DictReader(lines(), fieldnames=header)
+        current: Optional[Dict[str, Any]] = None
+        while True:
+            row_start = position
+            row = next(reader, None)
+            if row is None or current is None or row["conversation_id"] != current["id"]:
+                if current is not None:
+                    current["end"] = row_start
+                    yield current
+                if row is None:
+                    return
+                current = {"id": row["conversation_id"], "user_id": row["user_id"], "messages": [], "offset": row_start}
+            role = (row["role"] or "").strip().lower()
+            if role not in ROLES:
+                current["error"] = f"Papel inválido: {row['role']!r}"
+            elif row["content"]:
+                current["messages"].append({"role": role, "content": row["content"]})
+
+
+def iter_conversations(path: str, file_format: Optional[str] = None, start: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Lê as conversas de um arquivo JSONL ou CSV sem carregá-lo inteiro.
+
+    Args:
+        path (str): Arquivo de conversas
+        file_format (Optional[str]): "jsonl" ou "csv" (padrão: pela extensão)
+        start (int): Posição em bytes onde começa a leitura (uma `end` anterior)
+
+    Returns:
+        Iterator[Dict[str, Any]]: Conversas com `id`, `user_id`, `messages`, `offset` e
+            `end` (posições em bytes); conversas inválidas trazem `error`
+    """
+    file_format = file_format or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    if file_format == "csv":
+        return _iter_csv(path, start)
+    if file_format == "jsonl":
+        return _iter_jsonl(path, start)
+    raise ValueError(f"Formato desconhecido: {file_format}")
+
+
+class ConversationIngestor:
+    """Extrai memórias e perfis de conversas com concorrência limitada e escritas em lote."""
+
+    def __init__(
+        self,
+        store: Any,
+        memory_manager: Any = None,
+        profile_manager: Any = None,
+        namespace: tuple = MEMORY_NAMESPACE,
+        concurrency: int = INGEST_CONCURRENCY,
+        batch_size: int = INGEST_BATCH_SIZE,
+        query_limit: int = MEMORY_QUERY_LIMIT,
+        errors_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            store: Armazenamento onde memórias e perfis são gravados
+            memory_manager: Extrator de memórias (`langmem.create_memory_manager`); None desativa
+            profile_manager: Extrator de perfis (`create_profile_manager`); None desativa
+            namespace (tuple): Namespace das memórias
+            concurrency (int): Conversas extraídas em paralelo
+            batch_size (int): Memórias por chamada a `store.batch`
+            query_limit (int): Memórias existentes do usuário passadas ao extrator (0 desativa a busca)
+            errors_path (Optional[str]): Arquivo JSONL onde as conversas com erro são registradas
+        """
+        self.store = store
+        self.memory_manager = memory_manager
+        self.profile_manager = profile_manager
+        self.namespace = namespace
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.query_limit = query_limit
+        self.errors_path = errors_path
+        # Perfis do mesmo usuário são atualizados em série; locks fixos mantêm a memória constante
+        self._profile_locks = [threading.Lock() for _ in range(64)]
+
+    def _extract_memories(self, conversation: Dict[str, Any]) -> List[Any]:
+        from langgraph.store.base import PutOp
+
+        namespace = tuple(part.format(user_id=conversation["user_id"]) for part in self.namespace)
+        existing = []
+        if self.query_limit > 0:
+            query = "\n".join(m["content"] for m in conversation["messages"] if m["role"] == "user")[-2000:]
+            existing = [
+                (item.key, item.value.get("kind", "Memory"), item.value.get("content"))
+                for item in self.store.search(namespace, query=query or None, limit=self.query_limit)
+            ]
+        existing_keys = {key for key, _, _ in existing}
+
+        extracted = self.memory_manager.invoke({"messages": conversation["messages"], "existing": existing})
+        ops = []
+        for index, memory in enumerate(extracted):
+            content = memory.content
+            if hasattr(content, "model_dump"):
+                value = {"kind": type(content).__name__, "content": content.model_dump()}
+            else:
+                value = {"kind": "Memory", "content": content}
+            key = str(memory.id)
+            if key not in existing_keys:
+                # Chave estável: reprocessar a conversa sobrescreve a mesma memória
+                key = str(uuid.uuid5(uuid.NAMESPACE_URL, f"ingest:{conversation['id']}:{index}"))
+            ops.append(PutOp(namespace, key, value))
+        return ops
+
+    def _update_profile(self, conversation: Dict[str, Any]) -> bool:
+        from src.memory.profiles import UserProfile, save_user_profile
+
+        user_id = conversation["user_id"]
+        namespace = tuple(part.format(user_id=user_id) for part in PROFILE_NAMESPACE)
+        with self._profile_locks[hash(user_id) % len(self._profile_locks)]:
+            item = self.store.get(namespace, "profile")
+            existing = [("profile", UserProfile.__name__, item.value["content"])] if item else []
+            result = self.profile_manager.invoke({"messages": conversation["messages"], "existing": existing})
+            if not result:
+                return False
+            save_user_profile(self.store, result[0].content, user_id)
+            return True
+
+    def _extract(self, conversation: Dict[str, Any]) -> Tuple[List[Any], bool]:
+        ops = self._extract_memories(conversation) if self.memory_manager is not None else []
+        profile = self._update_profile(conversation) if self.profile_manager is not None else False
+        return ops, profile
+
+    def _record_error(self, conversation: Dict[str, Any], error: str) -> None:
+        logger.warning(f"Conversa {conversation['id']} ignorada: {error}")
+        if not self.errors_path:
+            return
+        with open(self.errors_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps({
+                "id": conversation["id"],
+                "user_id": conversation.get("user_id"),
+                "offset": conversation["offset"],
+                "error": error,
+            }, ensure_ascii=False) + "\n")
+
+    def run(
+        self,
+        conversations: Iterator[Dict[str, Any]],
+        progress: Optional[Dict[str, Any]] = None,
+        on_progress: Any = None,
+    ) -> Dict[str, Any]:
+        """
+        Processa as conversas na ordem do arquivo.
+
+        Args:
+            conversations (Iterator[Dict[str, Any]]): Conversas de `iter_conversations`
+            progress (Optional[Dict[str, Any]]): Progresso de uma execução anterior
+                (contadores continuam a partir dele)
+            on_progress: Chamado com o progresso sempre que a posição gravada avança
+
+        Returns:
+            Dict[str, Any]: Progresso final: `offset`, `conversations`, `memories`,
+                `profiles` e `failed`
+        """
+        progress = dict(progress or {})
+        for counter in ("offset", "conversations", "memories", "profiles", "failed"):
+            progress.setdefault(counter, 0)
+
+        window = self.concurrency * 4
+        # Conversas lidas e ainda não gravadas, na ordem do arquivo: [offset, end, concluída]
+        order: deque = deque()
+        extracted: List[List[Any]] = []
+        buffer: List[Any] = []
+        pending: Dict[Any, Tuple[List[Any], Dict[str, Any]]] = {}
+        exhausted = False
+
+        def commit() -> None:
+            advanced = False
+            while order and order[0][2]:
+                progress["offset"] = order.popleft()[1]
+                progress["conversations"] += 1
+                advanced = True
+            if advanced and on_progress is not None:
+                on_progress(progress)
+
+        def flush() -> None:
+            if buffer:
+                for batch in unique_text_batches(buffer):
+                    self.store.batch(batch)
+                progress["memories"] += len(buffer)
+                buffer.clear()
+            for entry in extracted:
+                entry[2] = True
+            extracted.clear()
+            commit()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="ingest") as executor:
+            while True:
+                while not exhausted and len(order) < window:
+                    conversation = next(conversations, None)
+                    if conversation is None:
+                        exhausted = True
+                        break
+                    entry = [conversation["offset"], conversation["end"], False]
+                    order.append(entry)
+                    if conversation.get("error") or not conversation.get("messages"):
+                        self._record_error(conversation, conversation.get("error", "Conversa sem mensagens"))
+                        progress["failed"] += 1
+                        entry[2] = True
+                        continue
+                    future = executor.submit(self._extract, conversation)
+                    pending[future] = (entry, {"id": conversation["id"], "user_id": conversation["user_id"],
+                                               "offset": conversation["offset"]})
+
+                if pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        entry, conversation = pending.pop(future)
+                        try:
+                            ops, profile = future.result()
+                        except Exception as e:
+                            self._record_error(conversation, f"{type(e).__name__}: {e}")
+                            progress["failed"] += 1
+                            entry[2] = True
+                            continue
+                        buffer.extend(ops)
+                        extracted.append(entry)
+                        progress["profiles"] += int(profile)
+
+                # Sem extrações em andamento, o que está no buffer não pode esperar por mais
+                if len(buffer) >= self.batch_size or not pending:
+                    flush()
+                else:
+                    commit()
+                if exhausted and not pending:
+                    flush()
+                    return progress
+
+
+def load_progress(path: str, source: str) -> Optional[Dict[str, Any]]:
+    """
+    Lê o progresso salvo de uma ingestão anterior do mesmo arquivo.
+
+    Args:
+        path (str): Arquivo de progresso
+        source (str): Arquivo de conversas sendo ingerido
+
+    Returns:
+        Optional[Dict[str, Any]]: Progresso ou None se não houver um para este arquivo
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as file:
+        progress = json.load(file)
+    if progress.get("source") != os.path.abspath(source):
+        logger.warning(f"O progresso em {path} é de outro arquivo ({progress.get('source')}); ignorado")
+        return None
+    return progress
+
+
+def save_progress(path: str, progress: Dict[str, Any]) -> None:
+    """Grava o progresso de forma atômica (arquivo temporário seguido de `os.replace`)."""
+    progress["updated_at"] = datetime.now(timezone.utc).isoformat()
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(progress, file, indent=2, ensure_ascii=False)
+    os.replace(temporary, path)
+
+
+def add_arguments(parser: Any) -> None:
+    """Registra as opções do subcomando `ingest` da CLI."""
+    parser.add_argument("path", help="Conversas em JSONL ou CSV")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Formato do arquivo (padrão: pela extensão)")
+    parser.add_argument("--concurrency", type=int, default=INGEST_CONCURRENCY, help="Conversas extraídas em paralelo")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="Memórias por escrita em lote")
+    parser.add_argument("--no-memories", action="store_true", help="Não extrai memórias")
+    parser.add_argument("--no-profiles", action="store_true", help="Não extrai perfis")
+    parser.add_argument("--progress", help="Arquivo de progresso (padrão: <arquivo>.progress.json)")
+    parser.add_argument("--errors", help="Conversas com erro (padrão: <arquivo>.errors.jsonl)")
+    parser.add_argument("--restart", action="store_true", help="Ignora o progresso salvo e começa do início")
+
+
+def run_from_args(args: Any) -> int:
+    """
+    Executa o subcomando `ingest` da CLI com o armazenamento e o modelo configurados.
+
+    Args:
+        args: Opções lidas por `add_arguments`
+
+    Returns:
+        int: Código de saída (1 se alguma conversa falhou)
+    """
+    from langmem import create_memory_manager
+
+    from src.config import MODEL_NAME
+    from src.memory import create_memory_store
+    from src.memory.profiles import create_profile_manager
+    from src.models import create_chat_model
+
+    progress_path = args.progress or f"{args.path}.progress.json"
+    errors_path = args.errors or f"{args.path}.errors.jsonl"
+    progress = None if args.restart else load_progress(progress_path, args.path)
+    if progress:
+        print(f"Retomando a partir do byte {progress['offset']} ({progress['conversations']} conversas já processadas)")
+    else:
+        progress = {"source": os.path.abspath(args.path)}
+
+    model = create_chat_model(MODEL_NAME, priority="batch")
+    ingestor = ConversationIngestor(
+        create_memory_store(),
+        memory_manager=None if args.no_memories else create_memory_manager(model),
+        profile_manager=None if args.no_profiles else create_profile_manager(model=model),
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        errors_path=errors_path,
+    )
+
+    size = os.path.getsize(args.path)
+    started = time.monotonic()
+    first = progress.get("conversations", 0)
+
+    last_report = [0.0]
+
+    def report(current: Dict[str, Any]) -> None:
+        # Grava e exibe o progresso no máximo uma vez por segundo
+        if time.monotonic() - last_report[0] < 1.0:
+            return
+        last_report[0] = time.monotonic()
+        save_progress(progress_path, current)
+        rate = (current["conversations"] - first) / max(time.monotonic() - started, 1e-9)
+        print(
+            f"\r{current['offset'] / max(size, 1):6.1%}  conversas: {current['conversations']}  "
+            f"memórias: {current['memories']}  perfis: {current['profiles']}  "
+            f"falhas: {current['failed']}  ({rate:.1f} conversas/s)",
+            end="",
+            flush=True,
+        )
+
+    conversations = iter_conversations(args.path, args.format, start=progress.get("offset", 0))
+    result = ingestor.run(conversations, progress, on_progress=report)
+    save_progress(progress_path, result)
+    print(f"\nIngestão concluída em {time.monotonic() - started:.1f} s")
+    if result["failed"]:
+        print(f"{result['failed']} conversas com erro registradas em {errors_path}")
+    return 1 if result["failed"] else 0
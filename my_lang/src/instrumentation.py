@@ -0,0 +1,335 @@
+"""
+Instrumentação de latência por etapa do caminho crítico.
+
+Define as métricas do chatbot no registro `src.metrics.REGISTRY` (exposto em
+`/metrics`) e os pontos de medição de cada etapa:
+
+- busca de memórias (`MemoryRetriever`), por backend e origem da resposta;
+- embeddings (`InstrumentedEmbeddings`), por modelo e operação;
+- chamadas ao modelo de chat (`LLMMetricsCallbackHandler`): tempo até o
+  primeiro token e tempo total, por modelo;
+- ferramentas (`ToolMetricsCallbackHandler`), por ferramenta;
+- atualização de perfil, em `chat()`;
+- fila e execução do processamento em segundo plano (`InstrumentedReflector`);
+- leitura e escrita do checkpointer (`InstrumentedSaver`), por backend.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+from langgraph.checkpoint.memory import InMemorySaver
+
+from src.metrics import REGISTRY
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+MEMORY_SEARCH_SECONDS = REGISTRY.histogram(
+    "chatbot_memory_search_seconds",
+    "Latência da busca de memórias relevantes",
+    ["backend", "source"],
+)
+EMBEDDING_SECONDS = REGISTRY.histogram(
+    "chatbot_embedding_seconds",
+    "Latência das chamadas de embeddings",
+    ["model", "operation"],
+)
+LLM_TTFT_SECONDS = REGISTRY.histogram(
+    "chatbot_llm_time_to_first_token_seconds",
+    "Tempo até o primeiro token das chamadas ao modelo de chat",
+    ["model"],
+)
+LLM_DURATION_SECONDS = REGISTRY.histogram(
+    "chatbot_llm_duration_seconds",
+    "Duração total das chamadas ao modelo de chat",
+    ["model", "status"],
+)
+TOOL_SECONDS = REGISTRY.histogram(
+    "chatbot_tool_duration_seconds",
+    "Duração da execução das ferramentas do agente",
+    ["tool", "status"],
+)
+PROFILE_UPDATE_SECONDS = REGISTRY.histogram(
+    "chatbot_profile_update_seconds",
+    "Duração da atualização do perfil do usuário ao fim do turno",
+)
+BACKGROUND_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "chatbot_background_queue_wait_seconds",
+    "Atraso entre o horário agendado e o início do processamento de memória em segundo plano",
+)
+BACKGROUND_RUN_SECONDS = REGISTRY.histogram(
+    "chatbot_background_run_seconds",
+    "Duração do processamento de memória em segundo plano",
+    ["status"],
+)
+BACKGROUND_QUEUE_DEPTH = REGISTRY.gauge(
+    "chatbot_background_queue_depth",
+    "Tarefas aguardando na fila do processamento de memória em segundo plano",
+)
+MEMORY_CONSOLIDATION_SECONDS = REGISTRY.histogram(
+    "chatbot_memory_consolidation_seconds",
+    "Duração de cada execução da consolidação de memórias duplicadas",
+)
+MEMORY_CONSOLIDATION_RECLAIMED = REGISTRY.counter(
+    "chatbot_memory_consolidation_reclaimed_total",
+    "Memórias duplicadas ou superadas removidas pela consolidação",
+)
+CHECKPOINTER_SECONDS = REGISTRY.histogram(
+    "chatbot_checkpointer_seconds",
+    "Latência das leituras e escritas do checkpointer",
+    ["backend", "operation"],
+)
+BREAKER_TRANSITIONS = REGISTRY.counter(
+    "chatbot_circuit_breaker_transitions_total",
+    "Mudanças de estado dos disjuntores",
+    ["breaker", "state"],
+)
+BREAKER_STATE = REGISTRY.gauge(
+    "chatbot_circuit_breaker_state",
+    "Estado atual dos disjuntores (0 = fechado, 1 = meio aberto, 2 = aberto)",
+    ["breaker"],
+)
+
+_BREAKER_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def store_backend(store: Any) -> str:
+    """
+    Nome do backend de um armazenamento, usado como rótulo das métricas.
+
+    Args:
+        store: Armazenamento de memórias
+
+    Returns:
+        str: Nome da classe do armazenamento (ex.: "InMemoryStore", "PostgresStore")
+    """
+    # Invólucros (como o `TracedStore`) informam o backend envolvido
+    return getattr(store, "backend_name", None) or type(store).__name__
+
+
+def unwrap_store(store: Any) -> Any:
+    """
+    Retorna o armazenamento envolvido por invólucros como o `TracedStore`.
+
+    Args:
+        store: Armazenamento de memórias, possivelmente envolvido
+
+    Returns:
+        Any: Armazenamento do backend
+    """
+    while getattr(store, "backend_name", None) and hasattr(store, "store"):
+        store = store.store
+    return store
+
+
+def record_breaker_transition(name: str, previous: str, state: str) -> None:
+    """Callback `on_state_change` dos disjuntores: contabiliza a mudança de estado."""
+    BREAKER_TRANSITIONS.labels(breaker=name, state=state).inc()
+    BREAKER_STATE.labels(breaker=name).set(_BREAKER_STATE_VALUES.get(state, -1))
+
+
+class LLMMetricsCallbackHandler(BaseCallbackHandler):
+    """Mede o tempo até o primeiro token e a duração das chamadas a um modelo de chat."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self._lock = threading.Lock()
+        # run_id -> (início, primeiro token já observado)
+        self._runs: Dict[UUID, Tuple[float, bool]] = {}
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._runs[run_id] = (time.perf_counter(), False)
+
+    def on_llm_start(self, serialized: Any, prompts: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._runs[run_id] = (time.perf_counter(), False)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None or run[1]:
+                return
+            self._runs[run_id] = (run[0], True)
+        LLM_TTFT_SECONDS.labels(model=self.model).observe(time.perf_counter() - run[0])
+
+    def _finish(self, run_id: UUID, status: str) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        elapsed = time.perf_counter() - run[0]
+        if status == "ok" and not run[1]:
+            # Sem streaming, o primeiro token chega com a resposta completa
+            LLM_TTFT_SECONDS.labels(model=self.model).observe(elapsed)
+        LLM_DURATION_SECONDS.labels(model=self.model, status=status).observe(elapsed)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "ok")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        # Tentativas abandonadas (como a perdedora do HedgedChatModel) não são falhas
+        cancelled = isinstance(error, (asyncio.CancelledError, GeneratorExit))
+        self._finish(run_id, "cancelled" if cancelled else "error")
+
+
+class ToolMetricsCallbackHandler(BaseCallbackHandler):
+    """Mede a duração de cada execução de ferramenta do agente."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs: Dict[UUID, Tuple[str, float]] = {}
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        with self._lock:
+            self._runs[run_id] = (name, time.perf_counter())
+
+    def _finish(self, run_id: UUID, status: str) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is not None:
+            TOOL_SECONDS.labels(tool=run[0], status=status).observe(time.perf_counter() - run[1])
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "ok")
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "error")
+
+
+class InstrumentedEmbeddings(Embeddings):
+    """
+    Modelo de embeddings que mede a latência de cada chamada.
+
+    Com um `rate_limiter` (adaptador de `src.rate_limiter`), cada chamada aguarda a
+    vez na classe de prioridade do adaptador, fora da latência medida, e os tokens
+    estimados são descontados do orçamento.
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str, rate_limiter: Any = None):
+        """
+        Args:
+            embeddings (Embeddings): Modelo de embeddings envolvido
+            model (str): Nome do modelo, usado como rótulo
+            rate_limiter: Adaptador do limitador de taxa compartilhado (None desativa)
+        """
+        self.embeddings = embeddings
+        self.model = model
+        self.rate_limiter = rate_limiter
+
+    def _account(self, texts: List[str]) -> None:
+        from src.rate_limiter import estimate_embedding_tokens
+
+        self.rate_limiter.limiter.record_tokens(estimate_embedding_tokens(texts))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+            self._account(texts)
+        with EMBEDDING_SECONDS.labels(model=self.model, operation="documents").time():
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+            self._account([text])
+        with EMBEDDING_SECONDS.labels(model=self.model, operation="query").time():
+            return self.embeddings.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.rate_limiter is not None:
+            await self.rate_limiter.aacquire()
+            self._account(texts)
+        with EMBEDDING_SECONDS.labels(model=self.model, operation="documents").time():
+            return await self.embeddings.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        if self.rate_limiter is not None:
+            await self.rate_limiter.aacquire()
+            self._account([text])
+        with EMBEDDING_SECONDS.labels(model=self.model, operation="query").time():
+            return await self.embeddings.aembed_query(text)
+
+
+class InstrumentedSaver(InMemorySaver):
+    """Checkpointer em memória que mede a latência de leituras e escritas."""
+
+    backend = "memory"
+
+    def get_tuple(self, config: Any) -> Any:
+        with CHECKPOINTER_SECONDS.labels(backend=self.backend, operation="get").time():
+            return super().get_tuple(config)
+
+    def list(self, config: Any, **kwargs: Any) -> Iterator[Any]:
+        # Mede apenas a materialização da listagem, sem o consumo pelo chamador
+        with CHECKPOINTER_SECONDS.labels(backend=self.backend, operation="list").time():
+            items = list(super().list(config, **kwargs))
+        return iter(items)
+
+    def put(self, config: Any, checkpoint: Any, metadata: Any, new_versions: Any) -> Any:
+        with CHECKPOINTER_SECONDS.labels(backend=self.backend, operation="put").time():
+            return super().put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config: Any, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        with CHECKPOINTER_SECONDS.labels(backend=self.backend, operation="put_writes").time():
+            return super().put_writes(config, writes, task_id, task_path)
+
+
+class InstrumentedReflector:
+    """
+    Envolve o gerenciador de memória executado pelo `ReflectionExecutor`.
+
+    Mede o atraso entre o horário agendado (`scheduled_at` no `configurable` da
+    tarefa) e o início da execução, e a duração da execução. A execução é um span
+    filho do turno que agendou a tarefa (`traceparent` no `configurable`).
+    """
+
+    def __init__(self, reflector: Any):
+        self.reflector = reflector
+        # O ReflectionExecutor exige o atributo `namespace` do reflector
+        self.namespace = reflector.namespace
+
+    def invoke(self, payload: Any, config: Any = None, **kwargs: Any) -> Any:
+        from langchain_core.runnables.config import var_child_runnable_config
+
+        from src.tracing import get_tracer
+
+        current = config or var_child_runnable_config.get() or {}
+        configurable = current.get("configurable") or {}
+        scheduled_at = configurable.get("scheduled_at")
+        queue_wait = max(0.0, time.time() - scheduled_at) if scheduled_at is not None else None
+        if queue_wait is not None:
+            BACKGROUND_QUEUE_WAIT_SECONDS.observe(queue_wait)
+
+        start = time.perf_counter()
+        status = "error"
+        attributes = {"user_id": configurable.get("user_id"), "queue_wait_ms": queue_wait and queue_wait * 1000}
+        try:
+            with get_tracer().span("background.memory_processing", attributes, parent=configurable.get("traceparent")):
+                result = self.reflector.invoke(payload, config, **kwargs)
+            status = "ok"
+            return result
+        finally:
+            BACKGROUND_RUN_SECONDS.labels(status=status).observe(time.perf_counter() - start)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.reflector, name)
+
+
+def track_background_queue(executor: Any) -> None:
+    """
+    Publica a profundidade da fila do executor em `chatbot_background_queue_depth`.
+
+    Args:
+        executor: `LocalReflectionExecutor` do processamento em segundo plano
+    """
+    task_queue = getattr(executor, "_task_queue", None)
+    if task_queue is not None:
+        BACKGROUND_QUEUE_DEPTH.set_function(task_queue.qsize)
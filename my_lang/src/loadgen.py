@@ -0,0 +1,484 @@
+"""
+Gerador de carga: reproduz conversas de um corpus com muitos usuários simulados.
+
+Alvos:
+
+- `InProcessTarget`: chama `chat()` no agente criado neste processo (com
+  `FakeChatModel`, roda offline);
+- `HttpTarget`: envia os turnos para o `/chat` de um servidor em execução.
+
+Modelos de chegada:
+
+- `closed`: N usuários simultâneos; cada um envia o próximo turno só depois de
+  receber a resposta do anterior (mais o tempo de reflexão). A carga se ajusta à
+  velocidade do servidor.
+- `open`: sessões (conversas) chegam segundo um processo de Poisson com a taxa
+  dada, independentemente das respostas. Quando o servidor fica lento, as sessões
+  se acumulam, como acontece em produção; o atraso entre a chegada programada e o
+  início real de cada sessão também é reportado.
+
+Durante a execução, uma amostra por intervalo registra turnos concluídos, erros,
+turnos em andamento e a profundidade da fila do processamento em segundo plano
+(`chatbot_background_queue_depth`, lida do registro local ou do `/metrics`).
+
+O corpus usa o formato de `src.agent.evaluation.load_corpus`:
+
+    {"id": "c1", "user_id": "u1", "turns": ["Oi!", "Qual é o meu nome?"]}
+"""
+
+import json
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from src.metrics import percentile
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+class InProcessTarget:
+    """Envia os turnos para um agente criado neste processo."""
+
+    def __init__(self, fake: bool = False, background: bool = True, profiles: bool = False):
+        """
+        Args:
+            fake (bool): Usa o `FakeChatModel` e um armazenamento em memória (sem provedor)
+            background (bool): Habilita o processamento de memória em segundo plano
+            profiles (bool): Habilita a atualização de perfis
+        """
+        from src.agent.chat_agent import create_chat_agent
+
+        if fake:
+            from langgraph.store.memory import InMemoryStore
+
+            from src.agent.fake_model import FakeChatModel
+
+            self.components = create_chat_agent(
+                store=InMemoryStore(),
+                enable_background_memory=background,
+                enable_user_profiles=profiles,
+                model=FakeChatModel(),
+            )
+        else:
+            from src.memory import create_memory_store
+
+            self.components = create_chat_agent(
+                store=create_memory_store(),
+                enable_background_memory=background,
+                enable_user_profiles=profiles,
+            )
+
+    def send(self, message: str, user_id: str, thread_id: str) -> None:
+        """Executa um turno; falhas são propagadas como exceções."""
+        from src.agent.chat_agent import chat
+
+        chat(
+            agent=self.components["agent"],
+            message=message,
+            user_id=user_id,
+            thread_id=thread_id,
+            background_memory_manager=self.components["background_memory_manager"],
+            profile_manager=self.components["profile_manager"],
+            profile_index=self.components["profile_index"],
+            prompt_registry=self.components["prompt_registry"],
+        )
+
+    def queue_depth(self) -> Optional[float]:
+        """Profundidade atual da fila do processamento em segundo plano."""
+        if self.components["background_memory_manager"] is None:
+            return None
+        from src.instrumentation import BACKGROUND_QUEUE_DEPTH
+
+        value = BACKGROUND_QUEUE_DEPTH.labels().value
+        return None if math.isnan(value) else value
+
+    def close(self) -> None:
+        """Conclui as tarefas em segundo plano pendentes e encerra a thread do executor."""
+        executor = self.components["background_memory_manager"]
+        if executor is not None:
+            depth = self.queue_depth()
+            if depth:
+                logger.info(f"Processando {int(depth)} tarefas de memória pendentes antes de encerrar")
+            executor.shutdown(wait=True)
+
+
+class HttpTarget:
+    """Envia os turnos para o `/chat` de um servidor em execução."""
+
+    def __init__(self, base_url: str, timeout: float = 120.0, max_connections: int = 100):
+        """
+        Args:
+            base_url (str): Endereço do servidor (ex.: http://localhost:8000)
+            timeout (float): Tempo máximo de cada requisição em segundos
+            max_connections (int): Conexões simultâneas com o servidor
+        """
+        import httpx
+
+        self.base_url = base_url.rstrip("/")
+        self._client = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    def send(self, message: str, user_id: str, thread_id: str) -> None:
+        """Executa um turno; respostas diferentes de 200 viram `HttpStatusError`."""
+        response = self._client.post(
+            f"{self.base_url}/chat",
+            json={"message": message, "user_id": user_id, "thread_id": thread_id},
+        )
+        if response.status_code != 200:
+            raise HttpStatusError(response.status_code)
+
+    def queue_depth(self) -> Optional[float]:
+        """Profundidade da fila lida do `/metrics` do servidor (None se indisponível)."""
+        try:
+            response = self._client.get(f"{self.base_url}/metrics", timeout=5.0)
+        except Exception:
+            return None
+        if response.status_code != 200:
+            return None
+        for line in response.text.splitlines():
+            if line.startswith("chatbot_background_queue_depth "):
+                value = float(line.split()[1])
+                return None if math.isnan(value) else value
+        return None
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class HttpStatusError(Exception):
+    """Resposta do `/chat` com status diferente de 200."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _error_kind(error: Exception) -> str:
+    if isinstance(error, HttpStatusError):
+        return f"http_{error.status_code}"
+    return type(error).__name__
+
+
+class LoadGenerator:
+    """Reproduz as conversas do corpus em um alvo e coleta latências e a linha do tempo."""
+
+    def __init__(
+        self,
+        target: Any,
+        corpus: List[Dict[str, Any]],
+        think_time: float = 0.0,
+        sample_interval: float = 1.0,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            target: Alvo com `send(message, user_id, thread_id)` e `queue_depth()`
+            corpus (List[Dict[str, Any]]): Conversas (ver `src.agent.evaluation.load_corpus`)
+            think_time (float): Pausa média entre turnos de uma sessão (exponencial)
+            sample_interval (float): Intervalo entre amostras da linha do tempo
+            seed (int): Semente das chegadas e pausas
+        """
+        if not corpus:
+            raise ValueError("O corpus não tem conversas")
+        self.target = target
+        self.corpus = corpus
+        self.think_time = think_time
+        self.sample_interval = sample_interval
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._latencies: List[float] = []
+        self._errors: Dict[str, int] = {}
+        self._start_lags: List[float] = []
+        self._in_flight = 0
+        self._sessions = 0
+        self._timeline: List[Dict[str, Any]] = []
+        self._started = 0.0
+
+    def _exponential(self, mean: float) -> float:
+        if mean <= 0:
+            return 0.0
+        with self._rng_lock:
+            return self._rng.expovariate(1.0 / mean)
+
+    def _run_session(self, session: int, stop_at: float, scheduled_at: Optional[float] = None) -> None:
+        if scheduled_at is not None:
+            with self._lock:
+                self._start_lags.append(max(0.0, time.monotonic() - scheduled_at))
+        conversation = self.corpus[session % len(self.corpus)]
+        user_id = f"{conversation.get('user_id', 'load')}_{session}"
+        thread_id = f"load_{uuid.uuid4().hex}"
+        with self._lock:
+            self._sessions += 1
+
+        for index, turn in enumerate(conversation["turns"]):
+            if time.monotonic() >= stop_at:
+                return
+            if index and self.think_time > 0:
+                time.sleep(self._exponential(self.think_time))
+            with self._lock:
+                self._in_flight += 1
+            start = time.perf_counter()
+            try:
+                self.target.send(turn["message"], user_id=user_id, thread_id=thread_id)
+            except Exception as e:
+                kind = _error_kind(e)
+                with self._lock:
+                    self._errors[kind] = self._errors.get(kind, 0) + 1
+                logger.debug(f"Erro no turno da sessão {session}: {e}")
+            else:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self._latencies.append(elapsed)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+    def _sample_loop(self, done: threading.Event) -> None:
+        last_completed = 0
+        while not done.wait(self.sample_interval):
+            self._sample(last_completed)
+            last_completed = self._timeline[-1]["completed"]
+        self._sample(last_completed)
+
+    def _sample(self, last_completed: int) -> None:
+        with self._lock:
+            completed = len(self._latencies)
+            errors = sum(self._errors.values())
+            in_flight = self._in_flight
+            recent = self._latencies[last_completed:]
+        self._timeline.append({
+            "t": round(time.monotonic() - self._started, 2),
+            "completed": completed,
+            "errors": errors,
+            "in_flight": in_flight,
+            "queue_depth": self.target.queue_depth(),
+            "p95_ms": round(percentile(recent, 95) * 1000, 1) if recent else None,
+        })
+
+    def run_closed(self, users: int, duration: Optional[float] = None, iterations: int = 1) -> Dict[str, Any]:
+        """
+        Carga em circuito fechado: `users` sessões simultâneas, cada uma repetindo conversas.
+
+        Args:
+            users (int): Usuários simultâneos
+            duration (Optional[float]): Duração em segundos (None: `iterations` conversas por usuário)
+            iterations (int): Conversas por usuário quando não há duração
+
+        Returns:
+            Dict[str, Any]: Relatório (ver `report`)
+        """
+        stop_at = time.monotonic() + duration if duration else math.inf
+
+        def user_loop(user: int) -> None:
+            repetition = 0
+            while time.monotonic() < stop_at and (duration or repetition < iterations):
+                self._run_session(user + repetition * users, stop_at)
+                repetition += 1
+
+        return self._execute("closed", users, lambda executor: list(executor.map(user_loop, range(users))))
+
+    def run_open(
+        self,
+        rate: float,
+        duration: Optional[float] = None,
+        sessions: Optional[int] = None,
+        max_in_flight: int = 256,
+    ) -> Dict[str, Any]:
+        """
+        Carga em circuito aberto: sessões chegam segundo um processo de Poisson.
+
+        Args:
+            rate (float): Sessões iniciadas por segundo (média)
+            duration (Optional[float]): Período de chegadas em segundos
+            sessions (Optional[int]): Número de sessões (se não houver duração)
+            max_in_flight (int): Sessões executadas ao mesmo tempo; chegadas além disso
+                esperam, e a espera aparece em `start_lag`
+
+        Returns:
+            Dict[str, Any]: Relatório (ver `report`)
+        """
+        if rate <= 0:
+            raise ValueError("A taxa de chegada deve ser positiva")
+        if duration is None and sessions is None:
+            raise ValueError("Informe a duração ou o número de sessões")
+
+        def schedule(executor: ThreadPoolExecutor) -> None:
+            start = time.monotonic()
+            arrivals_end = start + duration if duration else math.inf
+            # As sessões em andamento terminam o turno atual até 60 s após o fim das chegadas
+            stop_at = arrivals_end + 60.0 if duration else math.inf
+            next_arrival = start
+            futures = []
+            session = 0
+            while next_arrival < arrivals_end and (sessions is None or session < sessions):
+                delay = next_arrival - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(executor.submit(self._run_session, session, stop_at, next_arrival))
+                session += 1
+                next_arrival += self._exponential(1.0 / rate)
+            for future in futures:
+                future.result()
+
+        return self._execute("open", max_in_flight, schedule, rate=rate)
+
+    def _execute(self, model: str, workers: int, body: Any, **settings: Any) -> Dict[str, Any]:
+        self._started = time.monotonic()
+        done = threading.Event()
+        sampler = threading.Thread(target=self._sample_loop, args=(done,), name="loadgen-sampler", daemon=True)
+        sampler.start()
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="loadgen") as executor:
+                body(executor)
+        finally:
+            done.set()
+            sampler.join()
+        return self.report(model, workers=workers, **settings)
+
+    def report(self, model: str, **settings: Any) -> Dict[str, Any]:
+        """
+        Resume a execução.
+
+        Args:
+            model (str): Modelo de chegada ("closed" ou "open")
+            **settings: Parâmetros da execução incluídos no relatório
+
+        Returns:
+            Dict[str, Any]: `arrival_model`, `settings`, `sessions`, `turns`, `errors`,
+                `error_rate`, `errors_by_kind`, `throughput_tps`, latências em ms,
+                `start_lag_ms` (circuito aberto) e `timeline`
+        """
+        elapsed = time.monotonic() - self._started
+        with self._lock:
+            latencies = [value * 1000 for value in self._latencies]
+            errors = dict(self._errors)
+            lags = [value * 1000 for value in self._start_lags]
+        error_count = sum(errors.values())
+        turns = len(latencies) + error_count
+
+        def summary(values: List[float]) -> Dict[str, Optional[float]]:
+            result = {}
+            for name, pct in (("p50", 50), ("p90", 90), ("p95", 95), ("p99", 99), ("max", 100)):
+                value = percentile(values, pct)
+                result[name] = round(value, 1) if value is not None else None
+            return result
+
+        result = {
+            "arrival_model": model,
+            "settings": settings,
+            "duration_s": round(elapsed, 2),
+            "sessions": self._sessions,
+            "turns": turns,
+            "errors": error_count,
+            "error_rate": round(error_count / turns, 4) if turns else 0.0,
+            "errors_by_kind": errors,
+            "throughput_tps": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency_ms": summary(latencies),
+            "timeline": self._timeline,
+        }
+        if model == "open":
+            result["start_lag_ms"] = summary(lags)
+        return result
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """
+    Formata o relatório para o terminal.
+
+    Args:
+        report (Dict[str, Any]): Relatório de `LoadGenerator`
+
+    Returns:
+        str: Resumo, percentis e a linha do tempo
+    """
+    latency = report["latency_ms"]
+    lines = [
+        f"Modelo de chegada: {report['arrival_model']}  duração: {report['duration_s']} s  "
+        f"sessões: {report['sessions']}  turnos: {report['turns']}",
+        f"Vazão: {report['throughput_tps']} turnos/s  erros: {report['errors']} "
+        f"({report['error_rate'] * 100:.2f}%) {report['errors_by_kind'] or ''}",
+        "Latência (ms): " + "  ".join(f"{name} {value}" for name, value in latency.items()),
+    ]
+    if "start_lag_ms" in report:
+        lines.append("Atraso de início das sessões (ms): " + "  ".join(
+            f"{name} {value}" for name, value in report["start_lag_ms"].items()
+        ))
+    lines.append("")
+    lines.append(f"{'t (s)':>8}{'concluídos':>12}{'erros':>8}{'em curso':>10}{'fila':>8}{'p95 ms':>10}")
+    for sample in report["timeline"]:
+        queue = sample["queue_depth"]
+        p95 = sample["p95_ms"]
+        lines.append(
+            f"{sample['t']:>8}{sample['completed']:>12}{sample['errors']:>8}{sample['in_flight']:>10}"
+            f"{'-' if queue is None else int(queue):>8}{'-' if p95 is None else p95:>10}"
+        )
+    return "\n".join(lines)
+
+
+def add_arguments(parser: Any) -> None:
+    """Registra as opções do subcomando `load` da CLI."""
+    parser.add_argument("corpus", help="Conversas em JSONL (formato de src.agent.evaluation)")
+    parser.add_argument("--url", help="Servidor em execução (ex.: http://localhost:8000); sem ela, usa o agente local")
+    parser.add_argument("--fake", action="store_true", help="Agente local com o modelo simulado (sem provedor)")
+    parser.add_argument("--no-background", action="store_true", help="Agente local sem memória em segundo plano")
+    parser.add_argument("--profiles", action="store_true", help="Agente local com atualização de perfis")
+    parser.add_argument("--arrival", choices=["closed", "open"], default="closed", help="Modelo de chegada")
+    parser.add_argument("--users", type=int, default=10, help="Usuários simultâneos (circuito fechado)")
+    parser.add_argument("--iterations", type=int, default=1, help="Conversas por usuário sem --duration")
+    parser.add_argument("--rate", type=float, default=1.0, help="Sessões por segundo (circuito aberto)")
+    parser.add_argument("--sessions", type=int, help="Sessões a iniciar (circuito aberto sem --duration)")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Sessões simultâneas (circuito aberto)")
+    parser.add_argument("--duration", type=float, help="Duração em segundos")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Pausa média entre turnos em segundos")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Intervalo da linha do tempo em segundos")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Tempo máximo de cada requisição HTTP")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Arquivo JSON com o relatório completo")
+
+
+def run_from_args(args: Any) -> int:
+    """
+    Executa o subcomando `load` da CLI.
+
+    Args:
+        args: Opções lidas por `add_arguments`
+
+    Returns:
+        int: Código de saída (1 se algum turno falhou)
+    """
+    from src.agent.evaluation import load_corpus
+
+    corpus = load_corpus(args.corpus)
+    if args.url:
+        target = HttpTarget(args.url, timeout=args.timeout, max_connections=max(args.users, args.max_in_flight))
+    else:
+        target = InProcessTarget(fake=args.fake, background=not args.no_background, profiles=args.profiles)
+
+    generator = LoadGenerator(
+        target, corpus, think_time=args.think_time, sample_interval=args.sample_interval, seed=args.seed,
+    )
+    try:
+        if args.arrival == "open":
+            sessions = args.sessions if args.sessions is not None or args.duration else len(corpus)
+            report = generator.run_open(args.rate, duration=args.duration, sessions=sessions,
+                                        max_in_flight=args.max_in_flight)
+        else:
+            report = generator.run_closed(args.users, duration=args.duration, iterations=args.iterations)
+    finally:
+        target.close()
+
+    print(format_report(report))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+            file.write("\n")
+    return 1 if report["errors"] else 0
@@ -0,0 +1,278 @@
+"""
+Configuração de logging sem bloqueio no caminho das requisições.
+
+Os handlers do logger raiz são substituídos por um único `QueueHandler`: quem
+registra uma mensagem só a coloca em uma fila limitada, e uma thread própria
+(`QueueListener`) faz a escrita no arquivo (com rotação por tamanho) e no
+console. Se a fila encher, a mensagem é descartada em vez de esperar.
+
+Antes da fila, cada registro passa por:
+
+- amostragem por logger (`LOG_SAMPLE_RATES`), para fontes ruidosas como a fila de
+  reflexão em segundo plano; avisos e erros nunca são amostrados;
+- limite de taxa por logger (`LOG_RATE_LIMIT_PER_SECOND`, com rajada de
+  `LOG_RATE_LIMIT_BURST`); o próximo registro aceito informa quantos foram
+  suprimidos;
+- contexto do turno: `trace_id`/`span_id` do span ativo, para correlacionar logs
+  e rastros.
+
+Os descartes são contabilizados em `chatbot_log_records_dropped_total` (`/metrics`).
+"""
+
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from src.config import (
+    LOG_LEVEL,
+    LOG_FILE,
+    LOG_FORMAT,
+    LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT,
+    LOG_QUEUE_SIZE,
+    LOG_RATE_LIMIT_PER_SECOND,
+    LOG_RATE_LIMIT_BURST,
+    LOG_SAMPLE_RATES,
+)
+from src.metrics import REGISTRY
+
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    "chatbot_log_records_dropped_total",
+    "Registros de log descartados antes da escrita",
+    ["reason"],
+)
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+# Atributos padrão de um LogRecord (o restante vem de `extra=` e vai para o JSON)
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """
+    Lê as taxas de amostragem por logger.
+
+    Args:
+        value (str): Pares "logger=taxa" separados por vírgula (ex.: "src.memory.background=0.1")
+
+    Returns:
+        Dict[str, float]: Logger -> fração dos registros mantidos
+    """
+    rates = {}
+    for item in value.split(","):
+        name, separator, rate = item.strip().partition("=")
+        if separator and name:
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+def _sample_rate(logger_name: str, rates: Dict[str, float]) -> Optional[float]:
+    # O prefixo mais específico vence (ex.: "langmem.reflection" antes de "langmem")
+    name = logger_name
+    while name:
+        if name in rates:
+            return rates[name]
+        name = name.rpartition(".")[0]
+    return None
+
+
+class SamplingFilter(logging.Filter):
+    """Mantém só uma fração dos registros abaixo de WARNING dos loggers configurados."""
+
+    def __init__(self, rates: Dict[str, float], rng: Optional[random.Random] = None):
+        super().__init__()
+        self.rates = rates
+        self._rng = rng or random.Random()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = _sample_rate(record.name, self.rates)
+        if rate is None or self._rng.random() < rate:
+            return True
+        LOG_RECORDS_DROPPED.labels(reason="sampled").inc()
+        return False
+
+
+class RateLimitFilter(logging.Filter):
+    """Limite de registros por segundo de cada logger (balde de fichas); avisos e erros sempre passam."""
+
+    def __init__(self, per_second: float, burst: float, clock=time.monotonic):
+        super().__init__()
+        self.per_second = per_second
+        self.burst = max(1.0, burst)
+        self._clock = clock
+        self._lock = threading.Lock()
+        # logger -> [fichas, último reabastecimento, registros suprimidos]
+        self._buckets: Dict[str, List[float]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.per_second <= 0:
+            return True
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(record.name)
+            if bucket is None:
+                bucket = self._buckets[record.name] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.per_second)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                LOG_RECORDS_DROPPED.labels(reason="rate_limited").inc()
+                return False
+            bucket[0] -= 1
+            suppressed, bucket[2] = int(bucket[2]), 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class TraceContextFilter(logging.Filter):
+    """Anota o registro com o span ativo (lido na thread de quem registrou)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        from src.tracing import current_span
+
+        span = current_span()
+        if span is not None:
+            record.trace_id = span.trace_id
+            record.span_id = span.span_id
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formata cada registro como uma linha JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """`QueueHandler` que descarta o registro quando a fila está cheia."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve a mensagem e a exceção na thread de quem registrou (os argumentos
+        # podem mudar depois), mas deixa a formatação final para a thread de escrita
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(reason="queue_full").inc()
+
+
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+
+
+def configure_logging(
+    level: str = LOG_LEVEL,
+    log_file: Optional[str] = LOG_FILE,
+    log_format: str = LOG_FORMAT,
+    max_bytes: int = LOG_MAX_BYTES,
+    backup_count: int = LOG_BACKUP_COUNT,
+    queue_size: int = LOG_QUEUE_SIZE,
+    rate_limit_per_second: float = LOG_RATE_LIMIT_PER_SECOND,
+    rate_limit_burst: float = LOG_RATE_LIMIT_BURST,
+    sample_rates: Optional[Dict[str, float]] = None,
+    console: bool = True,
+) -> logging.handlers.QueueListener:
+    """
+    Configura o logger raiz com fila, escrita em segundo plano, rotação e filtros.
+
+    Pode ser chamada de novo (por exemplo, em testes): a configuração anterior é
+    encerrada antes.
+
+    Args:
+        level (str): Nível mínimo do logger raiz
+        log_file (Optional[str]): Arquivo de log (None ou vazio desativa o arquivo)
+        log_format (str): "json" (uma linha JSON por registro) ou "text"
+        max_bytes (int): Tamanho do arquivo que dispara a rotação
+        backup_count (int): Arquivos rotacionados mantidos
+        queue_size (int): Registros pendentes acima dos quais novos são descartados
+        rate_limit_per_second (float): Registros por segundo de cada logger (0 desativa)
+        rate_limit_burst (float): Rajada permitida acima da taxa
+        sample_rates (Optional[Dict[str, float]]): Logger -> fração dos registros abaixo
+            de WARNING mantidos (padrão: LOG_SAMPLE_RATES)
+        console (bool): Se também escreve no stderr
+
+    Returns:
+        logging.handlers.QueueListener: Thread de escrita (encerrada por `shutdown_logging`)
+    """
+    global _listener, _queue_handler
+    shutdown_logging()
+
+    formatter = JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers: List[logging.Handler] = []
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        ))
+    if console:
+        handlers.append(logging.StreamHandler(sys.stderr))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    if sample_rates is None:
+        sample_rates = parse_sample_rates(LOG_SAMPLE_RATES)
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    queue_handler.addFilter(SamplingFilter(sample_rates))
+    queue_handler.addFilter(RateLimitFilter(rate_limit_per_second, rate_limit_burst))
+    queue_handler.addFilter(TraceContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    with _lock:
+        _listener, _queue_handler = listener, queue_handler
+    return listener
+
+
+def shutdown_logging() -> None:
+    """Escreve os registros pendentes e encerra a thread de escrita."""
+    global _listener, _queue_handler
+    with _lock:
+        listener, queue_handler = _listener, _queue_handler
+        _listener = _queue_handler = None
+    if listener is None:
+        return
+    logging.getLogger().removeHandler(queue_handler)
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
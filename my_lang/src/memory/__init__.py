@@ -1,44 +1,60 @@
 """
 Módulo para gerenciamento de memória usando LangMem.
+
+Os nomes públicos são carregados sob demanda (PEP 562): importar `src.memory`
+não importa o LangMem, o otimizador nem os backends de armazenamento até que o
+nome correspondente seja usado.
 """
 
-from src.memory.manager import (
-    create_memory_store,
-    create_memory_prompt_function,
-)
-
-from src.memory.background import (
-    create_background_memory_manager,
-    schedule_memory_processing,
-)
-
-from src.memory.optimizer import (
-    create_system_prompt_optimizer,
-    optimize_system_prompt,
-    create_multi_system_prompt_optimizer,
-    optimize_multiple_prompts,
-)
-
-from src.memory.profiles import (
-    UserProfile,
-    create_profile_manager,
-    create_profile_store_manager,
-    get_user_profile,
-    update_user_profile,
-)
-
-__all__ = [
-    "create_memory_store",
-    "create_memory_prompt_function",
-    "create_background_memory_manager",
-    "schedule_memory_processing",
-    "create_system_prompt_optimizer",
-    "optimize_system_prompt",
-    "create_multi_system_prompt_optimizer",
-    "optimize_multiple_prompts",
-    "UserProfile",
-    "create_profile_manager",
-    "create_profile_store_manager",
-    "get_user_profile",
-    "update_user_profile",
-] 
\ No newline at end of file
+import importlib
+
+# Nome exportado -> módulo que o define
+_EXPORTS = {
+    "create_memory_store": "src.memory.manager",
+    "create_memory_prompt_function": "src.memory.manager",
+    "create_background_memory_manager": "src.memory.background",
+    "schedule_memory_processing": "src.memory.background",
+    "create_system_prompt_optimizer": "src.memory.optimizer",
+    "optimize_system_prompt": "src.memory.optimizer",
+    "create_multi_system_prompt_optimizer": "src.memory.optimizer",
+    "optimize_multiple_prompts": "src.memory.optimizer",
+    "ReflectionCache": "src.memory.optimization_pipeline",
+    "save_trajectory": "src.memory.optimization_pipeline",
+    "iter_trajectories_from_checkpointer": "src.memory.optimization_pipeline",
+    "iter_trajectories_from_store": "src.memory.optimization_pipeline",
+    "run_optimization_pipeline": "src.memory.optimization_pipeline",
+    "select_trajectories": "src.memory.trajectory_selection",
+    "UserProfile": "src.memory.profiles",
+    "create_profile_manager": "src.memory.profiles",
+    "create_profile_store_manager": "src.memory.profiles",
+    "get_user_profile": "src.memory.profiles",
+    "save_user_profile": "src.memory.profiles",
+    "update_user_profile": "src.memory.profiles",
+    "ProfileIndex": "src.memory.profile_index",
+    "create_profile_index": "src.memory.profile_index",
+    "MemoryCache": "src.memory.retrieval",
+    "MemoryRetriever": "src.memory.retrieval",
+    "get_memory_retriever": "src.memory.retrieval",
+    "export_store": "src.memory.transfer",
+    "import_store": "src.memory.transfer",
+    "SnapshotStore": "src.memory.snapshot",
+    "SQLiteStore": "src.memory.sqlite_store",
+    "ShardedStore": "src.memory.sharding",
+    "run_consolidation": "src.memory.consolidation",
+}
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_EXPORTS))
+
+
+__all__ = list(_EXPORTS)
\ No newline at end of file
@@ -4,6 +4,7 @@ Processamento de memória em segundo plano (Background Formation) usando LangMem
 
 from typing import Dict, Any, Optional
 import logging
+import time
 import traceback
 from concurrent.futures import CancelledError
 
@@ -11,15 +12,42 @@ from langmem import ReflectionExecutor, create_memory_store_manager
 from langgraph.store.memory import InMemoryStore
 from langgraph.config import RunnableConfig
 
+from src.models import create_chat_model
+from src.instrumentation import InstrumentedReflector, track_background_queue
+from src.memory.consolidation import namespace_lock
+from src.tracing import current_traceparent
 from src.config import (
     MEMORY_NAMESPACE,
     MODEL_NAME,
     EMBEDDING_MODEL,
 )
 
-# Configuração de logging
-logger = logging.getLogger("memory_background")
-logger.setLevel(logging.DEBUG)
+# Configurar logger (nível e amostragem definidos em src/logging_setup.py)
+logger = logging.getLogger(__name__)
+
+
+class NamespaceLockedReflector:
+    """
+    Executa o gerenciador de memória sob o lock do namespace do usuário.
+
+    A consolidação (`src.memory.consolidation`) relê e grava as memórias sob o mesmo
+    lock, então não apaga uma memória que a reflexão regravou depois da leitura.
+    """
+
+    def __init__(self, reflector: Any):
+        self.reflector = reflector
+        # O ReflectionExecutor exige o atributo `namespace` do reflector
+        self.namespace = reflector.namespace
+
+    def invoke(self, payload: Any, config: Any = None, **kwargs: Any) -> Any:
+        from langchain_core.runnables.config import var_child_runnable_config
+
+        current = config or var_child_runnable_config.get() or {}
+        with namespace_lock(self.namespace(current)):
+            return self.reflector.invoke(payload, config, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.reflector, name)
 
 
 def create_background_memory_manager(
@@ -27,6 +55,7 @@ def create_background_memory_manager(
     model_name: str = MODEL_NAME,
     namespace: tuple = MEMORY_NAMESPACE,
     query_limit: int = 5,
+    model: Any = None,
 ) -> ReflectionExecutor:
     """
     Cria um gerenciador de memória em segundo plano usando ReflectionExecutor.
@@ -40,6 +69,7 @@ def create_background_memory_manager(
         model_name (str): Nome do modelo de linguagem
         namespace (tuple): Namespace para armazenamento das memórias
         query_limit (int): Número máximo de memórias relevantes a serem recuperadas
+        model: Modelo de chat já construído (padrão: um modelo próprio com prioridade de segundo plano)
         
     Returns:
         ReflectionExecutor: Executor para processamento de memória em segundo plano
@@ -48,13 +78,16 @@ def create_background_memory_manager(
     
     # Criamos o gerenciador de memória
     memory_manager = create_memory_store_manager(
-        model_name,  # Passamos como argumento posicional, não como keyword
+        model if model is not None else create_chat_model(model_name, priority="background"),  # Argumento posicional
         namespace=namespace,
         query_limit=query_limit,
     )
     
-    # Envolvemos o gerenciador em um ReflectionExecutor para processamento em segundo plano
-    executor = ReflectionExecutor(memory_manager, store=store)
+    # Envolvemos o gerenciador em um ReflectionExecutor para processamento em segundo plano;
+    # a espera na fila e a duração de cada execução são medidas em `/metrics`, e cada
+    # execução segura o lock do namespace do usuário (compartilhado com a consolidação)
+    executor = ReflectionExecutor(InstrumentedReflector(NamespaceLockedReflector(memory_manager)), store=store)
+    track_background_queue(executor)
     
     logger.info("Gerenciador de memória em segundo plano criado com sucesso")
     
@@ -87,15 +120,21 @@ def schedule_memory_processing(
             "messages": messages,
         }
         
-        # Criamos uma configuração explícita
+        # Criamos uma configuração explícita; `scheduled_at` permite medir a espera na
+        # fila e `traceparent` liga a tarefa ao rastro do turno que a agendou
         config = RunnableConfig(
             configurable={
                 "user_id": user_id,
+                "scheduled_at": time.time() + delay_seconds,
+                "traceparent": current_traceparent(),
             }
         )
         
-        # Agendamos o processamento com o atraso especificado e a configuração
-        future = executor.submit(to_process, after_seconds=delay_seconds, config=config)
+        # Agendamos o processamento com o atraso especificado e a configuração. Cada
+        # tarefa leva só as mensagens do próprio turno, então nenhuma pode substituir
+        # outra: sem `thread_id` explícito a LangMem agrupa todas as tarefas sob a mesma
+        # chave e cada envio cancelava o anterior, inclusive de outros usuários
+        future = executor.submit(to_process, after_seconds=delay_seconds, config=config, thread_id=None)
         
         # Adicionamos callback para monitorar o status da tarefa
         def done_callback(future):
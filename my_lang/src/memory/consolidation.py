@@ -0,0 +1,489 @@
+"""
+Consolidação periódica das memórias: remoção de duplicatas e de fatos superados.
+
+A ferramenta de gerenciamento de memórias e a reflexão em segundo plano gravam
+memórias o tempo todo, e os usuários repetem os mesmos fatos com outras palavras.
+As quase-duplicatas deixam a busca mais lenta e gastam tokens do prompt em
+`prompt_with_memories`. Este job agrupa as memórias de cada usuário pela
+similaridade dos embeddings e mantém uma única memória canônica por grupo:
+
+- as memórias são ordenadas da mais recente para a mais antiga e cada uma entra no
+  primeiro grupo cuja memória canônica tenha similaridade de cosseno de pelo menos
+  `threshold`; caso contrário, abre um grupo novo;
+- a canônica de cada grupo é a mais recente, que supera as anteriores; as demais
+  são apagadas;
+- com um modelo de chat (`--merge-model`), o conteúdo do grupo é reescrito em uma
+  única memória, preferindo os fatos mais recentes em caso de conflito.
+
+Usuários cujas memórias não mudaram desde a última execução são pulados: o job
+guarda, por usuário, a data da memória mais recente e a quantidade de memórias.
+Os vetores já gravados pelo backend são reaproveitados (InMemoryStore e SQLite);
+só memórias sem vetor custam chamadas de embeddings.
+
+Antes de gravar, o job relê as memórias de cada grupo e não apaga nem reescreve as
+que mudaram desde a leitura. A releitura e a gravação acontecem sob o lock do
+namespace (`namespace_lock`), o mesmo que a reflexão em segundo plano
+(`src.memory.background`) mantém durante cada execução. Escritas de fora desse
+lock ainda podem cair entre a releitura e a gravação, e então se perdem: as da
+ferramenta de memórias durante um turno e as de outro processo (com o job
+agendado à parte).
+
+Com os backends em memória (MEMORY_BACKEND=memory), o job precisa rodar no mesmo
+processo do servidor: defina CONSOLIDATION_INTERVAL. Com PostgreSQL ou SQLite,
+também pode ser agendado à parte (por exemplo, via cron):
+
+    python -m src.memory.consolidation --threshold 0.9
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from src.config import (
+    EMBEDDING_MODEL,
+    MEMORY_BACKEND,
+    MEMORY_NAMESPACE,
+    CONSOLIDATION_STATE_NAMESPACE,
+    CONSOLIDATION_SIMILARITY,
+    CONSOLIDATION_CONCURRENCY,
+    CONSOLIDATION_INTERVAL,
+    CONSOLIDATION_MERGE_MODEL,
+)
+from src.instrumentation import unwrap_store
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+MERGE_INSTRUCTIONS = (
+    "As memórias abaixo descrevem o mesmo fato sobre um usuário e estão ordenadas da "
+    "mais recente para a mais antiga. Combine-as em uma única memória curta, sem perder "
+    "detalhes. Quando houver conflito, a informação mais recente prevalece. Responda "
+    "apenas com o texto da memória."
+)
+
+
+def memory_text(value: Dict[str, Any]) -> Optional[str]:
+    """
+    Extrai o texto de uma memória gravada pela LangMem.
+
+    Aceita tanto `{"content": "..."}` (ferramenta de gerenciamento) quanto
+    `{"kind": "Memory", "content": {"content": "..."}}` (reflexão em segundo plano).
+
+    Args:
+        value (Dict[str, Any]): Valor do item no armazenamento
+
+    Returns:
+        Optional[str]: Texto da memória, ou None para itens estruturados
+    """
+    content = value.get("content")
+    if isinstance(content, dict):
+        content = content.get("content")
+    return content if isinstance(content, str) and content.strip() else None
+
+
+def _with_text(value: Dict[str, Any], text: str) -> Dict[str, Any]:
+    """Retorna uma cópia do valor com o texto da memória substituído."""
+    if isinstance(value.get("content"), dict):
+        return {**value, "content": {**value["content"], "content": text}}
+    return {**value, "content": text}
+
+
+def cluster_memories(vectors: np.ndarray, threshold: float = CONSOLIDATION_SIMILARITY) -> List[List[int]]:
+    """
+    Agrupa memórias quase duplicadas por agrupamento guloso com líderes.
+
+    As linhas devem vir ordenadas da memória mais recente para a mais antiga; o
+    primeiro índice de cada grupo é o da memória canônica.
+
+    Args:
+        vectors (np.ndarray): Embeddings das memórias, uma por linha
+        threshold (float): Similaridade de cosseno mínima com a canônica do grupo
+
+    Returns:
+        List[List[int]]: Índices de cada grupo, a canônica primeiro
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1.0, norms)
+
+    clusters: List[List[int]] = []
+    leaders = np.empty((len(vectors), vectors.shape[1] if vectors.ndim == 2 else 0), dtype=np.float32)
+    for index, vector in enumerate(vectors):
+        if clusters:
+            similarity = leaders[: len(clusters)] @ vector
+            best = int(np.argmax(similarity))
+            if similarity[best] >= threshold:
+                clusters[best].append(index)
+                continue
+        leaders[len(clusters)] = vector
+        clusters.append([index])
+    return clusters
+
+
+def _iter_namespaces(store: Any, page_size: int = 1000) -> Iterator[Tuple[str, ...]]:
+    """Percorre, em páginas, os namespaces de memórias de todos os usuários."""
+    prefix = tuple(part for part in MEMORY_NAMESPACE if "{" not in part)
+    offset = 0
+    while True:
+        page = store.list_namespaces(prefix=prefix, max_depth=len(MEMORY_NAMESPACE), limit=page_size, offset=offset)
+        for namespace in page:
+            if len(namespace) == len(MEMORY_NAMESPACE):
+                yield namespace
+        if len(page) < page_size:
+            return
+        offset += page_size
+
+
+def _load_memories(store: Any, namespace: Tuple[str, ...], page_size: int = 1000) -> List[Any]:
+    """Carrega todas as memórias de um namespace (sem subnamespaces)."""
+    items, offset = [], 0
+    while True:
+        page = store.search(namespace, limit=page_size, offset=offset)
+        items.extend(item for item in page if tuple(item.namespace) == namespace)
+        if len(page) < page_size:
+            return items
+        offset += page_size
+
+
+def _merge_texts(model: Any, texts: Sequence[str]) -> Optional[str]:
+    """Pede ao modelo uma única memória para o grupo (do mais recente ao mais antigo)."""
+    listing = "\n".join(f"{index + 1}. {text}" for index, text in enumerate(texts))
+    response = model.invoke([("system", MERGE_INSTRUCTIONS), ("human", listing)])
+    text = getattr(response, "content", response)
+    return text.strip() if isinstance(text, str) and text.strip() else None
+
+
+def _watermark(items: Sequence[Any]) -> Dict[str, Any]:
+    newest = max(item.updated_at for item in items).isoformat() if items else None
+    return {"updated_at": newest, "count": len(items)}
+
+
+def _stored_vectors(store: Any, namespace: Tuple[str, ...]) -> Dict[str, np.ndarray]:
+    """
+    Vetores já gravados pelo backend para as memórias de um namespace.
+
+    O InMemoryStore (e o SnapshotStore) e o SQLiteStore guardam os vetores junto com
+    os itens; no PostgreSQL eles ficam no pgvector e não são lidos aqui, então os
+    itens são embutidos de novo.
+    """
+    from langgraph.store.memory import InMemoryStore
+
+    from src.memory.sharding import ShardedStore
+    from src.memory.sqlite_store import SQLiteStore
+
+    backend = unwrap_store(store)
+    if isinstance(backend, ShardedStore):
+        backend = unwrap_store(backend.shards[backend.shard_for(namespace)])
+    if isinstance(backend, SQLiteStore):
+        return backend.vectors(namespace)
+    if isinstance(backend, InMemoryStore):
+        return {
+            key: np.asarray(next(iter(fields.values())), dtype=np.float32)
+            for key, fields in backend._vectors.get(namespace, {}).items()
+            if fields
+        }
+    return {}
+
+
+def _memory_vectors(store: Any, namespace: Tuple[str, ...], memories: Sequence[Tuple[Any, str]], embeddings: Any) -> np.ndarray:
+    """Vetores das memórias: os gravados pelo backend e, só para os que faltam, novos embeddings."""
+    stored = _stored_vectors(store, namespace)
+    vectors: List[Optional[np.ndarray]] = [stored.get(item.key) for item, _ in memories]
+    missing = [index for index, vector in enumerate(vectors) if vector is None]
+    if missing:
+        for index, vector in zip(missing, embeddings.embed_documents([memories[i][1] for i in missing])):
+            vectors[index] = np.asarray(vector, dtype=np.float32)
+    return np.vstack(vectors)
+
+
+def _unchanged_keys(store: Any, namespace: Tuple[str, ...], items: Sequence[Any]) -> Set[str]:
+    """Chaves cujos itens continuam com o mesmo `updated_at` de quando foram lidos."""
+    from langgraph.store.base import GetOp
+
+    current = store.batch([GetOp(namespace, item.key) for item in items])
+    return {
+        item.key
+        for item, now in zip(items, current)
+        if now is not None and now.updated_at == item.updated_at
+    }
+
+
+_namespace_locks_guard = threading.Lock()
+# Namespace -> [lock, usuários do lock]; a entrada é removida quando ninguém mais a usa
+_namespace_locks: Dict[Tuple[str, ...], List[Any]] = {}
+
+
+@contextmanager
+def namespace_lock(namespace: Tuple[str, ...]) -> Iterator[None]:
+    """
+    Serializa, no processo, as escritas nas memórias de um usuário.
+
+    Usado pela consolidação (entre a releitura e a gravação) e pela reflexão em
+    segundo plano (durante cada execução).
+
+    Args:
+        namespace (Tuple[str, ...]): Namespace das memórias do usuário
+    """
+    namespace = tuple(namespace)
+    with _namespace_locks_guard:
+        entry = _namespace_locks.setdefault(namespace, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _namespace_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _namespace_locks[namespace]
+
+
+def consolidate_namespace(
+    store: Any,
+    namespace: Tuple[str, ...],
+    embeddings: Any,
+    threshold: float = CONSOLIDATION_SIMILARITY,
+    model: Any = None,
+    dry_run: bool = False,
+    force: bool = False,
+    memory_cache: Any = None,
+) -> Dict[str, Any]:
+    """
+    Consolida as memórias de um usuário.
+
+    Os vetores gravados pelo backend são reaproveitados; só memórias sem vetor são
+    embutidas. Antes de gravar, cada item é lido de novo: se a reflexão em segundo
+    plano o alterou desde a leitura, ele não é apagado nem reescrito (e, se for a
+    canônica, o grupo inteiro fica para a próxima execução).
+
+    Args:
+        store: Armazenamento (InMemoryStore ou compatível)
+        namespace (Tuple[str, ...]): Namespace das memórias do usuário
+        embeddings: Modelo de embeddings para as memórias sem vetor gravado
+        threshold (float): Similaridade de cosseno a partir da qual duas memórias são duplicatas
+        model: Modelo de chat que reescreve cada grupo (None mantém a memória mais recente)
+        dry_run (bool): Apenas conta o que seria removido, sem gravar
+        force (bool): Processa o usuário mesmo sem memórias novas desde a última execução
+        memory_cache (Optional[MemoryCache]): Cache de reserva da busca, invalidado após as remoções
+
+    Returns:
+        Dict[str, Any]: Memórias lidas, grupos consolidados, memórias removidas e reescritas
+    """
+    from langgraph.store.base import PutOp
+
+    stats = {"memories": 0, "clusters": 0, "reclaimed": 0, "rewritten": 0, "conflicts": 0, "skipped": False}
+    items = _load_memories(store, namespace)
+    stats["memories"] = len(items)
+    state_key = json.dumps(list(namespace), ensure_ascii=False)
+    if not force:
+        previous = store.get(CONSOLIDATION_STATE_NAMESPACE, state_key)
+        if previous is not None and previous.value == _watermark(items):
+            stats["skipped"] = True
+            return stats
+
+    # Da mais recente para a mais antiga: a primeira de cada grupo supera as demais
+    memories = sorted(
+        ((item, text) for item in items if (text := memory_text(item.value)) is not None),
+        key=lambda pair: pair[0].updated_at,
+        reverse=True,
+    )
+    groups = []
+    if len(memories) > 1:
+        vectors = _memory_vectors(store, namespace, memories, embeddings)
+        for cluster in cluster_memories(vectors, threshold):
+            if len(cluster) == 1:
+                continue
+            merged = None
+            if model is not None:
+                merged = _merge_texts(model, [memories[index][1] for index in cluster])
+                if merged == memories[cluster[0]][1]:
+                    merged = None
+            groups.append(([memories[index][0] for index in cluster], merged))
+
+    # Relê os itens logo antes de gravar (depois das chamadas ao modelo), sob o lock
+    # do namespace: a reflexão em segundo plano não grava entre a releitura e a escrita
+    ops = []
+    with namespace_lock(namespace):
+        unchanged = _unchanged_keys(store, namespace, [item for group, _ in groups for item in group]) if groups else set()
+        for group, merged in groups:
+            canonical, duplicates = group[0], group[1:]
+            if canonical.key not in unchanged:
+                stats["conflicts"] += 1
+                continue
+            stats["clusters"] += 1
+            if merged:
+                ops.append(PutOp(namespace, canonical.key, _with_text(canonical.value, merged)))
+                stats["rewritten"] += 1
+            for item in duplicates:
+                if item.key in unchanged:
+                    ops.append(PutOp(namespace, item.key, None))
+                    stats["reclaimed"] += 1
+                else:
+                    stats["conflicts"] += 1
+        if ops and not dry_run:
+            store.batch(ops)
+
+    if dry_run:
+        return stats
+    if ops:
+        if memory_cache is not None:
+            memory_cache.invalidate(namespace)
+        items = _load_memories(store, namespace)
+    store.put(CONSOLIDATION_STATE_NAMESPACE, state_key, _watermark(items), index=False)
+    return stats
+
+
+def run_consolidation(
+    store: Any,
+    embeddings: Any = None,
+    threshold: float = CONSOLIDATION_SIMILARITY,
+    model: Any = None,
+    concurrency: int = CONSOLIDATION_CONCURRENCY,
+    dry_run: bool = False,
+    force: bool = False,
+    memory_cache: Any = None,
+) -> Dict[str, Any]:
+    """
+    Executa uma rodada de consolidação sobre as memórias de todos os usuários.
+
+    Args:
+        store: Armazenamento (InMemoryStore ou compatível)
+        embeddings: Modelo de embeddings (padrão: o do armazenamento, ou EMBEDDING_MODEL)
+        threshold (float): Similaridade de cosseno a partir da qual duas memórias são duplicatas
+        model: Modelo de chat que reescreve cada grupo (None mantém a memória mais recente)
+        concurrency (int): Usuários processados em paralelo
+        dry_run (bool): Apenas conta o que seria removido, sem gravar
+        force (bool): Processa também os usuários sem memórias novas
+        memory_cache (Optional[MemoryCache]): Cache de reserva da busca (padrão: o do
+            `MemoryRetriever` do processo)
+
+    Returns:
+        Dict[str, Any]: Relatório da execução, incluindo as memórias recuperadas (`reclaimed`)
+    """
+    from src.instrumentation import MEMORY_CONSOLIDATION_RECLAIMED, MEMORY_CONSOLIDATION_SECONDS
+
+    start = time.perf_counter()
+    if embeddings is None:
+        embeddings = getattr(unwrap_store(store), "embeddings", None)
+    if embeddings is None:
+        from src.models import create_embeddings
+
+        embeddings = create_embeddings(EMBEDDING_MODEL, priority="batch")
+    if memory_cache is None:
+        from src.memory.retrieval import get_memory_retriever
+
+        memory_cache = get_memory_retriever().cache
+
+    report = {
+        "users": 0,
+        "skipped_users": 0,
+        "memories": 0,
+        "clusters": 0,
+        "reclaimed": 0,
+        "rewritten": 0,
+        "conflicts": 0,
+        "errors": 0,
+        "dry_run": dry_run,
+    }
+
+    def consolidate(namespace: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+        try:
+            return consolidate_namespace(
+                store, namespace, embeddings, threshold, model, dry_run, force, memory_cache
+            )
+        except Exception as e:
+            logger.warning(f"Erro ao consolidar as memórias de {namespace}: {str(e)}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="consolidation") as executor:
+        for stats in executor.map(consolidate, list(_iter_namespaces(store))):
+            report["users"] += 1
+            if stats is None:
+                report["errors"] += 1
+                continue
+            report["skipped_users"] += stats["skipped"]
+            for field in ("memories", "clusters", "reclaimed", "rewritten", "conflicts"):
+                report[field] += stats[field]
+
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    MEMORY_CONSOLIDATION_SECONDS.observe(report["seconds"])
+    if not dry_run:
+        MEMORY_CONSOLIDATION_RECLAIMED.inc(report["reclaimed"])
+    logger.info(
+        f"Consolidação de memórias: {report['reclaimed']} memórias recuperadas de {report['memories']} "
+        f"em {report['users']} usuários ({report['skipped_users']} sem mudanças) em {report['seconds']:.1f}s"
+    )
+    return report
+
+
+def start_consolidation_schedule(
+    store: Any,
+    interval: float = CONSOLIDATION_INTERVAL,
+    **kwargs: Any,
+) -> threading.Event:
+    """
+    Executa a consolidação periodicamente em uma thread do próprio processo.
+
+    Args:
+        store: Armazenamento (InMemoryStore ou compatível)
+        interval (float): Segundos entre o fim de uma execução e o início da próxima
+        **kwargs: Argumentos repassados para `run_consolidation`
+
+    Returns:
+        threading.Event: Evento que encerra o agendamento quando sinalizado
+    """
+    stop = threading.Event()
+
+    def run() -> None:
+        while not stop.wait(interval):
+            try:
+                run_consolidation(store, **kwargs)
+            except Exception as e:
+                logger.error(f"Erro na consolidação de memórias: {str(e)}", exc_info=True)
+
+    threading.Thread(target=run, name="memory-consolidation", daemon=True).start()
+    logger.info(f"Consolidação de memórias agendada a cada {interval:.0f}s")
+    return stop
+
+
+def main():
+    """Ponto de entrada do job agendado de consolidação de memórias."""
+    parser = argparse.ArgumentParser(description="Remove memórias duplicadas e superadas")
+    parser.add_argument("--threshold", type=float, default=CONSOLIDATION_SIMILARITY)
+    parser.add_argument("--concurrency", type=int, default=CONSOLIDATION_CONCURRENCY)
+    parser.add_argument("--merge-model", default=CONSOLIDATION_MERGE_MODEL, help="Modelo que reescreve cada grupo")
+    parser.add_argument("--dry-run", action="store_true", help="Apenas conta as memórias que seriam removidas")
+    parser.add_argument("--force", action="store_true", help="Processa também os usuários sem memórias novas")
+    args = parser.parse_args()
+    if MEMORY_BACKEND == "memory":
+        # O armazenamento em memória é do processo: use CONSOLIDATION_INTERVAL no servidor
+        parser.error("o job precisa de um armazenamento compartilhado (MEMORY_BACKEND=postgres ou sqlite)")
+
+    from src.memory.manager import create_memory_store
+
+    model = None
+    if args.merge_model:
+        from src.models import create_chat_model
+
+        model = create_chat_model(args.merge_model, priority="batch")
+    report = run_consolidation(
+        create_memory_store(),
+        threshold=args.threshold,
+        model=model,
+        concurrency=args.concurrency,
+        dry_run=args.dry_run,
+        force=args.force,
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
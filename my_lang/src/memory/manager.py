@@ -2,40 +2,87 @@
 Gerenciamento de memória para o chatbot usando LangMem.
 """
 
-from typing import Callable, Dict, List, Tuple, Any
+from typing import Callable, Dict, List, Optional, Tuple, Any
 import asyncio
 
-from langmem import create_manage_memory_tool, create_search_memory_tool
 from langgraph.store.memory import InMemoryStore
-from langgraph.store.postgres import AsyncPostgresStore, PoolConfig
-from langgraph.config import get_store
+from langgraph.config import get_store, get_config
 
+from src.models import create_embeddings
+from src.memory.retrieval import get_memory_retriever
 from src.config import (
     MEMORY_NAMESPACE,
     MEMORY_INSTRUCTIONS,
     SEARCH_INSTRUCTIONS,
     EMBEDDING_MODEL,
-    USE_POSTGRES,
+    MEMORY_BACKEND,
+    TRACING_ENABLED,
     POSTGRES_CONNECTION_STRING,
     POSTGRES_POOL_MIN_SIZE,
     POSTGRES_POOL_MAX_SIZE,
+    MEMORY_SNAPSHOT_DIR,
+    SQLITE_STORE_PATH,
+    MEMORY_SHARDS,
 )
 
 
 def create_memory_store():
     """
-    Cria o armazenamento de memória usando PostgreSQL ou InMemoryStore.
+    Cria o armazenamento de memória configurado em MEMORY_BACKEND: PostgreSQL,
+    SQLite ou InMemoryStore.
+    
+    Com MEMORY_SNAPSHOT_DIR, o InMemoryStore é persistido em snapshots com log de
+    alterações (ver `SnapshotStore`). Com MEMORY_SHARDS, os namespaces são
+    distribuídos entre vários backends do mesmo tipo (ver `ShardedStore`).
+    
+    Com TRACING_ENABLED, o armazenamento é envolvido por um `TracedStore`.
     
     Returns:
-        Store: O objeto de armazenamento para memórias (AsyncPostgresStore ou InMemoryStore)
+        Store: O objeto de armazenamento para memórias (AsyncPostgresStore, SQLiteStore,
+            SnapshotStore ou InMemoryStore)
     """
-    # Configuração comum para embeddings
-    index_config = {
+    store = _create_sharded_store() if MEMORY_SHARDS else _create_backend_store()
+    if TRACING_ENABLED:
+        from src.tracing import TracedStore
+
+        store = TracedStore(store)
+    return store
+
+
+def _create_sharded_store():
+    """Cria um backend por shard de MEMORY_SHARDS, com o mesmo modelo de embeddings."""
+    from src.memory.sharding import ShardedStore, parse_shards
+
+    index_config = _create_index_config()
+    return ShardedStore({
+        name: _create_backend_store(location, index_config)
+        for name, location in parse_shards(MEMORY_SHARDS).items()
+    })
+
+
+def _create_index_config() -> Dict[str, Any]:
+    """Configuração comum para embeddings."""
+    return {
         "dims": 1536,  # Dimensionalidade dos embeddings
-        "embed": EMBEDDING_MODEL,  # Modelo para embeddings
+        "embed": create_embeddings(EMBEDDING_MODEL),  # Modelo para embeddings (cliente HTTP compartilhado)
     }
 
-    if USE_POSTGRES:
+
+def _create_backend_store(location: Optional[str] = None, index_config: Optional[Dict[str, Any]] = None):
+    """
+    Cria o armazenamento configurado, sem invólucros.
+    
+    Args:
+        location (Optional[str]): String de conexão (postgres), arquivo (sqlite) ou diretório de
+            snapshots (memory); padrão: o da configuração
+        index_config (Optional[Dict[str, Any]]): Configuração de embeddings compartilhada
+    """
+    index_config = index_config or _create_index_config()
+
+    if MEMORY_BACKEND == "postgres":
+        # Importado só aqui para que o psycopg não seja carregado sem PostgreSQL
+        from langgraph.store.postgres import AsyncPostgresStore, PoolConfig
+
         # Configuração para PostgreSQL com pgvector
         async def setup_postgres_store():
             # Configuração do pool de conexões
@@ -47,7 +94,7 @@ def create_memory_store():
             # Criação do store com pool de conexões
             store = None
             async with AsyncPostgresStore.from_conn_string(
-                POSTGRES_CONNECTION_STRING,
+                location or POSTGRES_CONNECTION_STRING,
                 pool_config=pool_config,
                 index=index_config
             ) as async_store:
@@ -60,6 +107,18 @@ def create_memory_store():
                 
         # Executa a configuração de forma síncrona
         return asyncio.run(setup_postgres_store())
+    elif MEMORY_BACKEND == "sqlite":
+        # Banco local durável, sem serviço externo
+        from src.memory.sqlite_store import SQLiteStore
+
+        return SQLiteStore(location or SQLITE_STORE_PATH, index=index_config)
+    elif MEMORY_BACKEND != "memory":
+        raise ValueError(f"MEMORY_BACKEND desconhecido: {MEMORY_BACKEND} (use memory, sqlite ou postgres)")
+    elif location or MEMORY_SNAPSHOT_DIR:
+        # InMemoryStore restaurado do último snapshot e do log de alterações
+        from src.memory.snapshot import SnapshotStore
+
+        return SnapshotStore(location or MEMORY_SNAPSHOT_DIR, index=index_config)
     else:
         # Usa o InMemoryStore padrão quando PostgreSQL não está habilitado
         return InMemoryStore(index=index_config)
@@ -75,6 +134,8 @@ def create_memory_tools(namespace: Tuple[str, ...] = MEMORY_NAMESPACE) -> List[C
     Returns:
         List[Callable]: Lista de ferramentas de memória
     """
+    from langmem import create_manage_memory_tool, create_search_memory_tool
+
     return [
         create_manage_memory_tool(
             namespace=namespace,
@@ -87,10 +148,28 @@ def create_memory_tools(namespace: Tuple[str, ...] = MEMORY_NAMESPACE) -> List[C
     ]
 
 
-def create_memory_prompt_function() -> Callable:
+def _get_configurable(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Obtém os parâmetros configuráveis do turno atual (config do grafo ou estado)."""
+    try:
+        return get_config().get("configurable", {})
+    except RuntimeError:
+        return state.get("configurable", {})
+
+
+def create_memory_prompt_function(prompt_registry=None, memory_retriever=None) -> Callable:
     """
     Cria uma função de prompt que recupera memórias relevantes.
     
+    A busca tem orçamento de latência e disjuntor (ver `MemoryRetriever`): se o
+    armazenamento estiver lento ou indisponível, o turno segue com as últimas
+    memórias conhecidas do usuário ou sem memórias.
+    
+    Args:
+        prompt_registry (Optional[PromptRegistry]): Registro de onde o prompt do
+            sistema é lido a cada turno
+        memory_retriever (Optional[MemoryRetriever]): Buscador de memórias
+            (padrão: o compartilhado pelo processo)
+    
     Returns:
         Callable: Função de prompt que adiciona memórias relevantes
     """
@@ -119,33 +198,38 @@ def create_memory_prompt_function() -> Callable:
             last_message = getattr(state["messages"][-1], "content", "")
         
         # Configuráveis para o namespace
-        configurable = state.get("configurable", {})
+        configurable = _get_configurable(state)
         user_id = configurable.get("user_id", "default_user")
         
+        # Prompt do sistema fixado no início do turno (ou a versão ativa)
+        system_prompt = ""
+        if prompt_registry is not None:
+            version = configurable.get("prompt_version")
+            prompt_version = prompt_registry.get(version) if version else None
+            system_prompt = (prompt_version or prompt_registry.active).prompt.strip()
+        
         # Resolve o namespace com o ID do usuário
         namespace = tuple(
             part.format(user_id=user_id) if isinstance(part, str) else part
             for part in MEMORY_NAMESPACE
         )
         
-        # Busca memórias relevantes
-        try:
-            items = store.search(namespace, query=last_message, limit=5)
-            if items:
-                memories = "\n\n".join(f"- {item.value}" for item in items)
-                
-                # Cria a mensagem de sistema com memórias
-                system_msg = {
-                    "role": "system", 
-                    "content": f"## Memórias Relevantes:\n\n{memories}\n\nUse estas informações quando relevante, mas não mencione explicitamente que está usando 'memórias'."
-                }
-                
-                # Adiciona a mensagem de sistema no início das mensagens
-                return [system_msg] + state["messages"]
-        except Exception:
-            # Se houver erro, apenas retorna as mensagens originais
-            pass
+        # Busca memórias relevantes dentro do orçamento de latência
+        memories_section = ""
+        retriever = memory_retriever or get_memory_retriever()
+        items, _ = retriever.retrieve(store, namespace, query=last_message, limit=5)
+        if items:
+            memories = "\n\n".join(f"- {item.value}" for item in items)
+            memories_section = f"## Memórias Relevantes:\n\n{memories}\n\nUse estas informações quando relevante, mas não mencione explicitamente que está usando 'memórias'."
+        
+        # Cria a mensagem de sistema com o prompt e as memórias
+        system_content = "\n\n".join(part for part in (system_prompt, memories_section) if part)
+        if system_content:
+            system_msg = {"role": "system", "content": system_content}
+            
+            # Adiciona a mensagem de sistema no início das mensagens
+            return [system_msg] + state["messages"]
             
         return state["messages"]
     
-    return prompt_with_memories 
\ No newline at end of file
+    return prompt_with_memories
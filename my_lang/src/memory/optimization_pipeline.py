@@ -0,0 +1,444 @@
+"""
+Pipeline offline de otimização de prompts sobre trajetórias armazenadas.
+
+Este módulo transforma a otimização manual de prompts em um job em lote: as
+trajetórias são lidas em streaming do checkpointer ou do armazenamento, divididas
+em lotes, refletidas pelo otimizador com concorrência limitada e combinadas em um
+prompt candidato, que é publicado no registro de prompts. Reflexões intermediárias
+são armazenadas em cache pelo hash do conteúdo, de modo que execuções repetidas só
+pagam pelos lotes novos.
+
+Execução agendada (por exemplo, via cron):
+
+    python -m src.memory.optimization_pipeline --shard-size 20 --concurrency 4
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from langchain_core.messages import convert_to_openai_messages
+
+from src.config import (
+    MEMORY_BACKEND,
+    OPTIMIZER_TOKEN_BUDGET,
+    TRAJECTORY_NAMESPACE,
+    OPTIMIZATION_CACHE_NAMESPACE,
+    OPTIMIZATION_SHARD_SIZE,
+    OPTIMIZATION_MAX_CONCURRENCY,
+)
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Trajetória no formato aceito pelo otimizador: (mensagens, feedback)
+Trajectory = Tuple[List[Dict[str, Any]], Dict[str, Any]]
+
+MERGE_FEEDBACK = {
+    "instrucoes": (
+        "Esta é uma proposta de prompt gerada a partir de um lote de conversas. "
+        "Incorpore suas melhorias ao prompt final, sem duplicar instruções."
+    )
+}
+
+
+def save_trajectory(
+    store: Any,
+    messages: List[Any],
+    feedback: Optional[Dict[str, Any]] = None,
+    user_id: str = "default_user",
+    thread_id: Optional[str] = None,
+) -> str:
+    """
+    Armazena uma trajetória com feedback para otimização posterior.
+
+    Args:
+        store: Armazenamento (InMemoryStore ou compatível)
+        messages (List[Any]): Mensagens da conversa
+        feedback (Optional[Dict[str, Any]]): Feedback do usuário ou sistema
+        user_id (str): ID do usuário
+        thread_id (Optional[str]): ID da conversa (usado como chave)
+
+    Returns:
+        str: Chave da trajetória no armazenamento
+    """
+    namespace = tuple(part.format(user_id=user_id) for part in TRAJECTORY_NAMESPACE)
+    key = thread_id or str(uuid.uuid4())
+    store.put(
+        namespace,
+        key,
+        {"messages": convert_to_openai_messages(messages), "feedback": feedback or {}},
+        index=False,
+    )
+    return key
+
+
+def iter_trajectories_from_checkpointer(
+    checkpointer: Any,
+    default_feedback: Optional[Dict[str, Any]] = None,
+    limit: Optional[int] = None,
+) -> Iterator[Trajectory]:
+    """
+    Lê em streaming a versão mais recente de cada conversa do checkpointer.
+
+    Args:
+        checkpointer: Checkpointer do LangGraph (InMemorySaver, PostgresSaver, ...)
+        default_feedback (Optional[Dict[str, Any]]): Feedback associado às trajetórias
+        limit (Optional[int]): Número máximo de trajetórias
+
+    Yields:
+        Trajectory: Pares (mensagens, feedback)
+    """
+    seen_threads = set()
+    count = 0
+    for checkpoint_tuple in checkpointer.list(None):
+        configurable = checkpoint_tuple.config.get("configurable", {})
+        thread_id = configurable.get("thread_id")
+        if configurable.get("checkpoint_ns") or thread_id in seen_threads:
+            continue
+        seen_threads.add(thread_id)
+
+        messages = checkpoint_tuple.checkpoint.get("channel_values", {}).get("messages", [])
+        if not messages:
+            continue
+
+        yield convert_to_openai_messages(messages), dict(default_feedback or {})
+        count += 1
+        if limit is not None and count >= limit:
+            return
+
+
+def iter_trajectories_from_store(
+    store: Any,
+    default_feedback: Optional[Dict[str, Any]] = None,
+    page_size: int = 100,
+    limit: Optional[int] = None,
+) -> Iterator[Trajectory]:
+    """
+    Lê em streaming as trajetórias gravadas com `save_trajectory`.
+
+    Args:
+        store: Armazenamento (InMemoryStore ou compatível)
+        default_feedback (Optional[Dict[str, Any]]): Feedback usado quando a trajetória não tem um
+        page_size (int): Tamanho das páginas lidas do armazenamento
+        limit (Optional[int]): Número máximo de trajetórias
+
+    Yields:
+        Trajectory: Pares (mensagens, feedback)
+    """
+    prefix = tuple(part for part in TRAJECTORY_NAMESPACE if "{" not in part)
+    count = 0
+    namespace_offset = 0
+
+    while True:
+        namespaces = store.list_namespaces(prefix=prefix, limit=page_size, offset=namespace_offset)
+        for namespace in namespaces:
+            item_offset = 0
+            while True:
+                items = store.search(namespace, limit=page_size, offset=item_offset)
+                for item in items:
+                    messages = item.value.get("messages")
+                    if not messages:
+                        continue
+                    yield messages, item.value.get("feedback") or dict(default_feedback or {})
+                    count += 1
+                    if limit is not None and count >= limit:
+                        return
+                if len(items) < page_size:
+                    break
+                item_offset += page_size
+
+        if len(namespaces) < page_size:
+            return
+        namespace_offset += page_size
+
+
+def shard_trajectories(trajectories: Iterable[Trajectory], shard_size: int) -> Iterator[List[Trajectory]]:
+    """
+    Agrupa um fluxo de trajetórias em lotes de tamanho fixo.
+
+    Args:
+        trajectories (Iterable[Trajectory]): Fluxo de trajetórias
+        shard_size (int): Número de trajetórias por lote
+
+    Yields:
+        List[Trajectory]: Lotes de trajetórias
+    """
+    iterator = iter(trajectories)
+    while True:
+        shard = list(islice(iterator, shard_size))
+        if not shard:
+            return
+        yield shard
+
+
+def _content_hash(prompt: str, trajectories: List[Trajectory]) -> str:
+    """Calcula o hash do conteúdo de uma etapa de reflexão."""
+    payload = json.dumps(
+        {"prompt": prompt, "trajectories": trajectories},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReflectionCache:
+    """
+    Cache de reflexões intermediárias indexado pelo hash do conteúdo.
+
+    Sem armazenamento, o cache vive apenas no processo; com armazenamento, as
+    reflexões são reaproveitadas entre execuções do job.
+    """
+
+    def __init__(self, store: Any = None, namespace: tuple = OPTIMIZATION_CACHE_NAMESPACE):
+        """
+        Inicializa o cache.
+
+        Args:
+            store: Armazenamento opcional para persistir as reflexões
+            namespace (tuple): Namespace das reflexões no armazenamento
+        """
+        self._store = store
+        self._namespace = namespace
+        self._local: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._local.get(key)
+        if value is None and self._store is not None:
+            item = self._store.get(self._namespace, key)
+            value = item.value.get("prompt") if item is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._local[key] = value
+        return value
+
+    def put(self, key: str, prompt: str) -> None:
+        with self._lock:
+            self._local[key] = prompt
+        if self._store is not None:
+            self._store.put(self._namespace, key, {"prompt": prompt}, index=False)
+
+
+def _extract_prompt(result: Any) -> str:
+    """Normaliza o retorno do otimizador para o texto do prompt."""
+    if isinstance(result, dict):
+        return result.get("prompt", "")
+    return str(result)
+
+
+def _reflect(optimizer: Any, prompt: str, trajectories: List[Trajectory], cache: ReflectionCache) -> str:
+    """Executa (ou recupera do cache) uma etapa de reflexão do otimizador."""
+    key = _content_hash(prompt, trajectories)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = _extract_prompt(optimizer.invoke({"prompt": prompt, "trajectories": trajectories}))
+    cache.put(key, result)
+    return result
+
+
+def _map_bounded(fn, inputs: Iterable[Any], max_concurrency: int, on_error=None) -> List[Any]:
+    """
+    Aplica `fn` aos itens de um fluxo com no máximo `max_concurrency` execuções simultâneas.
+
+    Novos itens só são lidos do fluxo quando há vaga, mantendo o uso de memória
+    proporcional à concorrência e não ao tamanho da entrada. A falha de um item não
+    interrompe os demais: `on_error(item, erro)` devolve o resultado que o substitui
+    (None descarta o item); sem `on_error`, a primeira falha é propagada.
+    """
+    results: Dict[int, Any] = {}
+
+    def collect(future, index, item) -> None:
+        try:
+            results[index] = future.result()
+        except Exception as e:
+            if on_error is None:
+                raise
+            results[index] = on_error(item, e)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        in_flight = {}
+        for index, item in enumerate(inputs):
+            if len(in_flight) >= max_concurrency:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future, *in_flight.pop(future))
+            in_flight[executor.submit(fn, item)] = (index, item)
+
+        for future in list(in_flight):
+            collect(future, *in_flight.pop(future))
+
+    return [results[index] for index in sorted(results) if results[index] is not None]
+
+
+def run_optimization_pipeline(
+    optimizer: Any,
+    current_prompt: str,
+    trajectories: Iterable[Trajectory],
+    prompt_registry: Any = None,
+    shard_size: int = OPTIMIZATION_SHARD_SIZE,
+    max_concurrency: int = OPTIMIZATION_MAX_CONCURRENCY,
+    cache: Optional[ReflectionCache] = None,
+    activate: bool = False,
+    token_budget: Optional[int] = None,
+    embeddings: Any = None,
+) -> Dict[str, Any]:
+    """
+    Executa a otimização em lote do prompt do sistema.
+
+    Cada lote de trajetórias gera uma proposta de prompt (fase de mapeamento); as
+    propostas são então combinadas pelo próprio otimizador, em grupos de até
+    `shard_size`, até restar um único candidato (fase de redução).
+
+    Args:
+        optimizer: Otimizador de prompts (ver `create_system_prompt_optimizer`)
+        current_prompt (str): Prompt atual do sistema
+        trajectories (Iterable[Trajectory]): Fluxo de pares (mensagens, feedback)
+        prompt_registry (Optional[PromptRegistry]): Registro onde o candidato é publicado
+        shard_size (int): Número de trajetórias por lote
+        max_concurrency (int): Número máximo de reflexões simultâneas
+        cache (Optional[ReflectionCache]): Cache de reflexões intermediárias
+        activate (bool): Se o candidato deve ser ativado ao ser publicado
+        token_budget (Optional[int]): Orçamento total de tokens da execução; quando
+            informado, todo o fluxo passa uma única vez por `select_trajectories`
+            (amostra limitada, sem quase-duplicatas) antes de ser dividido em lotes
+        embeddings: Modelo de embeddings usado na seleção
+
+    Returns:
+        Dict[str, Any]: Prompt candidato, versão publicada e estatísticas da execução
+    """
+    cache = cache or ReflectionCache()
+    # A seleção depende do numpy; só é carregada quando a pipeline roda
+    from src.memory.trajectory_selection import select_trajectories
+
+    start_time = time.perf_counter()
+    stats = {"trajectories": 0, "shards": 0, "failed_shards": 0, "failed_merges": 0}
+
+    def shard_failed(shard: List[Trajectory], error: Exception) -> None:
+        stats["failed_shards"] += 1
+        logger.warning(f"Reflexão de um lote de {len(shard)} trajetórias falhou: {str(error)}")
+        return None
+
+    def merge_failed(group: List[Trajectory], error: Exception) -> str:
+        # Mantém a primeira proposta do grupo para a próxima rodada de combinação
+        stats["failed_merges"] += 1
+        logger.warning(f"Combinação de {len(group)} propostas falhou: {str(error)}")
+        return group[0][0][0]["content"]
+
+    def counted(items: Iterable[Trajectory]) -> Iterator[Trajectory]:
+        for trajectory in items:
+            stats["trajectories"] += 1
+            yield trajectory
+
+    source: Iterable[Trajectory] = counted(trajectories)
+    if token_budget is not None:
+        # Uma única seleção sobre todo o fluxo: o orçamento vale para a execução, não
+        # para cada lote, e quase-duplicatas em lotes diferentes também são removidas
+        source = select_trajectories(source, embeddings=embeddings, token_budget=token_budget)
+        stats["selected"] = len(source)
+
+    def counted_shards() -> Iterator[List[Trajectory]]:
+        for shard in shard_trajectories(source, shard_size):
+            stats["shards"] += 1
+            yield shard
+
+    logger.info(f"Iniciando otimização em lote (lotes de {shard_size}, concorrência {max_concurrency})")
+    candidates = _map_bounded(
+        lambda shard: _reflect(optimizer, current_prompt, shard, cache),
+        counted_shards(),
+        max_concurrency,
+        on_error=shard_failed,
+    )
+
+    if not candidates:
+        logger.info("Nenhuma trajetória encontrada; otimização ignorada")
+        return {"prompt": current_prompt, "version": None, **stats}
+
+    # Combina as propostas até restar um único candidato
+    while len(candidates) > 1:
+        groups = [
+            [([{"role": "user", "content": candidate}], MERGE_FEEDBACK) for candidate in group]
+            for group in shard_trajectories(candidates, max(shard_size, 2))
+        ]
+        candidates = _map_bounded(
+            lambda group: _reflect(optimizer, current_prompt, group, cache),
+            groups,
+            max_concurrency,
+            on_error=merge_failed,
+        )
+
+    candidate = candidates[0]
+    stats.update(
+        cache_hits=cache.hits,
+        cache_misses=cache.misses,
+        duration_seconds=time.perf_counter() - start_time,
+    )
+    logger.info(
+        f"Otimização em lote concluída: {stats['trajectories']} trajetórias, {stats['shards']} lotes, "
+        f"{cache.hits} reflexões reaproveitadas do cache"
+    )
+
+    version = None
+    if prompt_registry is not None and candidate.strip() and candidate != current_prompt:
+        version = prompt_registry.publish(
+            candidate,
+            activate=activate,
+            source="optimizer",
+            metadata=dict(stats),
+        ).version
+
+    return {"prompt": candidate, "version": version, **stats}
+
+
+def main():
+    """Ponto de entrada do job agendado de otimização de prompts."""
+    parser = argparse.ArgumentParser(description="Otimização em lote do prompt do sistema")
+    parser.add_argument("--shard-size", type=int, default=OPTIMIZATION_SHARD_SIZE)
+    parser.add_argument("--concurrency", type=int, default=OPTIMIZATION_MAX_CONCURRENCY)
+    parser.add_argument("--limit", type=int, default=None, help="Número máximo de trajetórias")
+    parser.add_argument("--activate", action="store_true", help="Ativa o prompt candidato")
+    args = parser.parse_args()
+
+    if MEMORY_BACKEND == "memory":
+        # O armazenamento em memória é do processo: as trajetórias do servidor não estão aqui
+        parser.error("o job precisa de um armazenamento compartilhado (MEMORY_BACKEND=postgres ou sqlite)")
+
+    from src.agent.prompt_registry import PromptRegistry
+    from src.memory.manager import create_memory_store
+    from src.memory.optimizer import create_system_prompt_optimizer
+
+    store = create_memory_store()
+    registry = PromptRegistry(store=store)
+    result = run_optimization_pipeline(
+        create_system_prompt_optimizer(),
+        registry.active.prompt,
+        iter_trajectories_from_store(store, limit=args.limit),
+        prompt_registry=registry,
+        shard_size=args.shard_size,
+        max_concurrency=args.concurrency,
+        cache=ReflectionCache(store),
+        activate=args.activate,
+        token_budget=OPTIMIZER_TOKEN_BUDGET,
+    )
+    print(json.dumps({key: value for key, value in result.items() if key != "prompt"}, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -10,12 +10,15 @@ from typing import Dict, List, Any, Optional
 from langmem import create_prompt_optimizer, create_multi_prompt_optimizer
 from langgraph.store.memory import InMemoryStore
 
-from src.config import MODEL_NAME
+from src.models import create_chat_model
+from src.config import MODEL_NAME, OPTIMIZER_TOKEN_BUDGET
+from src.memory.trajectory_selection import select_trajectories
 
 
 def create_system_prompt_optimizer(
     model_name: str = MODEL_NAME,
     max_reflection_steps: int = 3,
+    model: Any = None,
 ):
     """
     Cria um otimizador de prompts do sistema.
@@ -26,12 +29,13 @@ def create_system_prompt_optimizer(
     Args:
         model_name (str): Nome do modelo de linguagem
         max_reflection_steps (int): Número máximo de etapas de reflexão
+        model: Modelo de chat já construído (padrão: um modelo próprio com prioridade de lote)
         
     Returns:
         callable: Função para otimizar prompts do sistema
     """
     optimizer = create_prompt_optimizer(
-        model_name,
+        model if model is not None else create_chat_model(model_name, priority="batch"),
         kind="metaprompt",
         config={"max_reflection_steps": max_reflection_steps}
     )
@@ -44,21 +48,35 @@ def optimize_system_prompt(
     current_prompt: str,
     trajectories: List[Dict[str, Any]],
     feedback: Dict[str, Any],
+    token_budget: Optional[int] = OPTIMIZER_TOKEN_BUDGET,
+    embeddings: Any = None,
 ) -> str:
     """
     Otimiza um prompt do sistema com base em interações e feedback.
     
+    Antes da chamada ao otimizador, as trajetórias passam por uma etapa de seleção
+    que remove quase-duplicatas e limita o total de tokens (ver `select_trajectories`).
+    
     Args:
         optimizer: Otimizador de prompts
         current_prompt (str): Prompt atual do sistema
         trajectories (List[Dict[str, Any]]): Histórico de interações
         feedback (Dict[str, Any]): Feedback do usuário ou sistema
+        token_budget (Optional[int]): Total máximo de tokens das trajetórias enviadas
+            ao otimizador (None desativa a seleção)
+        embeddings: Modelo de embeddings usado na seleção
         
     Returns:
         str: Prompt otimizado
     """
     # Formata as trajetórias com feedback
     formatted_trajectories = [(trajectory, feedback) for trajectory in trajectories]
+    if token_budget is not None:
+        formatted_trajectories = select_trajectories(
+            formatted_trajectories,
+            embeddings=embeddings,
+            token_budget=token_budget,
+        )
     
     # Invoca o otimizador
     optimized_prompt = optimizer.invoke({
@@ -72,6 +90,7 @@ def optimize_system_prompt(
 def create_multi_system_prompt_optimizer(
     model_name: str = MODEL_NAME,
     max_reflection_steps: int = 3,
+    model: Any = None,
 ):
     """
     Cria um otimizador para múltiplos prompts do sistema.
@@ -82,12 +101,13 @@ def create_multi_system_prompt_optimizer(
     Args:
         model_name (str): Nome do modelo de linguagem
         max_reflection_steps (int): Número máximo de etapas de reflexão
+        model: Modelo de chat já construído (padrão: um modelo próprio com prioridade de lote)
         
     Returns:
         callable: Função para otimizar múltiplos prompts do sistema
     """
     multi_optimizer = create_multi_prompt_optimizer(
-        model_name,
+        model if model is not None else create_chat_model(model_name, priority="batch"),
         kind="metaprompt",
         config={"max_reflection_steps": max_reflection_steps}
     )
@@ -100,6 +120,8 @@ def optimize_multiple_prompts(
     prompts: Dict[str, str],
     trajectories: List[Dict[str, Any]],
     feedback: Dict[str, Any],
+    token_budget: Optional[int] = OPTIMIZER_TOKEN_BUDGET,
+    embeddings: Any = None,
 ) -> Dict[str, str]:
     """
     Otimiza múltiplos prompts do sistema com base em interações e feedback.
@@ -109,12 +131,21 @@ def optimize_multiple_prompts(
         prompts (Dict[str, str]): Dicionário de prompts atuais
         trajectories (List[Dict[str, Any]]): Histórico de interações
         feedback (Dict[str, Any]): Feedback do usuário ou sistema
+        token_budget (Optional[int]): Total máximo de tokens das trajetórias enviadas
+            ao otimizador (None desativa a seleção)
+        embeddings: Modelo de embeddings usado na seleção
         
     Returns:
         Dict[str, str]: Dicionário de prompts otimizados
     """
     # Formata as trajetórias com feedback
     formatted_trajectories = [(trajectory, feedback) for trajectory in trajectories]
+    if token_budget is not None:
+        formatted_trajectories = select_trajectories(
+            formatted_trajectories,
+            embeddings=embeddings,
+            token_budget=token_budget,
+        )
     
     # Invoca o otimizador de múltiplos prompts
     optimized_prompts = multi_optimizer.invoke({
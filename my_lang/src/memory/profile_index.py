@@ -0,0 +1,264 @@
+"""
+Índices secundários sobre perfis de usuário.
+
+Este módulo mantém índices invertidos (valor -> conjunto de usuários) sobre campos
+selecionados do `UserProfile`, permitindo segmentar usuários por idioma, interesses
+ou nível de expertise sem percorrer todos os perfis do armazenamento.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+from src.config import PROFILE_NAMESPACE, PROFILE_INDEXED_FIELDS
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+def _normalize(value: Any) -> str:
+    """Normaliza um valor para comparação (sem espaços extras e sem diferenciar caixa)."""
+    return str(value).strip().casefold()
+
+
+class ProfileIndex:
+    """
+    Índice invertido sobre campos de perfis de usuário.
+
+    Cada campo indexado mantém um mapeamento `valor normalizado -> {user_id}`. Campos
+    com listas (como `interests`) indexam cada elemento separadamente. As consultas
+    combinam campos com AND e valores de um mesmo campo com OR, intersectando sempre
+    a partir do menor conjunto.
+    """
+
+    def __init__(self, fields: Iterable[str] = PROFILE_INDEXED_FIELDS, store: Any = None):
+        """
+        Inicializa o índice.
+
+        Args:
+            fields (Iterable[str]): Campos do perfil a serem indexados
+            store: Armazenamento onde os perfis indexados são persistidos
+                (usado por `update_user_profile` para gravar antes de indexar)
+        """
+        self.fields = tuple(fields)
+        self.store = store
+        self._postings: Dict[str, Dict[str, Set[str]]] = {field: {} for field in self.fields}
+        self._entries: Dict[str, Dict[str, Set[str]]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._entries
+
+    def _extract_values(self, profile: Any, field: str) -> Set[str]:
+        """Extrai os valores normalizados de um campo do perfil."""
+        if isinstance(profile, dict):
+            raw = profile.get(field)
+        else:
+            raw = getattr(profile, field, None)
+
+        if raw is None:
+            return set()
+        if isinstance(raw, (list, tuple, set)):
+            return {_normalize(value) for value in raw if value is not None and str(value).strip()}
+        if isinstance(raw, dict):
+            return {_normalize(value) for value in raw.keys()}
+        return {_normalize(raw)} if str(raw).strip() else set()
+
+    def update(self, user_id: str, profile: Any) -> None:
+        """
+        Atualiza as entradas de um usuário no índice.
+
+        Apenas as diferenças em relação à versão anterior do perfil são aplicadas,
+        de modo que o custo é proporcional ao número de valores alterados.
+
+        Args:
+            user_id (str): ID do usuário
+            profile (Any): Perfil do usuário (UserProfile ou dicionário)
+        """
+        if profile is None:
+            self.remove(user_id)
+            return
+
+        new_entry = {field: self._extract_values(profile, field) for field in self.fields}
+
+        with self._lock:
+            old_entry = self._entries.get(user_id, {})
+            for field in self.fields:
+                old_values = old_entry.get(field, set())
+                new_values = new_entry[field]
+                postings = self._postings[field]
+
+                for value in old_values - new_values:
+                    users = postings.get(value)
+                    if users is not None:
+                        users.discard(user_id)
+                        if not users:
+                            del postings[value]
+
+                for value in new_values - old_values:
+                    postings.setdefault(value, set()).add(user_id)
+
+            self._entries[user_id] = new_entry
+
+    def remove(self, user_id: str) -> None:
+        """
+        Remove um usuário do índice.
+
+        Args:
+            user_id (str): ID do usuário
+        """
+        with self._lock:
+            old_entry = self._entries.pop(user_id, None)
+            if not old_entry:
+                return
+            for field, values in old_entry.items():
+                postings = self._postings[field]
+                for value in values:
+                    users = postings.get(value)
+                    if users is not None:
+                        users.discard(user_id)
+                        if not users:
+                            del postings[value]
+
+    def query(self, **criteria: Union[str, List[str], None]) -> Set[str]:
+        """
+        Consulta os usuários que satisfazem todos os critérios.
+
+        Exemplo:
+            index.query(interests="tecnologia", language="pt-BR")
+
+        Args:
+            **criteria: Campo indexado -> valor ou lista de valores aceitos
+
+        Returns:
+            Set[str]: IDs dos usuários encontrados
+        """
+        candidate_sets = []
+        with self._lock:
+            for field, expected in criteria.items():
+                if expected is None:
+                    continue
+                if field not in self._postings:
+                    raise ValueError(f"Campo não indexado: {field}")
+
+                values = [expected] if isinstance(expected, str) else list(expected)
+                postings = self._postings[field]
+                matches = [postings.get(_normalize(value), set()) for value in values]
+                if len(matches) == 1:
+                    candidate_sets.append(matches[0])
+                else:
+                    candidate_sets.append(set().union(*matches))
+
+            if not candidate_sets:
+                return set(self._entries)
+
+            # Intersecta a partir do menor conjunto para minimizar o trabalho
+            candidate_sets.sort(key=len)
+            result = set(candidate_sets[0])
+            for users in candidate_sets[1:]:
+                if not result:
+                    break
+                result &= users
+            return result
+
+    def count(self, **criteria: Union[str, List[str], None]) -> int:
+        """
+        Conta os usuários que satisfazem os critérios.
+
+        Args:
+            **criteria: Campo indexado -> valor ou lista de valores aceitos
+
+        Returns:
+            int: Número de usuários encontrados
+        """
+        return len(self.query(**criteria))
+
+    def facets(self, field: str) -> Dict[str, int]:
+        """
+        Retorna a distribuição de usuários por valor de um campo indexado.
+
+        Args:
+            field (str): Campo indexado
+
+        Returns:
+            Dict[str, int]: Valor normalizado -> número de usuários
+        """
+        if field not in self._postings:
+            raise ValueError(f"Campo não indexado: {field}")
+        with self._lock:
+            return {value: len(users) for value, users in self._postings[field].items()}
+
+    def rebuild(self, store: Any, page_size: int = 1000) -> int:
+        """
+        Reconstrói o índice a partir dos perfis persistidos no armazenamento.
+
+        Args:
+            store: Armazenamento (InMemoryStore ou compatível)
+            page_size (int): Tamanho da página usada na listagem dos namespaces
+
+        Returns:
+            int: Número de perfis indexados
+        """
+        prefix = tuple(part for part in PROFILE_NAMESPACE if "{" not in part)
+        indexed = 0
+        offset = 0
+
+        while True:
+            namespaces = store.list_namespaces(prefix=prefix, limit=page_size, offset=offset)
+            if not namespaces:
+                break
+
+            for namespace in namespaces:
+                if len(namespace) <= len(prefix):
+                    continue
+                user_id = namespace[len(prefix)]
+                profile = _latest_profile(store.search(namespace, limit=page_size))
+                if profile is not None:
+                    self.update(user_id, profile)
+                    indexed += 1
+
+            if len(namespaces) < page_size:
+                break
+            offset += page_size
+
+        logger.info(f"Índice de perfis reconstruído com {indexed} perfis")
+        return indexed
+
+
+def _latest_profile(items: List[Any]) -> Optional[Dict[str, Any]]:
+    """Retorna o conteúdo do perfil mais recente entre os itens de um namespace."""
+    latest = None
+    for item in items:
+        value = item.value or {}
+        content = value.get("content", value)
+        if not isinstance(content, dict):
+            continue
+        if latest is None or item.updated_at > latest[0]:
+            latest = (item.updated_at, content)
+    return latest[1] if latest else None
+
+
+def create_profile_index(
+    store: Any = None,
+    fields: Iterable[str] = PROFILE_INDEXED_FIELDS,
+) -> ProfileIndex:
+    """
+    Cria um índice de perfis e, se houver armazenamento, carrega os perfis existentes.
+
+    Args:
+        store: Armazenamento com os perfis persistidos
+        fields (Iterable[str]): Campos do perfil a serem indexados
+
+    Returns:
+        ProfileIndex: Índice de perfis
+    """
+    profile_index = ProfileIndex(fields=fields, store=store)
+    if store is not None:
+        try:
+            profile_index.rebuild(store)
+        except Exception as e:
+            logger.error(f"Erro ao reconstruir índice de perfis: {str(e)}")
+    return profile_index
@@ -5,13 +5,18 @@ Este módulo implementa funcionalidades para criar, atualizar e recuperar perfis
 que são representações estruturadas de informações sobre os usuários.
 """
 
+import logging
 from typing import Dict, Any, Optional, List
 from pydantic import BaseModel
 
 from langmem import create_memory_manager, create_memory_store_manager
 from langgraph.store.memory import InMemoryStore
 
-from src.config import MODEL_NAME, MEMORY_NAMESPACE
+from src.models import create_chat_model
+from src.config import MODEL_NAME, MEMORY_NAMESPACE, PROFILE_NAMESPACE
+
+# Configurar logger
+logger = logging.getLogger(__name__)
 
 
 class UserProfile(BaseModel):
@@ -35,6 +40,8 @@ class UserProfile(BaseModel):
 def create_profile_manager(
     model_name: str = MODEL_NAME,
     namespace: tuple = MEMORY_NAMESPACE,
+    model: Any = None,
+    priority: str = "interactive",
 ):
     """
     Cria um gerenciador de perfis de usuário.
@@ -42,9 +49,15 @@ def create_profile_manager(
     O gerenciador de perfis é responsável por extrair e atualizar informações
     de perfil a partir das conversas.
     
+    A atualização roda dentro do turno (`update_user_profile`), por isso o modelo
+    padrão usa a classe interativa do limitador de taxa: com a classe de segundo
+    plano, cada turno esperaria atrás do backlog da reflexão.
+    
     Args:
         model_name (str): Nome do modelo de linguagem
         namespace (tuple): Namespace para armazenamento dos perfis
+        model: Modelo de chat já construído (padrão: um modelo próprio na classe `priority`)
+        priority (str): Classe de prioridade do modelo padrão no limitador de taxa
         
     Returns:
         callable: Gerenciador de perfis de usuário
@@ -66,7 +79,7 @@ def create_profile_manager(
     
     # Criamos o gerenciador de perfis
     profile_manager = create_memory_manager(
-        model_name,
+        model if model is not None else create_chat_model(model_name, priority=priority),
         schemas=[UserProfile],
         instructions=profile_instructions,
         enable_inserts=False,  # Apenas atualiza o perfil existente, não cria novos
@@ -78,6 +91,7 @@ def create_profile_manager(
 def create_profile_store_manager(
     store: Optional[InMemoryStore] = None,
     model_name: str = MODEL_NAME,
+    model: Any = None,
 ):
     """
     Cria um gerenciador de perfis com armazenamento.
@@ -88,12 +102,13 @@ def create_profile_store_manager(
     Args:
         store (Optional[InMemoryStore]): Armazenamento para perfis
         model_name (str): Nome do modelo de linguagem
+        model: Modelo de chat já construído (padrão: um modelo próprio com prioridade de segundo plano)
         
     Returns:
         callable: Gerenciador de perfis com armazenamento
     """
     # Namespace específico para perfis
-    profile_namespace = ("user_profiles", "{user_id}")
+    profile_namespace = PROFILE_NAMESPACE
     
     # Instruções específicas para extração de perfil
     profile_instructions = """
@@ -112,7 +127,7 @@ def create_profile_store_manager(
     
     # Criamos o gerenciador de perfis com armazenamento
     profile_store_manager = create_memory_store_manager(
-        model_name,
+        model if model is not None else create_chat_model(model_name, priority="background"),
         schemas=[UserProfile],
         instructions=profile_instructions,
         enable_inserts=False,  # Apenas atualiza o perfil existente, não cria novos
@@ -165,28 +180,77 @@ def get_user_profile(
                 if profile_data:
                     return UserProfile(**profile_data)
         except Exception as e:
-            print(f"Erro ao recuperar perfil do usuário: {e}")
+            logger.warning(f"Erro ao recuperar perfil do usuário: {e}")
     
     # Se não encontrou ou houve erro, retorna None
     return None
 
 
+def save_user_profile(
+    store: Any,
+    profile: UserProfile,
+    user_id: str = "default_user",
+    profile_index=None,
+) -> None:
+    """
+    Persiste o perfil do usuário no armazenamento e atualiza o índice de perfis.
+    
+    O perfil é gravado no mesmo formato usado pelo `create_profile_store_manager`
+    (`{"kind": "UserProfile", "content": {...}}`) no namespace de perfis do usuário.
+    
+    Args:
+        store: Armazenamento (InMemoryStore ou compatível)
+        profile (UserProfile): Perfil do usuário
+        user_id (str): ID do usuário
+        profile_index (Optional[ProfileIndex]): Índice de perfis a ser atualizado
+    """
+    if isinstance(profile, BaseModel):
+        content = profile.model_dump()
+    else:
+        content = dict(profile)
+    
+    if store is not None:
+        namespace = tuple(part.format(user_id=user_id) for part in PROFILE_NAMESPACE)
+        store.put(
+            namespace,
+            "profile",
+            {"kind": UserProfile.__name__, "content": content},
+            index=False,  # Perfis são consultados pelo índice, não por similaridade
+        )
+    
+    if profile_index is not None:
+        profile_index.update(user_id, content)
+
+
 def update_user_profile(
     profile_manager,
     messages: List[Dict[str, Any]],
     user_id: str = "default_user",
+    profile_index=None,
+    store: Any = None,
 ) -> Optional[UserProfile]:
     """
     Atualiza o perfil de um usuário com base em novas mensagens.
     
+    Com um armazenamento, o perfil atual é passado ao gerenciador e o resultado é
+    gravado com `save_user_profile`, que também atualiza o índice: o índice nunca
+    contém um perfil que não foi persistido, e `rebuild` o reencontra após um
+    reinício.
+    
     Args:
         profile_manager: Gerenciador de perfis
         messages (List[Dict[str, Any]]): Mensagens da conversa
         user_id (str): ID do usuário
+        profile_index (Optional[ProfileIndex]): Índice de perfis a ser atualizado
+        store: Armazenamento dos perfis (padrão: o armazenamento do índice, se houver)
         
     Returns:
         Optional[UserProfile]: Perfil atualizado do usuário
     """
+    if store is None:
+        store = getattr(profile_index, "store", None)
+    namespace = tuple(part.format(user_id=user_id) for part in PROFILE_NAMESPACE)
+    
     # Formata as mensagens para o gerenciador de perfis
     to_process = {
         "messages": messages,
@@ -194,11 +258,22 @@ def update_user_profile(
             "user_id": user_id,
         }
     }
+    if store is not None:
+        item = store.get(namespace, "profile")
+        if item is not None:
+            to_process["existing"] = [("profile", UserProfile.__name__, item.value["content"])]
     
     # Invoca o gerenciador de perfis
     result = profile_manager.invoke(to_process)
     
     if result and len(result) > 0:
-        return result[0].content
+        profile = result[0].content
+        if profile is None:
+            return None
+        if store is not None:
+            save_user_profile(store, profile, user_id, profile_index=profile_index)
+        elif profile_index is not None:
+            profile_index.update(user_id, profile)
+        return profile
     
     return None 
\ No newline at end of file
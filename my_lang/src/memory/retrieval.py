@@ -0,0 +1,236 @@
+"""
+Busca de memórias com orçamento de latência e degradação controlada.
+
+A busca de memórias relevantes acontece no caminho crítico de todo turno. Quando
+o PostgreSQL ou o endpoint de embeddings ficam lentos, o `MemoryRetriever`
+impede que o turno inteiro fique lento junto:
+
+- a busca roda em um pool de threads próprio e é abandonada ao estourar o
+  orçamento (`MEMORY_SEARCH_BUDGET_MS`, limitado pelo prazo do turno); com o
+  prazo do turno já esgotado, nem é iniciada;
+- buscas abandonadas continuam ocupando o pool até terminarem; enquanto todos os
+  workers estiverem ocupados, novas buscas não são enfileiradas atrás delas;
+- tempos esgotados e erros alimentam um disjuntor; com ele aberto, o armazenamento
+  nem é consultado;
+- nesses casos o turno segue com as últimas memórias obtidas para o usuário
+  (`MemoryCache`, também preenchido pelo aquecimento) ou sem memórias.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from src.circuit_breaker import CircuitBreaker
+from src.config import (
+    MEMORY_SEARCH_BUDGET_MS,
+    MEMORY_SEARCH_WORKERS,
+    MEMORY_BREAKER_FAILURE_THRESHOLD,
+    MEMORY_BREAKER_RESET_SECONDS,
+    MEMORY_CACHE_MAX_USERS,
+)
+from src.deadlines import remaining
+from src.instrumentation import MEMORY_SEARCH_SECONDS, record_breaker_transition, store_backend
+from src.timings import record_timing
+from src.metrics import percentile
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+class MemoryCache:
+    """Últimas memórias recuperadas por namespace, com descarte LRU."""
+
+    def __init__(self, max_entries: int = MEMORY_CACHE_MAX_USERS):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, ...], List[Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, namespace: Tuple[str, ...]) -> Optional[List[Any]]:
+        with self._lock:
+            items = self._entries.get(namespace)
+            if items is not None:
+                self._entries.move_to_end(namespace)
+            return items
+
+    def put(self, namespace: Tuple[str, ...], items: List[Any]) -> None:
+        with self._lock:
+            self._entries[namespace] = list(items)
+            self._entries.move_to_end(namespace)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, namespace: Tuple[str, ...]) -> None:
+        """Descarta as memórias guardadas para o namespace (por exemplo, após removê-las)."""
+        with self._lock:
+            self._entries.pop(namespace, None)
+
+
+class MemoryRetriever:
+    """Busca de memórias com orçamento de latência, disjuntor e cache de reserva."""
+
+    def __init__(
+        self,
+        budget_seconds: float = MEMORY_SEARCH_BUDGET_MS / 1000,
+        max_workers: int = MEMORY_SEARCH_WORKERS,
+        breaker: Optional[CircuitBreaker] = None,
+        cache: Optional[MemoryCache] = None,
+    ):
+        """
+        Args:
+            budget_seconds (float): Tempo máximo de espera pela busca
+            max_workers (int): Buscas simultâneas no armazenamento
+            breaker (Optional[CircuitBreaker]): Disjuntor da busca
+            cache (Optional[MemoryCache]): Cache de reserva
+        """
+        self.budget_seconds = budget_seconds
+        self.breaker = breaker or CircuitBreaker(
+            "memory_search",
+            failure_threshold=MEMORY_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=MEMORY_BREAKER_RESET_SECONDS,
+            on_state_change=record_breaker_transition,
+        )
+        self.cache = cache or MemoryCache()
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="memory-search")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._latencies: Deque[float] = deque(maxlen=1000)
+        self._counts: Dict[str, int] = {
+            "store": 0, "cache": 0, "none": 0, "timeouts": 0, "errors": 0, "rejected": 0,
+            "skipped": 0, "saturated": 0,
+        }
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
+
+    def _search_done(self, future: Any) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _skip(self, store: Any, namespace: Tuple[str, ...], reason: str) -> Tuple[List[Any], str]:
+        self._count(reason)
+        items, source = self._fallback(namespace)
+        MEMORY_SEARCH_SECONDS.labels(backend=store_backend(store), source=source).observe(0.0)
+        record_timing("memory", 0.0)
+        return items, source
+
+    def _fallback(self, namespace: Tuple[str, ...]) -> Tuple[List[Any], str]:
+        items = self.cache.get(namespace)
+        source = "cache" if items is not None else "none"
+        self._count(source)
+        return items or [], source
+
+    def retrieve(self, store: Any, namespace: Tuple[str, ...], query: str, limit: int = 5) -> Tuple[List[Any], str]:
+        """
+        Busca as memórias relevantes dentro do orçamento.
+
+        Args:
+            store: Armazenamento das memórias
+            namespace (Tuple[str, ...]): Namespace do usuário
+            query (str): Texto da busca
+            limit (int): Número máximo de memórias
+
+        Returns:
+            Tuple[List[Any], str]: Itens encontrados e a origem (`store`, `cache` ou `none`)
+        """
+        budget = self.budget_seconds
+        left = remaining()
+        if left is not None:
+            if left <= 0:
+                # O turno já não pode esperar; não é uma falha do armazenamento
+                return self._skip(store, namespace, "skipped")
+            budget = min(budget, left)
+
+        # A vaga no pool é reservada antes de consultar o disjuntor: uma busca recusada
+        # por saturação não pode consumir a chamada de teste do disjuntor meio aberto
+        with self._lock:
+            saturated = self._in_flight >= self.max_workers
+            if not saturated:
+                self._in_flight += 1
+        if saturated:
+            # O pool está ocupado por buscas abandonadas; a nova ficaria na fila
+            return self._skip(store, namespace, "saturated")
+
+        if not self.breaker.allow():
+            with self._lock:
+                self._in_flight -= 1
+            return self._skip(store, namespace, "rejected")
+
+        backend = store_backend(store)
+        start_time = time.perf_counter()
+        # O contexto do turno (prazo, span ativo) acompanha a busca no pool
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, store.search, namespace, query=query, limit=limit)
+        future.add_done_callback(self._search_done)
+        try:
+            items = future.result(timeout=budget)
+        except FutureTimeoutError:
+            # A busca continua no pool, mas o turno não espera por ela
+            future.cancel()
+            self.breaker.record_failure()
+            self._count("timeouts")
+            logger.warning(f"Busca de memórias excedeu {budget * 1000:.0f} ms em {namespace}")
+            items, source = self._fallback(namespace)
+        except Exception as e:
+            self.breaker.record_failure()
+            self._count("errors")
+            logger.error(f"Erro na busca de memórias em {namespace}: {str(e)}")
+            items, source = self._fallback(namespace)
+        else:
+            with self._lock:
+                self._latencies.append(time.perf_counter() - start_time)
+            self.breaker.record_success()
+            self.cache.put(namespace, items)
+            self._count("store")
+            source = "store"
+
+        # Tempo percebido pelo turno, incluindo esperas abandonadas
+        elapsed = time.perf_counter() - start_time
+        MEMORY_SEARCH_SECONDS.labels(backend=backend, source=source).observe(elapsed)
+        record_timing("memory", elapsed)
+        return items, source
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna as métricas da busca de memórias.
+
+        Returns:
+            Dict[str, Any]: Origem das respostas, falhas, latência e estado do disjuntor
+        """
+        with self._lock:
+            latencies = list(self._latencies)
+            counts = dict(self._counts)
+        return {
+            **counts,
+            "latency_p50": percentile(latencies, 50),
+            "latency_p95": percentile(latencies, 95),
+            "in_flight": self._in_flight,
+            "cached_namespaces": len(self.cache),
+            "breaker": self.breaker.stats(),
+        }
+
+
+_lock = threading.Lock()
+_retriever: Optional[MemoryRetriever] = None
+
+
+def get_memory_retriever() -> MemoryRetriever:
+    """
+    Retorna o buscador de memórias do processo, criando-o no primeiro uso.
+
+    Returns:
+        MemoryRetriever: Buscador compartilhado
+    """
+    global _retriever
+    with _lock:
+        if _retriever is None:
+            _retriever = MemoryRetriever()
+        return _retriever
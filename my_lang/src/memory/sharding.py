@@ -0,0 +1,441 @@
+"""
+Armazenamento particionado por namespace entre vários backends.
+
+O `ShardedStore` distribui os namespaces entre N armazenamentos (por exemplo,
+vários primários PostgreSQL) com hashing consistente:
+
+- a chave de roteamento são os primeiros `routing_depth` componentes do namespace
+  (por padrão 2, o `MEMORY_NAMESPACE` resolvido com o `user_id`), de modo que
+  todas as memórias de um usuário, inclusive em sub-namespaces, ficam no mesmo
+  shard e a busca dele consulta um único backend;
+- operações sem chave completa (buscas em todos os usuários, `list_namespaces`,
+  exportações) são enviadas a todos os shards em paralelo e os resultados são
+  combinados;
+- `add_shard` adiciona um backend sem parar o serviço: apenas as chaves que mudam
+  de dono (cerca de 1/N delas) são migradas, em segundo plano. Até a migração de
+  uma chave, as leituras vão ao dono anterior; a primeira escrita em uma chave
+  pendente migra essa chave antes de gravar, então nada se perde nem reaparece.
+  Entre backends que guardam os vetores junto com os itens (InMemoryStore,
+  SnapshotStore, SQLiteStore), os itens são copiados com os vetores e as datas
+  originais; nos demais, são regravados (e embutidos de novo).
+"""
+
+import asyncio
+import bisect
+import hashlib
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from langgraph.store.base import BaseStore, GetOp, ListNamespacesOp, PutOp, SearchOp
+
+from src.config import PROFILE_NAMESPACE, SHARD_ROUTING_DEPTH, SHARD_VIRTUAL_NODES, SHARD_WORKERS
+from src.instrumentation import unwrap_store
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Itens copiados por lote na migração
+_MIGRATION_PAGE = 500
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Anel de hashing consistente com nós virtuais."""
+
+    def __init__(self, nodes: Sequence[str], virtual_nodes: int = SHARD_VIRTUAL_NODES):
+        """
+        Args:
+            nodes (Sequence[str]): Nomes dos shards
+            virtual_nodes (int): Pontos no anel por shard (mais pontos, distribuição mais uniforme)
+        """
+        if not nodes:
+            raise ValueError("O anel precisa de pelo menos um shard")
+        self.nodes = list(nodes)
+        self.virtual_nodes = virtual_nodes
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(virtual_nodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, key: str) -> str:
+        """Shard responsável pela chave: o primeiro ponto do anel depois do hash dela."""
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+    def with_node(self, node: str) -> "HashRing":
+        """Novo anel com um shard a mais."""
+        return HashRing(self.nodes + [node], self.virtual_nodes)
+
+
+def parse_shards(spec: str) -> Dict[str, str]:
+    """
+    Lê a lista de shards de MEMORY_SHARDS.
+
+    Args:
+        spec (str): Entradas separadas por vírgula, `nome=local` ou só `local`
+            (nomeado `shard<posição>`). Os nomes definem a posição no anel: mudar o
+            local de um shard sem mudar o nome não move nenhuma chave.
+
+    Returns:
+        Dict[str, str]: Local de cada shard, por nome
+    """
+    shards: Dict[str, str] = {}
+    for position, entry in enumerate(part.strip() for part in spec.split(",")):
+        if not entry:
+            continue
+        match = re.match(r"^([\w-]+)=(.+)$", entry)
+        name, location = match.groups() if match else (f"shard{position}", entry)
+        if name in shards:
+            raise ValueError(f"Shard repetido em MEMORY_SHARDS: {name}")
+        shards[name] = location
+    return shards
+
+
+def _item_vectors(store: Any, items: List[Any]) -> Optional[Dict[Tuple[Tuple[str, ...], str], Dict[str, Any]]]:
+    """Vetores gravados de cada item, por campo, ou None se o backend não os expõe."""
+    from langgraph.store.memory import InMemoryStore
+
+    from src.memory.sqlite_store import SQLiteStore
+
+    store = unwrap_store(store)
+    if isinstance(store, SQLiteStore):
+        return store.item_vectors(items)
+    if isinstance(store, InMemoryStore):
+        return {
+            (item.namespace, item.key): fields
+            for item in items
+            if (fields := store._vectors.get(item.namespace, {}).get(item.key))
+        }
+    return None
+
+
+def _put_items(store: Any, items: List[Any], vectors: Dict[Tuple[Tuple[str, ...], str], Dict[str, Any]]) -> bool:
+    """Grava itens com as datas e os vetores originais; False se o backend não permite."""
+    from langgraph.store.base import Item
+    from langgraph.store.memory import InMemoryStore
+
+    store = unwrap_store(store)
+    put_items = getattr(store, "put_items", None)
+    if callable(put_items):
+        put_items(items, vectors)
+        return True
+    if type(store) is not InMemoryStore:
+        return False
+    # `_data` e `_vectors` são a API interna do InMemoryStore (ver src/memory/transfer.py)
+    for item in items:
+        store._data[item.namespace][item.key] = Item(
+            value=item.value,
+            key=item.key,
+            namespace=item.namespace,
+            created_at=item.created_at,
+            updated_at=item.updated_at,
+        )
+        fields = vectors.get((item.namespace, item.key))
+        if fields:
+            store._vectors[item.namespace][item.key] = {field: list(map(float, vector)) for field, vector in fields.items()}
+        else:
+            store._vectors.get(item.namespace, {}).pop(item.key, None)
+    return True
+
+
+def _copy_items(source: Any, target: Any, items: List[Any]) -> None:
+    """Copia itens entre shards, preservando vetores e datas quando os dois backends permitem."""
+    vectors = _item_vectors(source, items)
+    if vectors is not None and _put_items(target, items, vectors):
+        return
+    target.batch([
+        PutOp(item.namespace, item.key, item.value,
+              index=False if item.namespace[0] == PROFILE_NAMESPACE[0] else None)
+        for item in items
+    ])
+
+
+def _search_sort_key(item: Any) -> Tuple[int, float, float]:
+    # Pontuados primeiro (maior pontuação), depois os mais recentes
+    score = getattr(item, "score", None)
+    return (0 if score is not None else 1, -(score or 0.0), -item.updated_at.timestamp())
+
+
+class ShardedStore(BaseStore):
+    """Armazenamento que roteia cada namespace a um de vários backends por hashing consistente."""
+
+    def __init__(
+        self,
+        shards: Dict[str, BaseStore],
+        *,
+        routing_depth: int = SHARD_ROUTING_DEPTH,
+        virtual_nodes: int = SHARD_VIRTUAL_NODES,
+        workers: int = SHARD_WORKERS,
+    ):
+        """
+        Args:
+            shards (Dict[str, BaseStore]): Backends por nome; o nome (não a ordem) define a posição no anel
+            routing_depth (int): Componentes do namespace usados como chave de roteamento
+            virtual_nodes (int): Pontos no anel por shard
+            workers (int): Threads para operações em vários shards e para a migração
+        """
+        self.shards = dict(shards)
+        self.routing_depth = routing_depth
+        self._ring = HashRing(list(self.shards), virtual_nodes)
+        # Anel anterior enquanto uma migração está em andamento
+        self._previous_ring: Optional[HashRing] = None
+        self._migrated: set = set()
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(64)]
+        self._workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="shard")
+        self._rebalance_thread: Optional[threading.Thread] = None
+        self.rebalance_progress: Dict[str, Any] = {}
+
+    @property
+    def backend_name(self) -> str:
+        names = {type(store).__name__ for store in self.shards.values()}
+        return f"Sharded[{','.join(sorted(names))}]"
+
+    # Roteamento
+
+    def routing_key(self, namespace: Tuple[str, ...]) -> str:
+        """Chave de roteamento: os primeiros `routing_depth` componentes (ou todos, se houver menos)."""
+        return "/".join(namespace[: self.routing_depth])
+
+    def shard_for(self, namespace: Tuple[str, ...], write: bool = False) -> str:
+        """
+        Shard responsável pelo namespace.
+
+        Durante uma migração, leituras de chaves ainda não migradas vão ao dono
+        anterior; escritas migram a chave antes (ver `_ensure_migrated`).
+        """
+        key = self.routing_key(namespace)
+        ring, previous = self._ring, self._previous_ring
+        owner = ring.node_for(key)
+        if previous is not None and key not in self._migrated:
+            old_owner = previous.node_for(key)
+            if old_owner != owner:
+                if not write:
+                    return old_owner
+                self._ensure_migrated(key)
+        return owner
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        return self._key_locks[_hash(key) % len(self._key_locks)]
+
+    # API do BaseStore
+
+    def _plan(self, ops: List[Any]) -> Tuple[Dict[str, List[Tuple[int, Any]]], List[Tuple[int, Any]]]:
+        """Separa as operações com shard único das que precisam de todos os shards."""
+        routed: Dict[str, List[Tuple[int, Any]]] = {}
+        fanout: List[Tuple[int, Any]] = []
+        for index, op in enumerate(ops):
+            if isinstance(op, (GetOp, PutOp)):
+                routed.setdefault(self.shard_for(op.namespace, write=isinstance(op, PutOp)), []).append((index, op))
+            elif isinstance(op, SearchOp) and len(op.namespace_prefix) >= self.routing_depth:
+                routed.setdefault(self.shard_for(op.namespace_prefix), []).append((index, op))
+            elif isinstance(op, (SearchOp, ListNamespacesOp)):
+                fanout.append((index, op))
+            else:
+                raise ValueError(f"Operação desconhecida: {type(op)}")
+        return routed, fanout
+
+    @staticmethod
+    def _widen(op: Any) -> Any:
+        # Cada shard devolve até `offset + limit` itens; o corte é feito após combinar
+        return op._replace(offset=0, limit=op.offset + op.limit)
+
+    def _merge(self, op: Any, partials: Dict[str, List[Any]]) -> List[Any]:
+        if isinstance(op, ListNamespacesOp):
+            merged = sorted({namespace for partial in partials.values() for namespace in partial})
+        else:
+            # Durante uma migração, a chave pode existir em dois shards: vale a do dono atual
+            merged = sorted(
+                (item for name, partial in partials.items() for item in partial
+                 if self.shard_for(item.namespace) == name),
+                key=_search_sort_key,
+            )
+        return merged[op.offset: op.offset + op.limit]
+
+    def batch(self, ops: Iterable[Any]) -> List[Any]:
+        ops = list(ops)
+        results: List[Any] = [None] * len(ops)
+        routed, fanout = self._plan(ops)
+        calls = [(name, [op for _, op in entries]) for name, entries in routed.items()]
+        if fanout:
+            widened = [self._widen(op) for _, op in fanout]
+            calls.extend((name, widened) for name in self.shards)
+
+        outputs = self._map(lambda call: self.shards[call[0]].batch(call[1]), calls)
+        for (name, entries), output in zip(routed.items(), outputs):
+            for (index, _), result in zip(entries, output):
+                results[index] = result
+        fanout_outputs = dict(zip(self.shards, outputs[len(routed):]))
+        for position, (index, op) in enumerate(fanout):
+            results[index] = self._merge(op, {name: output[position] for name, output in fanout_outputs.items()})
+        return results
+
+    async def abatch(self, ops: Iterable[Any]) -> List[Any]:
+        ops = list(ops)
+        results: List[Any] = [None] * len(ops)
+        # O planejamento pode migrar chaves (escritas durante um rebalanceamento)
+        routed, fanout = await asyncio.get_running_loop().run_in_executor(self._executor, self._plan, ops)
+        calls = [self.shards[name].abatch([op for _, op in entries]) for name, entries in routed.items()]
+        if fanout:
+            widened = [self._widen(op) for _, op in fanout]
+            calls.extend(self.shards[name].abatch(widened) for name in self.shards)
+
+        outputs = await asyncio.gather(*calls)
+        for (name, entries), output in zip(routed.items(), outputs):
+            for (index, _), result in zip(entries, output):
+                results[index] = result
+        fanout_outputs = dict(zip(self.shards, outputs[len(routed):]))
+        for position, (index, op) in enumerate(fanout):
+            results[index] = self._merge(op, {name: output[position] for name, output in fanout_outputs.items()})
+        return results
+
+    def _map(self, function: Any, calls: List[Any]) -> List[Any]:
+        if len(calls) == 1:
+            return [function(calls[0])]
+        return list(self._executor.map(function, calls))
+
+    # Rebalanceamento
+
+    def add_shard(self, name: str, store: BaseStore, wait: bool = False) -> Optional[threading.Thread]:
+        """
+        Adiciona um shard e migra, em segundo plano, as chaves que passam a ser dele.
+
+        Args:
+            name (str): Nome do novo shard
+            store (BaseStore): Backend do novo shard
+            wait (bool): Espera a migração terminar
+
+        Returns:
+            Optional[threading.Thread]: Thread da migração (None com `wait=True`)
+        """
+        with self._lock:
+            if name in self.shards:
+                raise ValueError(f"O shard {name} já existe")
+            if self._previous_ring is not None:
+                raise RuntimeError("Já há um rebalanceamento em andamento")
+            self.shards[name] = store
+            self._migrated = set()
+            self._previous_ring = self._ring
+            self._ring = self._ring.with_node(name)
+            self.rebalance_progress = {"shard": name, "keys": 0, "items": 0, "done": False, "seconds": 0.0}
+        logger.info(f"Shard {name} adicionado; migrando as chaves que mudaram de dono")
+
+        if wait:
+            self.rebalance()
+            return None
+        self._rebalance_thread = threading.Thread(target=self.rebalance, name="shard-rebalance", daemon=True)
+        self._rebalance_thread.start()
+        return self._rebalance_thread
+
+    def _routing_keys(self, name: str) -> List[str]:
+        """Chaves de roteamento presentes em um shard."""
+        keys = set()
+        offset = 0
+        while True:
+            namespaces = self.shards[name].list_namespaces(max_depth=self.routing_depth, limit=1000, offset=offset)
+            keys.update(map(self.routing_key, namespaces))
+            if len(namespaces) < 1000:
+                return sorted(keys)
+            offset += 1000
+
+    def _key_pages(self, store: BaseStore, key: str) -> Iterator[List[Any]]:
+        """Páginas com os itens de uma chave de roteamento em um shard."""
+        namespace = tuple(key.split("/"))
+        offset = 0
+        while True:
+            items = store.search(namespace, limit=_MIGRATION_PAGE, offset=offset)
+            # Um namespace curto também é prefixo de namespaces de outras chaves
+            yield [item for item in items if self.routing_key(item.namespace) == key]
+            if len(items) < _MIGRATION_PAGE:
+                return
+            offset += len(items)
+
+    def rebalance(self) -> Dict[str, Any]:
+        """
+        Migra para o novo dono as chaves afetadas pelo último `add_shard`.
+
+        As cópias antigas são removidas só no fim, depois que todas as leituras
+        passaram a ir ao novo dono.
+
+        Returns:
+            Dict[str, Any]: Chaves e itens migrados e duração
+        """
+        previous = self._previous_ring
+        if previous is None:
+            return self.rebalance_progress
+        start = time.perf_counter()
+        moving = [
+            (key, name)
+            for name in previous.nodes
+            for key in self._routing_keys(name)
+            if previous.node_for(key) == name and self._ring.node_for(key) != name
+        ]
+        # Pool próprio: as operações dos usuários não esperam atrás da migração
+        with ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="shard-migration") as pool:
+            for _ in pool.map(self._ensure_migrated, [key for key, _ in moving]):
+                pass
+            with self._lock:
+                self._previous_ring = None
+                self._migrated = set()
+            for _ in pool.map(lambda entry: self._remove_copies(*entry), moving):
+                pass
+        self.rebalance_progress.update(done=True, seconds=round(time.perf_counter() - start, 3))
+        logger.info(
+            f"Rebalanceamento concluído: {self.rebalance_progress['keys']} chaves e "
+            f"{self.rebalance_progress['items']} itens migrados em {self.rebalance_progress['seconds']:.1f}s"
+        )
+        return self.rebalance_progress
+
+    def _ensure_migrated(self, key: str) -> None:
+        """Copia os itens de uma chave para o novo dono (uma vez por chave)."""
+        previous = self._previous_ring
+        if previous is None or key in self._migrated:
+            return
+        with self._key_lock(key):
+            if key in self._migrated:
+                return
+            source = self.shards[previous.node_for(key)]
+            target = self.shards[self._ring.node_for(key)]
+            # Escritas nesta chave esperam o lock, então a origem não muda durante a cópia
+            moved = 0
+            for items in self._key_pages(source, key):
+                if items:
+                    _copy_items(source, target, items)
+                moved += len(items)
+            # Só depois da cópia completa as leituras passam ao novo dono
+            with self._lock:
+                self._migrated.add(key)
+                self.rebalance_progress["keys"] += 1
+                self.rebalance_progress["items"] += moved
+
+    def _remove_copies(self, key: str, name: str) -> None:
+        """Remove de um shard os itens de uma chave que já pertence a outro."""
+        store = self.shards[name]
+        namespace = tuple(key.split("/"))
+        offset = 0
+        while True:
+            items = store.search(namespace, limit=_MIGRATION_PAGE, offset=offset)
+            mine = [item for item in items if self.routing_key(item.namespace) == key]
+            if mine:
+                store.batch([PutOp(item.namespace, item.key, None) for item in mine])
+            if len(items) < _MIGRATION_PAGE:
+                return
+            # Os itens removidos deslocam os seguintes; só os que ficaram contam
+            offset += len(items) - len(mine)
+
+    def close(self) -> None:
+        """Espera uma migração em andamento e fecha os backends que tenham `close`."""
+        if self._rebalance_thread is not None:
+            self._rebalance_thread.join()
+        self._executor.shutdown(wait=True)
+        for store in self.shards.values():
+            close = getattr(store, "close", None)
+            if callable(close):
+                close()
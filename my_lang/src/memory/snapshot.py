@@ -0,0 +1,462 @@
+"""
+Snapshots e log de alterações para o armazenamento em memória.
+
+O `SnapshotStore` é um `InMemoryStore` que sobrevive a reinícios sem PostgreSQL:
+
+- periodicamente, o conteúdo é gravado em um snapshot: os itens como registros
+  JSON compactos (`items.jsonl`) e os vetores em uma matriz float32 contínua
+  (`vectors.npy`);
+- entre snapshots, cada escrita é acrescentada a um log (`wal-<geração>.log`),
+  com os vetores já calculados, antes de a chamada retornar;
+- ao iniciar, a matriz de vetores é mapeada em memória (`mmap`), sem cópia e sem
+  chamar o modelo de embeddings, e o log posterior ao snapshot é reaplicado.
+
+Layout do diretório:
+
+    snapshot-00000003/manifest.json   # geração, contagens e dimensão
+    snapshot-00000003/items.jsonl     # um item por linha, com as linhas dos vetores
+    snapshot-00000003/vectors.npy     # matriz (vetores × dims) em float32
+    wal-00000003.log                  # alterações feitas depois do snapshot 3
+
+Um snapshot é escrito em um diretório temporário e renomeado só quando completo;
+os logs anteriores são apagados depois disso, então uma falha no meio da escrita
+nunca perde alterações.
+"""
+
+import base64
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langgraph.store.base import Item, PutOp
+from langgraph.store.memory import InMemoryStore
+
+from src.config import MEMORY_SNAPSHOT_FSYNC, MEMORY_SNAPSHOT_INTERVAL
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Versão do formato dos snapshots
+SNAPSHOT_VERSION = 1
+
+# Arquivos de cada snapshot
+MANIFEST_FILE = "manifest.json"
+ITEMS_FILE = "items.jsonl"
+VECTORS_FILE = "vectors.npy"
+
+_SNAPSHOT_RE = re.compile(r"^snapshot-(\d+)$")
+_WAL_RE = re.compile(r"^wal-(\d+)\.log$")
+
+
+def _encode_vector(vector: Any) -> str:
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def _decode_vector(data: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32)
+
+
+def _fsync_directory(path: str) -> None:
+    """Garante que renomeações e criações no diretório cheguem ao disco."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return  # Diretórios não podem ser abertos no Windows
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SnapshotStore(InMemoryStore):
+    """
+    `InMemoryStore` persistido em snapshots com vetores mapeados em memória e log de alterações.
+
+    As buscas e leituras continuam inteiramente em memória; só as escritas pagam
+    o acréscimo ao log (e o `fsync`, se habilitado).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        index: Optional[Dict[str, Any]] = None,
+        interval: float = MEMORY_SNAPSHOT_INTERVAL,
+        fsync: bool = MEMORY_SNAPSHOT_FSYNC,
+    ):
+        """
+        Args:
+            directory (str): Diretório dos snapshots e do log (criado se não existir)
+            index (Optional[Dict[str, Any]]): Configuração de índice do InMemoryStore
+            interval (float): Segundos entre snapshots automáticos (0 desativa)
+            fsync (bool): Força o log para o disco a cada escrita
+        """
+        super().__init__(index=index)
+        self.directory = directory
+        self.interval = interval
+        self.fsync = fsync
+        # Protege as estruturas internas, o log e a troca de geração
+        self._lock = threading.RLock()
+        # Apenas um snapshot por vez
+        self._snapshot_lock = threading.Lock()
+        self._generation = 0
+        self._changes = 0
+        self._wal = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._restore()
+        self._wal = open(self._wal_path(self._generation), "ab")
+
+        if interval > 0:
+            self._thread = threading.Thread(target=self._run, name="memory-snapshot", daemon=True)
+            self._thread.start()
+
+    # Pontos de mutação do InMemoryStore: todas as escritas (síncronas ou não) passam por eles
+
+    def _insertinmem_store(self, to_embed: Dict[str, List[Tuple[Tuple[str, ...], str, str]]], embeddings: List[List[float]]) -> None:
+        with self._lock:
+            super()._insertinmem_store(to_embed, embeddings)
+
+    def _apply_put_ops(self, put_ops: Dict[Tuple[Tuple[str, ...], str], PutOp]) -> None:
+        with self._lock:
+            super()._apply_put_ops(put_ops)
+            self._log(put_ops)
+
+    def put_items(self, items: List[Item], vectors: Dict[Tuple[Tuple[str, ...], str], Dict[str, Any]]) -> None:
+        """
+        Grava itens como estão, com as datas originais e vetores já calculados.
+
+        Usado ao copiar itens de outro backend (migração de shards): nada é embutido
+        de novo, e as escritas entram no log como as demais.
+
+        Args:
+            items (List[Item]): Itens a gravar
+            vectors (Dict[Tuple[Tuple[str, ...], str], Dict[str, Any]]): Vetores por campo de cada
+                (namespace, chave); itens ausentes ficam sem vetores
+        """
+        with self._lock:
+            for item in items:
+                namespace = tuple(item.namespace)
+                self._data[namespace][item.key] = Item(
+                    value=item.value,
+                    key=item.key,
+                    namespace=namespace,
+                    created_at=item.created_at,
+                    updated_at=item.updated_at,
+                )
+                fields = vectors.get((namespace, item.key))
+                if fields:
+                    self._vectors[namespace][item.key] = dict(fields)
+                else:
+                    self._vectors.get(namespace, {}).pop(item.key, None)
+            self._log({(tuple(item.namespace), item.key): None for item in items})
+
+    def _record(self, namespace: Tuple[str, ...], key: str) -> Dict[str, Any]:
+        """Estado atual de um item no formato do log (remoção se não existir)."""
+        item = self._data.get(namespace, {}).get(key)
+        if item is None:
+            return {"op": "delete", "namespace": list(namespace), "key": key}
+        vectors = self._vectors.get(namespace, {}).get(key) or {}
+        return {
+            "op": "put",
+            "namespace": list(namespace),
+            "key": key,
+            "value": item.value,
+            "created_at": item.created_at.isoformat(),
+            "updated_at": item.updated_at.isoformat(),
+            "vectors": {path: _encode_vector(vector) for path, vector in vectors.items()} or None,
+        }
+
+    def _log(self, put_ops: Dict[Tuple[Tuple[str, ...], str], PutOp]) -> None:
+        if self._wal is None or not put_ops:
+            return
+        # Grava o estado resultante, não a operação: reaplicar o log é idempotente
+        lines = [
+            json.dumps(self._record(namespace, key), ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+            for namespace, key in put_ops
+        ]
+        self._wal.write(b"".join(lines))
+        self._wal.flush()
+        if self.fsync:
+            os.fsync(self._wal.fileno())
+        self._changes += len(lines)
+
+    # Restauração
+
+    def _wal_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"wal-{generation:08d}.log")
+
+    def _snapshot_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"snapshot-{generation:08d}")
+
+    def _generations(self) -> Tuple[List[int], List[int]]:
+        """Gerações dos snapshots completos e dos logs presentes no diretório."""
+        snapshots, wals = [], []
+        for name in os.listdir(self.directory):
+            if (match := _SNAPSHOT_RE.match(name)) and os.path.exists(os.path.join(self.directory, name, MANIFEST_FILE)):
+                snapshots.append(int(match.group(1)))
+            elif match := _WAL_RE.match(name):
+                wals.append(int(match.group(1)))
+        return sorted(snapshots), sorted(wals)
+
+    def _restore(self) -> None:
+        start = time.perf_counter()
+        # Snapshots interrompidos no meio da escrita nunca foram renomeados
+        for name in os.listdir(self.directory):
+            if name.startswith("snapshot-") and name.endswith(".tmp"):
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+        snapshots, wals = self._generations()
+        latest = snapshots[-1] if snapshots else 0
+        items = self._load_snapshot(self._snapshot_path(latest)) if snapshots else 0
+        replayed = 0
+        for generation in wals:
+            if generation >= latest:
+                replayed += self._replay(self._wal_path(generation))
+        self._generation = max([latest] + wals)
+        # O que veio do log entra no próximo snapshot
+        self._changes += replayed
+        if items or replayed:
+            logger.info(
+                f"Armazenamento restaurado de {self.directory}: {items} itens do snapshot {latest} "
+                f"e {replayed} alterações do log em {(time.perf_counter() - start) * 1000:.0f} ms"
+            )
+
+    def _load_snapshot(self, path: str) -> int:
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as file:
+            manifest = json.load(file)
+        if manifest.get("version", 0) > SNAPSHOT_VERSION:
+            raise ValueError(f"{path} usa a versão {manifest['version']} do formato (suportada: {SNAPSHOT_VERSION})")
+
+        # Mapeado, não lido: as páginas só são carregadas quando uma busca as usa.
+        # `asarray` tira a subclasse `memmap`, cujas fatias são bem mais lentas de criar
+        vectors = np.asarray(np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")) if manifest.get("vectors") else None
+        dims = (self.index_config or {}).get("dims")
+        reuse = vectors is not None and dims == manifest.get("dims")
+        if vectors is not None and not reuse:
+            logger.warning(
+                f"Vetores de {path} têm dimensão {manifest.get('dims')} e o índice usa {dims}; "
+                f"os itens serão embutidos de novo"
+            )
+
+        stale: Dict[Tuple[Tuple[str, ...], str], PutOp] = {}
+        count = 0
+        with open(os.path.join(path, ITEMS_FILE), encoding="utf-8") as file:
+            for line in file:
+                record = json.loads(line)
+                namespace = tuple(record["namespace"])
+                key = record["key"]
+                self._data[namespace][key] = Item(
+                    value=record["value"],
+                    key=key,
+                    namespace=namespace,
+                    created_at=datetime.fromisoformat(record["created_at"]),
+                    updated_at=datetime.fromisoformat(record["updated_at"]),
+                )
+                if record.get("vectors"):
+                    if reuse:
+                        # Cada vetor é uma visão de uma linha da matriz mapeada
+                        self._vectors[namespace][key] = {p: vectors[row] for p, row in record["vectors"].items()}
+                    else:
+                        stale[(namespace, key)] = PutOp(namespace, key, record["value"])
+                count += 1
+
+        if stale and self.embeddings is not None:
+            self._reembed(stale)
+        return count
+
+    def _reembed(self, put_ops: Dict[Tuple[Tuple[str, ...], str], PutOp]) -> None:
+        """Recalcula os vetores dos itens, preservando datas, e marca-os para o próximo snapshot."""
+        to_embed = self._extract_texts(put_ops)
+        texts = list(to_embed)
+        for text, vector in zip(texts, self.embeddings.embed_documents(texts)):
+            # Textos repetidos aparecem uma vez em `to_embed`, com todas as posições
+            for namespace, key, path in to_embed[text]:
+                self._vectors[namespace][key][path] = vector
+        self._changes += len(put_ops)
+
+    def _replay(self, path: str) -> int:
+        """Reaplica um log e descarta uma última linha incompleta (escrita interrompida)."""
+        count = 0
+        with open(path, "r+b") as file:
+            while True:
+                offset = file.tell()
+                line = file.readline()
+                if not line:
+                    break
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("linha incompleta")
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Log {path} truncado na posição {offset}: última escrita incompleta descartada")
+                    file.truncate(offset)
+                    break
+                self._apply_record(record)
+                count += 1
+        return count
+
+    def _apply_record(self, record: Dict[str, Any]) -> None:
+        namespace = tuple(record["namespace"])
+        key = record["key"]
+        if record["op"] == "delete":
+            self._data.get(namespace, {}).pop(key, None)
+            self._vectors.get(namespace, {}).pop(key, None)
+            return
+        self._data[namespace][key] = Item(
+            value=record["value"],
+            key=key,
+            namespace=namespace,
+            created_at=datetime.fromisoformat(record["created_at"]),
+            updated_at=datetime.fromisoformat(record["updated_at"]),
+        )
+        if record.get("vectors"):
+            self._vectors[namespace][key] = {p: _decode_vector(data) for p, data in record["vectors"].items()}
+        else:
+            self._vectors.get(namespace, {}).pop(key, None)
+
+    # Snapshots
+
+    def snapshot(self, force: bool = False) -> Optional[str]:
+        """
+        Grava um snapshot do conteúdo atual e descarta os logs que ele substitui.
+
+        As escritas só ficam bloqueadas enquanto as referências aos itens são
+        copiadas; a gravação em disco acontece fora do lock.
+
+        Args:
+            force (bool): Grava mesmo sem alterações desde o último snapshot
+
+        Returns:
+            Optional[str]: Caminho do snapshot, ou None se não havia alterações
+        """
+        with self._snapshot_lock:
+            with self._lock:
+                if not self._changes and not force:
+                    return None
+                generation = self._generation + 1
+                previous_wal = self._wal
+                self._wal = open(self._wal_path(generation), "ab")
+                self._generation = generation
+                changes, self._changes = self._changes, 0
+                entries = [
+                    (item, dict(self._vectors.get(namespace, {}).get(key) or {}))
+                    for namespace, items in self._data.items()
+                    for key, item in items.items()
+                ]
+            if previous_wal is not None:
+                previous_wal.close()
+
+            start = time.perf_counter()
+            try:
+                path = self._write_snapshot(generation, entries)
+            except Exception:
+                # Os logs continuam no disco; a próxima tentativa grava tudo de novo
+                with self._lock:
+                    self._changes += changes
+                raise
+            self._cleanup(generation)
+            logger.info(
+                f"Snapshot {generation} gravado em {path}: {len(entries)} itens "
+                f"em {(time.perf_counter() - start) * 1000:.0f} ms"
+            )
+            return path
+
+    def _write_snapshot(self, generation: int, entries: List[Tuple[Item, Dict[str, Any]]]) -> str:
+        final = self._snapshot_path(generation)
+        temporary = final + ".tmp"
+        shutil.rmtree(temporary, ignore_errors=True)
+        os.makedirs(temporary)
+
+        rows = sum(len(vectors) for _, vectors in entries)
+        dims = next((len(vector) for _, vectors in entries for vector in vectors.values()), 0)
+        matrix = None
+        if rows:
+            # Escrita direto no arquivo mapeado: a matriz não é montada em memória
+            matrix = np.lib.format.open_memmap(
+                os.path.join(temporary, VECTORS_FILE), mode="w+", dtype=np.float32, shape=(rows, dims)
+            )
+
+        row = 0
+        with open(os.path.join(temporary, ITEMS_FILE), "w", encoding="utf-8") as file:
+            for item, vectors in entries:
+                positions = {}
+                for path, vector in vectors.items():
+                    matrix[row] = vector
+                    positions[path] = row
+                    row += 1
+                record = {
+                    "namespace": list(item.namespace),
+                    "key": item.key,
+                    "value": item.value,
+                    "created_at": item.created_at.isoformat(),
+                    "updated_at": item.updated_at.isoformat(),
+                    "vectors": positions or None,
+                }
+                file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        if matrix is not None:
+            matrix.flush()
+            del matrix
+            with open(os.path.join(temporary, VECTORS_FILE), "rb") as file:
+                os.fsync(file.fileno())
+
+        manifest = {
+            "version": SNAPSHOT_VERSION,
+            "generation": generation,
+            "items": len(entries),
+            "vectors": rows,
+            "dims": dims or (self.index_config or {}).get("dims"),
+            "created_at": datetime.now().astimezone().isoformat(),
+        }
+        with open(os.path.join(temporary, MANIFEST_FILE), "w", encoding="utf-8") as file:
+            json.dump(manifest, file)
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.rename(temporary, final)
+        _fsync_directory(self.directory)
+        return final
+
+    def _cleanup(self, generation: int) -> None:
+        """Remove snapshots e logs anteriores à geração gravada."""
+        snapshots, wals = self._generations()
+        for old in snapshots:
+            if old < generation:
+                # No Linux, vetores ainda mapeados continuam válidos depois da remoção
+                shutil.rmtree(self._snapshot_path(old), ignore_errors=True)
+        for old in wals:
+            if old < generation:
+                try:
+                    os.remove(self._wal_path(old))
+                except OSError as e:
+                    logger.warning(f"Não foi possível remover o log {old}: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.snapshot()
+            except Exception as e:
+                logger.error(f"Erro ao gravar snapshot do armazenamento: {str(e)}", exc_info=True)
+
+    def close(self) -> None:
+        """Interrompe os snapshots periódicos, grava o último e fecha o log."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._wal is None:
+            return
+        self.snapshot()
+        with self._lock:
+            self._wal.close()
+            self._wal = None
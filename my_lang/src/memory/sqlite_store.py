@@ -0,0 +1,580 @@
+"""
+Armazenamento de memórias em SQLite, com vetores em BLOBs e busca em NumPy.
+
+Uma alternativa durável e sem serviço externo entre o `InMemoryStore` (volátil) e
+o PostgreSQL com pgvector, para implantações em um único nó:
+
+- os itens ficam na tabela `store` e os vetores (float32) em `store_vectors`, com
+  o mesmo layout de namespaces do `PostgresStore` (partes unidas por ".");
+- abrir o banco só cria as tabelas se preciso: a inicialização leva milissegundos;
+- na busca, os vetores de cada namespace são carregados uma vez em um bloco
+  (matriz normalizada em memória, cache LRU) e pontuados com um único produto
+  matricial; escritas no namespace invalidam o bloco;
+- opcionalmente, blocos grandes ganham um índice aproximado (IVF: k-means sobre os
+  vetores, e a busca só pontua as listas dos centróides mais próximos).
+
+Filtros (`filter=`) seguem a mesma semântica do `InMemoryStore`.
+"""
+
+import asyncio
+import bisect
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langgraph.store.base import (
+    BaseStore,
+    GetOp,
+    Item,
+    ListNamespacesOp,
+    PutOp,
+    SearchItem,
+    SearchOp,
+    validate_op_namespace,
+)
+from langgraph.store.base.embed import ensure_embeddings, get_text_at_path, tokenize_path
+# Mesmas regras de filtro e de namespaces do InMemoryStore
+from langgraph.store.memory import _compare_values, _does_match
+
+from src.config import SQLITE_ANN_MIN_VECTORS, SQLITE_ANN_NPROBE, SQLITE_BLOCK_CACHE_SIZE
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS store (
+    prefix TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (prefix, key)
+);
+CREATE TABLE IF NOT EXISTS store_vectors (
+    prefix TEXT NOT NULL,
+    key TEXT NOT NULL,
+    field_name TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    PRIMARY KEY (prefix, key, field_name)
+);
+"""
+
+# Chaves buscadas por consulta ao percorrer resultados com filtro
+_FETCH_CHUNK = 64
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class _IVFIndex:
+    """Índice aproximado de um bloco: k-means esférico e listas invertidas por centróide."""
+
+    def __init__(self, matrix: np.ndarray, nprobe: int, iterations: int = 8, seed: int = 0):
+        rows = len(matrix)
+        nlist = max(1, int(np.sqrt(rows)))
+        rng = np.random.default_rng(seed)
+        centroids = matrix[rng.choice(rows, nlist, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(matrix @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, matrix)
+            empty = np.bincount(assignment, minlength=nlist) == 0
+            # Centróides sem vetores mantêm a posição anterior
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+        assignment = np.argmax(matrix @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(nlist + 1))
+        self.centroids = centroids
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(nlist)]
+        self.nprobe = min(nprobe, nlist)
+
+    def candidates(self, query: np.ndarray) -> np.ndarray:
+        closest = np.argsort(-(self.centroids @ query))[: self.nprobe]
+        return np.concatenate([self.lists[i] for i in closest])
+
+
+class _Block:
+    """Vetores de um namespace: uma linha por campo embutido, normalizados."""
+
+    def __init__(self, keys: List[str], matrix: np.ndarray, ann_min_vectors: int, nprobe: int):
+        self.keys = keys
+        self.matrix = _normalize(matrix) if len(matrix) else matrix
+        self.fields_per_key = max(1, len(keys) // max(1, len(set(keys))))
+        self.ann = _IVFIndex(self.matrix, nprobe) if ann_min_vectors and len(keys) >= ann_min_vectors else None
+
+    def top(self, query: np.ndarray, k: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Linhas mais similares à consulta (todas, ordenadas, se `k` for None)."""
+        rows = None
+        if self.ann is not None and k is not None:
+            candidates = self.ann.candidates(query)
+            # Listas pequenas demais para o pedido: cai para a busca exata
+            if len(candidates) >= k:
+                rows = candidates
+        scores = (self.matrix[rows] if rows is not None else self.matrix) @ query
+        if rows is None:
+            rows = np.arange(len(scores))
+        if k is not None and k < len(scores):
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+        else:
+            best = np.argsort(-scores)
+        return scores[best], rows[best]
+
+
+def _prefix(namespace: Tuple[str, ...]) -> str:
+    return ".".join(namespace)
+
+
+def _namespace(prefix: str) -> Tuple[str, ...]:
+    return tuple(prefix.split("."))
+
+
+def _parse_datetime(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+class SQLiteStore(BaseStore):
+    """
+    Armazenamento de memórias em um arquivo SQLite com busca vetorial em NumPy.
+
+    É seguro para uso por várias threads: as consultas SQL compartilham uma conexão
+    protegida por lock, e a pontuação dos blocos acontece fora dele.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        index: Optional[Dict[str, Any]] = None,
+        block_cache_size: int = SQLITE_BLOCK_CACHE_SIZE,
+        ann_min_vectors: int = SQLITE_ANN_MIN_VECTORS,
+        ann_nprobe: int = SQLITE_ANN_NPROBE,
+    ):
+        """
+        Args:
+            path (str): Arquivo do banco (":memory:" para um banco temporário)
+            index (Optional[Dict[str, Any]]): Configuração de índice (`dims`, `embed`, `fields`),
+                como no InMemoryStore
+            block_cache_size (int): Namespaces com vetores mantidos em memória
+            ann_min_vectors (int): Vetores a partir dos quais um bloco ganha índice aproximado (0 desativa)
+            ann_nprobe (int): Listas do índice aproximado pontuadas por busca
+        """
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.index_config = dict(index) if index else None
+        self.embeddings = ensure_embeddings(self.index_config.get("embed")) if self.index_config else None
+        self._fields = [
+            (field, tokenize_path(field)) if field != "$" else (field, field)
+            for field in ((self.index_config or {}).get("fields") or ["$"])
+        ]
+        self.block_cache_size = block_cache_size
+        self.ann_min_vectors = ann_min_vectors
+        self.ann_nprobe = ann_nprobe
+
+        self._lock = threading.RLock()
+        self._blocks: "OrderedDict[str, _Block]" = OrderedDict()
+        # Versão de cada namespace: um bloco lido antes de uma escrita não entra no cache
+        self._versions: Dict[str, int] = {}
+        # Namespaces existentes, ordenados (carregados no primeiro `list_namespaces`)
+        self._namespaces: Optional[List[Tuple[str, ...]]] = None
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # API do BaseStore
+
+    def batch(self, ops: Iterable[Any]) -> List[Any]:
+        results: List[Any] = []
+        # Como no InMemoryStore, a última escrita de cada chave no lote prevalece
+        put_ops: Dict[Tuple[Tuple[str, ...], str], PutOp] = {}
+        for op in ops:
+            # Os namespaces são gravados unidos por ".": um rótulo com ponto não pode
+            # endereçar o namespace de outro usuário
+            validate_op_namespace(op)
+            if isinstance(op, PutOp):
+                put_ops[(op.namespace, op.key)] = op
+                results.append(None)
+            else:
+                results.append(op)
+
+        if put_ops:
+            self._apply_puts(list(put_ops.values()))
+        for index, op in enumerate(results):
+            if isinstance(op, GetOp):
+                results[index] = self._get(op)
+            elif isinstance(op, SearchOp):
+                results[index] = self._search(op)
+            elif isinstance(op, ListNamespacesOp):
+                results[index] = self._list_namespaces(op)
+            elif op is not None:
+                raise ValueError(f"Operação desconhecida: {type(op)}")
+        return results
+
+    async def abatch(self, ops: Iterable[Any]) -> List[Any]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.batch, list(ops))
+
+    def close(self) -> None:
+        """Fecha a conexão com o banco."""
+        with self._lock:
+            self._conn.close()
+
+    def vectors(self, namespace: Tuple[str, ...]) -> Dict[str, np.ndarray]:
+        """
+        Vetores já gravados para os itens de um namespace, sem chamar os embeddings.
+
+        Args:
+            namespace (Tuple[str, ...]): Namespace dos itens
+
+        Returns:
+            Dict[str, np.ndarray]: Chave -> vetor normalizado (o do primeiro campo embutido)
+        """
+        validate_op_namespace(GetOp(namespace, ""))
+        block = self._block(_prefix(namespace))
+        vectors: Dict[str, np.ndarray] = {}
+        for row, key in enumerate(block.keys):
+            vectors.setdefault(key, block.matrix[row])
+        return vectors
+
+    def item_vectors(self, items: List[Any]) -> Dict[Tuple[Tuple[str, ...], str], Dict[str, np.ndarray]]:
+        """
+        Vetores gravados, por campo e sem normalizar, de itens do armazenamento.
+
+        Args:
+            items (List[Any]): Itens (com `namespace` e `key`)
+
+        Returns:
+            Dict[Tuple[Tuple[str, ...], str], Dict[str, np.ndarray]]: (namespace, chave) -> campo -> vetor;
+                itens sem vetores não aparecem
+        """
+        keys = [(_prefix(item.namespace), item.key) for item in items]
+        vectors: Dict[Tuple[Tuple[str, ...], str], Dict[str, np.ndarray]] = {}
+        for start in range(0, len(keys), _FETCH_CHUNK):
+            chunk = keys[start:start + _FETCH_CHUNK]
+            conditions = " OR ".join("(prefix = ? AND key = ?)" for _ in chunk)
+            params = [part for pair in chunk for part in pair]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT prefix, key, field_name, embedding FROM store_vectors WHERE {conditions}", params
+                ).fetchall()
+            for prefix, key, field, blob in rows:
+                vectors.setdefault((_namespace(prefix), key), {})[field] = np.frombuffer(blob, dtype=np.float32)
+        return vectors
+
+    # Escritas
+
+    def put_items(self, items: List[Any], vectors: Dict[Tuple[Tuple[str, ...], str], Dict[str, Any]]) -> None:
+        """
+        Grava itens como estão, com as datas originais e vetores já calculados.
+
+        Usado ao copiar itens de outro backend (migração de shards): nada é embutido
+        de novo e `created_at`/`updated_at` são preservados.
+
+        Args:
+            items (List[Any]): Itens a gravar
+            vectors (Dict[Tuple[Tuple[str, ...], str], Dict[str, Any]]): Vetores por campo de cada
+                (namespace, chave); itens ausentes ficam sem vetores
+        """
+        for item in items:
+            validate_op_namespace(PutOp(item.namespace, item.key, item.value))
+        rows = [
+            (_prefix(item.namespace), item.key, json.dumps(item.value, ensure_ascii=False),
+             item.created_at.isoformat(), item.updated_at.isoformat())
+            for item in items
+        ]
+        vector_rows = [
+            (_prefix(item.namespace), item.key, field, np.asarray(vector, dtype=np.float32).tobytes())
+            for item in items
+            for field, vector in (vectors.get((item.namespace, item.key)) or {}).items()
+        ]
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                cursor.executemany(
+                    "INSERT INTO store (prefix, key, value, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (prefix, key) DO UPDATE SET value = excluded.value, "
+                    "created_at = excluded.created_at, updated_at = excluded.updated_at",
+                    rows,
+                )
+                cursor.executemany("DELETE FROM store_vectors WHERE prefix = ? AND key = ?", [row[:2] for row in rows])
+                cursor.executemany(
+                    "INSERT INTO store_vectors (prefix, key, field_name, embedding) VALUES (?, ?, ?, ?)", vector_rows
+                )
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            for prefix in {row[0] for row in rows}:
+                self._versions[prefix] = self._versions.get(prefix, 0) + 1
+                self._blocks.pop(prefix, None)
+            self._track_namespaces({row[0] for row in rows}, deleted=False)
+
+    def _embed_puts(self, put_ops: List[PutOp]) -> List[Tuple[str, str, str, bytes]]:
+        """Calcula os vetores das escritas indexadas, com cada texto distinto embutido uma vez."""
+        if self.embeddings is None:
+            return []
+        positions: Dict[str, List[Tuple[str, str, str]]] = {}
+        for op in put_ops:
+            if op.value is None or op.index is False:
+                continue
+            fields = self._fields if op.index is None else [(field, tokenize_path(field)) for field in op.index]
+            for path, field in fields:
+                texts = get_text_at_path(op.value, field)
+                for i, text in enumerate(texts):
+                    name = f"{path}.{i}" if len(texts) > 1 else path
+                    positions.setdefault(text, []).append((_prefix(op.namespace), op.key, name))
+        if not positions:
+            return []
+        texts = list(positions)
+        rows = []
+        for text, vector in zip(texts, self.embeddings.embed_documents(texts)):
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.extend((prefix, key, name, blob) for prefix, key, name in positions[text])
+        return rows
+
+    def _apply_puts(self, put_ops: List[PutOp]) -> None:
+        # Embeddings fora do lock: outras threads continuam lendo e escrevendo
+        vectors = self._embed_puts(put_ops)
+        now = datetime.now(timezone.utc).isoformat()
+        reindexed = [
+            (_prefix(op.namespace), op.key)
+            for op in put_ops
+            if op.value is None or (op.index is not False and self.embeddings is not None)
+        ]
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                cursor.executemany(
+                    "DELETE FROM store WHERE prefix = ? AND key = ?",
+                    [(_prefix(op.namespace), op.key) for op in put_ops if op.value is None],
+                )
+                cursor.executemany(
+                    "INSERT INTO store (prefix, key, value, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (prefix, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                    [
+                        (_prefix(op.namespace), op.key, json.dumps(op.value, ensure_ascii=False), now, now)
+                        for op in put_ops
+                        if op.value is not None
+                    ],
+                )
+                cursor.executemany("DELETE FROM store_vectors WHERE prefix = ? AND key = ?", reindexed)
+                cursor.executemany(
+                    "INSERT INTO store_vectors (prefix, key, field_name, embedding) VALUES (?, ?, ?, ?)", vectors
+                )
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            for prefix in {_prefix(op.namespace) for op in put_ops}:
+                self._versions[prefix] = self._versions.get(prefix, 0) + 1
+                self._blocks.pop(prefix, None)
+            self._track_namespaces(
+                {_prefix(op.namespace) for op in put_ops}, deleted=any(op.value is None for op in put_ops)
+            )
+
+    def _track_namespaces(self, prefixes: Iterable[str], deleted: bool) -> None:
+        """Atualiza a lista de namespaces em cache após uma escrita (chamado com o lock adquirido)."""
+        if self._namespaces is None:
+            return
+        if deleted:
+            # A remoção pode ter esvaziado um namespace: a lista é relida no próximo uso
+            self._namespaces = None
+            return
+        namespaces = self._namespaces
+        for namespace in map(_namespace, prefixes):
+            position = bisect.bisect_left(namespaces, namespace)
+            if position == len(namespaces) or namespaces[position] != namespace:
+                if namespaces is self._namespaces:
+                    # Cópia: leitores podem estar percorrendo a lista atual fora do lock
+                    namespaces = list(namespaces)
+                namespaces.insert(position, namespace)
+        self._namespaces = namespaces
+
+    # Leituras
+
+    def _row_to_item(self, row: Tuple[str, str, str, str, str], score: Optional[float] = None, search: bool = False) -> Any:
+        prefix, key, value, created_at, updated_at = row
+        kwargs = dict(
+            namespace=_namespace(prefix),
+            key=key,
+            value=json.loads(value),
+            created_at=_parse_datetime(created_at),
+            updated_at=_parse_datetime(updated_at),
+        )
+        return SearchItem(**kwargs, score=score) if search else Item(**kwargs)
+
+    def _get(self, op: GetOp) -> Optional[Item]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT prefix, key, value, created_at, updated_at FROM store WHERE prefix = ? AND key = ?",
+                (_prefix(op.namespace), op.key),
+            ).fetchone()
+        return self._row_to_item(row) if row else None
+
+    def _prefixes(self, namespace_prefix: Tuple[str, ...]) -> List[str]:
+        """Namespaces gravados sob o prefixo informado."""
+        if not namespace_prefix:
+            query, params = "SELECT DISTINCT prefix FROM store", ()
+        else:
+            # Faixa [prefixo + ".", prefixo + "/") em vez de substr: usa a chave primária
+            prefix = _prefix(namespace_prefix)
+            query = "SELECT DISTINCT prefix FROM store WHERE prefix = ? OR (prefix >= ? || '.' AND prefix < ? || '/')"
+            params = (prefix, prefix, prefix)
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query, params)]
+
+    def _block(self, prefix: str) -> _Block:
+        with self._lock:
+            block = self._blocks.get(prefix)
+            if block is not None:
+                self._blocks.move_to_end(prefix)
+                return block
+            version = self._versions.get(prefix, 0)
+            rows = self._conn.execute(
+                "SELECT key, embedding FROM store_vectors WHERE prefix = ?", (prefix,)
+            ).fetchall()
+        keys = [key for key, _ in rows]
+        matrix = np.frombuffer(b"".join(blob for _, blob in rows), dtype=np.float32)
+        dims = len(rows[0][1]) // 4 if rows else 0
+        block = _Block(keys, matrix.reshape(len(rows), dims), self.ann_min_vectors, self.ann_nprobe)
+        with self._lock:
+            if self._versions.get(prefix, 0) == version and self.block_cache_size > 0:
+                self._blocks[prefix] = block
+                while len(self._blocks) > self.block_cache_size:
+                    self._blocks.popitem(last=False)
+        return block
+
+    def _fetch(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Tuple[str, str, str, str, str]]:
+        rows: Dict[Tuple[str, str], Tuple[str, str, str, str, str]] = {}
+        for start in range(0, len(keys), _FETCH_CHUNK):
+            chunk = keys[start:start + _FETCH_CHUNK]
+            conditions = " OR ".join("(prefix = ? AND key = ?)" for _ in chunk)
+            params = [part for pair in chunk for part in pair]
+            with self._lock:
+                for row in self._conn.execute(
+                    f"SELECT prefix, key, value, created_at, updated_at FROM store WHERE {conditions}", params
+                ):
+                    rows[(row[0], row[1])] = row
+        return rows
+
+    def _matches(self, row: Tuple[str, str, str, str, str], op: SearchOp) -> bool:
+        if not op.filter:
+            return True
+        value = json.loads(row[2])
+        return all(_compare_values(value.get(key), expected) for key, expected in op.filter.items())
+
+    def _search(self, op: SearchOp) -> List[SearchItem]:
+        prefixes = self._prefixes(op.namespace_prefix)
+        wanted = op.offset + op.limit
+        if not (op.query and self.embeddings is not None):
+            return self._scan(prefixes, op, offset=op.offset, limit=op.limit)
+
+        query = _normalize(np.asarray(self.embeddings.embed_query(op.query), dtype=np.float32))
+        ranked: List[Tuple[float, str, str]] = []
+        for prefix in prefixes:
+            block = self._block(prefix)
+            if not block.keys:
+                continue
+            # Com filtro, não dá para saber quantas linhas serão descartadas
+            k = None if op.filter else wanted * block.fields_per_key
+            scores, rows = block.top(query, k)
+            ranked.extend((float(score), prefix, block.keys[row]) for score, row in zip(scores, rows))
+        ranked.sort(key=lambda entry: entry[0], reverse=True)
+
+        # Max pooling: cada item entra com a maior pontuação entre seus campos
+        ordered: List[Tuple[float, Tuple[str, str]]] = []
+        seen = set()
+        for score, prefix, key in ranked:
+            if (prefix, key) not in seen:
+                seen.add((prefix, key))
+                ordered.append((score, (prefix, key)))
+
+        results: List[SearchItem] = []
+        position = 0
+        for start in range(0, len(ordered), _FETCH_CHUNK):
+            chunk = ordered[start:start + _FETCH_CHUNK]
+            rows = self._fetch([key for _, key in chunk])
+            for score, key in chunk:
+                row = rows.get(key)
+                if row is None or not self._matches(row, op):
+                    continue
+                if position >= op.offset:
+                    results.append(self._row_to_item(row, score=score, search=True))
+                position += 1
+                if len(results) >= op.limit:
+                    return results
+        # Como no InMemoryStore, itens sem vetores completam o resultado sem pontuação
+        return results + self._scan(prefixes, op, offset=max(0, op.offset - position),
+                                    limit=op.limit - len(results), unscored=True)
+
+    def _scan(self, prefixes: List[str], op: SearchOp, offset: int, limit: int, unscored: bool = False) -> List[SearchItem]:
+        """Itens dos namespaces em ordem de atualização (mais recentes primeiro), em páginas."""
+        results: List[SearchItem] = []
+        if not prefixes or limit <= 0:
+            return results
+        placeholders = ",".join("?" for _ in prefixes)
+        query = (
+            f"SELECT prefix, key, value, created_at, updated_at FROM store s WHERE prefix IN ({placeholders})"
+            + (
+                " AND NOT EXISTS (SELECT 1 FROM store_vectors v WHERE v.prefix = s.prefix AND v.key = s.key)"
+                if unscored else ""
+            )
+            + " ORDER BY updated_at DESC, prefix, key LIMIT ? OFFSET ?"
+        )
+        # Sem filtro, o próprio SQLite pula o deslocamento
+        position = 0 if op.filter else offset
+        page = limit if not op.filter else max(limit, _FETCH_CHUNK)
+        while True:
+            with self._lock:
+                rows = self._conn.execute(query, (*prefixes, page, position)).fetchall()
+            for row in rows:
+                if self._matches(row, op):
+                    if offset > 0 and op.filter:
+                        offset -= 1
+                        continue
+                    results.append(self._row_to_item(row, search=True))
+                    if len(results) >= limit:
+                        return results
+            if len(rows) < page:
+                return results
+            position += page
+
+    def _sorted_namespaces(self) -> List[Tuple[str, ...]]:
+        """Namespaces existentes em ordem; a lista é mantida pelas escritas deste processo."""
+        with self._lock:
+            if self._namespaces is None:
+                self._namespaces = sorted(_namespace(prefix) for prefix in self._prefixes(()))
+            return self._namespaces
+
+    def _list_namespaces(self, op: ListNamespacesOp) -> List[Tuple[str, ...]]:
+        namespaces = self._sorted_namespaces()
+        # A parte fixa de uma condição de prefixo delimita uma faixa contígua da lista ordenada
+        for condition in op.match_conditions or ():
+            literal = tuple(itertools.takewhile(lambda part: part != "*", condition.path))
+            if condition.match_type == "prefix" and literal:
+                end = literal[:-1] + (literal[-1] + "\0",)
+                namespaces = namespaces[bisect.bisect_left(namespaces, literal): bisect.bisect_left(namespaces, end)]
+                break
+        if op.match_conditions:
+            namespaces = [
+                namespace for namespace in namespaces
+                if all(_does_match(condition, namespace) for condition in op.match_conditions)
+            ]
+        if op.max_depth is not None:
+            namespaces = sorted({namespace[: op.max_depth] for namespace in namespaces})
+        return namespaces[op.offset: op.offset + op.limit]
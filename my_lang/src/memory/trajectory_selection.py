@@ -0,0 +1,166 @@
+"""
+Seleção de trajetórias para o otimizador de prompts.
+
+Com tráfego real, enviar todas as trajetórias ao otimizador estoura o limite de
+contexto e desperdiça tokens com conversas quase idênticas. Este módulo escolhe um
+subconjunto diverso e representativo das trajetórias que cabe em um orçamento de
+tokens configurável, de modo que o custo de cada execução do otimizador é limitado
+independentemente do volume de tráfego.
+"""
+
+import logging
+import random
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+from langchain_core.messages.utils import count_tokens_approximately
+
+from src.config import (
+    EMBEDDING_MODEL,
+    OPTIMIZER_TOKEN_BUDGET,
+    OPTIMIZER_MAX_CANDIDATES,
+    OPTIMIZER_DEDUP_THRESHOLD,
+)
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Trajetória no formato aceito pelo otimizador: (mensagens, feedback)
+Trajectory = Tuple[List[Any], Dict[str, Any]]
+
+
+def trajectory_text(trajectory: Trajectory) -> str:
+    """
+    Converte uma trajetória em texto para geração de embeddings.
+
+    Args:
+        trajectory (Trajectory): Par (mensagens, feedback)
+
+    Returns:
+        str: Texto da conversa, uma mensagem por linha
+    """
+    messages, _ = trajectory
+    lines = []
+    for message in messages:
+        if isinstance(message, dict):
+            role, content = message.get("role", ""), message.get("content", "")
+        else:
+            role, content = getattr(message, "type", ""), getattr(message, "content", "")
+        lines.append(f"{role}: {content}")
+    return "\n".join(lines)
+
+
+def _sample_candidates(
+    trajectories: Iterable[Trajectory],
+    max_candidates: int,
+    seed: int,
+) -> Tuple[List[Trajectory], int]:
+    """Amostra uniformemente (reservoir sampling) no máximo `max_candidates` trajetórias."""
+    rng = random.Random(seed)
+    reservoir: List[Trajectory] = []
+    total = 0
+    for index, trajectory in enumerate(trajectories):
+        total += 1
+        if index < max_candidates:
+            reservoir.append(trajectory)
+        else:
+            slot = rng.randint(0, index)
+            if slot < max_candidates:
+                reservoir[slot] = trajectory
+    return reservoir, total
+
+
+def select_trajectories(
+    trajectories: Iterable[Trajectory],
+    embeddings: Any = None,
+    token_budget: int = OPTIMIZER_TOKEN_BUDGET,
+    similarity_threshold: float = OPTIMIZER_DEDUP_THRESHOLD,
+    max_candidates: int = OPTIMIZER_MAX_CANDIDATES,
+    token_counter: Callable[[List[Any]], int] = count_tokens_approximately,
+    seed: int = 0,
+) -> List[Trajectory]:
+    """
+    Seleciona trajetórias diversas e representativas dentro de um orçamento de tokens.
+
+    As trajetórias são amostradas (no máximo `max_candidates`), convertidas em
+    embeddings e agrupadas por k-centros guloso: a primeira escolhida é a mais
+    próxima do centróide e cada nova escolha é a mais distante das já escolhidas.
+    A seleção para quando a próxima candidata é uma quase-duplicata
+    (`similarity_threshold`) ou quando o orçamento de tokens se esgota. Cada
+    trajetória escolhida recebe no feedback o tamanho do seu grupo
+    (`cluster_size`), para que o otimizador saiba quão frequente é o padrão.
+
+    Args:
+        trajectories (Iterable[Trajectory]): Pares (mensagens, feedback)
+        embeddings: Modelo de embeddings (padrão: EMBEDDING_MODEL)
+        token_budget (int): Total máximo de tokens das trajetórias selecionadas
+        similarity_threshold (float): Similaridade de cosseno a partir da qual duas
+            trajetórias são consideradas quase idênticas
+        max_candidates (int): Número máximo de trajetórias avaliadas
+        token_counter (Callable): Função que conta os tokens de uma lista de mensagens
+        seed (int): Semente da amostragem
+
+    Returns:
+        List[Trajectory]: Trajetórias selecionadas
+    """
+    candidates, total = _sample_candidates(trajectories, max_candidates, seed)
+    costs = [token_counter(list(messages)) for messages, _ in candidates]
+    candidates = [c for c, cost in zip(candidates, costs) if 0 < cost <= token_budget]
+    costs = [cost for cost in costs if 0 < cost <= token_budget]
+    if not candidates:
+        return []
+    if len(candidates) == 1:
+        return [(candidates[0][0], {**(candidates[0][1] or {}), "cluster_size": 1})]
+
+    if embeddings is None:
+        from src.models import create_embeddings
+
+        embeddings = create_embeddings(EMBEDDING_MODEL, priority="batch")
+
+    vectors = np.asarray(
+        embeddings.embed_documents([trajectory_text(c) for c in candidates]),
+        dtype=np.float32,
+    )
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1.0, norms)
+
+    # Começa pela trajetória mais representativa (mais próxima do centróide)
+    centroid = vectors.mean(axis=0)
+    first = int(np.argmax(vectors @ centroid))
+
+    selected = [first]
+    spent = costs[first]
+    # Maior similaridade de cada candidata com alguma trajetória já selecionada
+    max_similarity = vectors @ vectors[first]
+    assignment = np.zeros(len(candidates), dtype=np.int64)
+    excluded = np.zeros(len(candidates), dtype=bool)
+    excluded[first] = True
+
+    while True:
+        remaining = np.where(excluded, np.inf, max_similarity)
+        candidate = int(np.argmin(remaining))
+        if not np.isfinite(remaining[candidate]) or remaining[candidate] >= similarity_threshold:
+            break
+
+        excluded[candidate] = True
+        if spent + costs[candidate] > token_budget:
+            # Não cabe no orçamento; tenta a próxima mais diversa
+            continue
+
+        selected.append(candidate)
+        spent += costs[candidate]
+        similarity = vectors @ vectors[candidate]
+        closer = similarity > max_similarity
+        assignment[closer] = len(selected) - 1
+        max_similarity = np.maximum(max_similarity, similarity)
+
+    cluster_sizes = np.bincount(assignment, minlength=len(selected))
+    logger.info(
+        f"Selecionadas {len(selected)} de {total} trajetórias "
+        f"({spent} de {token_budget} tokens)"
+    )
+
+    return [
+        (candidates[index][0], {**(candidates[index][1] or {}), "cluster_size": int(cluster_sizes[position])})
+        for position, index in enumerate(selected)
+    ]
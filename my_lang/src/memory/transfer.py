@@ -0,0 +1,655 @@
+"""
+Exportação e importação em streaming de memórias e perfis.
+
+Move os namespaces de memórias e perfis entre armazenamentos (InMemoryStore,
+PostgreSQL) ou ambientes por meio de arquivos:
+
+- JSONL (opcionalmente `.jsonl.gz`): a primeira linha é um cabeçalho com o modelo
+  e a dimensão dos embeddings; as demais são registros
+  `{"namespace", "key", "value", "created_at", "updated_at", "embeddings"}`;
+- Parquet (`.parquet`, requer o pacote `pyarrow`): as mesmas colunas, gravadas em
+  grupos de linhas, com o cabeçalho nos metadados do esquema.
+
+Os embeddings vão junto com os registros, então a importação não chama o modelo de
+embeddings quando o arquivo foi gerado com o mesmo modelo e a mesma dimensão do
+destino; caso contrário, os textos são embutidos de novo, em lotes.
+
+Leitura e escrita são feitas em páginas de tamanho fixo, e o uso de memória não
+depende do tamanho do armazenamento. No PostgreSQL, a exportação usa um cursor no
+servidor e a importação grava cada lote com `COPY` em tabelas temporárias seguido
+de um `INSERT ... ON CONFLICT`.
+
+Uso (PostgreSQL de POSTGRES_CONNECTION_STRING):
+
+    python -m src.memory.transfer export memorias.jsonl.gz
+    python -m src.memory.transfer import memorias.jsonl.gz
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.config import EMBEDDING_MODEL, MEMORY_NAMESPACE, POSTGRES_CONNECTION_STRING, PROFILE_NAMESPACE
+from src.instrumentation import unwrap_store
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Identificação do formato dos arquivos
+FILE_FORMAT = "chatbot-memories"
+FORMAT_VERSION = 1
+
+# Namespaces exportados por padrão: memórias e perfis de todos os usuários
+DEFAULT_PREFIXES = (MEMORY_NAMESPACE[0], PROFILE_NAMESPACE[0])
+
+
+def unique_text_batches(ops: List[Any]) -> Iterator[List[Any]]:
+    """
+    Divide escritas para que nenhum lote repita um valor.
+
+    O InMemoryStore embute cada texto distinto uma vez por lote e falha quando dois
+    itens do mesmo lote têm o mesmo texto.
+
+    Args:
+        ops (List[Any]): Operações `PutOp`
+
+    Returns:
+        Iterator[List[Any]]: Lotes sem valores repetidos, na ordem original
+    """
+    batch: List[Any] = []
+    texts = set()
+    for op in ops:
+        text = json.dumps(op.value, sort_keys=True, ensure_ascii=False)
+        if text in texts:
+            yield batch
+            batch, texts = [], set()
+        batch.append(op)
+        texts.add(text)
+    if batch:
+        yield batch
+
+
+def _is_in_memory(store: Any) -> bool:
+    from langgraph.store.memory import InMemoryStore
+
+    return isinstance(store, InMemoryStore)
+
+
+def _isoformat(value: Any) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _parse_datetime(value: Optional[str]) -> datetime:
+    return datetime.fromisoformat(value) if value else datetime.now(timezone.utc)
+
+
+def _parse_vector(text: str) -> List[float]:
+    """Converte a representação textual do pgvector (`[0.1,0.2]`) em lista."""
+    return [float(part) for part in text.strip("[]").split(",")] if text.strip("[]") else []
+
+
+def _matches(namespace: Sequence[str], prefixes: Sequence[str]) -> bool:
+    return bool(namespace) and namespace[0] in prefixes
+
+
+# ---------------------------------------------------------------------------
+# Leitura dos armazenamentos
+# ---------------------------------------------------------------------------
+
+
+def iter_store_records(
+    store: Any,
+    prefixes: Sequence[str] = DEFAULT_PREFIXES,
+    page_size: int = 1000,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Percorre os itens dos namespaces escolhidos de um armazenamento.
+
+    No InMemoryStore, os vetores são lidos diretamente da estrutura interna; em
+    outros armazenamentos, os itens são paginados com `list_namespaces` e `search`,
+    sem embeddings (a importação os recalcula).
+
+    Args:
+        store: Armazenamento de origem
+        prefixes (Sequence[str]): Primeiro componente dos namespaces exportados
+        page_size (int): Itens por página nos armazenamentos genéricos
+
+    Returns:
+        Iterator[Dict[str, Any]]: Registros no formato do arquivo
+    """
+    store = unwrap_store(store)
+    if _is_in_memory(store):
+        # `_data` e `_vectors` são a API interna do InMemoryStore (o código dele pede
+        # que os nomes não mudem); as listas de chaves são copiadas por namespace
+        for namespace in list(store._data):
+            if not _matches(namespace, prefixes):
+                continue
+            vectors = store._vectors.get(namespace, {})
+            for key in list(store._data[namespace]):
+                item = store._data[namespace].get(key)
+                if item is None:
+                    continue
+                embeddings = vectors.get(key)
+                yield {
+                    "namespace": list(namespace),
+                    "key": key,
+                    "value": item.value,
+                    "created_at": _isoformat(item.created_at),
+                    "updated_at": _isoformat(item.updated_at),
+                    "embeddings": {field: list(vector) for field, vector in embeddings.items()} if embeddings else None,
+                }
+        return
+
+    for prefix in prefixes:
+        namespace_offset = 0
+        while True:
+            namespaces = store.list_namespaces(prefix=(prefix,), limit=page_size, offset=namespace_offset)
+            for namespace in namespaces:
+                item_offset = 0
+                while True:
+                    items = store.search(namespace, limit=page_size, offset=item_offset)
+                    for item in items:
+                        # A busca por prefixo também devolve namespaces filhos, listados à parte
+                        if tuple(item.namespace) != tuple(namespace):
+                            continue
+                        yield {
+                            "namespace": list(item.namespace),
+                            "key": item.key,
+                            "value": item.value,
+                            "created_at": _isoformat(item.created_at),
+                            "updated_at": _isoformat(item.updated_at),
+                            "embeddings": None,
+                        }
+                    if len(items) < page_size:
+                        break
+                    item_offset += page_size
+            if len(namespaces) < page_size:
+                break
+            namespace_offset += page_size
+
+
+def iter_postgres_records(
+    conninfo: str = POSTGRES_CONNECTION_STRING,
+    prefixes: Sequence[str] = DEFAULT_PREFIXES,
+    page_size: int = 1000,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Percorre as tabelas do `PostgresStore` com um cursor no servidor, com os vetores.
+
+    Args:
+        conninfo (str): String de conexão do PostgreSQL
+        prefixes (Sequence[str]): Primeiro componente dos namespaces exportados
+        page_size (int): Linhas buscadas do servidor por vez
+
+    Returns:
+        Iterator[Dict[str, Any]]: Registros no formato do arquivo
+    """
+    import psycopg
+
+    conditions = " OR ".join("(s.prefix = %s OR s.prefix LIKE %s)" for _ in prefixes)
+    params: List[str] = []
+    for prefix in prefixes:
+        params.extend([prefix, f"{prefix}.%"])
+    query = f"""
+        SELECT s.prefix, s.key, s.value, s.created_at, s.updated_at, v.embeddings
+        FROM store s
+        LEFT JOIN LATERAL (
+            SELECT json_object_agg(sv.field_name, sv.embedding::text) AS embeddings
+            FROM store_vectors sv
+            WHERE sv.prefix = s.prefix AND sv.key = s.key
+        ) v ON TRUE
+        WHERE {conditions}
+        ORDER BY s.prefix, s.key
+    """
+    with psycopg.connect(conninfo) as connection:
+        with connection.cursor(name="memory_export") as cursor:
+            cursor.itersize = page_size
+            cursor.execute(query, params)
+            for prefix, key, value, created_at, updated_at, embeddings in cursor:
+                yield {
+                    "namespace": prefix.split("."),
+                    "key": key,
+                    "value": value,
+                    "created_at": _isoformat(created_at),
+                    "updated_at": _isoformat(updated_at),
+                    "embeddings": {field: _parse_vector(text) for field, text in embeddings.items()} if embeddings else None,
+                }
+
+
+def postgres_dims(conninfo: str = POSTGRES_CONNECTION_STRING) -> Optional[int]:
+    """Dimensão da coluna `store_vectors.embedding` (None se a tabela não existir)."""
+    import psycopg
+
+    with psycopg.connect(conninfo) as connection:
+        row = connection.execute(
+            "SELECT atttypmod FROM pg_attribute "
+            "WHERE attrelid = to_regclass('store_vectors') AND attname = 'embedding'"
+        ).fetchone()
+    return row[0] if row and row[0] > 0 else None
+
+
+# ---------------------------------------------------------------------------
+# Arquivos
+# ---------------------------------------------------------------------------
+
+
+def _file_format(path: str, file_format: Optional[str]) -> str:
+    if file_format:
+        return file_format
+    return "parquet" if path.lower().endswith(".parquet") else "jsonl"
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Arquivos Parquet exigem o pacote pyarrow (pip install pyarrow)") from None
+    return pyarrow
+
+
+def _parquet_schema(pa: Any, header: Dict[str, Any]) -> Any:
+    return pa.schema(
+        [
+            ("namespace", pa.list_(pa.string())),
+            ("key", pa.string()),
+            ("value", pa.string()),
+            ("created_at", pa.string()),
+            ("updated_at", pa.string()),
+            ("embedding_fields", pa.list_(pa.string())),
+            ("embeddings", pa.list_(pa.list_(pa.float32()))),
+        ],
+        metadata={FILE_FORMAT: json.dumps(header)},
+    )
+
+
+def _parquet_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    embeddings = record.get("embeddings") or {}
+    return {
+        "namespace": record["namespace"],
+        "key": record["key"],
+        "value": json.dumps(record["value"], ensure_ascii=False),
+        "created_at": record.get("created_at"),
+        "updated_at": record.get("updated_at"),
+        "embedding_fields": list(embeddings) or None,
+        "embeddings": list(embeddings.values()) or None,
+    }
+
+
+def write_records(
+    records: Iterable[Dict[str, Any]],
+    path: str,
+    header: Dict[str, Any],
+    file_format: Optional[str] = None,
+    page_size: int = 1000,
+) -> int:
+    """
+    Grava os registros em JSONL (comprimido se terminar em `.gz`) ou Parquet.
+
+    Args:
+        records (Iterable[Dict[str, Any]]): Registros a gravar
+        path (str): Arquivo de destino
+        header (Dict[str, Any]): Cabeçalho (`embedding_model`, `dims`)
+        file_format (Optional[str]): "jsonl" ou "parquet" (padrão: pela extensão)
+        page_size (int): Registros por grupo de linhas do Parquet
+
+    Returns:
+        int: Número de registros gravados
+    """
+    header = {"format": FILE_FORMAT, "version": FORMAT_VERSION,
+              "exported_at": datetime.now(timezone.utc).isoformat(), **header}
+    count = 0
+    if _file_format(path, file_format) == "parquet":
+        pa = _import_pyarrow()
+        schema = _parquet_schema(pa, header)
+        rows: List[Dict[str, Any]] = []
+        with pa.parquet.ParquetWriter(path, schema, compression="zstd") as writer:
+            for record in records:
+                rows.append(_parquet_row(record))
+                count += 1
+                if len(rows) >= page_size:
+                    writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                    rows.clear()
+            if rows:
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+        return count
+
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as file:
+        file.write(json.dumps(header, ensure_ascii=False) + "\n")
+        for record in records:
+            file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            count += 1
+    return count
+
+
+def read_records(path: str, file_format: Optional[str] = None, page_size: int = 1000) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """
+    Abre um arquivo exportado.
+
+    Args:
+        path (str): Arquivo gerado por `write_records`
+        file_format (Optional[str]): "jsonl" ou "parquet" (padrão: pela extensão)
+        page_size (int): Linhas lidas do Parquet por vez
+
+    Returns:
+        Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]: Cabeçalho e registros
+    """
+    if _file_format(path, file_format) == "parquet":
+        pa = _import_pyarrow()
+        parquet_file = pa.parquet.ParquetFile(path)
+        metadata = parquet_file.schema_arrow.metadata or {}
+        header = json.loads(metadata.get(FILE_FORMAT.encode(), b"{}"))
+
+        def parquet_records() -> Iterator[Dict[str, Any]]:
+            for batch in parquet_file.iter_batches(batch_size=page_size):
+                for row in batch.to_pylist():
+                    fields = row.pop("embedding_fields") or []
+                    vectors = row.pop("embeddings") or []
+                    row["value"] = json.loads(row["value"])
+                    row["embeddings"] = dict(zip(fields, vectors)) or None
+                    yield row
+
+        return _check_header(header, path), parquet_records()
+
+    opener = gzip.open if path.endswith(".gz") else open
+    file = opener(path, "rt", encoding="utf-8")
+    header = json.loads(file.readline() or "{}")
+
+    def jsonl_records() -> Iterator[Dict[str, Any]]:
+        with file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+    return _check_header(header, path), jsonl_records()
+
+
+def _check_header(header: Dict[str, Any], path: str) -> Dict[str, Any]:
+    if header.get("format") != FILE_FORMAT:
+        raise ValueError(f"{path} não é uma exportação de memórias")
+    if header.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"{path} usa a versão {header['version']} do formato (suportada: {FORMAT_VERSION})")
+    return header
+
+
+# ---------------------------------------------------------------------------
+# Escrita nos armazenamentos
+# ---------------------------------------------------------------------------
+
+
+def _chunks(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _usable_embeddings(record: Dict[str, Any], dims: Optional[int]) -> bool:
+    embeddings = record.get("embeddings")
+    return bool(embeddings) and dims is not None and all(len(vector) == dims for vector in embeddings.values())
+
+
+def _import_into_memory(store: Any, records: Iterable[Dict[str, Any]], reuse: bool, batch_size: int, stats: Dict[str, int]) -> None:
+    from langgraph.store.base import Item, PutOp
+
+    dims = (store.index_config or {}).get("dims")
+    for chunk in _chunks(records, batch_size):
+        to_embed = []
+        for record in chunk:
+            namespace = tuple(record["namespace"])
+            if reuse and _usable_embeddings(record, dims):
+                store._data[namespace][record["key"]] = Item(
+                    value=record["value"],
+                    key=record["key"],
+                    namespace=namespace,
+                    created_at=_parse_datetime(record.get("created_at")),
+                    updated_at=_parse_datetime(record.get("updated_at")),
+                )
+                store._vectors[namespace][record["key"]] = dict(record["embeddings"])
+                stats["reused_embeddings"] += 1
+            else:
+                # Perfis não são indexados por similaridade (ver save_user_profile)
+                index = False if record["namespace"][0] == PROFILE_NAMESPACE[0] else None
+                to_embed.append(PutOp(namespace, record["key"], record["value"], index=index))
+        for batch in unique_text_batches(to_embed):
+            store.batch(batch)
+        stats["embedded"] += len(to_embed)
+        stats["records"] += len(chunk)
+    # As escritas diretas não passam pelo log do SnapshotStore: persiste em um snapshot
+    if hasattr(store, "snapshot"):
+        store.snapshot(force=True)
+
+
+def _import_into_store(store: Any, records: Iterable[Dict[str, Any]], batch_size: int, stats: Dict[str, int]) -> None:
+    from langgraph.store.base import PutOp
+
+    for chunk in _chunks(records, batch_size):
+        ops = []
+        for record in chunk:
+            index = False if record["namespace"][0] == PROFILE_NAMESPACE[0] else None
+            ops.append(PutOp(tuple(record["namespace"]), record["key"], record["value"], index=index))
+        for batch in unique_text_batches(ops):
+            store.batch(batch)
+        stats["embedded"] += len(ops)
+        stats["records"] += len(chunk)
+
+
+def _import_into_postgres(
+    conninfo: str,
+    records: Iterable[Dict[str, Any]],
+    reuse: bool,
+    batch_size: int,
+    embeddings: Any,
+    stats: Dict[str, int],
+    dims: Optional[int] = None,
+) -> None:
+    import psycopg
+    from langgraph.store.base.embed import get_text_at_path
+
+    if postgres_dims(conninfo) is None:
+        # Destino vazio: cria as tabelas do PostgresStore com a dimensão do arquivo
+        from langgraph.store.postgres import PostgresStore
+
+        index = {"dims": dims, "embed": embeddings} if dims else None
+        with PostgresStore.from_conn_string(conninfo, index=index) as store:
+            store.setup()
+    dims = postgres_dims(conninfo)
+    with psycopg.connect(conninfo) as connection:
+        connection.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS import_store "
+            "(prefix text, key text, value text, created_at timestamptz, updated_at timestamptz)"
+        )
+        connection.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS import_vectors (prefix text, key text, field_name text, embedding text)"
+        )
+        connection.commit()
+        for chunk in _chunks(records, batch_size):
+            vectors: List[Tuple[str, str, str, str]] = []
+            pending: List[Tuple[str, str, str, str]] = []
+            for record in chunk:
+                prefix = ".".join(record["namespace"])
+                if record["namespace"][0] == PROFILE_NAMESPACE[0]:
+                    continue
+                if reuse and _usable_embeddings(record, dims):
+                    for field, vector in record["embeddings"].items():
+                        vectors.append((prefix, record["key"], field, json.dumps(vector)))
+                    stats["reused_embeddings"] += 1
+                elif dims is not None and embeddings is not None:
+                    texts = get_text_at_path(record["value"], "$")
+                    for index, text in enumerate(texts):
+                        field = f"$.{index}" if len(texts) > 1 else "$"
+                        pending.append((prefix, record["key"], field, text))
+                    stats["embedded"] += 1
+            if pending:
+                computed = embeddings.embed_documents([text for _, _, _, text in pending])
+                vectors.extend(
+                    (prefix, key, field, json.dumps(vector))
+                    for (prefix, key, field, _), vector in zip(pending, computed)
+                )
+
+            with connection.transaction():
+                with connection.cursor() as cursor:
+                    cursor.execute("TRUNCATE import_store, import_vectors")
+                    with cursor.copy("COPY import_store (prefix, key, value, created_at, updated_at) FROM STDIN") as copy:
+                        for record in chunk:
+                            copy.write_row((
+                                ".".join(record["namespace"]),
+                                record["key"],
+                                json.dumps(record["value"], ensure_ascii=False),
+                                record.get("created_at") or datetime.now(timezone.utc).isoformat(),
+                                record.get("updated_at") or datetime.now(timezone.utc).isoformat(),
+                            ))
+                    if vectors:
+                        with cursor.copy("COPY import_vectors (prefix, key, field_name, embedding) FROM STDIN") as copy:
+                            for row in vectors:
+                                copy.write_row(row)
+                    cursor.execute(
+                        "INSERT INTO store (prefix, key, value, created_at, updated_at) "
+                        "SELECT prefix, key, value::jsonb, created_at, updated_at FROM import_store "
+                        "ON CONFLICT (prefix, key) DO UPDATE "
+                        "SET value = EXCLUDED.value, updated_at = EXCLUDED.updated_at"
+                    )
+                    if vectors:
+                        cursor.execute(
+                            "INSERT INTO store_vectors (prefix, key, field_name, embedding, created_at, updated_at) "
+                            "SELECT prefix, key, field_name, embedding::vector, now(), now() FROM import_vectors "
+                            "ON CONFLICT (prefix, key, field_name) DO UPDATE "
+                            "SET embedding = EXCLUDED.embedding, updated_at = EXCLUDED.updated_at"
+                        )
+            stats["records"] += len(chunk)
+
+
+def export_store(
+    store: Any,
+    path: str,
+    prefixes: Sequence[str] = DEFAULT_PREFIXES,
+    file_format: Optional[str] = None,
+    page_size: int = 1000,
+    embedding_model: str = EMBEDDING_MODEL,
+) -> Dict[str, Any]:
+    """
+    Exporta memórias e perfis de um armazenamento para um arquivo.
+
+    Args:
+        store: Armazenamento de origem ou "postgres" (usa POSTGRES_CONNECTION_STRING)
+            ou uma string de conexão `postgresql://...`
+        path (str): Arquivo de destino (`.jsonl`, `.jsonl.gz` ou `.parquet`)
+        prefixes (Sequence[str]): Primeiro componente dos namespaces exportados
+        file_format (Optional[str]): "jsonl" ou "parquet" (padrão: pela extensão)
+        page_size (int): Itens lidos e gravados por vez
+        embedding_model (str): Modelo que gerou os embeddings do armazenamento
+
+    Returns:
+        Dict[str, Any]: `records` e `seconds`
+    """
+    start = time.perf_counter()
+    if isinstance(store, str):
+        conninfo = POSTGRES_CONNECTION_STRING if store == "postgres" else store
+        dims = postgres_dims(conninfo)
+        records = iter_postgres_records(conninfo, prefixes, page_size)
+    else:
+        backend = unwrap_store(store)
+        dims = (getattr(backend, "index_config", None) or {}).get("dims") if _is_in_memory(backend) else None
+        records = iter_store_records(store, prefixes, page_size)
+
+    header = {"embedding_model": embedding_model if dims else None, "dims": dims, "prefixes": list(prefixes)}
+    count = write_records(records, path, header, file_format, page_size)
+    elapsed = time.perf_counter() - start
+    logger.info(f"{count} registros exportados para {path} em {elapsed:.1f}s")
+    return {"records": count, "seconds": round(elapsed, 3)}
+
+
+def import_store(
+    store: Any,
+    path: str,
+    file_format: Optional[str] = None,
+    batch_size: int = 1000,
+    embedding_model: str = EMBEDDING_MODEL,
+    reembed: bool = False,
+    embeddings: Any = None,
+) -> Dict[str, Any]:
+    """
+    Importa um arquivo exportado para um armazenamento, em lotes.
+
+    Os embeddings do arquivo são reaproveitados quando ele foi gerado com o mesmo
+    modelo e a mesma dimensão do destino; os demais itens são embutidos de novo.
+
+    Args:
+        store: Armazenamento de destino ou "postgres" (usa POSTGRES_CONNECTION_STRING)
+            ou uma string de conexão `postgresql://...`
+        path (str): Arquivo gerado por `export_store`
+        file_format (Optional[str]): "jsonl" ou "parquet" (padrão: pela extensão)
+        batch_size (int): Itens gravados por lote
+        embedding_model (str): Modelo de embeddings do destino
+        reembed (bool): Ignora os embeddings do arquivo e recalcula todos
+        embeddings: Modelo usado para recalcular embeddings no PostgreSQL
+            (padrão: `create_embeddings(embedding_model)`)
+
+    Returns:
+        Dict[str, Any]: `records`, `reused_embeddings`, `embedded` e `seconds`
+    """
+    start = time.perf_counter()
+    header, records = read_records(path, file_format, batch_size)
+    reuse = not reembed and header.get("embedding_model") == embedding_model
+    if not reembed and header.get("dims") and not reuse:
+        logger.warning(
+            f"Embeddings de {path} gerados com {header.get('embedding_model')}; "
+            f"serão recalculados com {embedding_model}"
+        )
+    stats = {"records": 0, "reused_embeddings": 0, "embedded": 0}
+
+    if isinstance(store, str):
+        conninfo = POSTGRES_CONNECTION_STRING if store == "postgres" else store
+        if embeddings is None:
+            from src.models import create_embeddings
+
+            embeddings = create_embeddings(embedding_model, priority="batch")
+        _import_into_postgres(conninfo, records, reuse, batch_size, embeddings, stats, header.get("dims"))
+    elif _is_in_memory(unwrap_store(store)):
+        _import_into_memory(unwrap_store(store), records, reuse, batch_size, stats)
+    else:
+        _import_into_store(store, records, batch_size, stats)
+
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    logger.info(
+        f"{stats['records']} registros importados de {path} "
+        f"({stats['reused_embeddings']} com embeddings do arquivo) em {stats['seconds']:.1f}s"
+    )
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Ponto de entrada da linha de comando da exportação e importação."""
+    parser = argparse.ArgumentParser(description="Exporta e importa memórias e perfis")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", help="Arquivo .jsonl, .jsonl.gz ou .parquet")
+    parser.add_argument("--database", default=POSTGRES_CONNECTION_STRING,
+                        help="String de conexão do PostgreSQL (padrão: POSTGRES_CONNECTION_STRING)")
+    parser.add_argument("--prefix", action="append", help="Namespace exportado (repetível; padrão: memórias e perfis)")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], help="Formato do arquivo (padrão: pela extensão)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Itens lidos e gravados por vez")
+    parser.add_argument("--reembed", action="store_true", help="Recalcula os embeddings na importação")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        result = export_store(args.database, args.path, prefixes=args.prefix or DEFAULT_PREFIXES,
+                              file_format=args.format, page_size=args.batch_size)
+    else:
+        result = import_store(args.database, args.path, file_format=args.format,
+                              batch_size=args.batch_size, reembed=args.reembed)
+    print(json.dumps(result, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Criação dos modelos de chat e de embeddings.
+
+Todos os consumidores de modelos devem obtê-los por aqui, e não a partir de nomes
+de modelo passados diretamente ao LangChain/LangMem: assim todos compartilham os
+clientes HTTP de `src.http_client`, as mesmas configurações de timeout e novas
+tentativas e o limitador de taxa de `src.rate_limiter`, na classe de prioridade
+do consumidor. Os modelos interativos respeitam o prazo do turno e podem disparar
+tentativas de cobertura (`src.agent.hedging`).
+"""
+
+import logging
+from typing import Any
+
+from src.config import MODEL_NAME, EMBEDDING_MODEL, MODEL_MAX_RETRIES, RATE_LIMIT_ENABLED
+from src.http_client import get_http_client, get_async_http_client
+from src.instrumentation import InstrumentedEmbeddings, LLMMetricsCallbackHandler
+from src.rate_limiter import RateLimitCallbackHandler, get_rate_limiter
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+def _split_provider(model: str, default_provider: str = "openai"):
+    provider, separator, name = model.partition(":")
+    return (provider, name) if separator else (default_provider, model)
+
+
+def create_chat_model(model_name: str = MODEL_NAME, priority: str = "interactive", **kwargs: Any):
+    """
+    Cria um modelo de chat que usa os clientes HTTP compartilhados.
+
+    Args:
+        model_name (str): Nome do modelo, opcionalmente com o provedor (ex.: "openai:gpt-4o-mini")
+        priority (str): Classe de prioridade no limitador de taxa (`interactive`,
+            `background` ou `batch`)
+        **kwargs: Parâmetros adicionais do modelo
+
+    Returns:
+        BaseChatModel: Modelo de chat (envolvido por `HedgedChatModel` se interativo)
+    """
+    provider, name = _split_provider(model_name)
+
+    callbacks = list(kwargs.get("callbacks") or []) + [LLMMetricsCallbackHandler(name)]
+    if RATE_LIMIT_ENABLED:
+        limiter = get_rate_limiter()
+        kwargs.setdefault("rate_limiter", limiter.for_priority(priority))
+        callbacks.append(RateLimitCallbackHandler(limiter))
+    kwargs["callbacks"] = callbacks
+
+    if provider != "openai":
+        # Outros provedores usam o próprio cliente
+        from langchain.chat_models import init_chat_model
+
+        logger.warning(f"Provedor {provider} não usa o cliente HTTP compartilhado")
+        return init_chat_model(name, model_provider=provider, **kwargs)
+
+    from langchain_openai import ChatOpenAI
+
+    kwargs.setdefault("max_retries", MODEL_MAX_RETRIES)
+    # O uso de tokens também é reportado nas respostas em streaming
+    kwargs.setdefault("stream_usage", True)
+    model = ChatOpenAI(
+        model=name,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+        **kwargs,
+    )
+    if priority != "interactive":
+        return model
+
+    from src.agent.hedging import HedgedChatModel
+
+    return HedgedChatModel(model=model)
+
+
+def create_embeddings(model: str = EMBEDDING_MODEL, priority: str = "interactive", **kwargs: Any):
+    """
+    Cria um modelo de embeddings que usa os clientes HTTP compartilhados.
+
+    Args:
+        model (str): Modelo de embeddings no formato "provedor:modelo"
+        priority (str): Classe de prioridade no limitador de taxa (`interactive`,
+            `background` ou `batch`)
+        **kwargs: Parâmetros adicionais do modelo (`rate_limiter=None` desativa o limitador)
+
+    Returns:
+        Embeddings: Modelo de embeddings (com a latência medida em `/metrics`)
+    """
+    provider, name = _split_provider(model)
+    if RATE_LIMIT_ENABLED:
+        kwargs.setdefault("rate_limiter", get_rate_limiter().for_priority(priority))
+    rate_limiter = kwargs.pop("rate_limiter", None)
+    if provider != "openai":
+        from langchain.embeddings import init_embeddings
+
+        logger.warning(f"Provedor {provider} não usa o cliente HTTP compartilhado")
+        return InstrumentedEmbeddings(
+            init_embeddings(name, provider=provider, **kwargs), model=name, rate_limiter=rate_limiter
+        )
+
+    from langchain_openai import OpenAIEmbeddings
+
+    kwargs.setdefault("max_retries", MODEL_MAX_RETRIES)
+    embeddings = OpenAIEmbeddings(
+        model=name,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+        **kwargs,
+    )
+    return InstrumentedEmbeddings(embeddings, model=name, rate_limiter=rate_limiter)
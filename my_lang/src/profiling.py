@@ -0,0 +1,198 @@
+"""
+Perfilamento de CPU sob demanda em um worker em execução.
+
+Dois modos, ambos sem reiniciar o processo:
+
+- `sample_stacks`: amostrador que lê as pilhas de todas as threads
+  (`sys._current_frames`) a intervalos fixos durante N segundos, inclusive a
+  thread do executor em segundo plano e as do pool de busca de memórias. O
+  resultado sai no formato de pilhas colapsadas (`frame;frame;frame contagem`),
+  aceito por flamegraph.pl, speedscope e similares.
+- `RequestProfiler`: modo sempre ligado e de baixo custo; uma fração dos turnos
+  (`PROFILE_REQUEST_SAMPLE_RATE`) roda sob o cProfile e as estatísticas são
+  acumuladas, exportáveis como arquivo pstats.
+"""
+
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+from src.config import PROFILE_REQUEST_SAMPLE_RATE
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}:{code.co_firstlineno}"
+
+
+# Funções em que uma thread fica bloqueada sem usar CPU
+_IDLE_FUNCTIONS = {"wait", "select", "poll", "accept", "get", "sleep", "_wait_for_tstate_lock", "acquire", "recv_into", "readinto"}
+
+
+def _is_idle(frame: Any) -> bool:
+    return frame.f_code.co_name in _IDLE_FUNCTIONS and os.path.basename(frame.f_code.co_filename) in {
+        "threading.py", "queue.py", "selectors.py", "socket.py", "thread.py", "base_events.py",
+    }
+
+
+def sample_stacks(seconds: float, interval: float = 0.005, include_idle: bool = False) -> Dict[str, int]:
+    """
+    Amostra as pilhas de todas as threads do processo.
+
+    Args:
+        seconds (float): Duração da amostragem
+        interval (float): Intervalo entre amostras em segundos
+        include_idle (bool): Se False, descarta amostras de threads paradas em espera
+            (locks, filas, `select`), que não consomem CPU
+
+    Returns:
+        Dict[str, int]: Pilha colapsada (raiz primeiro, nome da thread como raiz) -> amostras
+    """
+    me = threading.get_ident()
+    counts: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            if not include_idle and _is_idle(frame):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(f"thread:{names.get(ident, ident)}")
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return dict(counts)
+
+
+def format_collapsed(counts: Dict[str, int]) -> str:
+    """
+    Formata as amostras no formato de pilhas colapsadas.
+
+    Args:
+        counts (Dict[str, int]): Pilha -> amostras (de `sample_stacks`)
+
+    Returns:
+        str: Uma linha `pilha contagem` por pilha, da mais frequente para a menos
+    """
+    lines = [f"{stack} {count}" for stack, count in sorted(counts.items(), key=lambda item: -item[1])]
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+class RequestProfiler:
+    """Perfila com o cProfile uma fração das requisições e acumula as estatísticas."""
+
+    def __init__(self, sample_rate: float = PROFILE_REQUEST_SAMPLE_RATE, rng: Optional[random.Random] = None):
+        """
+        Args:
+            sample_rate (float): Fração das requisições perfiladas (0 desativa)
+            rng (Optional[random.Random]): Gerador de números aleatórios (substituível em testes)
+        """
+        self.sample_rate = sample_rate
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._stats: Optional[pstats.Stats] = None
+        self.profiled = 0
+
+    def call(self, function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Executa a função, sob o cProfile se a requisição for sorteada.
+
+        Args:
+            function (Callable): Função a executar (na thread atual)
+            *args: Argumentos posicionais
+            **kwargs: Argumentos nomeados
+
+        Returns:
+            Any: Resultado da função
+        """
+        if self.sample_rate <= 0 or self._rng.random() >= self.sample_rate:
+            return function(*args, **kwargs)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Outro perfilador já está ativo nesta thread
+            return function(*args, **kwargs)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profiler.disable()
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profiler)
+                else:
+                    self._stats.add(profiler)
+                self.profiled += 1
+
+    def dump(self) -> Optional[bytes]:
+        """
+        Exporta as estatísticas acumuladas como um arquivo pstats.
+
+        Returns:
+            Optional[bytes]: Conteúdo legível por `pstats.Stats(arquivo)`, ou None sem amostras
+        """
+        with self._lock:
+            if self._stats is None:
+                return None
+            return marshal.dumps(self._stats.stats)
+
+    def report(self, limit: int = 50, sort: str = "cumulative") -> str:
+        """
+        Resume as estatísticas acumuladas em texto.
+
+        Args:
+            limit (int): Número de funções listadas
+            sort (str): Critério de ordenação do pstats (ex.: "cumulative", "tottime")
+
+        Returns:
+            str: Relatório do pstats
+        """
+        with self._lock:
+            if self._stats is None:
+                return "Nenhuma requisição perfilada\n"
+            output = io.StringIO()
+            self._stats.stream = output
+            self._stats.sort_stats(sort).print_stats(limit)
+            return f"Requisições perfiladas: {self.profiled}\n" + output.getvalue()
+
+    def reset(self) -> None:
+        """Descarta as estatísticas acumuladas."""
+        with self._lock:
+            self._stats = None
+            self.profiled = 0
+
+
+_lock = threading.Lock()
+_request_profiler: Optional[RequestProfiler] = None
+
+
+def get_request_profiler() -> RequestProfiler:
+    """
+    Retorna o perfilador de requisições do processo, criando-o no primeiro uso.
+
+    Returns:
+        RequestProfiler: Perfilador compartilhado
+    """
+    global _request_profiler
+    with _lock:
+        if _request_profiler is None:
+            _request_profiler = RequestProfiler()
+        return _request_profiler
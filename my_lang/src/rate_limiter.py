@@ -0,0 +1,368 @@
+"""
+Limitador de taxa compartilhado com classes de prioridade.
+
+Turnos de chat, reflexão em segundo plano, extração de perfis e otimizações
+disputam os mesmos limites do provedor (requisições e tokens por minuto). O
+`PriorityRateLimiter` controla esse orçamento para o processo inteiro:
+
+- as requisições esperam em uma fila única ordenada por prioridade
+  (`interactive` < `background` < `batch`), e só a primeira da fila é liberada;
+- as classes `background` e `batch` não podem consumir a reserva do orçamento
+  destinada a `interactive`, de modo que um pico de tráfego de usuários encontra
+  capacidade disponível mesmo com um backlog grande em segundo plano;
+- respostas 429 do provedor reduzem a taxa pela metade e pausam a fila pelo tempo
+  indicado em `Retry-After`; os 429 que chegam durante essa pausa (novas tentativas
+  de requisições já enviadas) só estendem a pausa, e a taxa volta gradualmente ao
+  valor configurado;
+- os tokens consumidos são descontados do orçamento depois de cada chamada
+  (`RateLimitCallbackHandler`), já que só então são conhecidos.
+
+Cada modelo criado por `src.models.create_chat_model` recebe um adaptador para a
+sua classe de prioridade (`for_priority`). Chamadas `interactive` feitas dentro de
+um prazo (`src.deadlines`) esperam na fila no máximo o tempo restante do turno.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from src.config import (
+    RATE_LIMIT_REQUESTS_PER_MINUTE,
+    RATE_LIMIT_TOKENS_PER_MINUTE,
+    RATE_LIMIT_INTERACTIVE_RESERVE,
+    RATE_LIMIT_BURST_SECONDS,
+    RATE_LIMIT_RECOVERY_SECONDS,
+)
+from src.deadlines import DeadlineExceeded, remaining
+from src.metrics import percentile
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Classe de prioridade -> ordem na fila (menor é atendida primeiro)
+PRIORITIES = {"interactive": 0, "background": 1, "batch": 2}
+
+# Fração mínima da taxa configurada após reduções por 429
+MIN_RATE_FACTOR = 0.05
+
+# Função chamada quando o adaptador libera uma chamada do contexto atual (usada pelas
+# tentativas de `src.agent.hedging` para não contar a espera na fila como latência)
+on_acquired: contextvars.ContextVar[Optional[Callable[[], None]]] = contextvars.ContextVar(
+    "rate_limit_on_acquired", default=None
+)
+
+
+class PriorityRateLimiter:
+    """
+    Orçamento de requisições e tokens por minuto com fila por prioridade.
+
+    Os dois orçamentos são baldes de fichas (token buckets) reabastecidos
+    continuamente; a capacidade de cada balde equivale a `burst_seconds` da taxa.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = RATE_LIMIT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = RATE_LIMIT_TOKENS_PER_MINUTE,
+        interactive_reserve: float = RATE_LIMIT_INTERACTIVE_RESERVE,
+        burst_seconds: float = RATE_LIMIT_BURST_SECONDS,
+        recovery_seconds: float = RATE_LIMIT_RECOVERY_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            requests_per_minute (float): Requisições por minuto permitidas
+            tokens_per_minute (float): Tokens por minuto permitidos (0 desativa)
+            interactive_reserve (float): Fração de cada balde reservada para `interactive`
+            burst_seconds (float): Segundos de taxa acumuláveis em cada balde
+            recovery_seconds (float): Tempo para a taxa voltar ao máximo após um 429
+            clock (Callable[[], float]): Relógio monotônico (substituível em testes)
+        """
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._queue: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+
+        self._request_rate = requests_per_minute / 60
+        self._token_rate = tokens_per_minute / 60
+        self._request_capacity = max(1.0, self._request_rate * burst_seconds)
+        self._token_capacity = self._token_rate * burst_seconds
+        self._reserve = interactive_reserve
+        self._recovery_seconds = recovery_seconds
+
+        self._requests = self._request_capacity
+        self._tokens = self._token_capacity
+        self._rate_factor = 1.0
+        self._paused_until = 0.0
+        self._last_refill = clock()
+
+        self._rate_limited = 0
+        self._waits: Dict[str, Deque[float]] = {name: deque(maxlen=1000) for name in PRIORITIES}
+        self._acquired: Dict[str, int] = {name: 0 for name in PRIORITIES}
+        self._waiting: Dict[str, int] = {name: 0 for name in PRIORITIES}
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._last_refill)
+        self._last_refill = now
+        if self._rate_factor < 1.0 and self._recovery_seconds > 0:
+            self._rate_factor = min(1.0, self._rate_factor + elapsed / self._recovery_seconds)
+        self._requests = min(self._request_capacity, self._requests + elapsed * self._request_rate * self._rate_factor)
+        if self._token_rate > 0:
+            self._tokens = min(self._token_capacity, self._tokens + elapsed * self._token_rate * self._rate_factor)
+
+    def _floors(self, priority: str) -> Tuple[float, float]:
+        """Nível mínimo de cada balde que a classe precisa deixar intacto."""
+        if priority == "interactive":
+            return 0.0, 0.0
+        # A reserva nunca impede uma requisição com o balde de requisições cheio
+        request_floor = min(self._reserve * self._request_capacity, self._request_capacity - 1)
+        return request_floor, self._reserve * self._token_capacity
+
+    def _delay(self, priority: str, now: float) -> float:
+        """Tempo até a classe poder ser liberada (0 se puder agora)."""
+        if now < self._paused_until:
+            return self._paused_until - now
+        request_floor, token_floor = self._floors(priority)
+        delays = [0.0]
+        missing_requests = request_floor + 1 - self._requests
+        if missing_requests > 0:
+            delays.append(missing_requests / (self._request_rate * self._rate_factor))
+        if self._token_rate > 0 and self._tokens < token_floor:
+            delays.append((token_floor - self._tokens) / (self._token_rate * self._rate_factor))
+        return max(delays)
+
+    def acquire(self, priority: str = "interactive", blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Aguarda a vez da requisição e desconta uma requisição do orçamento.
+
+        Args:
+            priority (str): Classe de prioridade (`interactive`, `background` ou `batch`)
+            blocking (bool): Se False, retorna imediatamente quando não há capacidade
+            timeout (Optional[float]): Tempo máximo de espera em segundos
+
+        Returns:
+            bool: Se a requisição foi liberada
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Prioridade desconhecida: {priority}")
+
+        entry = (PRIORITIES[priority], next(self._sequence))
+        with self._cond:
+            start = self._clock()
+            heapq.heappush(self._queue, entry)
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = self._clock()
+                    self._refill(now)
+                    delay = self._delay(priority, now) if self._queue[0] == entry else None
+                    if delay == 0.0:
+                        break
+                    if not blocking:
+                        return False
+                    if timeout is not None:
+                        remaining = timeout - (now - start)
+                        if remaining <= 0:
+                            return False
+                        delay = remaining if delay is None else min(delay, remaining)
+                    # Sem previsão (não é a primeira da fila): espera ser notificada
+                    self._cond.wait(delay)
+                self._requests -= 1
+                heapq.heappop(self._queue)
+                waited = self._clock() - start
+                self._waits[priority].append(waited)
+                self._acquired[priority] += 1
+                return True
+            finally:
+                self._waiting[priority] -= 1
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+    def record_tokens(self, tokens: int) -> None:
+        """
+        Desconta do orçamento os tokens consumidos por uma chamada já concluída.
+
+        Args:
+            tokens (int): Tokens de entrada e saída da chamada
+        """
+        if tokens <= 0 or self._token_rate <= 0:
+            return
+        with self._cond:
+            self._refill(self._clock())
+            self._tokens -= tokens
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """
+        Reage a uma resposta 429 do provedor: reduz a taxa e pausa a fila.
+
+        A taxa é reduzida uma vez por janela: um 429 recebido enquanto a fila ainda
+        está pausada por um anterior apenas estende a pausa.
+
+        Args:
+            retry_after (Optional[float]): Segundos indicados pelo provedor (padrão: 1)
+        """
+        with self._cond:
+            now = self._clock()
+            self._refill(now)
+            self._rate_limited += 1
+            new_window = now >= self._paused_until
+            if new_window:
+                self._rate_factor = max(MIN_RATE_FACTOR, self._rate_factor / 2)
+            self._paused_until = max(self._paused_until, now + (retry_after if retry_after is not None else 1.0))
+            self._requests = min(self._requests, 0.0)
+            self._cond.notify_all()
+        if not new_window:
+            return
+        logger.warning(
+            f"Limite de taxa do provedor atingido; taxa reduzida para {self._rate_factor:.0%} "
+            f"e fila pausada por {retry_after if retry_after is not None else 1.0:.1f}s"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna o estado do limitador e o tempo de espera na fila por classe.
+
+        Returns:
+            Dict[str, Any]: Fator de taxa atual, número de 429 e métricas por classe
+        """
+        with self._cond:
+            self._refill(self._clock())
+            classes = {}
+            for name in PRIORITIES:
+                waits = list(self._waits[name])
+                classes[name] = {
+                    "acquired": self._acquired[name],
+                    "waiting": self._waiting[name],
+                    "queue_wait_p50": percentile(waits, 50),
+                    "queue_wait_p95": percentile(waits, 95),
+                    "queue_wait_max": max(waits) if waits else None,
+                }
+            return {
+                "rate_factor": round(self._rate_factor, 3),
+                "rate_limited": self._rate_limited,
+                "available_requests": round(self._requests, 2),
+                "available_tokens": round(self._tokens, 2) if self._token_rate > 0 else None,
+                "classes": classes,
+            }
+
+    def for_priority(self, priority: str) -> "PriorityRateLimiterAdapter":
+        """
+        Cria o adaptador do LangChain para uma classe de prioridade.
+
+        Args:
+            priority (str): Classe de prioridade
+
+        Returns:
+            PriorityRateLimiterAdapter: Limitador a passar em `rate_limiter=` do modelo
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Prioridade desconhecida: {priority}")
+        return PriorityRateLimiterAdapter(self, priority)
+
+
+class PriorityRateLimiterAdapter(BaseRateLimiter):
+    """
+    Adapta o `PriorityRateLimiter` à interface `rate_limiter` dos modelos do LangChain.
+
+    Na classe `interactive`, a espera é limitada ao prazo restante do turno; quando
+    ele termina antes da liberação, `DeadlineExceeded` é levantada.
+    """
+
+    def __init__(self, limiter: PriorityRateLimiter, priority: str):
+        self.limiter = limiter
+        self.priority = priority
+
+    @staticmethod
+    def _granted(acquired: bool) -> bool:
+        callback = on_acquired.get()
+        if acquired and callback is not None:
+            callback()
+        return acquired
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        left = remaining() if self.priority == "interactive" else None
+        timeout = None if left is None else max(0.0, left)
+        acquired = self.limiter.acquire(self.priority, blocking=blocking, timeout=timeout)
+        if blocking and not acquired:
+            raise DeadlineExceeded("Prazo da requisição esgotado na fila do limitador de taxa")
+        return self._granted(acquired)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        if not blocking:
+            return self.acquire(blocking=False)
+        # A espera bloqueia a thread; não pode ocupar o event loop (o contexto, com o
+        # prazo do turno, é copiado para a thread)
+        return await asyncio.to_thread(self.acquire)
+
+
+def estimate_embedding_tokens(texts: List[str]) -> int:
+    """Estimativa dos tokens de uma chamada de embeddings (cerca de 4 caracteres por token)."""
+    return sum(len(text) for text in texts) // 4
+
+
+class RateLimitCallbackHandler(BaseCallbackHandler):
+    """Desconta do orçamento os tokens usados em cada chamada ao modelo."""
+
+    def __init__(self, limiter: PriorityRateLimiter):
+        self.limiter = limiter
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    tokens += usage.get("total_tokens", 0)
+        if not tokens:
+            tokens = ((response.llm_output or {}).get("token_usage") or {}).get("total_tokens", 0)
+        self.limiter.record_tokens(tokens)
+
+
+_lock = threading.Lock()
+_limiter: Optional[PriorityRateLimiter] = None
+
+
+def get_rate_limiter() -> PriorityRateLimiter:
+    """
+    Retorna o limitador de taxa do processo, criando-o no primeiro uso.
+
+    Returns:
+        PriorityRateLimiter: Limitador compartilhado
+    """
+    global _limiter
+    with _lock:
+        if _limiter is None:
+            _limiter = PriorityRateLimiter()
+        return _limiter
+
+
+def parse_retry_after(headers: Any) -> Optional[float]:
+    """
+    Lê o tempo de espera indicado pelo provedor em uma resposta 429.
+
+    Args:
+        headers: Cabeçalhos da resposta
+
+    Returns:
+        Optional[float]: Segundos a esperar, se informados
+    """
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value) * scale
+        except ValueError:
+            continue
+    return None
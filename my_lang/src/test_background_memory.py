@@ -0,0 +1,48 @@
+"""
+Testes para o agendamento do processamento de memória em segundo plano.
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.runnables import RunnableLambda
+from langgraph.store.memory import InMemoryStore
+from langmem import ReflectionExecutor
+
+from src.memory.background import schedule_memory_processing
+
+
+class TestScheduleMemoryProcessing(unittest.TestCase):
+    """Testes para o schedule_memory_processing."""
+
+    def setUp(self):
+        self.processed = []
+        self.done = threading.Semaphore(0)
+
+        def reflect(payload, config):
+            self.processed.append(config["configurable"]["user_id"])
+            self.done.release()
+
+        reflector = RunnableLambda(reflect)
+        reflector.namespace = ("chatbot_memories", "{user_id}")
+        self.executor = ReflectionExecutor(reflector, store=InMemoryStore())
+        self.addCleanup(self.executor.shutdown, wait=False, cancel_futures=True)
+
+    def test_submissions_do_not_cancel_each_other(self):
+        """Cada turno agendado é processado, mesmo com tarefas de vários usuários na fila."""
+        for user_id in ("ana", "bia", "ana"):
+            schedule_memory_processing(self.executor, [{"role": "user", "content": "olá"}], user_id, delay_seconds=0.05)
+
+        for _ in range(3):
+            self.done.acquire(timeout=2.0)
+
+        self.assertEqual(sorted(self.processed), ["ana", "ana", "bia"])
+
+
+if __name__ == "__main__":
+    unittest.main()
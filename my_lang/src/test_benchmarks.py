@@ -0,0 +1,165 @@
+"""
+Testes para o servidor simulado da OpenAI e os benchmarks de latência.
+"""
+
+import inspect
+import json
+import os
+import sys
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.messages import HumanMessage
+
+from src.benchmarks.compare import compare_results
+from src.benchmarks.fake_openai import FakeOpenAIServer, LatencyModel, deterministic_embedding
+from src.benchmarks.store_scaling import format_markdown, measure_point, synthetic_memory
+from src.benchmarks.suite import BASELINE_PATH, BENCHMARKS, run_load, run_suite
+from src.models import create_chat_model, create_embeddings
+
+
+class TestFakeOpenAIServer(unittest.TestCase):
+    """Testes para o servidor compatível com a API da OpenAI."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeOpenAIServer(embedding_dims=32).start()
+        cls.client_kwargs = {"base_url": cls.server.base_url, "api_key": "test", "rate_limiter": None}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_chat_with_and_without_streaming(self):
+        """O ChatOpenAI funciona com o servidor nos dois modos, com o mesmo texto."""
+        model = create_chat_model("gpt-4o-mini", priority="batch", **self.client_kwargs)
+
+        response = model.invoke([HumanMessage(content="olá mundo")])
+        streamed = "".join(chunk.content for chunk in model.stream([HumanMessage(content="olá mundo")]))
+
+        self.assertTrue(response.content.endswith("olá mundo"))
+        self.assertEqual(streamed, response.content)
+        self.assertGreater(response.usage_metadata["total_tokens"], 0)
+
+    def test_questions_call_search_tool(self):
+        """Perguntas geram uma chamada à ferramenta de busca, também em streaming."""
+        def search_memory(query: str) -> str:
+            """Busca memórias."""
+            return query
+
+        model = create_chat_model("gpt-4o-mini", priority="batch", **self.client_kwargs).bind_tools([search_memory])
+        chunks = list(model.stream([HumanMessage(content="do que eu gosto?")]))
+        message = chunks[0]
+        for chunk in chunks[1:]:
+            message += chunk
+
+        self.assertEqual(message.tool_calls[0]["name"], "search_memory")
+        self.assertEqual(message.tool_calls[0]["args"], {"query": "do que eu gosto?"})
+
+    def test_embeddings_are_deterministic(self):
+        """O mesmo texto gera sempre o mesmo vetor unitário."""
+        embeddings = create_embeddings(
+            "openai:text-embedding-3-small",
+            base_url=self.server.base_url,
+            api_key="test",
+            check_embedding_ctx_length=False,
+        )
+        first, second = embeddings.embed_documents(["gosto de café", "carro azul"])
+
+        self.assertEqual(len(first), 32)
+        self.assertEqual(embeddings.embed_query("gosto de café"), first)
+        self.assertAlmostEqual(sum(value * value for value in second), 1.0)
+        self.assertEqual(first, deterministic_embedding("gosto de café", 32))
+
+
+class TestLatencyModel(unittest.TestCase):
+    """Testes para as distribuições de latência."""
+
+    def test_parse(self):
+        """As distribuições são lidas do formato da linha de comando."""
+        self.assertEqual(LatencyModel.parse("0.2").sample(), 0.2)
+        uniform = LatencyModel.parse("uniform:0.1:0.3", seed=1)
+        self.assertTrue(all(0.1 <= uniform.sample() <= 0.3 for _ in range(100)))
+        with self.assertRaises(ValueError):
+            LatencyModel.parse("gamma:1:2")
+
+
+class TestSuite(unittest.TestCase):
+    """Testes para o executor dos benchmarks e a comparação com a linha de base."""
+
+    def test_run_load_counts_errors(self):
+        """Falhas são contadas e não entram nos percentis."""
+        def operation(index):
+            if index % 5 == 0:
+                raise RuntimeError("falhou")
+
+        result = run_load(operation, requests=20, concurrency=4)
+
+        self.assertEqual(result["errors"], 4)
+        self.assertIn("RuntimeError", result["first_error"])
+        self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+
+    def test_small_suite_run(self):
+        """Uma rodada curta mede todos os benchmarks sem erros."""
+        report = run_suite(requests=4, concurrency=2, chat_latency="0", embedding_latency="0",
+                           token_interval=0, users=2, warmup=1)
+
+        self.assertEqual(set(report["results"]), {
+            "store_put", "store_search", "prompt_with_memories", "agent_chat", "api_chat",
+        })
+        for name, result in report["results"].items():
+            self.assertEqual(result["errors"], 0, result.get("first_error"))
+            self.assertGreater(result["throughput_rps"], 0, name)
+
+    def test_compare_flags_regressions(self):
+        """Latência acima da tolerância e vazão abaixo dela são regressões."""
+        baseline = {"results": {"chat": {"p50_ms": 100.0, "p95_ms": 200.0, "p99_ms": 2.0, "throughput_rps": 10.0}}}
+        current = {"results": {"chat": {"p50_ms": 110.0, "p95_ms": 300.0, "p99_ms": 4.0, "throughput_rps": 7.0}}}
+
+        rows = {row["metric"]: row for row in compare_results(baseline, current, tolerance=20, min_delta_ms=5)}
+
+        self.assertFalse(rows["p50_ms"]["regression"])
+        self.assertTrue(rows["p95_ms"]["regression"])
+        # +100%, mas só 2 ms: dentro da folga absoluta
+        self.assertFalse(rows["p99_ms"]["regression"])
+        self.assertTrue(rows["throughput_rps"]["regression"])
+
+    def test_committed_baseline_matches_suite(self):
+        """A linha de base versionada cobre todos os benchmarks, com os parâmetros padrão."""
+        with open(BASELINE_PATH, encoding="utf-8") as file:
+            baseline = json.load(file)
+
+        self.assertEqual(set(baseline["results"]), set(BENCHMARKS))
+        self.assertTrue(all(result["errors"] == 0 for result in baseline["results"].values()))
+        defaults = inspect.signature(run_suite).parameters
+        for name, value in baseline["settings"].items():
+            if name in defaults:
+                self.assertEqual(value, defaults[name].default, name)
+        self.assertFalse(any(row["regression"] for row in compare_results(baseline, baseline)))
+
+
+class TestStoreScaling(unittest.TestCase):
+    """Testes para o benchmark de escala do armazenamento."""
+
+    def test_synthetic_memories_are_distinct(self):
+        """Índices distintos geram textos distintos, sempre os mesmos."""
+        texts = [synthetic_memory(index) for index in range(5000)]
+
+        self.assertEqual(len(set(texts)), len(texts))
+        self.assertEqual(synthetic_memory(1234), texts[1234])
+
+    def test_measure_in_memory_point(self):
+        """Um ponto pequeno mede escrita, busca e memória residente."""
+        point = measure_point("memory", memories=300, per_user=50, dims=16, batch_size=100, queries=10, global_queries=2)
+
+        self.assertEqual(point["users"], 6)
+        self.assertGreater(point["put_throughput_per_s"], 0)
+        self.assertIsNone(point["index_build_s"])
+        self.assertEqual(point["search_user"]["queries"], 10)
+        self.assertIn("| memory | 300 | 50 |", format_markdown([point]))
+
+
+if __name__ == "__main__":
+    unittest.main()
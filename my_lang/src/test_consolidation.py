@@ -0,0 +1,166 @@
+"""
+Testes para a consolidação de memórias duplicadas.
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from langgraph.store.memory import InMemoryStore
+
+from src.agent.fake_model import FakeChatModel
+from src.benchmarks.store_scaling import DeterministicEmbeddings
+from src.memory import consolidation
+from src.memory.consolidation import cluster_memories, memory_text, namespace_lock, run_consolidation
+from src.memory.retrieval import MemoryCache
+from src.memory.sqlite_store import SQLiteStore
+
+
+def memory(text: str) -> dict:
+    return {"kind": "Memory", "content": {"content": text}}
+
+
+class CountingEmbeddings(DeterministicEmbeddings):
+    """Embeddings determinísticos que contam os textos embutidos."""
+
+    def __init__(self, dims: int):
+        super().__init__(dims)
+        self.texts = 0
+
+    def embed_documents(self, texts):
+        self.texts += len(texts)
+        return super().embed_documents(texts)
+
+
+class ConcurrentWriterModel(FakeChatModel):
+    """Modelo que, durante a combinação, simula a reflexão regravando uma das duplicatas."""
+
+    store: object = None
+
+    def _generate(self, messages, *args, **kwargs):
+        self.store.put(("chatbot_memories", "u1"), "antiga", memory("O usuário mora em Lisboa há 3 anos"))
+        return super()._generate(messages, *args, **kwargs)
+
+
+class TestConsolidation(unittest.TestCase):
+    """Testes da consolidação sobre um InMemoryStore."""
+
+    def setUp(self):
+        self.embeddings = CountingEmbeddings(64)
+        self.store = self.create_store()
+        self.namespace = ("chatbot_memories", "u1")
+        # Gravadas em ordem: a última repetição é a mais recente
+        for key, text in [
+            ("antiga", "O usuário mora em Lisboa"),
+            ("cafe", "O usuário prefere café sem açúcar"),
+            ("repetida", "o usuário mora em lisboa"),
+            ("recente", "O usuário mora em Lisboa"),
+        ]:
+            self.store.put(self.namespace, key, memory(text))
+            time.sleep(0.001)
+        self.store.put(self.namespace, "perfil", {"content": {"nome": "Ana"}})
+        self.store.put(("chatbot_memories", "u2"), "unica", {"content": "O usuário gosta de jazz"})
+
+    def create_store(self):
+        return InMemoryStore(index={"dims": 64, "embed": self.embeddings})
+
+    def keys(self, namespace):
+        return sorted(item.key for item in self.store.search(namespace, limit=100))
+
+    def test_cluster_memories(self):
+        """Cada grupo começa pela primeira linha (a mais recente) e só junta vetores próximos."""
+        vectors = np.array([[1.0, 0.0], [0.0, 1.0], [0.99, 0.05], [2.0, 0.0]])
+
+        self.assertEqual(cluster_memories(vectors, threshold=0.95), [[0, 2, 3], [1]])
+        self.assertEqual(memory_text(memory("texto")), "texto")
+        self.assertEqual(memory_text({"content": "texto"}), "texto")
+        self.assertIsNone(memory_text({"content": {"nome": "Ana"}}))
+
+    def test_keeps_most_recent_and_reports_reclaimed(self):
+        """As duplicatas mais antigas são apagadas e a execução informa quantas foram recuperadas."""
+        embedded = self.embeddings.texts
+        cache = MemoryCache()
+        cache.put(self.namespace, ["memórias antigas"])
+        report = run_consolidation(self.store, embeddings=self.embeddings, threshold=0.95, memory_cache=cache)
+
+        # Os vetores gravados pelo armazenamento são reaproveitados
+        self.assertEqual(self.embeddings.texts, embedded)
+        self.assertIsNone(cache.get(self.namespace))
+
+        self.assertEqual(report["users"], 2)
+        self.assertEqual(report["memories"], 6)
+        self.assertEqual(report["clusters"], 1)
+        self.assertEqual(report["reclaimed"], 2)
+        self.assertEqual(self.keys(self.namespace), ["cafe", "perfil", "recente"])
+        self.assertEqual(self.keys(("chatbot_memories", "u2")), ["unica"])
+
+        # Sem memórias novas, a próxima execução pula os usuários
+        again = run_consolidation(self.store, embeddings=self.embeddings, threshold=0.95)
+        self.assertEqual(again["skipped_users"], 2)
+        self.assertEqual(again["reclaimed"], 0)
+
+    def test_dry_run_does_not_write(self):
+        """No modo de simulação, nada é apagado nem marcado como consolidado."""
+        report = run_consolidation(self.store, embeddings=self.embeddings, threshold=0.95, dry_run=True)
+
+        self.assertEqual(report["reclaimed"], 2)
+        self.assertEqual(len(self.keys(self.namespace)), 5)
+        self.assertEqual(run_consolidation(self.store, embeddings=self.embeddings, threshold=0.95)["reclaimed"], 2)
+
+    def test_concurrent_writes_are_not_overwritten(self):
+        """Uma memória alterada durante a execução não é apagada."""
+        model = ConcurrentWriterModel(tool_call_policy=None, store=self.store)
+        report = run_consolidation(self.store, embeddings=self.embeddings, threshold=0.95, model=model)
+
+        self.assertEqual(report["conflicts"], 1)
+        self.assertEqual(report["reclaimed"], 1)
+        self.assertIn("3 anos", memory_text(self.store.get(self.namespace, "antiga").value))
+        self.assertIsNone(self.store.get(self.namespace, "repetida"))
+
+    def test_waits_for_reflection_holding_namespace_lock(self):
+        """A consolidação espera a reflexão em andamento no namespace e respeita o que ela gravou."""
+        reports = []
+        with namespace_lock(self.namespace):
+            worker = threading.Thread(
+                target=lambda: reports.append(run_consolidation(self.store, embeddings=self.embeddings, threshold=0.95))
+            )
+            worker.start()
+            # Espera a consolidação chegar ao lock antes de a "reflexão" gravar
+            while consolidation._namespace_locks[self.namespace][1] < 2:
+                time.sleep(0.001)
+            self.store.put(self.namespace, "antiga", memory("O usuário mora em Lisboa há 3 anos"))
+        worker.join(5)
+
+        self.assertEqual(reports[0]["conflicts"], 1)
+        self.assertIn("3 anos", memory_text(self.store.get(self.namespace, "antiga").value))
+        self.assertEqual(consolidation._namespace_locks, {})
+
+    def test_merge_model_rewrites_canonical(self):
+        """Com um modelo, a memória canônica recebe o texto combinado do grupo."""
+        model = FakeChatModel(tool_call_policy=None)
+        report = run_consolidation(self.store, embeddings=self.embeddings, threshold=0.95, model=model)
+
+        self.assertEqual(report["rewritten"], 1)
+        merged = self.store.get(self.namespace, "recente").value
+        self.assertEqual(merged["kind"], "Memory")
+        self.assertIn("Lisboa", merged["content"]["content"])
+        self.assertTrue(merged["content"]["content"].startswith("Resposta"))
+
+
+class TestSQLiteConsolidation(TestConsolidation):
+    """Os mesmos testes sobre o SQLiteStore, que também guarda os vetores."""
+
+    def create_store(self):
+        store = SQLiteStore(":memory:", index={"dims": 64, "embed": self.embeddings})
+        self.addCleanup(store.close)
+        return store
+
+
+if __name__ == "__main__":
+    unittest.main()
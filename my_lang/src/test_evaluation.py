@@ -0,0 +1,72 @@
+"""
+Testes para o harness de avaliação de prompts com o modelo simulado.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langgraph.store.memory import InMemoryStore
+
+from src.agent.evaluation import evaluate_prompts, load_corpus, token_f1
+from src.agent.fake_model import FakeChatModel
+
+
+class TestEvaluationHarness(unittest.TestCase):
+    """Testes para o evaluate_prompts."""
+
+    def setUp(self):
+        corpus = [
+            {"id": "c1", "user_id": "u1", "turns": [
+                {"message": "Meu nome é Ana.", "expected": "Resposta Meu nome é Ana"},
+                {"message": "Qual é o meu nome?"},
+            ]},
+            {"id": "c2", "turns": ["Gosto de jazz.", "Do que eu gosto?"]},
+        ]
+        handle, self.corpus_path = tempfile.mkstemp(suffix=".jsonl")
+        with os.fdopen(handle, "w", encoding="utf-8") as corpus_file:
+            for conversation in corpus:
+                corpus_file.write(json.dumps(conversation, ensure_ascii=False) + "\n")
+
+    def tearDown(self):
+        os.remove(self.corpus_path)
+
+    def test_offline_comparison(self):
+        """Os dois prompts são avaliados offline e as diferenças reportadas."""
+        corpus = load_corpus(self.corpus_path)
+        self.assertEqual(corpus[1]["turns"][0], {"message": "Gosto de jazz."})
+
+        report = evaluate_prompts(
+            corpus,
+            {"baseline": "Seja breve.", "candidate": "Seja muito detalhado. " * 40},
+            model_factory=lambda: FakeChatModel(latency=0.001),
+            store_factory=InMemoryStore,
+            concurrency=4,
+        )
+
+        baseline = report["prompts"]["baseline"]
+        candidate = report["prompts"]["candidate"]
+        self.assertEqual(baseline["turns"], 4)
+        self.assertEqual(baseline["errors"], 0)
+        # As duas perguntas do corpus disparam uma busca de memória cada
+        self.assertEqual(baseline["tool_calls_per_turn"], 0.5)
+        self.assertIsNotNone(baseline["latency_p95"])
+        self.assertIsNotNone(baseline["quality"])
+        # Um prompt mais longo custa mais tokens por turno
+        self.assertGreater(report["delta"]["candidate"]["tokens_per_turn"], 0)
+        self.assertGreater(candidate["tokens_per_turn"], baseline["tokens_per_turn"])
+
+    def test_token_f1(self):
+        """A nota padrão compara as palavras com a resposta esperada."""
+        self.assertEqual(token_f1("", "olá mundo", "olá mundo"), 1.0)
+        self.assertEqual(token_f1("", "nada", "olá"), 0.0)
+        self.assertIsNone(token_f1("", "olá", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,192 @@
+"""
+Testes para os prazos por requisição e as tentativas de cobertura do modelo.
+"""
+
+import itertools
+import os
+import sys
+import time
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+from langgraph.store.memory import InMemoryStore
+
+from src.agent.chat_agent import chat, create_chat_agent
+from src.agent.fake_model import FakeChatModel
+from src.agent.hedging import HedgedChatModel, HedgeStats
+from src.api.routes import create_api
+from src.deadlines import DeadlineExceeded, deadline_scope, remaining
+from src.rate_limiter import PriorityRateLimiter
+
+
+def _sequence(*delays):
+    """Latência do modelo simulado: um valor por chamada, na ordem."""
+    values = itertools.chain(delays, itertools.repeat(delays[-1]))
+    return lambda: next(values)
+
+
+class StreamingModel(FakeChatModel):
+    """Modelo simulado que transmite a resposta em pedaços.
+
+    A primeira chamada pode falhar depois do primeiro pedaço (`fail_first`); com
+    `empty`, o streaming termina sem nenhum pedaço. Cada chamada guarda o prazo
+    restante visto pela tentativa.
+    """
+
+    fail_first: bool = False
+    empty: bool = False
+    calls: list = []
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls.append(remaining())
+        if self.empty:
+            return
+        yield ChatGenerationChunk(message=AIMessageChunk(content="Resposta "))
+        if self.fail_first and len(self.calls) == 1:
+            raise ConnectionError("conexão encerrada")
+        yield ChatGenerationChunk(message=AIMessageChunk(content="completa"))
+
+
+class TestHedgedChatModel(unittest.TestCase):
+    """Testes para o HedgedChatModel."""
+
+    def test_deadline_interrupts_slow_call(self):
+        """Uma chamada lenta é abandonada quando o prazo do turno termina."""
+        stats = HedgeStats()
+        model = HedgedChatModel(model=FakeChatModel(latency=2.0), stats=stats)
+
+        start = time.perf_counter()
+        with deadline_scope(0.1):
+            with self.assertRaises(DeadlineExceeded):
+                model.invoke("olá")
+
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(stats.snapshot()["deadline_exceeded"], 1)
+
+    def test_nested_scope_never_extends_deadline(self):
+        """Um prazo interno maior não estende o prazo do turno."""
+        with deadline_scope(1.0):
+            with deadline_scope(60.0):
+                self.assertLess(remaining(), 1.0)
+        self.assertIsNone(remaining())
+
+    def test_slow_first_attempt_is_hedged(self):
+        """Sem primeiro token dentro do limiar, a segunda tentativa responde."""
+        stats = HedgeStats()
+        for _ in range(20):
+            stats.record_ttft(0.01)
+        model = HedgedChatModel(
+            model=FakeChatModel(latency=_sequence(2.0, 0.01)),
+            hedge_enabled=True,
+            hedge_min_delay=0.05,
+            stats=stats,
+        )
+
+        start = time.perf_counter()
+        response = model.invoke("Qual é a capital?")
+
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertIn("Qual é a capital?", response.content)
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot["hedged"], 1)
+        self.assertEqual(snapshot["hedge_wins"], 1)
+        self.assertGreater(snapshot["extra_input_tokens"], 0)
+
+    def test_no_hedge_without_samples(self):
+        """Sem histórico de tempos, nenhuma tentativa extra é disparada."""
+        stats = HedgeStats()
+        model = HedgedChatModel(model=FakeChatModel(latency=0.05), hedge_enabled=True, stats=stats)
+
+        model.invoke("olá")
+
+        self.assertEqual(stats.snapshot()["hedged"], 0)
+        self.assertEqual(stats.snapshot()["calls"], 1)
+
+    def test_attempts_see_caller_context(self):
+        """A tentativa roda com o prazo do turno do chamador."""
+        model = StreamingModel(calls=[])
+
+        with deadline_scope(5.0):
+            response = HedgedChatModel(model=model, stats=HedgeStats()).invoke("olá")
+
+        self.assertEqual(response.content, "Resposta completa")
+        self.assertIsNotNone(model.calls[0])
+        self.assertLessEqual(model.calls[0], 5.0)
+
+    def test_mid_stream_failure_falls_back(self):
+        """Se a tentativa mantida falha no meio da resposta, uma nova tentativa responde."""
+        stats = HedgeStats()
+        model = StreamingModel(fail_first=True, calls=[])
+
+        response = HedgedChatModel(model=model, stats=stats).invoke("olá")
+
+        self.assertEqual(response.content, "Resposta completa")
+        self.assertEqual(len(model.calls), 2)
+        self.assertEqual(stats.snapshot()["fallbacks"], 1)
+
+    def test_rate_limiter_wait_is_not_ttft(self):
+        """A espera na fila do limitador não conta no tempo até o primeiro token nem dispara cobertura."""
+        stats = HedgeStats()
+        for _ in range(20):
+            stats.record_ttft(0.01)
+        limiter = PriorityRateLimiter(requests_per_minute=6000)
+        limiter.on_rate_limited(retry_after=0.3)
+        model = HedgedChatModel(
+            model=StreamingModel(calls=[], rate_limiter=limiter.for_priority("interactive")),
+            hedge_enabled=True,
+            hedge_min_delay=0.05,
+            stats=stats,
+        )
+
+        start = time.perf_counter()
+        response = model.invoke("olá")
+
+        self.assertGreaterEqual(time.perf_counter() - start, 0.25)
+        self.assertEqual(response.content, "Resposta completa")
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot["hedged"], 0)
+        self.assertLess(max(stats._ttft), 0.2)
+
+    def test_empty_stream_raises_error(self):
+        """Um streaming sem conteúdo levanta uma exceção de verdade."""
+        model = HedgedChatModel(model=StreamingModel(empty=True, calls=[]), stats=HedgeStats())
+
+        with self.assertRaises(Exception) as raised:
+            model.invoke("olá")
+
+        self.assertNotIsInstance(raised.exception, TypeError)
+
+
+class TestChatDeadline(unittest.TestCase):
+    """Testes para o prazo do turno de ponta a ponta."""
+
+    def setUp(self):
+        model = HedgedChatModel(model=FakeChatModel(latency=1.0), stats=HedgeStats())
+        self.components = create_chat_agent(
+            store=InMemoryStore(),
+            enable_background_memory=False,
+            enable_user_profiles=False,
+            model=model,
+        )
+
+    def test_chat_raises_on_deadline(self):
+        """O chat() propaga o prazo esgotado em vez de devolver uma mensagem de erro."""
+        with self.assertRaises(DeadlineExceeded):
+            chat(self.components["agent"], "olá", timeout_seconds=0.1)
+
+    def test_chat_endpoint_returns_504(self):
+        """O /chat responde 504 quando o prazo informado termina."""
+        client = TestClient(create_api(agent=self.components["agent"]))
+
+        response = client.post("/chat", json={"message": "olá", "timeout_ms": 100})
+
+        self.assertEqual(response.status_code, 504)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+"""
+Testes para os clientes HTTP compartilhados pelos modelos.
+"""
+
+import os
+import sys
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-teste")
+
+from src.config import HTTP_MAX_CONNECTIONS
+from src.http_client import close_http_clients, get_async_http_client, get_http_client
+from src.models import create_chat_model, create_embeddings
+
+
+class TestSharedHttpClient(unittest.TestCase):
+    """Testes para o get_http_client e as fábricas de modelos."""
+
+    def tearDown(self):
+        close_http_clients()
+
+    def test_client_is_shared(self):
+        """O mesmo cliente é devolvido a cada chamada, com os limites configurados."""
+        client = get_http_client()
+        self.assertIs(get_http_client(), client)
+        self.assertEqual(client._transport._pool._max_connections, HTTP_MAX_CONNECTIONS)
+
+    def test_models_reuse_the_process_clients(self):
+        """Modelos de chat e de embeddings usam os mesmos clientes HTTP."""
+        # Modelos interativos vêm envolvidos pelo HedgedChatModel
+        chat_model = create_chat_model("gpt-4o-mini").model
+        profile_model = create_chat_model("openai:gpt-4o-mini", priority="background", temperature=0)
+        embeddings = create_embeddings("openai:text-embedding-3-small").embeddings
+
+        for model in (chat_model, profile_model, embeddings):
+            self.assertIs(model.http_client, get_http_client())
+            self.assertIs(model.http_async_client, get_async_http_client())
+        self.assertEqual(profile_model.model_name, "gpt-4o-mini")
+
+    def test_closed_client_is_recreated(self):
+        """Depois de fechado, um novo cliente é criado no próximo uso."""
+        client = get_http_client()
+        close_http_clients()
+        self.assertTrue(client.is_closed)
+        self.assertIsNot(get_http_client(), client)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+"""
+Testes para a ingestão em lote de conversas.
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langgraph.store.memory import InMemoryStore
+from langmem import create_memory_manager
+
+from src.agent.fake_model import FakeChatModel
+from src.benchmarks.store_scaling import DeterministicEmbeddings
+from src.ingest import ConversationIngestor, iter_conversations, load_progress, save_progress
+from src.memory.profiles import create_profile_manager
+
+
+class CountingEmbeddings(DeterministicEmbeddings):
+    """Embeddings determinísticos que registram o tamanho de cada chamada."""
+
+    def __init__(self, dims: int):
+        super().__init__(dims)
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(len(texts))
+        return super().embed_documents(texts)
+
+
+def extraction_policy(messages, tool_names):
+    """Extrai o item citado na conversa como memória e um perfil fixo."""
+    if any(message.type == "ai" for message in messages):
+        return None
+    if "Memory" in tool_names:
+        item = re.findall(r"item \d+", str(messages[-1].content))
+        return {"name": "Memory", "args": {"content": f"Gosta do {item[-1] if item else 'nada'}"}}
+    if "UserProfile" in tool_names:
+        return {"name": "UserProfile", "args": {"name": "Ana", "interests": ["café"]}}
+    return None
+
+
+def write_jsonl(directory, conversations):
+    path = os.path.join(directory, "conversas.jsonl")
+    with open(path, "w", encoding="utf-8") as file:
+        for conversation in conversations:
+            file.write((conversation if isinstance(conversation, str) else json.dumps(conversation)) + "\n")
+    return path
+
+
+class TestIterConversations(unittest.TestCase):
+    """Testes para a leitura em streaming."""
+
+    def test_jsonl_offsets_allow_resuming(self):
+        """Cada conversa traz a posição final, e ler a partir dela continua na próxima."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_jsonl(directory, [
+                {"id": "c1", "user_id": "ana", "messages": [{"role": "user", "content": "Oi"}]},
+                "isto não é json",
+                {"id": "c3", "user_id": "bia", "turns": [{"message": "Oi", "response": "Olá!"}]},
+            ])
+            conversations = list(iter_conversations(path))
+            resumed = list(iter_conversations(path, start=conversations[0]["end"]))
+
+        self.assertEqual([c["id"] for c in resumed], [c["id"] for c in conversations[1:]])
+        self.assertIn("error", conversations[1])
+        self.assertEqual(conversations[2]["messages"][1], {"role": "assistant", "content": "Olá!"})
+
+    def test_csv_groups_consecutive_rows(self):
+        """As linhas de cada conversa viram uma conversa, com campos de várias linhas."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "conversas.csv")
+            with open(path, "w", encoding="utf-8", newline="") as file:
+                file.write("conversation_id,user_id,role,content\n")
+                file.write('c1,ana,user,"Oi,\ntudo bem?"\n')
+                file.write("c1,ana,assistant,Tudo!\n")
+                file.write("c2,bia,user,Gosto de chá\n")
+            conversations = list(iter_conversations(path))
+            resumed = list(iter_conversations(path, start=conversations[0]["end"]))
+
+        self.assertEqual([c["id"] for c in conversations], ["c1", "c2"])
+        self.assertEqual(conversations[0]["messages"][0]["content"], "Oi,\ntudo bem?")
+        self.assertEqual(len(conversations[0]["messages"]), 2)
+        self.assertEqual([c["id"] for c in resumed], ["c2"])
+
+
+class TestConversationIngestor(unittest.TestCase):
+    """Testes para a extração e gravação em lote."""
+
+    def setUp(self):
+        self.embeddings = CountingEmbeddings(16)
+        self.store = InMemoryStore(index={"dims": 16, "embed": self.embeddings})
+        model = FakeChatModel(tool_call_policy=extraction_policy)
+        self.ingestor = ConversationIngestor(
+            self.store,
+            memory_manager=create_memory_manager(model),
+            profile_manager=create_profile_manager(model=model),
+            concurrency=4,
+            batch_size=5,
+            query_limit=0,
+        )
+
+    def conversations(self, count):
+        return [
+            {"id": f"c{i}", "user_id": f"u{i % 3}", "messages": [{"role": "user", "content": f"Gosto do item {i}"}]}
+            for i in range(count)
+        ]
+
+    def test_memories_and_profiles_are_written_in_batches(self):
+        """Memórias são gravadas em lotes (uma chamada de embeddings por lote) e perfis salvos."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_jsonl(directory, self.conversations(12))
+            snapshots = []
+            progress = self.ingestor.run(iter_conversations(path), on_progress=lambda p: snapshots.append(dict(p)))
+            size = os.path.getsize(path)
+
+        self.assertEqual(progress["conversations"], 12)
+        self.assertEqual(progress["memories"], 12)
+        self.assertEqual(progress["profiles"], 12)
+        self.assertEqual(progress["offset"], size)
+        self.assertLessEqual(len(self.embeddings.calls), 4)
+        self.assertEqual(len(self.store.search(("chatbot_memories", "u0"), limit=100)), 4)
+        profile = self.store.get(("user_profiles", "u1"), "profile")
+        self.assertEqual(profile.value["content"]["name"], "Ana")
+        offsets = [snapshot["offset"] for snapshot in snapshots]
+        self.assertEqual(offsets, sorted(offsets))
+
+    def test_failures_are_recorded_and_reprocessing_overwrites(self):
+        """Conversas com erro vão para o arquivo de erros; repetir a ingestão não duplica memórias."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_jsonl(directory, self.conversations(3) + [{"id": "sem_usuario", "messages": []}])
+            self.ingestor.errors_path = os.path.join(directory, "erros.jsonl")
+            first = self.ingestor.run(iter_conversations(path))
+            second = self.ingestor.run(iter_conversations(path))
+            with open(self.ingestor.errors_path, encoding="utf-8") as file:
+                errors = [json.loads(line) for line in file]
+
+        self.assertEqual(first["failed"], 1)
+        self.assertEqual(second["conversations"], 4)
+        self.assertIn("ValueError", errors[0]["error"])
+        self.assertEqual(len(self.store.search(("chatbot_memories", "u0"), limit=100)), 1)
+
+    def test_progress_round_trip(self):
+        """O progresso salvo só é retomado para o mesmo arquivo."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "progresso.json")
+            save_progress(path, {"source": os.path.abspath("a.jsonl"), "offset": 10, "conversations": 1})
+
+            self.assertEqual(load_progress(path, "a.jsonl")["offset"], 10)
+            self.assertIsNone(load_progress(path, "b.jsonl"))
+
+
+if __name__ == "__main__":
+    unittest.main()
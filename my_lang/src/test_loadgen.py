@@ -0,0 +1,184 @@
+"""
+Testes para o gerador de carga da CLI.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.instrumentation import BACKGROUND_RUN_SECONDS
+from src.loadgen import HttpTarget, InProcessTarget, LoadGenerator, add_arguments, format_report, run_from_args
+
+CORPUS = [
+    {"id": "c1", "user_id": "ana", "turns": [{"message": "Oi, gosto de café."}, {"message": "Do que eu gosto?"}]},
+    {"id": "c2", "user_id": "bruno", "turns": [{"message": "Tenho um carro azul."}]},
+]
+
+
+class RecordingTarget:
+    """Alvo que registra os turnos e falha nas mensagens marcadas."""
+
+    def __init__(self, delay: float = 0.0, fail_on: str = ""):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def send(self, message, user_id, thread_id):
+        time.sleep(self.delay)
+        with self._lock:
+            self.calls.append((message, user_id, thread_id))
+        if self.fail_on and self.fail_on in message:
+            raise TimeoutError(message)
+
+    def queue_depth(self):
+        return 3.0
+
+
+class TestLoadGenerator(unittest.TestCase):
+    """Testes para os modelos de chegada e o relatório."""
+
+    def test_closed_loop_replays_conversations_in_order(self):
+        """Cada usuário simulado reproduz sua conversa em ordem, em uma thread própria."""
+        target = RecordingTarget()
+        report = LoadGenerator(target, CORPUS, sample_interval=0.05).run_closed(users=3, iterations=2)
+
+        self.assertEqual(report["sessions"], 6)
+        self.assertEqual(report["turns"], 9)
+        self.assertEqual(report["errors"], 0)
+        by_thread = {}
+        for message, user_id, thread_id in target.calls:
+            by_thread.setdefault(thread_id, []).append((message, user_id))
+        self.assertEqual(len(by_thread), 6)
+        for turns in by_thread.values():
+            self.assertEqual(len({user_id for _, user_id in turns}), 1)
+            if len(turns) == 2:
+                self.assertEqual([message for message, _ in turns], ["Oi, gosto de café.", "Do que eu gosto?"])
+        self.assertEqual(report["timeline"][-1]["completed"], 9)
+        self.assertEqual(report["timeline"][-1]["queue_depth"], 3.0)
+
+    def test_errors_are_counted_by_kind(self):
+        """Falhas entram na taxa de erros e ficam fora dos percentis de latência."""
+        report = LoadGenerator(RecordingTarget(fail_on="carro"), CORPUS).run_closed(users=2)
+
+        self.assertEqual(report["turns"], 3)
+        self.assertEqual(report["errors_by_kind"], {"TimeoutError": 1})
+        self.assertAlmostEqual(report["error_rate"], 0.3333)
+        self.assertIn("TimeoutError", format_report(report))
+
+    def test_open_loop_keeps_arrival_rate_when_target_is_slow(self):
+        """No circuito aberto as sessões chegam no ritmo programado mesmo com respostas lentas."""
+        target = RecordingTarget(delay=0.2)
+        start = time.monotonic()
+        report = LoadGenerator(target, CORPUS, seed=1).run_open(rate=50, sessions=10)
+
+        self.assertEqual(report["sessions"], 10)
+        self.assertEqual(report["arrival_model"], "open")
+        self.assertIn("start_lag_ms", report)
+        # Sessões em série levariam pelo menos 10 * 0,2 s
+        self.assertLess(time.monotonic() - start, 1.5)
+
+    def test_open_loop_requires_a_limit(self):
+        """Sem duração nem número de sessões, as chegadas não terminariam."""
+        with self.assertRaises(ValueError):
+            LoadGenerator(RecordingTarget(), CORPUS).run_open(rate=1)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(503 if self.server.fail else 200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b'{"response": "ok"}')
+
+    def do_GET(self):
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"# TYPE chatbot_background_queue_depth gauge\nchatbot_background_queue_depth 7.0\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHttpTarget(unittest.TestCase):
+    """Testes para o alvo HTTP."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _MetricsHandler)
+        self.server.fail = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.target = HttpTarget(f"http://127.0.0.1:{self.server.server_port}/")
+
+    def tearDown(self):
+        self.target.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_status_errors_and_queue_depth(self):
+        """Status diferentes de 200 viram erros `http_<status>` e a fila vem do `/metrics`."""
+        self.assertEqual(self.target.queue_depth(), 7.0)
+        self.assertEqual(LoadGenerator(self.target, CORPUS).run_closed(users=1)["errors"], 0)
+
+        self.server.fail = True
+        report = LoadGenerator(self.target, CORPUS).run_closed(users=1)
+
+        self.assertEqual(report["errors_by_kind"], {"http_503": 2})
+
+
+class TestInProcessTarget(unittest.TestCase):
+    """Testes com o agente local e o modelo simulado."""
+
+    def test_fake_agent_run_from_cli_arguments(self):
+        """O subcomando roda offline, com memória em segundo plano, e grava o relatório."""
+        with tempfile.TemporaryDirectory() as directory:
+            corpus_path = os.path.join(directory, "corpus.jsonl")
+            output_path = os.path.join(directory, "report.json")
+            with open(corpus_path, "w", encoding="utf-8") as file:
+                for conversation in CORPUS:
+                    file.write(json.dumps(conversation, ensure_ascii=False) + "\n")
+
+            parser = argparse.ArgumentParser()
+            add_arguments(parser)
+            args = parser.parse_args([
+                corpus_path, "--fake", "--users", "2", "--sample-interval", "0.05", "--output", output_path,
+            ])
+            exit_code = run_from_args(args)
+
+            with open(output_path, encoding="utf-8") as file:
+                report = json.load(file)
+
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(report["turns"], 3)
+        self.assertIsNotNone(report["timeline"][-1]["queue_depth"])
+
+    def test_every_turn_is_processed_in_background(self):
+        """Turnos seguidos não cancelam o processamento dos anteriores, e o encerramento conclui a fila."""
+        def runs():
+            return sum(BACKGROUND_RUN_SECONDS.labels(status=status).count for status in ("ok", "error"))
+
+        target = InProcessTarget(fake=True)
+        before = runs()
+        target.send("Gosto de café.", user_id="ana", thread_id="t1")
+        target.send("Gosto de chá.", user_id="ana", thread_id="t1")
+        target.send("Tenho um carro azul.", user_id="bruno", thread_id="t2")
+
+        closer = threading.Thread(target=target.close, daemon=True)
+        closer.start()
+        closer.join(timeout=60)
+
+        self.assertFalse(closer.is_alive())
+        self.assertEqual(runs() - before, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+"""
+Testes para o logging em fila com formato JSON, limites de taxa e amostragem.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.logging_setup import (
+    LOG_RECORDS_DROPPED,
+    NonBlockingQueueHandler,
+    RateLimitFilter,
+    SamplingFilter,
+    configure_logging,
+    parse_sample_rates,
+    shutdown_logging,
+)
+from src.tracing import InMemoryExporter, Tracer
+
+
+def make_record(name="test", level=logging.INFO, msg="mensagem"):
+    """Cria um registro de log avulso."""
+    return logging.LogRecord(name, level, __file__, 1, msg, None, None)
+
+
+class FakeClock:
+    """Relógio controlado pelo teste."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestFilters(unittest.TestCase):
+    """Testes para a amostragem e o limite de taxa por logger."""
+
+    def test_parse_sample_rates(self):
+        """As taxas são lidas de pares logger=taxa."""
+        self.assertEqual(parse_sample_rates("a.b=0.1, c=1"), {"a.b": 0.1, "c": 1.0})
+        self.assertEqual(parse_sample_rates(""), {})
+
+    def test_sampling_applies_to_prefix_below_warning(self):
+        """Só os loggers configurados são amostrados, e nunca avisos ou erros."""
+        sampler = SamplingFilter({"src.memory.background": 0.0}, rng=random.Random(1))
+
+        self.assertFalse(sampler.filter(make_record("src.memory.background")))
+        self.assertTrue(sampler.filter(make_record("src.memory.background", logging.WARNING)))
+        self.assertTrue(sampler.filter(make_record("src.memory.retrieval")))
+
+    def test_rate_limit_reports_suppressed_records(self):
+        """Acima da rajada os registros são suprimidos e contados no próximo aceito."""
+        clock = FakeClock()
+        limiter = RateLimitFilter(per_second=1, burst=2, clock=clock)
+        results = [limiter.filter(make_record("ruidoso")) for _ in range(5)]
+
+        self.assertEqual(results, [True, True, False, False, False])
+        self.assertTrue(limiter.filter(make_record("outro")))
+        # Avisos e erros não são limitados nem gastam fichas
+        self.assertTrue(limiter.filter(make_record("ruidoso", logging.ERROR)))
+
+        clock.now = 1.0
+        record = make_record("ruidoso")
+        self.assertTrue(limiter.filter(record))
+        self.assertEqual(record.suppressed, 3)
+
+    def test_full_queue_drops_without_blocking(self):
+        """Com a fila cheia o registro é descartado e contabilizado."""
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        dropped = LOG_RECORDS_DROPPED.labels(reason="queue_full")
+        before = dropped.value
+
+        handler.handle(make_record())
+        handler.handle(make_record())
+
+        self.assertEqual(handler.queue.qsize(), 1)
+        self.assertEqual(dropped.value, before + 1)
+
+
+class TestConfigureLogging(unittest.TestCase):
+    """Testes para a escrita em segundo plano em arquivo JSON com rotação."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "chatbot.log")
+        root = logging.getLogger()
+        self.previous = (root.level, list(root.handlers))
+
+    def tearDown(self):
+        shutdown_logging()
+        root = logging.getLogger()
+        root.setLevel(self.previous[0])
+        for handler in self.previous[1]:
+            root.addHandler(handler)
+        shutil.rmtree(self.directory)
+
+    def read_entries(self):
+        with open(self.path, encoding="utf-8") as file:
+            return [json.loads(line) for line in file]
+
+    def test_json_lines_with_extras_and_trace(self):
+        """Cada registro vira uma linha JSON com campos extras, exceção e span ativo."""
+        configure_logging(log_file=self.path, console=False, rate_limit_per_second=0, sample_rates={})
+        tracer = Tracer(exporter=InMemoryExporter(), enabled=True)
+        logger = logging.getLogger("src.test")
+
+        with tracer.span("chat") as span:
+            logger.info("Olá %s", "mundo", extra={"user_id": "u1"})
+        try:
+            raise ValueError("falhou")
+        except ValueError:
+            logger.error("Erro", exc_info=True)
+        shutdown_logging()
+
+        first, second = self.read_entries()
+        self.assertEqual(first["message"], "Olá mundo")
+        self.assertEqual(first["logger"], "src.test")
+        self.assertEqual(first["user_id"], "u1")
+        self.assertEqual(first["trace_id"], span.trace_id)
+        self.assertEqual(second["level"], "ERROR")
+        self.assertIn("ValueError: falhou", second["exception"])
+
+    def test_rotation_by_size(self):
+        """O arquivo é rotacionado ao atingir o tamanho máximo."""
+        configure_logging(
+            log_file=self.path, console=False, max_bytes=500, backup_count=2,
+            rate_limit_per_second=0, sample_rates={},
+        )
+        logger = logging.getLogger("src.test")
+        for i in range(50):
+            logger.info(f"registro {i}")
+        shutdown_logging()
+
+        self.assertTrue(os.path.exists(self.path + ".1"))
+        self.assertLessEqual(os.path.getsize(self.path), 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
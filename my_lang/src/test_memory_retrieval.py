@@ -0,0 +1,164 @@
+"""
+Testes para a busca de memórias com orçamento de latência e disjuntor.
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langgraph.store.memory import InMemoryStore
+
+from src.circuit_breaker import CircuitBreaker
+from src.deadlines import deadline_scope
+from src.memory.retrieval import MemoryCache, MemoryRetriever
+from src.warmup import run_warmup
+
+
+class SlowStore:
+    """Armazenamento cuja busca pode ficar lenta ou falhar sob demanda."""
+
+    def __init__(self, store):
+        self.store = store
+        self.delay = 0.0
+        self.error = None
+        self.searches = 0
+
+    def search(self, namespace, **kwargs):
+        self.searches += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.store.search(namespace, **kwargs)
+
+
+class TestMemoryRetriever(unittest.TestCase):
+    """Testes para o MemoryRetriever."""
+
+    def setUp(self):
+        self.namespace = ("chatbot_memories", "ana")
+        store = InMemoryStore()
+        store.put(self.namespace, "m1", {"content": "Ana gosta de jazz"})
+        self.store = SlowStore(store)
+        self.transitions = []
+        self.retriever = MemoryRetriever(
+            budget_seconds=0.05,
+            breaker=CircuitBreaker(
+                "memory_search",
+                failure_threshold=2,
+                reset_timeout=0.2,
+                on_state_change=lambda name, old, new: self.transitions.append(new),
+            ),
+            cache=MemoryCache(),
+        )
+
+    def test_slow_search_falls_back_to_cache(self):
+        """Uma busca lenta é abandonada e o turno recebe as últimas memórias conhecidas."""
+        items, source = self.retriever.retrieve(self.store, self.namespace, "música")
+        self.assertEqual(source, "store")
+
+        self.store.delay = 0.5
+        items, source = self.retriever.retrieve(self.store, self.namespace, "música")
+
+        self.assertEqual(self.retriever.stats()["timeouts"], 1)
+        self.assertEqual(source, "cache")
+        self.assertEqual(items[0].value["content"], "Ana gosta de jazz")
+        self.assertEqual(self.retriever.retrieve(self.store, ("chatbot_memories", "bia"), "x")[1], "none")
+
+    def test_breaker_opens_and_recovers(self):
+        """Falhas seguidas abrem o disjuntor; depois do tempo de espera, um sucesso o fecha."""
+        self.store.error = ConnectionError("banco indisponível")
+        for _ in range(2):
+            self.retriever.retrieve(self.store, self.namespace, "q")
+        self.assertEqual(self.retriever.breaker.state, "open")
+
+        # Com o disjuntor aberto o armazenamento não é consultado
+        searches = self.store.searches
+        _, source = self.retriever.retrieve(self.store, self.namespace, "q")
+        self.assertEqual(source, "none")
+        self.assertEqual(self.store.searches, searches)
+
+        self.store.error = None
+        time.sleep(0.25)
+        _, source = self.retriever.retrieve(self.store, self.namespace, "q")
+
+        self.assertEqual(source, "store")
+        self.assertEqual(self.transitions, ["open", "half_open", "closed"])
+        stats = self.retriever.stats()
+        self.assertEqual(stats["errors"], 2)
+        self.assertEqual(stats["rejected"], 1)
+
+    def test_expired_deadline_skips_search(self):
+        """Com o prazo do turno esgotado, a busca não é feita nem conta como falha."""
+        with deadline_scope(0.0):
+            _, source = self.retriever.retrieve(self.store, self.namespace, "q")
+
+        self.assertEqual(source, "none")
+        self.assertEqual(self.store.searches, 0)
+        self.assertEqual(self.retriever.stats()["skipped"], 1)
+        self.assertEqual(self.retriever.breaker.stats()["consecutive_failures"], 0)
+
+    def test_saturated_pool_does_not_queue_searches(self):
+        """Com todos os workers presos em buscas abandonadas, novas buscas não entram na fila."""
+        retriever = MemoryRetriever(budget_seconds=0.01, max_workers=1, cache=MemoryCache())
+        self.store.delay = 0.3
+        retriever.retrieve(self.store, self.namespace, "q")
+
+        _, source = retriever.retrieve(self.store, self.namespace, "q")
+
+        self.assertEqual(source, "none")
+        self.assertEqual(self.store.searches, 1)
+        stats = retriever.stats()
+        self.assertEqual(stats["saturated"], 1)
+        self.assertEqual(stats["in_flight"], 1)
+
+    def test_saturated_pool_does_not_take_half_open_trial(self):
+        """Uma busca recusada por saturação não prende o disjuntor meio aberto."""
+        gate = threading.Event()
+        self.addCleanup(gate.set)
+        now = [0.0]
+        retriever = MemoryRetriever(
+            budget_seconds=0.01,
+            max_workers=1,
+            breaker=CircuitBreaker("memory_search", failure_threshold=1, reset_timeout=1.0, clock=lambda: now[0]),
+            cache=MemoryCache(),
+        )
+        blocked_search = self.store.search
+
+        def search(namespace, **kwargs):
+            gate.wait(5.0)
+            return blocked_search(namespace, **kwargs)
+
+        self.store.search = search
+        retriever.retrieve(self.store, self.namespace, "q")
+        self.assertEqual(retriever.breaker.state, "open")
+
+        # Meio aberto, com o pool ainda ocupado pela busca abandonada
+        now[0] = 2.0
+        self.assertEqual(retriever.retrieve(self.store, self.namespace, "q")[1], "none")
+        self.assertEqual(retriever.stats()["saturated"], 1)
+
+        gate.set()
+        while retriever.stats()["in_flight"]:
+            time.sleep(0.01)
+        self.store.search = blocked_search
+        _, source = retriever.retrieve(self.store, self.namespace, "q")
+
+        self.assertEqual(source, "store")
+        self.assertEqual(retriever.breaker.state, "closed")
+
+    def test_warmup_fills_fallback_cache(self):
+        """O aquecimento deixa as memórias dos usuários recentes no cache de reserva."""
+        with mock.patch("src.warmup.get_memory_retriever", return_value=self.retriever):
+            run_warmup(self.store.store, preload_user_count=5)
+
+        self.assertIsNotNone(self.retriever.cache.get(self.namespace))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+"""
+Testes para as métricas de latência por etapa e o endpoint /metrics.
+"""
+
+import asyncio
+import os
+import sys
+import time
+import unittest
+import uuid
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from langgraph.store.memory import InMemoryStore
+
+from src.agent.chat_agent import chat, create_chat_agent
+from src.agent.fake_model import FakeChatModel
+from src.api.routes import create_api
+from src.circuit_breaker import CircuitBreaker
+from src.instrumentation import (
+    BACKGROUND_QUEUE_WAIT_SECONDS,
+    InstrumentedReflector,
+    LLMMetricsCallbackHandler,
+    record_breaker_transition,
+)
+from src.metrics import MetricsRegistry, REGISTRY
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """Testes para os tipos de métrica e a exposição no formato do Prometheus."""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Cada faixa conta as observações menores ou iguais ao seu limite."""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latência", ["stage"], buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.labels(stage="search").observe(value)
+
+        text = registry.render()
+
+        self.assertIn("# TYPE latency_seconds histogram", text)
+        self.assertIn('latency_seconds_bucket{stage="search",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{stage="search",le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{stage="search",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_count{stage="search"} 4', text)
+        self.assertIn('latency_seconds_sum{stage="search"} 4.05', text)
+
+    def test_registry_reuses_metrics_and_checks_labels(self):
+        """O mesmo nome devolve a mesma métrica; rótulos diferentes são um erro."""
+        registry = MetricsRegistry()
+        counter = registry.counter("events_total", "Eventos", ["kind"])
+
+        self.assertIs(registry.counter("events_total", "Eventos", ["kind"]), counter)
+        with self.assertRaises(ValueError):
+            registry.counter("events_total", "Eventos", ["other"])
+        with self.assertRaises(ValueError):
+            counter.inc()
+
+    def test_gauge_function_is_read_at_scrape_time(self):
+        """Um medidor com função reflete o valor no momento da coleta."""
+        registry = MetricsRegistry()
+        depth = [3]
+        registry.gauge("queue_depth", "Profundidade").set_function(lambda: depth[0])
+
+        self.assertIn("queue_depth 3", registry.render())
+        depth[0] = 7
+        self.assertIn("queue_depth 7", registry.render())
+
+    def test_breaker_transitions_are_counted(self):
+        """As mudanças de estado do disjuntor aparecem como contador e medidor."""
+        breaker = CircuitBreaker("test_breaker", failure_threshold=1, on_state_change=record_breaker_transition)
+        breaker.record_failure()
+
+        text = REGISTRY.render()
+        self.assertIn('chatbot_circuit_breaker_transitions_total{breaker="test_breaker",state="open"} 1', text)
+        self.assertIn('chatbot_circuit_breaker_state{breaker="test_breaker"} 2', text)
+
+    def test_cancelled_llm_calls_are_not_errors(self):
+        """Uma chamada cancelada é registrada como `cancelled`, não como erro."""
+        handler = LLMMetricsCallbackHandler("fake-cancelled")
+        for error in (asyncio.CancelledError(), ConnectionError("falhou")):
+            run_id = uuid.uuid4()
+            handler.on_llm_start({}, ["olá"], run_id=run_id)
+            handler.on_llm_error(error, run_id=run_id)
+
+        text = REGISTRY.render()
+        self.assertIn('chatbot_llm_duration_seconds_count{model="fake-cancelled",status="cancelled"} 1', text)
+        self.assertIn('chatbot_llm_duration_seconds_count{model="fake-cancelled",status="error"} 1', text)
+
+    def test_background_queue_wait_uses_scheduled_time(self):
+        """A espera na fila é medida a partir do horário agendado da tarefa."""
+
+        class Reflector:
+            namespace = ("memories", "{user_id}")
+
+            def invoke(self, payload, config=None):
+                return payload
+
+        reflector = InstrumentedReflector(Reflector())
+        waits = BACKGROUND_QUEUE_WAIT_SECONDS.labels()
+        count, total = waits.count, waits.sum
+
+        result = reflector.invoke({"messages": []}, {"configurable": {"scheduled_at": time.time() - 2.0}})
+
+        self.assertEqual(result, {"messages": []})
+        self.assertEqual(reflector.namespace, ("memories", "{user_id}"))
+        self.assertEqual(waits.count, count + 1)
+        self.assertGreaterEqual(waits.sum - total, 2.0)
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+    """Testes de ponta a ponta: um turno alimenta as métricas de cada etapa."""
+
+    def test_turn_populates_stage_histograms(self):
+        """Um turno com ferramenta registra modelo, ferramenta, busca e checkpointer."""
+        model = FakeChatModel(callbacks=[LLMMetricsCallbackHandler("fake-metrics")])
+        components = create_chat_agent(
+            store=InMemoryStore(),
+            enable_background_memory=False,
+            enable_user_profiles=False,
+            model=model,
+        )
+        # O registro é global: a ferramenta pode já ter sido medida por outros testes
+        tool_calls = REGISTRY.get("chatbot_tool_duration_seconds").labels(tool="search_memory", status="ok")
+        tool_calls_before = tool_calls.count
+        chat(components["agent"], "qual é o meu nome?", user_id="metrics_user", thread_id="metrics_thread")
+
+        client = TestClient(create_api(agent=components["agent"]))
+        response = client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        text = response.text
+        self.assertIn('chatbot_llm_time_to_first_token_seconds_count{model="fake-metrics"}', text)
+        self.assertIn('chatbot_llm_duration_seconds_count{model="fake-metrics",status="ok"} 2', text)
+        self.assertEqual(tool_calls.count, tool_calls_before + 1)
+        self.assertIn('chatbot_tool_duration_seconds_count{tool="search_memory",status="ok"}', text)
+        self.assertIn('chatbot_memory_search_seconds_count{backend="InMemoryStore",source="store"}', text)
+        self.assertIn('chatbot_checkpointer_seconds_count{backend="memory",operation="put"}', text)
+        self.assertIn('chatbot_checkpointer_seconds_count{backend="memory",operation="get"}', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
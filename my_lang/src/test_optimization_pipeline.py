@@ -0,0 +1,203 @@
+"""
+Testes para o pipeline offline de otimização de prompts.
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import StateGraph, MessagesState, START
+from langgraph.store.memory import InMemoryStore
+
+from fastapi.testclient import TestClient
+from langchain_core.messages.utils import count_tokens_approximately
+
+from src.agent.chat_agent import create_chat_agent
+from src.agent.fake_model import FakeChatModel
+from src.agent.prompt_registry import PromptRegistry
+from src.api.routes import create_api
+from src.benchmarks.store_scaling import DeterministicEmbeddings
+from src.memory.optimization_pipeline import (
+    ReflectionCache,
+    save_trajectory,
+    iter_trajectories_from_checkpointer,
+    iter_trajectories_from_store,
+    run_optimization_pipeline,
+)
+
+
+class MockOptimizer:
+    """Otimizador simulado que registra as chamadas e a concorrência máxima."""
+
+    def __init__(self):
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, payload):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.01)
+        with self._lock:
+            self.active -= 1
+        return f"{payload['prompt']}+{len(payload['trajectories'])}"
+
+
+def _trajectories(count):
+    return (
+        ([{"role": "user", "content": f"pergunta {i}"}], {"nota": i % 3})
+        for i in range(count)
+    )
+
+
+class TestOptimizationPipeline(unittest.TestCase):
+    """Testes para o run_optimization_pipeline."""
+
+    def test_bounded_concurrency_and_cache(self):
+        """Os lotes respeitam a concorrência e reflexões repetidas vêm do cache."""
+        optimizer = MockOptimizer()
+        cache = ReflectionCache()
+
+        result = run_optimization_pipeline(
+            optimizer, "base", _trajectories(50), shard_size=5, max_concurrency=3, cache=cache
+        )
+        self.assertEqual(result["trajectories"], 50)
+        self.assertEqual(result["shards"], 10)
+        self.assertLessEqual(optimizer.max_active, 3)
+        # 10 lotes + 3 combinações (10 propostas em grupos de 5 -> 2 -> 1)
+        self.assertEqual(optimizer.calls, 13)
+
+        calls_before = optimizer.calls
+        again = run_optimization_pipeline(
+            optimizer, "base", _trajectories(50), shard_size=5, max_concurrency=3, cache=cache
+        )
+        self.assertEqual(optimizer.calls, calls_before)
+        self.assertEqual(again["prompt"], result["prompt"])
+
+    def test_candidate_published_to_registry(self):
+        """O candidato é publicado no registro sem ser ativado."""
+        registry = PromptRegistry(initial_prompt="base")
+        result = run_optimization_pipeline(
+            MockOptimizer(), "base", _trajectories(3), prompt_registry=registry, shard_size=10
+        )
+        self.assertEqual(result["version"], 2)
+        self.assertEqual(registry.active.version, 1)
+        self.assertEqual(registry.get(2).source, "optimizer")
+
+    def test_failed_shards_do_not_abort_the_run(self):
+        """Um lote que falha é contado e os demais seguem para a combinação."""
+        optimizer = MockOptimizer()
+        invoke = optimizer.invoke
+
+        def flaky(payload):
+            if any("pergunta 0" == t[0][0]["content"] for t in payload["trajectories"]):
+                raise RuntimeError("erro do provedor")
+            return invoke(payload)
+
+        optimizer.invoke = flaky
+        result = run_optimization_pipeline(optimizer, "base", _trajectories(20), shard_size=5)
+
+        self.assertEqual(result["shards"], 4)
+        self.assertEqual(result["failed_shards"], 1)
+        self.assertEqual(result["prompt"], "base+3")
+
+    def test_token_budget_covers_the_whole_run(self):
+        """O orçamento vale para a execução inteira e remove duplicatas entre lotes."""
+        optimizer = MockOptimizer()
+        reflected = []
+        invoke = optimizer.invoke
+
+        def recording(payload):
+            reflected.extend(t for t in payload["trajectories"] if t[0][0]["content"].startswith("pergunta"))
+            return invoke(payload)
+
+        optimizer.invoke = recording
+        # 10 conversas distintas, cada uma repetida 10 vezes ao longo do fluxo
+        trajectories = [([{"role": "user", "content": f"pergunta {i % 10}"}], {}) for i in range(100)]
+        budget = 5 * count_tokens_approximately(trajectories[0][0])
+
+        result = run_optimization_pipeline(
+            optimizer, "base", trajectories, shard_size=5, token_budget=budget, embeddings=DeterministicEmbeddings(16)
+        )
+
+        self.assertEqual(result["trajectories"], 100)
+        self.assertLessEqual(result["selected"], 5)
+        self.assertEqual(result["shards"], 1)
+        self.assertTrue(reflected)
+        self.assertLessEqual(sum(count_tokens_approximately(messages) for messages, _ in reflected), budget)
+        contents = [messages[0]["content"] for messages, _ in reflected]
+        self.assertEqual(len(contents), len(set(contents)))
+
+    def test_empty_input(self):
+        """Sem trajetórias, o prompt atual é mantido."""
+        result = run_optimization_pipeline(MockOptimizer(), "base", [])
+        self.assertEqual(result["prompt"], "base")
+        self.assertIsNone(result["version"])
+
+    def test_stream_from_store_and_checkpointer(self):
+        """As trajetórias são lidas do armazenamento e do checkpointer."""
+        store = InMemoryStore()
+        for i in range(5):
+            save_trajectory(
+                store,
+                [{"role": "user", "content": f"oi {i}"}],
+                feedback={"ok": True},
+                user_id=f"user_{i % 2}",
+            )
+        from_store = list(iter_trajectories_from_store(store, page_size=2))
+        self.assertEqual(len(from_store), 5)
+        self.assertEqual(from_store[0][1], {"ok": True})
+
+        graph = StateGraph(MessagesState)
+        graph.add_node("echo", lambda state: {"messages": [{"role": "assistant", "content": "ok"}]})
+        graph.add_edge(START, "echo")
+        app = graph.compile(checkpointer=InMemorySaver())
+        for thread_id in ("a", "b"):
+            for _ in range(2):
+                app.invoke(
+                    {"messages": [{"role": "user", "content": "oi"}]},
+                    {"configurable": {"thread_id": thread_id}},
+                )
+
+        from_checkpointer = list(iter_trajectories_from_checkpointer(app.checkpointer, default_feedback={"x": 1}))
+        self.assertEqual(len(from_checkpointer), 2)
+        self.assertEqual(len(from_checkpointer[0][0]), 4)
+        self.assertEqual(from_checkpointer[0][1], {"x": 1})
+
+
+class TestFeedbackEndpoint(unittest.TestCase):
+    """Testes para o registro de feedback pelo /feedback."""
+
+    def setUp(self):
+        self.store = InMemoryStore()
+        components = create_chat_agent(
+            store=self.store,
+            enable_background_memory=False,
+            enable_user_profiles=False,
+            model=FakeChatModel(tool_call_policy=None),
+        )
+        self.client = TestClient(create_api(agent=components["agent"]))
+        self.client.post("/chat", json={"message": "olá", "user_id": "ana", "thread_id": "t1"})
+
+    def test_only_the_owner_can_file_feedback(self):
+        """Feedback sobre a conversa de outro usuário é recusado como se ela não existisse."""
+        other = self.client.post("/feedback", json={"user_id": "eva", "thread_id": "t1", "feedback": {"nota": 1}})
+        self.assertEqual(other.status_code, 404)
+        self.assertEqual(list(iter_trajectories_from_store(self.store)), [])
+
+        own = self.client.post("/feedback", json={"user_id": "ana", "thread_id": "t1", "feedback": {"nota": 5}})
+        self.assertEqual(own.status_code, 200)
+        self.assertEqual(len(list(iter_trajectories_from_store(self.store))), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+Testes para os índices secundários de perfis de usuário.
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from langgraph.store.memory import InMemoryStore
+
+from src.api.routes import create_api
+from src.memory.profiles import UserProfile, save_user_profile, update_user_profile
+from src.memory.profile_index import ProfileIndex, create_profile_index
+
+
+class TestProfileIndex(unittest.TestCase):
+    """Testes para o ProfileIndex."""
+
+    def setUp(self):
+        """Configuração inicial para os testes."""
+        self.index = ProfileIndex()
+        self.index.update("maria", UserProfile(language="pt-BR", interests=["Jazz", "Python"], expertise_level="avançado"))
+        self.index.update("joao", UserProfile(language="pt-BR", interests=["futebol"]))
+        self.index.update("ana", {"language": "en", "interests": ["python"], "expertise_level": "iniciante"})
+
+    def test_query_combines_fields(self):
+        """Campos diferentes são combinados com AND e valores normalizados."""
+        self.assertEqual(self.index.query(interests="python", language="PT-br"), {"maria"})
+        self.assertEqual(self.index.query(interests="python"), {"maria", "ana"})
+        self.assertEqual(self.index.query(interests=["jazz", "futebol"]), {"maria", "joao"})
+        self.assertEqual(self.index.count(language="pt-BR"), 2)
+
+    def test_update_replaces_old_values(self):
+        """Reescrever um perfil remove os valores antigos do índice."""
+        self.index.update("joao", UserProfile(language="es", interests=["python"]))
+        self.assertEqual(self.index.query(language="pt-BR"), {"maria"})
+        self.assertNotIn("futebol", self.index.facets("interests"))
+        self.assertEqual(self.index.query(interests="python"), {"maria", "ana", "joao"})
+
+        self.index.remove("maria")
+        self.assertEqual(self.index.query(interests="jazz"), set())
+        self.assertEqual(len(self.index), 2)
+
+    def test_unknown_field(self):
+        """Consultas por campos não indexados geram erro."""
+        with self.assertRaises(ValueError):
+            self.index.query(timezone="UTC")
+
+    def test_rebuild_from_store(self):
+        """O índice é reconstruído a partir dos perfis persistidos."""
+        store = InMemoryStore()
+        save_user_profile(store, UserProfile(language="pt-BR", interests=["jazz"]), user_id="maria")
+        save_user_profile(store, UserProfile(language="en"), user_id="ana")
+
+        index = create_profile_index(store)
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.query(language="pt-BR", interests="jazz"), {"maria"})
+
+    def test_chat_updates_are_persisted(self):
+        """Perfis aprendidos no chat são gravados no armazenamento e sobrevivem a um reinício."""
+        store = InMemoryStore()
+        index = create_profile_index(store)
+        manager = mock.MagicMock()
+        manager.invoke.return_value = [mock.MagicMock(content=UserProfile(language="pt-BR", interests=["jazz"]))]
+
+        update_user_profile(manager, [{"role": "user", "content": "Adoro jazz"}], "maria", profile_index=index)
+
+        self.assertEqual(index.query(interests="jazz"), {"maria"})
+        self.assertEqual(create_profile_index(store).query(interests="jazz"), {"maria"})
+
+        # Na próxima atualização, o perfil persistido é passado ao gerenciador
+        update_user_profile(manager, [{"role": "user", "content": "Oi"}], "maria", profile_index=index)
+        existing = manager.invoke.call_args.args[0]["existing"]
+        self.assertEqual(existing[0][2]["interests"], ["jazz"])
+
+    def test_search_endpoint_requires_admin_token(self):
+        """A segmentação expõe IDs de todos os usuários e só responde com o token de administração."""
+        client = TestClient(create_api(agent=None, profile_index=self.index, admin_token="secret"))
+
+        self.assertEqual(client.get("/profiles/search", params={"language": "pt-BR"}).status_code, 401)
+        response = client.get("/profiles/search", params={"language": "pt-BR"}, headers={"X-Admin-Token": "secret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["user_ids"], ["joao", "maria"])
+
+        unconfigured = TestClient(create_api(agent=None, profile_index=self.index, admin_token=None))
+        self.assertEqual(unconfigured.get("/profiles/search").status_code, 404)
+
+    def test_query_does_not_scan_profiles(self):
+        """Consultas seletivas usam só as listas invertidas, sem percorrer todos os perfis."""
+        index = ProfileIndex()
+        for i in range(100_000):
+            index.update(f"user_{i}", {
+                "language": "pt-BR" if i % 2 else "en",
+                "interests": [f"topic_{i % 100}"],
+            })
+
+        entries = mock.MagicMock(wraps=index._entries)
+        with mock.patch.object(index, "_entries", entries):
+            users = index.query(interests="topic_7", language="pt-BR")
+
+        self.assertEqual(len(users), 1000)
+        self.assertEqual(entries.mock_calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Testes para o perfilamento sob demanda e o perfilamento amostral de requisições.
+"""
+
+import marshal
+import os
+import random
+import sys
+import threading
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from langgraph.store.memory import InMemoryStore
+
+from src.agent.chat_agent import create_chat_agent
+from src.agent.fake_model import FakeChatModel
+from src.api.routes import create_api
+from src.profiling import RequestProfiler, format_collapsed, sample_stacks
+
+
+def busy_worker_loop(stop):
+    """Consome CPU até `stop` ser sinalizado."""
+    total = 0
+    while not stop.is_set():
+        total += sum(range(1000))
+    return total
+
+
+def short_task():
+    """Trabalho curto usado como requisição perfilada."""
+    return sum(i * i for i in range(1000))
+
+
+class TestStackSampler(unittest.TestCase):
+    """Testes para o amostrador de pilhas de todas as threads."""
+
+    def test_samples_other_threads(self):
+        """Threads em execução aparecem nas pilhas, com o nome da thread na raiz."""
+        stop = threading.Event()
+        thread = threading.Thread(target=busy_worker_loop, args=(stop,), name="busy-worker", daemon=True)
+        thread.start()
+        try:
+            counts = sample_stacks(0.2, interval=0.005)
+        finally:
+            stop.set()
+            thread.join()
+
+        busy = {stack: count for stack, count in counts.items() if stack.startswith("thread:busy-worker;")}
+        self.assertTrue(busy)
+        self.assertTrue(all("test_profiling:busy_worker_loop" in stack for stack in busy))
+
+        lines = format_collapsed(counts).splitlines()
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertEqual(int(count), max(counts.values()))
+
+
+class TestRequestProfiler(unittest.TestCase):
+    """Testes para o perfilamento de uma fração das requisições."""
+
+    def test_disabled_profiler_runs_function(self):
+        """Com taxa 0 a função roda sem perfilamento."""
+        profiler = RequestProfiler(sample_rate=0.0)
+
+        self.assertEqual(profiler.call(sum, [1, 2, 3]), 6)
+        self.assertEqual(profiler.profiled, 0)
+        self.assertIsNone(profiler.dump())
+
+    def test_sampled_requests_are_accumulated(self):
+        """As requisições sorteadas são acumuladas e exportadas como pstats."""
+        profiler = RequestProfiler(sample_rate=0.5, rng=random.Random(1))
+        for _ in range(20):
+            profiler.call(short_task)
+
+        self.assertGreater(profiler.profiled, 0)
+        self.assertLess(profiler.profiled, 20)
+        stats = marshal.loads(profiler.dump())
+        self.assertTrue(any(function == "short_task" for (_, _, function) in stats))
+        self.assertIn("short_task", profiler.report(limit=10))
+
+
+class TestAdminEndpoints(unittest.TestCase):
+    """Testes para os endpoints de perfilamento protegidos por token."""
+
+    def setUp(self):
+        components = create_chat_agent(
+            store=InMemoryStore(),
+            enable_background_memory=False,
+            enable_user_profiles=False,
+            model=FakeChatModel(),
+        )
+        self.profiler = RequestProfiler(sample_rate=1.0)
+        self.client = TestClient(create_api(
+            agent=components["agent"],
+            admin_token="secret",
+            request_profiler=self.profiler,
+        ))
+
+    def test_requires_token(self):
+        """Sem o token correto os endpoints respondem 401."""
+        self.assertEqual(self.client.get("/admin/profile?seconds=0.01").status_code, 401)
+        response = self.client.get("/admin/profile?seconds=0.01", headers={"Authorization": "Bearer wrong"})
+        self.assertEqual(response.status_code, 401)
+
+    def test_disabled_without_token(self):
+        """Sem ADMIN_TOKEN configurado os endpoints não existem."""
+        client = TestClient(create_api(agent=None, admin_token=None))
+
+        self.assertEqual(client.get("/admin/profile", headers={"X-Admin-Token": ""}).status_code, 404)
+
+    def test_profile_returns_collapsed_stacks(self):
+        """A amostragem responde com pilhas colapsadas."""
+        response = self.client.get("/admin/profile?seconds=0.1&include_idle=true", headers={"X-Admin-Token": "secret"})
+
+        self.assertEqual(response.status_code, 200)
+        for line in response.text.splitlines():
+            stack, count = line.rsplit(" ", 1)
+            self.assertTrue(stack.startswith("thread:"))
+            self.assertGreater(int(count), 0)
+
+    def test_profiled_chat_requests(self):
+        """Os turnos sorteados aparecem no relatório e no arquivo pstats."""
+        self.client.post("/chat", json={"message": "olá"})
+        headers = {"X-Admin-Token": "secret"}
+
+        report = self.client.get("/admin/profile/requests", headers=headers)
+        self.assertEqual(report.status_code, 200)
+        self.assertIn("chat_agent.py", report.text)
+
+        dump = self.client.get("/admin/profile/requests?format=pstats&reset=true", headers=headers)
+        self.assertEqual(dump.status_code, 200)
+        self.assertIsInstance(marshal.loads(dump.content), dict)
+        self.assertEqual(self.profiler.profiled, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Testes para o registro versionado de prompts do sistema.
+"""
+
+import os
+import sys
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from langgraph.store.memory import InMemoryStore
+
+from src.agent.prompt_registry import PromptRegistry
+from src.api.routes import create_api
+
+
+class TestPromptRegistry(unittest.TestCase):
+    """Testes para o PromptRegistry."""
+
+    def test_publish_activate_and_rollback(self):
+        """Novas versões são ativadas e podem ser revertidas."""
+        registry = PromptRegistry(initial_prompt="v1")
+        self.assertEqual(registry.active.version, 1)
+
+        registry.publish("v2")
+        self.assertEqual(registry.active.prompt, "v2")
+
+        candidate = registry.publish("v3", activate=False, source="optimizer")
+        self.assertEqual(registry.active.version, 2)
+        self.assertEqual(candidate.source, "optimizer")
+
+        registry.activate(3)
+        self.assertEqual(registry.active.prompt, "v3")
+
+        self.assertEqual(registry.rollback().version, 2)
+        self.assertEqual(registry.rollback().version, 1)
+        with self.assertRaises(ValueError):
+            registry.rollback()
+        with self.assertRaises(ValueError):
+            registry.activate(42)
+
+    def test_metrics_per_version(self):
+        """As métricas de latência e tokens são acumuladas por versão."""
+        registry = PromptRegistry(initial_prompt="v1")
+        registry.record_turn(1, 0.1, tokens=100)
+        registry.record_turn(1, 0.3, tokens=50)
+        registry.record_turn(1, 0.2, error=True)
+
+        metrics = registry.metrics()[1]
+        self.assertEqual(metrics["turns"], 3)
+        self.assertEqual(metrics["errors"], 1)
+        self.assertEqual(metrics["total_tokens"], 150)
+        self.assertAlmostEqual(metrics["latency_p50"], 0.2)
+
+    def test_shared_store_propagates_active_version(self):
+        """Workers que compartilham o armazenamento sincronizam a versão ativa."""
+        store = InMemoryStore()
+        worker_a = PromptRegistry(initial_prompt="v1", store=store, refresh_seconds=0)
+        worker_b = PromptRegistry(initial_prompt="ignorado", store=store, refresh_seconds=0)
+        self.assertEqual(worker_b.active.prompt, "v1")
+
+        worker_a.publish("v2")
+        self.assertEqual(worker_b.active.prompt, "v2")
+
+        worker_a.rollback()
+        self.assertEqual(worker_b.active.version, 1)
+
+
+class TestPromptEndpoints(unittest.TestCase):
+    """Testes para os endpoints /prompts."""
+
+    def setUp(self):
+        self.registry = PromptRegistry(initial_prompt="v1")
+        self.client = TestClient(create_api(agent=None, prompt_registry=self.registry, admin_token="secret"))
+
+    def test_writes_require_admin_token(self):
+        """Publicar, ativar e reverter exigem o token; listar não."""
+        self.assertEqual(self.client.post("/prompts", json={"prompt": "v2"}).status_code, 401)
+        self.assertEqual(self.client.post("/prompts/1/activate").status_code, 401)
+        response = self.client.post("/prompts/rollback", headers={"Authorization": "Bearer errado"})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.registry.active.version, 1)
+        self.assertEqual(self.client.get("/prompts").status_code, 200)
+
+        response = self.client.post("/prompts", json={"prompt": "v2"}, headers={"X-Admin-Token": "secret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.registry.active.prompt, "v2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+"""
+Testes para o limitador de taxa com classes de prioridade.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.agent.fake_model import FakeChatModel
+from src.benchmarks.store_scaling import DeterministicEmbeddings
+from src.deadlines import DeadlineExceeded, deadline_scope
+from src.instrumentation import InstrumentedEmbeddings
+from src.rate_limiter import PriorityRateLimiter, RateLimitCallbackHandler, parse_retry_after
+
+
+class TestPriorityRateLimiter(unittest.TestCase):
+    """Testes para o PriorityRateLimiter."""
+
+    def test_interactive_is_served_before_background(self):
+        """Com a fila cheia, uma requisição interativa passa à frente das de segundo plano."""
+        # Uma requisição a cada 100 ms, sem acúmulo
+        limiter = PriorityRateLimiter(requests_per_minute=600, tokens_per_minute=0, burst_seconds=0.1)
+        limiter.acquire("interactive")
+        order = []
+
+        def worker(priority):
+            limiter.acquire(priority)
+            order.append(priority)
+
+        threads = [
+            threading.Thread(target=worker, args=("batch",), daemon=True),
+            threading.Thread(target=worker, args=("background",), daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.02)
+        threads.append(threading.Thread(target=worker, args=("interactive",), daemon=True))
+        threads[-1].start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual(order, ["interactive", "background", "batch"])
+        stats = limiter.stats()["classes"]
+        self.assertGreater(stats["batch"]["queue_wait_p50"], stats["interactive"]["queue_wait_p50"])
+
+    def test_background_cannot_use_interactive_reserve(self):
+        """Segundo plano e lote só usam a capacidade acima da reserva interativa."""
+        limiter = PriorityRateLimiter(
+            requests_per_minute=60, tokens_per_minute=0, burst_seconds=10, interactive_reserve=0.5
+        )
+
+        granted = 0
+        while limiter.acquire("background", blocking=False):
+            granted += 1
+
+        self.assertEqual(granted, 5)
+        self.assertFalse(limiter.acquire("batch", blocking=False))
+        self.assertTrue(limiter.acquire("interactive", blocking=False))
+
+    def test_rate_limited_response_throttles(self):
+        """Um 429 pausa a fila e reduz a taxa pela metade."""
+        limiter = PriorityRateLimiter(requests_per_minute=600, tokens_per_minute=0)
+
+        limiter.on_rate_limited(retry_after=0.2)
+
+        self.assertFalse(limiter.acquire("interactive", blocking=False))
+        self.assertLessEqual(limiter.stats()["rate_factor"], 0.51)
+        self.assertEqual(limiter.stats()["rate_limited"], 1)
+        self.assertTrue(limiter.acquire("interactive", timeout=2))
+
+    def test_interactive_wait_is_bounded_by_deadline(self):
+        """Uma chamada interativa não espera na fila além do prazo do turno."""
+        limiter = PriorityRateLimiter(requests_per_minute=600, tokens_per_minute=0)
+        limiter.on_rate_limited(retry_after=5)
+        adapter = limiter.for_priority("interactive")
+
+        start = time.perf_counter()
+        with deadline_scope(0.1):
+            with self.assertRaises(DeadlineExceeded):
+                adapter.acquire()
+            with self.assertRaises(DeadlineExceeded):
+                asyncio.run(adapter.aacquire())
+
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(limiter.stats()["classes"]["interactive"]["waiting"], 0)
+
+    def test_retried_429s_halve_the_rate_once_per_window(self):
+        """Vários 429 durante a mesma pausa reduzem a taxa uma única vez."""
+        limiter = PriorityRateLimiter(requests_per_minute=600, tokens_per_minute=0)
+
+        for _ in range(3):
+            limiter.on_rate_limited(retry_after=0.2)
+
+        self.assertEqual(limiter.stats()["rate_limited"], 3)
+        self.assertGreater(limiter.stats()["rate_factor"], 0.45)
+
+    def test_embeddings_calls_are_accounted(self):
+        """Chamadas de embeddings aguardam o limitador na classe do modelo e descontam tokens."""
+        limiter = PriorityRateLimiter(requests_per_minute=600, tokens_per_minute=600, burst_seconds=1)
+        embeddings = InstrumentedEmbeddings(
+            DeterministicEmbeddings(8), model="fake", rate_limiter=limiter.for_priority("batch")
+        )
+
+        embeddings.embed_documents(["olá " * 50])
+
+        stats = limiter.stats()
+        self.assertEqual(stats["classes"]["batch"]["acquired"], 1)
+        self.assertLess(stats["available_tokens"], 0)
+
+    def test_embeddings_limiter_can_be_disabled(self):
+        """`rate_limiter=None` cria os embeddings sem o limitador do processo."""
+        from src.models import create_embeddings
+
+        embeddings = create_embeddings("openai:text-embedding-3-small", rate_limiter=None, api_key="teste")
+
+        self.assertIsNone(embeddings.rate_limiter)
+
+    def test_model_calls_are_accounted(self):
+        """O modelo aguarda o limitador e os tokens usados são descontados do orçamento."""
+        limiter = PriorityRateLimiter(requests_per_minute=600, tokens_per_minute=600, burst_seconds=1)
+        model = FakeChatModel(
+            rate_limiter=limiter.for_priority("background"),
+            callbacks=[RateLimitCallbackHandler(limiter)],
+        )
+
+        model.invoke("olá " * 50)
+
+        stats = limiter.stats()
+        self.assertEqual(stats["classes"]["background"]["acquired"], 1)
+        self.assertLess(stats["available_tokens"], 0)
+        # Sem tokens disponíveis, nem a classe interativa é liberada de imediato
+        self.assertFalse(limiter.acquire("interactive", blocking=False))
+
+    def test_parse_retry_after(self):
+        """O tempo de espera é lido em segundos ou milissegundos."""
+        self.assertEqual(parse_retry_after({"retry-after": "2"}), 2.0)
+        self.assertEqual(parse_retry_after({"retry-after-ms": "250"}), 0.25)
+        self.assertIsNone(parse_retry_after({}))
+
+
+if __name__ == "__main__":
+    unittest.main()
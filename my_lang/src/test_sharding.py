@@ -0,0 +1,179 @@
+"""
+Testes para o armazenamento particionado por namespace.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langgraph.store.memory import InMemoryStore
+
+from src.benchmarks.store_scaling import DeterministicEmbeddings
+from src.memory.snapshot import SnapshotStore
+from src.memory.sharding import HashRing, ShardedStore, parse_shards
+from src.memory.sqlite_store import SQLiteStore
+
+
+class CountingEmbeddings(DeterministicEmbeddings):
+    """Embeddings determinísticos que contam os textos embutidos."""
+
+    def __init__(self, dims: int):
+        super().__init__(dims)
+        self.texts = 0
+
+    def embed_documents(self, texts):
+        self.texts += len(texts)
+        return super().embed_documents(texts)
+
+
+def memory_store(embeddings=None):
+    return InMemoryStore(index={"dims": 8, "embed": embeddings or DeterministicEmbeddings(8)})
+
+
+def fill(store, users=30):
+    for user in range(users):
+        for index in range(3):
+            store.put(("chatbot_memories", f"u{user}"), f"m{index}", {"content": f"Fato {index} de u{user}"})
+    store.put(("system_prompts",), "active", {"version": 1})
+
+
+class TestHashRing(unittest.TestCase):
+    """Testes para o anel de hashing consistente."""
+
+    def test_adding_a_node_moves_only_its_share(self):
+        """Com um shard a mais, só as chaves que passam a ser dele mudam de dono."""
+        ring = HashRing(["a", "b", "c"])
+        grown = ring.with_node("d")
+        keys = [f"chatbot_memories/u{i}" for i in range(3000)]
+        moved = [key for key in keys if ring.node_for(key) != grown.node_for(key)]
+
+        self.assertTrue(all(grown.node_for(key) == "d" for key in moved))
+        self.assertLess(abs(len(moved) / len(keys) - 0.25), 0.08)
+
+    def test_parse_shards(self):
+        """Entradas sem nome recebem o nome pela posição."""
+        self.assertEqual(
+            parse_shards("a=postgresql://h/db?sslmode=require, data/b.sqlite3"),
+            {"a": "postgresql://h/db?sslmode=require", "shard1": "data/b.sqlite3"},
+        )
+
+
+class TestShardedStore(unittest.TestCase):
+    """Testes de roteamento, operações em todos os shards e rebalanceamento."""
+
+    def setUp(self):
+        self.backends = {name: memory_store() for name in ("a", "b")}
+        self.store = ShardedStore(self.backends, workers=4)
+        self.addCleanup(self.store.close)
+        fill(self.store)
+
+    def test_each_user_lives_on_one_shard(self):
+        """As memórias de um usuário ficam todas no shard do seu namespace."""
+        for user in range(30):
+            namespace = ("chatbot_memories", f"u{user}")
+            owner = self.store.shard_for(namespace)
+            for name, backend in self.backends.items():
+                self.assertEqual(len(backend.search(namespace)), 3 if name == owner else 0)
+        self.assertTrue(all(backend.list_namespaces() for backend in self.backends.values()))
+
+    def test_fanout_merges_shards(self):
+        """Listagens e buscas em todos os usuários combinam os shards, com deslocamento."""
+        namespaces = self.store.list_namespaces(prefix=("chatbot_memories",), limit=100)
+        page = self.store.list_namespaces(prefix=("chatbot_memories",), limit=5, offset=10)
+        results = self.store.search(("chatbot_memories",), query="Fato 2 de u7", limit=4)
+        reference = memory_store()
+        fill(reference)
+        expected = reference.search(("chatbot_memories",), query="Fato 2 de u7", limit=4)
+
+        self.assertEqual(len(namespaces), 30)
+        self.assertEqual(page, namespaces[10:15])
+        self.assertEqual([(item.namespace, item.key) for item in results],
+                         [(item.namespace, item.key) for item in expected])
+        self.assertEqual(self.store.get(("system_prompts",), "active").value, {"version": 1})
+
+    def test_add_shard_migrates_online(self):
+        """Um shard novo recebe só as suas chaves, sem perder escritas feitas durante a migração."""
+        new = memory_store()
+        writer_errors = []
+
+        def write_during_rebalance():
+            try:
+                for user in range(30):
+                    self.store.put(("chatbot_memories", f"u{user}"), "m3", {"content": "Escrita concorrente"})
+            except Exception as e:
+                writer_errors.append(e)
+
+        thread = self.store.add_shard("c", new)
+        writer = threading.Thread(target=write_during_rebalance)
+        writer.start()
+        writer.join()
+        thread.join()
+
+        self.assertEqual(writer_errors, [])
+        self.assertTrue(self.store.rebalance_progress["done"])
+        self.assertGreater(len(new.list_namespaces(limit=100)), 0)
+        for user in range(30):
+            namespace = ("chatbot_memories", f"u{user}")
+            owner = self.store.shard_for(namespace)
+            self.assertEqual(len(self.store.search(namespace)), 4)
+            for name, backend in self.store.shards.items():
+                self.assertEqual(len(backend.search(namespace)), 4 if name == owner else 0)
+        self.assertEqual(self.store.get(("system_prompts",), "active").value, {"version": 1})
+
+
+class TestMigrationCopies(unittest.TestCase):
+    """A migração copia vetores e datas entre backends que os guardam."""
+
+    def check_migration(self, create_store):
+        embeddings = CountingEmbeddings(8)
+        store = ShardedStore({name: create_store(embeddings) for name in ("a", "b")}, workers=2)
+        self.addCleanup(store.close)
+        fill(store)
+        before = {
+            (item.namespace, item.key): (item.created_at, item.updated_at)
+            for item in store.search(("chatbot_memories",), limit=1000)
+        }
+        embedded = embeddings.texts
+
+        store.add_shard("c", create_store(embeddings), wait=True)
+
+        self.assertGreater(store.rebalance_progress["items"], 0)
+        self.assertEqual(embeddings.texts, embedded)
+        after = {
+            (item.namespace, item.key): (item.created_at, item.updated_at)
+            for item in store.search(("chatbot_memories",), limit=1000)
+        }
+        self.assertEqual(after, before)
+        # Os vetores copiados continuam pontuando as buscas no novo dono
+        namespace = next(ns for ns, _ in before if store.shard_for(ns) == "c")
+        results = store.search(namespace, query=f"Fato 1 de {namespace[1]}", limit=1)
+        self.assertEqual(results[0].key, "m1")
+
+    def test_in_memory_shards(self):
+        """Entre InMemoryStores, os itens são copiados sem novos embeddings."""
+        self.check_migration(memory_store)
+
+    def test_snapshot_shards(self):
+        """O SnapshotStore recebe as cópias pelo próprio `put_items`."""
+        def create(embeddings):
+            directory = tempfile.TemporaryDirectory()
+            self.addCleanup(directory.cleanup)
+            store = SnapshotStore(directory.name, index={"dims": 8, "embed": embeddings}, interval=0)
+            # Fecha antes de apagar o diretório (o ShardedStore fecha de novo, sem efeito)
+            self.addCleanup(store.close)
+            return store
+
+        self.check_migration(create)
+
+    def test_sqlite_shards(self):
+        """Entre SQLiteStores, os vetores em BLOB e as datas são preservados."""
+        self.check_migration(lambda embeddings: SQLiteStore(":memory:", index={"dims": 8, "embed": embeddings}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+Testes para os snapshots do armazenamento em memória.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.benchmarks.store_scaling import DeterministicEmbeddings
+from src.memory.snapshot import SnapshotStore
+
+
+class CountingEmbeddings(DeterministicEmbeddings):
+    """Embeddings determinísticos que contam os textos embutidos."""
+
+    def __init__(self, dims: int):
+        super().__init__(dims)
+        self.texts = 0
+
+    def embed_documents(self, texts):
+        self.texts += len(texts)
+        return super().embed_documents(texts)
+
+
+NAMESPACE = ("chatbot_memories", "ana")
+
+
+class TestSnapshotStore(unittest.TestCase):
+    """Testes de persistência, restauração e recuperação do log."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def open_store(self, dims: int = 8):
+        embeddings = CountingEmbeddings(dims)
+        store = SnapshotStore(self.directory.name, index={"dims": dims, "embed": embeddings}, interval=0)
+        return store, embeddings
+
+    def fill(self, store):
+        for index in range(5):
+            store.put(NAMESPACE, f"m{index}", {"content": f"Fato {index}"})
+        store.put(("user_profiles", "ana"), "profile", {"content": {"name": "Ana"}}, index=False)
+
+    def test_restore_maps_vectors_without_reembedding(self):
+        """Depois de um snapshot, o reinício mapeia os vetores e não chama o modelo."""
+        store, _ = self.open_store()
+        self.fill(store)
+        query_results = [item.key for item in store.search(NAMESPACE, query="Fato 3", limit=5)]
+        store.close()
+
+        restored, embeddings = self.open_store()
+        self.addCleanup(restored.close)
+
+        self.assertEqual(embeddings.texts, 0)
+        self.assertEqual(restored.get(NAMESPACE, "m3").value, {"content": "Fato 3"})
+        self.assertEqual(restored.get(NAMESPACE, "m3").created_at, store.get(NAMESPACE, "m3").created_at)
+        vector = restored._vectors[NAMESPACE]["m3"]["$"]
+        self.assertFalse(vector.flags.owndata or vector.flags.writeable)
+        self.assertNotIn("profile", restored._vectors.get(("user_profiles", "ana"), {}))
+        self.assertEqual([item.key for item in restored.search(NAMESPACE, query="Fato 3", limit=5)], query_results)
+
+    def test_writes_after_snapshot_come_from_the_log(self):
+        """Escritas e remoções posteriores ao snapshot são recuperadas do log sem encerramento limpo."""
+        store, _ = self.open_store()
+        self.fill(store)
+        store.snapshot()
+        store.put(NAMESPACE, "m5", {"content": "Fato 5"})
+        store.delete(NAMESPACE, "m0")
+        # Sem close(): simula uma queda do processo
+
+        restored, embeddings = self.open_store()
+        self.addCleanup(restored.close)
+
+        self.assertEqual(embeddings.texts, 0)
+        self.assertIsNone(restored.get(NAMESPACE, "m0"))
+        self.assertEqual(restored.get(NAMESPACE, "m5").value, {"content": "Fato 5"})
+        self.assertEqual(len(restored._vectors[NAMESPACE]["m5"]["$"]), 8)
+        self.assertEqual(len(restored.search(NAMESPACE, limit=10)), 5)
+
+    def test_snapshot_compacts_logs_and_torn_tail_is_dropped(self):
+        """O snapshot apaga os logs anteriores, e uma escrita incompleta no fim do log é descartada."""
+        store, _ = self.open_store()
+        self.fill(store)
+        store.snapshot()
+        store.put(NAMESPACE, "m5", {"content": "Fato 5"})
+        names = sorted(os.listdir(self.directory.name))
+        wal = os.path.join(self.directory.name, names[-1])
+        with open(wal, "ab") as file:
+            file.write(b'{"op":"put","namespace":["chatbot_m')
+
+        restored, _ = self.open_store()
+        restored.put(NAMESPACE, "m6", {"content": "Fato 6"})
+        restored.close()
+        final, _ = self.open_store()
+        self.addCleanup(final.close)
+
+        self.assertEqual(names, ["snapshot-00000001", "wal-00000001.log"])
+        self.assertEqual(final.get(NAMESPACE, "m5").value, {"content": "Fato 5"})
+        self.assertEqual(final.get(NAMESPACE, "m6").value, {"content": "Fato 6"})
+
+    def test_dimension_change_reembeds(self):
+        """Com outra dimensão de índice, os vetores do snapshot são recalculados."""
+        store, _ = self.open_store()
+        self.fill(store)
+        store.close()
+
+        restored, embeddings = self.open_store(dims=4)
+        self.addCleanup(restored.close)
+
+        self.assertEqual(embeddings.texts, 5)
+        self.assertEqual(len(restored._vectors[NAMESPACE]["m1"]["$"]), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
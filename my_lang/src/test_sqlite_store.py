@@ -0,0 +1,157 @@
+"""
+Testes para o armazenamento de memórias em SQLite.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langgraph.store.base import GetOp, InvalidNamespaceError, PutOp, SearchOp
+from langgraph.store.base.embed import get_text_at_path
+from langgraph.store.memory import InMemoryStore
+
+from src.benchmarks.store_scaling import DeterministicEmbeddings, synthetic_memory
+from src.memory.sqlite_store import SQLiteStore
+
+NAMESPACE = ("chatbot_memories", "ana")
+
+
+class TestSQLiteStore(unittest.TestCase):
+    """Testes de persistência e busca do SQLiteStore."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "memorias.sqlite3")
+        self.embeddings = DeterministicEmbeddings(16)
+
+    def open_store(self, **kwargs):
+        store = SQLiteStore(self.path, index={"dims": 16, "embed": self.embeddings}, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_items_survive_reopening(self):
+        """Escritas, atualizações e remoções persistem no arquivo."""
+        store = self.open_store()
+        store.put(NAMESPACE, "m1", {"content": "Gosta de café"})
+        store.put(NAMESPACE, "m2", {"content": "Tem um gato"})
+        created_at = store.get(NAMESPACE, "m1").created_at
+        store.put(NAMESPACE, "m1", {"content": "Gosta de chá"})
+        store.delete(NAMESPACE, "m2")
+        store.close()
+
+        reopened = self.open_store()
+        item = reopened.get(NAMESPACE, "m1")
+
+        self.assertEqual(item.value, {"content": "Gosta de chá"})
+        self.assertEqual(item.created_at, created_at)
+        self.assertIsNone(reopened.get(NAMESPACE, "m2"))
+        self.assertEqual(reopened.list_namespaces(prefix=("chatbot_memories",)), [NAMESPACE])
+
+    def test_search_matches_in_memory_store(self):
+        """A busca vetorial ordena como o InMemoryStore, com filtros e deslocamento."""
+        store = self.open_store()
+        reference = InMemoryStore(index={"dims": 16, "embed": self.embeddings})
+        for index in range(40):
+            namespace = ("chatbot_memories", f"u{index % 2}")
+            value = {"content": synthetic_memory(index), "par": index % 4 == 0}
+            store.put(namespace, f"m{index}", value)
+            reference.put(namespace, f"m{index}", value)
+
+        for prefix, kwargs in [
+            (NAMESPACE[:1], {"limit": 5}),
+            (("chatbot_memories", "u1"), {"limit": 3, "offset": 2}),
+            (NAMESPACE[:1], {"limit": 4, "filter": {"par": True}}),
+        ]:
+            query = synthetic_memory(7)
+            expected = [(item.key, round(item.score, 4)) for item in reference.search(prefix, query=query, **kwargs)]
+            found = [(item.key, round(item.score, 4)) for item in store.search(prefix, query=query, **kwargs)]
+            self.assertEqual(found, expected)
+
+    def test_writes_invalidate_cached_blocks(self):
+        """Depois de uma busca, novas memórias do namespace aparecem na próxima."""
+        store = self.open_store()
+        store.put(NAMESPACE, "m1", {"content": "Gosta de café"})
+        store.search(NAMESPACE, query="café")
+        store.put(NAMESPACE, "m2", {"content": "Tem um gato chamado Tom"})
+
+        results = store.search(NAMESPACE, query="Tem um gato chamado Tom", limit=1)
+
+        self.assertEqual(results[0].key, "m2")
+
+    def test_unindexed_items_complete_results(self):
+        """Itens sem vetores (como perfis) vêm depois dos pontuados, sem pontuação."""
+        store = self.open_store()
+        store.put(NAMESPACE, "m1", {"content": "Gosta de café"})
+        store.put(NAMESPACE, "profile", {"content": {"name": "Ana"}}, index=False)
+
+        results = store.search(NAMESPACE, query="café", limit=5)
+
+        self.assertEqual([item.key for item in results], ["m1", "profile"])
+        self.assertIsNone(results[1].score)
+
+    def test_approximate_index_finds_exact_matches(self):
+        """Com o índice aproximado, buscar o texto de uma memória a encontra primeiro."""
+        store = self.open_store(ann_min_vectors=100, ann_nprobe=4)
+        for start in range(0, 400, 100):
+            for index in range(start, start + 100):
+                store.put(NAMESPACE, f"m{index}", {"content": synthetic_memory(index)})
+
+        for index in (0, 123, 399):
+            query = get_text_at_path({"content": synthetic_memory(index)}, "$")[0]
+            results = store.search(NAMESPACE, query=query, limit=3)
+            self.assertEqual(results[0].key, f"m{index}")
+        self.assertIsNotNone(store._block(".".join(NAMESPACE)).ann)
+
+    def test_list_namespaces_follows_writes(self):
+        """A listagem de namespaces acompanha escritas e remoções e só usa o prefixo exato."""
+        store = self.open_store()
+        reference = InMemoryStore()
+        for namespace in [("chatbot_memories", "ana"), ("chatbot_memories", "ana-b"), ("chatbot_memoriesx", "bia")]:
+            store.put(namespace, "m1", {"content": "Gosta de café"})
+            reference.put(namespace, "m1", {"content": "Gosta de café"})
+        self.assertEqual(store.list_namespaces(), reference.list_namespaces())
+
+        store.put(("chatbot_memories", "caio"), "m1", {"content": "Tem um gato"})
+        store.delete(("chatbot_memories", "ana-b"), "m1")
+
+        self.assertEqual(
+            store.list_namespaces(prefix=("chatbot_memories",)),
+            [("chatbot_memories", "ana"), ("chatbot_memories", "caio")],
+        )
+        self.assertEqual(store.list_namespaces(prefix=("chatbot_memories",), offset=1, limit=1), [("chatbot_memories", "caio")])
+        self.assertEqual(len(store.search(("chatbot_memories",))), 2)
+
+    def test_batch_rejects_dotted_labels(self):
+        """Um rótulo com ponto, mesmo em operações diretas no `batch`, não alcança outro namespace."""
+        store = self.open_store()
+
+        for op in (
+            PutOp(("chatbot_memories", "eve.x"), "k", {"content": "segredo"}),
+            GetOp(("chatbot_memories", "eve.x"), "k"),
+            SearchOp(("chatbot_memories", "eve.x")),
+        ):
+            with self.assertRaises(InvalidNamespaceError):
+                store.batch([op])
+
+        self.assertIsNone(store.get(("chatbot_memories", "eve", "x"), "k"))
+        self.assertEqual(store.search(("chatbot_memories", "eve")), [])
+
+    def test_async_api(self):
+        """As operações assíncronas usam o mesmo banco."""
+        store = self.open_store()
+
+        async def run():
+            await store.aput(NAMESPACE, "m1", {"content": "Gosta de café"})
+            return await store.asearch(NAMESPACE, query="café")
+
+        self.assertEqual([item.key for item in asyncio.run(run())], ["m1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+"""
+Testes para o carregamento sob demanda e o benchmark de inicialização.
+"""
+
+import os
+import sys
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.benchmarks.import_time import check_startup, parse_importtime
+
+
+class TestStartup(unittest.TestCase):
+    """Testes para o tempo de importação dos pontos de entrada."""
+
+    def test_entry_points_do_not_load_optional_modules(self):
+        """Servidor e CLI não carregam backends nem subsistemas opcionais ao importar."""
+        # O orçamento de tempo é verificado pelo benchmark; aqui só os módulos carregados
+        results = check_startup(budget_ms=float("inf"), repeat=1)
+
+        for measurement in results:
+            self.assertEqual(measurement["violations"], [], measurement["module"])
+            self.assertGreater(measurement["total_ms"], 0)
+
+    def test_lazy_package_exports(self):
+        """Os nomes públicos dos pacotes continuam disponíveis sob demanda."""
+        import src.memory
+
+        self.assertIn("create_profile_index", dir(src.memory))
+        self.assertTrue(callable(src.memory.create_profile_index))
+        with self.assertRaises(AttributeError):
+            src.memory.nao_existe
+
+    def test_parse_importtime(self):
+        """A saída de -X importtime é convertida em tempos acumulados."""
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   json.decoder\n"
+            "import time:       300 |        420 | json\n"
+        )
+        self.assertEqual(parse_importtime(output), {"json.decoder": 120, "json": 420})
+
+
+if __name__ == "__main__":
+    unittest.main()
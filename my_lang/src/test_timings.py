@@ -0,0 +1,81 @@
+"""
+Testes para a decomposição do tempo do turno (Server-Timing).
+"""
+
+import os
+import sys
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from langgraph.store.memory import InMemoryStore
+
+from src.agent.chat_agent import create_chat_agent
+from src.agent.fake_model import FakeChatModel
+from src.api.routes import create_api
+from src.timings import TurnTimings, record_timing, timings_scope
+
+
+class TestTurnTimings(unittest.TestCase):
+    """Testes para o coletor de tempos por etapa."""
+
+    def test_header_follows_stage_order(self):
+        """As etapas são somadas e formatadas na ordem de STAGES."""
+        timings = TurnTimings()
+        timings.add("model", 0.2)
+        timings.add("memory", 0.0125)
+        timings.add("model", 0.1)
+
+        self.assertEqual(timings.as_dict(), {"memory": 12.5, "model": 300.0})
+        self.assertEqual(
+            timings.header(),
+            'memory;dur=12.5;desc="Busca de memorias", model;dur=300.0;desc="Chamadas ao modelo"',
+        )
+
+    def test_record_outside_a_turn_is_ignored(self):
+        """Sem coletor ativo, record_timing não tem efeito."""
+        record_timing("memory", 1.0)
+
+        timings = TurnTimings()
+        with timings_scope(timings):
+            record_timing("memory", 0.5)
+        record_timing("memory", 1.0)
+
+        self.assertEqual(timings.as_dict(), {"memory": 500.0})
+
+
+class TestServerTiming(unittest.TestCase):
+    """Testes para o cabeçalho Server-Timing do /chat."""
+
+    def setUp(self):
+        components = create_chat_agent(
+            store=InMemoryStore(),
+            enable_background_memory=False,
+            enable_user_profiles=False,
+            model=FakeChatModel(latency=0.01),
+        )
+        self.client = TestClient(create_api(agent=components["agent"]))
+
+    def test_chat_response_has_server_timing(self):
+        """Toda resposta do /chat traz as etapas do turno no cabeçalho."""
+        response = self.client.post("/chat", json={"message": "qual é o meu nome?", "user_id": "timing_user"})
+
+        self.assertEqual(response.status_code, 200)
+        stages = [entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")]
+        self.assertEqual(stages, ["memory", "model", "tool", "serialize", "total"])
+        self.assertNotIn("timings", response.json())
+
+    def test_timings_field_on_request(self):
+        """Com include_timings, a resposta também traz as durações no corpo."""
+        response = self.client.post("/chat", json={"message": "olá", "include_timings": True})
+
+        timings = response.json()["timings"]
+        self.assertGreaterEqual(timings["model"], 10.0)
+        self.assertGreaterEqual(timings["total"], timings["model"])
+        self.assertIn("serialize", timings)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+"""
+Testes para o rastreamento de turnos, ferramentas, armazenamento e tarefas em segundo plano.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langgraph.store.memory import InMemoryStore
+
+from src.agent.chat_agent import chat, create_chat_agent
+from src.agent.fake_model import FakeChatModel
+from src.instrumentation import InstrumentedReflector
+from src.tracing import (
+    InMemoryExporter,
+    JsonFileExporter,
+    OTLPHttpExporter,
+    TracedStore,
+    Tracer,
+    current_traceparent,
+    set_tracer,
+)
+
+
+class LocalCollector:
+    """Coletor OTLP/HTTP local que guarda os corpos recebidos."""
+
+    def __init__(self):
+        self.requests = []
+        collector = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                collector.requests.append((self.path, json.loads(body)))
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_port}/v1/traces"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestTracing(unittest.TestCase):
+    """Testes para os spans de um turno e a propagação do contexto."""
+
+    def setUp(self):
+        self.exporter = InMemoryExporter()
+        self.tracer = Tracer(self.exporter)
+        self.previous = set_tracer(self.tracer)
+
+    def tearDown(self):
+        set_tracer(self.previous)
+
+    def _spans(self):
+        self.tracer.flush()
+        return self.exporter.spans
+
+    def test_turn_spans_form_a_tree(self):
+        """Passos do agente, ferramentas e buscas no armazenamento ficam dentro do turno."""
+        components = create_chat_agent(
+            store=TracedStore(InMemoryStore()),
+            enable_background_memory=False,
+            enable_user_profiles=False,
+            model=FakeChatModel(),
+        )
+        chat(components["agent"], "qual é o meu nome?", user_id="trace_user", thread_id="trace_thread")
+
+        spans = self._spans()
+        by_id = {span["span_id"]: span for span in spans}
+        roots = [span for span in spans if span["name"] == "chat"]
+        self.assertEqual(len(roots), 1)
+        self.assertEqual(roots[0]["attributes"]["user_id"], "trace_user")
+        self.assertTrue(all(span["trace_id"] == roots[0]["trace_id"] for span in spans))
+
+        steps = [span for span in spans if span["name"] == "agent.step"]
+        self.assertEqual([step["attributes"]["node"] for step in sorted(steps, key=lambda s: s["attributes"]["step"])],
+                         ["agent", "tools", "agent"])
+
+        tool = next(span for span in spans if span["name"] == "tool.search_memory")
+        self.assertEqual(by_id[tool["parent_span_id"]]["name"], "agent.step")
+        store_searches = [span for span in spans if span["name"] == "store.search"
+                          and span["parent_span_id"] == tool["span_id"]]
+        self.assertEqual(len(store_searches), 1)
+        self.assertEqual(store_searches[0]["attributes"]["namespace"], "chatbot_memories/trace_user")
+
+    def test_background_job_links_to_turn(self):
+        """A tarefa em segundo plano continua o rastro do turno que a agendou."""
+
+        class Reflector:
+            namespace = ("memories", "{user_id}")
+
+            def invoke(self, payload, config=None):
+                return payload
+
+        with self.tracer.span("chat") as turn:
+            traceparent = current_traceparent()
+
+        # Executada depois, em outra thread, só com o configurable da tarefa
+        thread = threading.Thread(
+            target=InstrumentedReflector(Reflector()).invoke,
+            args=({"messages": []}, {"configurable": {"user_id": "u1", "traceparent": traceparent}}),
+        )
+        thread.start()
+        thread.join()
+
+        job = next(span for span in self._spans() if span["name"] == "background.memory_processing")
+        self.assertEqual(job["trace_id"], turn.trace_id)
+        self.assertEqual(job["parent_span_id"], turn.span_id)
+        self.assertEqual(job["attributes"]["user_id"], "u1")
+
+    def test_errors_are_recorded(self):
+        """Exceções que atravessam um span marcam o span como falho."""
+        with self.assertRaises(ValueError):
+            with self.tracer.span("failing"):
+                raise ValueError("boom")
+
+        span = self._spans()[0]
+        self.assertEqual(span["status"], "error")
+        self.assertIn("boom", span["status_message"])
+
+    def test_store_outside_a_trace_creates_no_spans(self):
+        """Operações sem turno ativo (ex.: aquecimento) não geram spans."""
+        store = TracedStore(InMemoryStore())
+        store.put(("ns",), "key", {"value": 1})
+
+        self.assertEqual(store.get(("ns",), "key").value, {"value": 1})
+        self.assertEqual(self._spans(), [])
+
+    def test_disabled_tracer_yields_none(self):
+        """Com o rastreamento desativado nenhum span é criado."""
+        tracer = Tracer(enabled=False)
+        with tracer.span("chat") as span:
+            self.assertIsNone(span)
+            self.assertIsNone(current_traceparent())
+
+
+class TestExporters(unittest.TestCase):
+    """Testes para os exportadores de arquivo e OTLP/HTTP."""
+
+    def test_json_file_exporter(self):
+        """Cada span vira uma linha JSON no arquivo."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "traces.jsonl")
+            tracer = Tracer(JsonFileExporter(path))
+            with tracer.span("parent"):
+                with tracer.span("child", {"key": "value"}):
+                    pass
+            tracer.shutdown()
+
+            with open(path, encoding="utf-8") as file:
+                spans = [json.loads(line) for line in file]
+
+        self.assertEqual([span["name"] for span in spans], ["child", "parent"])
+        self.assertEqual(spans[0]["parent_span_id"], spans[1]["span_id"])
+        self.assertEqual(spans[0]["attributes"], {"key": "value"})
+
+    def test_otlp_exporter_sends_to_collector(self):
+        """Os spans chegam ao coletor no formato OTLP/JSON."""
+        collector = LocalCollector()
+        try:
+            tracer = Tracer(OTLPHttpExporter(collector.endpoint, service_name="test-service"))
+            with tracer.span("chat", {"user_id": "u1", "turns": 3}):
+                pass
+            tracer.shutdown()
+        finally:
+            collector.close()
+
+        self.assertEqual(len(collector.requests), 1)
+        path, body = collector.requests[0]
+        self.assertEqual(path, "/v1/traces")
+        resource_spans = body["resourceSpans"][0]
+        self.assertEqual(resource_spans["resource"]["attributes"][0]["value"], {"stringValue": "test-service"})
+        span = resource_spans["scopeSpans"][0]["spans"][0]
+        self.assertEqual(span["name"], "chat")
+        self.assertEqual(len(span["traceId"]), 32)
+        self.assertIn({"key": "turns", "value": {"intValue": "3"}}, span["attributes"])
+
+
+if __name__ == "__main__":
+    unittest.main()
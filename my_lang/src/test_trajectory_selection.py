@@ -0,0 +1,104 @@
+"""
+Testes para a seleção de trajetórias do otimizador de prompts.
+"""
+
+import hashlib
+import os
+import sys
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.embeddings import Embeddings
+
+from src.memory.trajectory_selection import select_trajectories
+
+
+class BagOfWordsEmbeddings(Embeddings):
+    """Embeddings determinísticos: textos com as mesmas palavras têm vetores próximos."""
+
+    dims = 64
+
+    def _embed(self, text):
+        vector = [0.0] * self.dims
+        for word in text.lower().split():
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            vector[digest[0] % self.dims] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def _trajectory(text):
+    return ([{"role": "user", "content": text}], {"nota": 1})
+
+
+class TestTrajectorySelection(unittest.TestCase):
+    """Testes para o select_trajectories."""
+
+    def setUp(self):
+        self.embeddings = BagOfWordsEmbeddings()
+        self.topics = [
+            "qual a capital do brasil",
+            "como fazer bolo de chocolate",
+            "receita de pão integral caseiro",
+            "explique herança em python",
+        ]
+
+    def test_near_duplicates_are_collapsed(self):
+        """Conversas repetidas viram um único representante com o tamanho do grupo."""
+        trajectories = [_trajectory(self.topics[0])] * 50 + [_trajectory(self.topics[1])] * 10
+
+        selected = select_trajectories(trajectories, embeddings=self.embeddings, token_budget=10_000)
+
+        self.assertEqual(len(selected), 2)
+        sizes = sorted(feedback["cluster_size"] for _, feedback in selected)
+        self.assertEqual(sizes, [10, 50])
+        self.assertTrue(all(feedback["nota"] == 1 for _, feedback in selected))
+
+    def test_diverse_topics_are_kept(self):
+        """Tópicos diferentes são todos representados quando cabem no orçamento."""
+        trajectories = [_trajectory(topic) for topic in self.topics for _ in range(5)]
+
+        selected = select_trajectories(trajectories, embeddings=self.embeddings, token_budget=10_000)
+
+        texts = {messages[0]["content"] for messages, _ in selected}
+        self.assertEqual(texts, set(self.topics))
+
+    def test_token_budget_is_enforced(self):
+        """O total de tokens selecionado nunca excede o orçamento."""
+        trajectories = [_trajectory(f"assunto {i} " + "palavra " * 50) for i in range(200)]
+        counter = lambda messages: len(messages[0]["content"].split())
+
+        selected = select_trajectories(
+            trajectories,
+            embeddings=self.embeddings,
+            token_budget=500,
+            token_counter=counter,
+        )
+
+        self.assertTrue(selected)
+        self.assertLessEqual(sum(counter(messages) for messages, _ in selected), 500)
+
+    def test_max_candidates_bounds_embedding_cost(self):
+        """Apenas uma amostra limitada de trajetórias chega ao modelo de embeddings."""
+        embedded = []
+
+        class CountingEmbeddings(BagOfWordsEmbeddings):
+            def embed_documents(self, texts):
+                embedded.extend(texts)
+                return super().embed_documents(texts)
+
+        trajectories = (_trajectory(f"pergunta número {i}") for i in range(5000))
+        select_trajectories(trajectories, embeddings=CountingEmbeddings(), max_candidates=100)
+
+        self.assertEqual(len(embedded), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
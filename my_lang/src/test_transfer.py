@@ -0,0 +1,120 @@
+"""
+Testes para a exportação e importação de memórias e perfis.
+"""
+
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langgraph.store.memory import InMemoryStore
+
+from src.benchmarks.store_scaling import DeterministicEmbeddings
+from src.memory.profiles import UserProfile, save_user_profile
+from src.memory.transfer import export_store, import_store, read_records
+
+
+class CountingEmbeddings(DeterministicEmbeddings):
+    """Embeddings determinísticos que contam os textos embutidos."""
+
+    def __init__(self, dims: int):
+        super().__init__(dims)
+        self.texts = 0
+
+    def embed_documents(self, texts):
+        self.texts += len(texts)
+        return super().embed_documents(texts)
+
+
+def populated_store(users: int = 3, memories: int = 4) -> InMemoryStore:
+    store = InMemoryStore(index={"dims": 8, "embed": DeterministicEmbeddings(8)})
+    for user in range(users):
+        namespace = ("chatbot_memories", f"u{user}")
+        for index in range(memories):
+            store.put(namespace, f"m{index}", {"kind": "Memory", "content": {"content": f"Fato {index} de u{user}"}})
+        save_user_profile(store, UserProfile(name=f"Usuário {user}"), f"u{user}")
+    store.put(("outro", "u0"), "x", {"content": "fora da exportação"})
+    return store
+
+
+class TestTransfer(unittest.TestCase):
+    """Testes de ida e volta entre armazenamentos em memória."""
+
+    def setUp(self):
+        self.source = populated_store()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def round_trip(self, filename, **import_kwargs):
+        path = os.path.join(self.directory.name, filename)
+        exported = export_store(self.source, path, page_size=5)
+        embeddings = CountingEmbeddings(8)
+        target = InMemoryStore(index={"dims": 8, "embed": embeddings})
+        imported = import_store(target, path, batch_size=4, **import_kwargs)
+        return path, exported, imported, target, embeddings
+
+    def assert_same_items(self, target):
+        for user in range(3):
+            namespace = ("chatbot_memories", f"u{user}")
+            original = {item.key: item for item in self.source.search(namespace, limit=100)}
+            copied = {item.key: item for item in target.search(namespace, limit=100)}
+            self.assertEqual({k: i.value for k, i in copied.items()}, {k: i.value for k, i in original.items()})
+            profile = target.get(("user_profiles", f"u{user}"), "profile")
+            self.assertEqual(profile.value["content"]["name"], f"Usuário {user}")
+        self.assertIsNone(target.get(("outro", "u0"), "x"))
+
+    def test_jsonl_round_trip_reuses_embeddings(self):
+        """Exportar e importar com o mesmo modelo preserva itens, datas e vetores sem embutir de novo."""
+        path, exported, imported, target, embeddings = self.round_trip("memorias.jsonl.gz")
+
+        self.assertEqual(exported["records"], 15)
+        self.assertEqual(imported["records"], 15)
+        self.assertEqual(embeddings.texts, 0)
+        self.assert_same_items(target)
+        namespace = ("chatbot_memories", "u1")
+        self.assertEqual(target._vectors[namespace]["m2"], self.source._vectors[namespace]["m2"])
+        self.assertEqual(target.get(namespace, "m2").created_at, self.source.get(namespace, "m2").created_at)
+        query = "Fato 2 de u1"
+        self.assertEqual(
+            [item.key for item in target.search(namespace, query=query, limit=4)],
+            [item.key for item in self.source.search(namespace, query=query, limit=4)],
+        )
+
+        header, records = read_records(path)
+        self.assertEqual(header["dims"], 8)
+        self.assertEqual(sum(1 for _ in records), 15)
+
+    def test_model_mismatch_reembeds(self):
+        """Com outro modelo de embeddings, os itens são embutidos de novo (perfis continuam sem índice)."""
+        _, _, imported, target, embeddings = self.round_trip("memorias.jsonl", embedding_model="outro-modelo")
+
+        self.assertEqual(imported["reused_embeddings"], 0)
+        self.assertEqual(embeddings.texts, 12)
+        self.assert_same_items(target)
+
+    def test_rejects_unknown_files(self):
+        """Arquivos que não são exportações falham com uma mensagem clara."""
+        path = os.path.join(self.directory.name, "outro.jsonl")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(json.dumps({"id": "c1"}) + "\n")
+
+        with self.assertRaises(ValueError):
+            import_store(InMemoryStore(), path)
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow não instalado")
+    def test_parquet_round_trip(self):
+        """O formato Parquet guarda os mesmos registros e vetores."""
+        _, exported, imported, target, embeddings = self.round_trip("memorias.parquet")
+
+        self.assertEqual(imported["records"], exported["records"])
+        self.assertEqual(embeddings.texts, 0)
+        self.assert_same_items(target)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Testes para o aquecimento do worker e o endpoint de prontidão.
+"""
+
+import os
+import sys
+import time
+import unittest
+
+# Adicionar o diretório do projeto ao caminho para importações
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from langgraph.store.memory import InMemoryStore
+
+from src.agent.fake_model import FakeChatModel
+from src.api.routes import create_api
+from src.memory.profile_index import ProfileIndex
+from src.memory.profiles import save_user_profile
+from src.warmup import WarmupState, recent_user_ids, run_warmup
+
+
+class TestWarmup(unittest.TestCase):
+    """Testes para o run_warmup."""
+
+    def setUp(self):
+        self.store = InMemoryStore()
+        for user_id in ("antigo", "medio", "recente"):
+            self.store.put(("chatbot_memories", user_id), "m1", {"content": f"memória de {user_id}"})
+            # Garante datas de atualização distintas mesmo com relógios de baixa resolução
+            time.sleep(0.02)
+        save_user_profile(self.store, {"language": "pt"}, "medio")
+
+    def test_recent_users_are_ordered_by_activity(self):
+        """Os usuários com atualização mais recente vêm primeiro."""
+        # O perfil de "medio" é a escrita mais recente
+        self.assertEqual(recent_user_ids(self.store, limit=2), ["medio", "recente"])
+        self.assertEqual(recent_user_ids(self.store, limit=0), [])
+
+    def test_recent_users_scan_is_capped(self):
+        """Só os primeiros namespaces de cada tipo são examinados."""
+        user_ids = recent_user_ids(self.store, limit=10, page_size=1, max_namespaces=2)
+
+        self.assertEqual(sorted(user_ids), ["antigo", "medio"])
+
+    def test_warmup_runs_every_step(self):
+        """O aquecimento passa por todas as etapas e pré-carrega os perfis no índice."""
+        profile_index = ProfileIndex()
+
+        state = run_warmup(self.store, model=FakeChatModel(), profile_index=profile_index, preload_user_count=10)
+
+        self.assertTrue(state.ready)
+        snapshot = state.snapshot()
+        self.assertEqual(snapshot["status"], "ready")
+        self.assertEqual(set(snapshot["steps"]), {"store", "model", "preload_users"})
+        self.assertTrue(all(step["error"] is None for step in snapshot["steps"].values()))
+        self.assertEqual(snapshot["steps"]["preload_users"]["users"], 3)
+        self.assertEqual(profile_index.query(language="pt"), {"medio"})
+
+    def test_failed_step_does_not_block_readiness(self):
+        """Uma etapa com erro é registrada e o worker fica pronto mesmo assim."""
+
+        class BrokenModel:
+            def invoke(self, *args, **kwargs):
+                raise ConnectionError("provedor indisponível")
+
+        state = run_warmup(self.store, model=BrokenModel(), preload_user_count=0)
+
+        self.assertTrue(state.ready)
+        self.assertIn("provedor indisponível", state.snapshot()["steps"]["model"]["error"])
+
+    def test_ready_endpoint(self):
+        """O /ready responde 503 até o fim do aquecimento."""
+        state = WarmupState()
+        client = TestClient(create_api(agent=None, warmup_state=state))
+
+        self.assertEqual(client.get("/ready").status_code, 503)
+        run_warmup(self.store, state=state, preload_user_count=0)
+        response = client.get("/ready")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "ready")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+Decomposição do tempo de um turno por etapa (cabeçalho `Server-Timing`).
+
+O endpoint `/chat` cria um `TurnTimings` por requisição e o passa a `chat()`,
+que o torna o coletor ativo do turno (variável de contexto). Cada etapa soma a
+própria duração ao coletor ativo: busca de memórias, modelo e ferramentas (via
+`TimingsCallbackHandler`), perfil e agendamento em segundo plano. O endpoint
+acrescenta a serialização e o total e devolve tudo no cabeçalho `Server-Timing`
+e, se pedido, no campo `timings` da resposta.
+"""
+
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Etapas na ordem em que aparecem no cabeçalho, com a descrição exibida
+STAGES = {
+    "memory": "Busca de memórias",
+    "model": "Chamadas ao modelo",
+    "tool": "Ferramentas",
+    "profile": "Atualização de perfil",
+    "background": "Agendamento em segundo plano",
+    "serialize": "Serialização",
+    "total": "Total",
+}
+
+_current: ContextVar[Optional["TurnTimings"]] = ContextVar("turn_timings", default=None)
+
+
+class TurnTimings:
+    """Tempo acumulado por etapa de um turno."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seconds: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        """
+        Soma uma duração à etapa.
+
+        Args:
+            stage (str): Nome da etapa (ver `STAGES`)
+            seconds (float): Duração em segundos
+        """
+        with self._lock:
+            self._seconds[stage] = self._seconds.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """Soma a duração do bloco de código à etapa, mesmo que ele falhe."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def as_dict(self) -> Dict[str, float]:
+        """
+        Retorna as durações por etapa.
+
+        Returns:
+            Dict[str, float]: Milissegundos por etapa, na ordem de `STAGES`
+        """
+        with self._lock:
+            seconds = dict(self._seconds)
+        order = list(STAGES) + sorted(set(seconds) - set(STAGES))
+        return {stage: round(seconds[stage] * 1000, 2) for stage in order if stage in seconds}
+
+    def header(self) -> str:
+        """
+        Formata as durações para o cabeçalho HTTP `Server-Timing`.
+
+        Returns:
+            str: Por exemplo `memory;dur=12.5;desc="Busca de memorias", model;dur=830.1;desc="..."`
+        """
+        entries = []
+        for stage, milliseconds in self.as_dict().items():
+            entry = f"{stage};dur={milliseconds}"
+            description = STAGES.get(stage)
+            if description:
+                # Cabeçalhos HTTP só aceitam ASCII com segurança: remove os acentos
+                ascii_description = unicodedata.normalize("NFKD", description).encode("ascii", "ignore").decode()
+                entry += f';desc="{ascii_description}"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+
+@contextmanager
+def timings_scope(timings: Optional[TurnTimings]) -> Iterator[Optional[TurnTimings]]:
+    """
+    Torna `timings` o coletor ativo do bloco de código.
+
+    Args:
+        timings (Optional[TurnTimings]): Coletor do turno (None não altera o coletor ativo)
+    """
+    if timings is None:
+        yield _current.get()
+        return
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def get_timings() -> Optional[TurnTimings]:
+    """Retorna o coletor do turno atual, se houver."""
+    return _current.get()
+
+
+def record_timing(stage: str, seconds: float) -> None:
+    """
+    Soma uma duração à etapa no coletor do turno atual (sem efeito fora de um turno).
+
+    Args:
+        stage (str): Nome da etapa
+        seconds (float): Duração em segundos
+    """
+    timings = _current.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def measure(stage: str) -> Iterator[None]:
+    """Soma a duração do bloco de código à etapa no coletor do turno atual."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    with timings.measure(stage):
+        yield
+
+
+class TimingsCallbackHandler(BaseCallbackHandler):
+    """Soma ao coletor do turno o tempo das chamadas ao modelo e das ferramentas."""
+
+    def __init__(self, timings: TurnTimings):
+        self.timings = timings
+        self._lock = threading.Lock()
+        self._runs: Dict[UUID, Tuple[str, float]] = {}
+
+    def _start(self, run_id: UUID, stage: str) -> None:
+        with self._lock:
+            self._runs[run_id] = (stage, time.perf_counter())
+
+    def _end(self, run_id: UUID) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is not None:
+            self.timings.add(run[0], time.perf_counter() - run[1])
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, "model")
+
+    def on_llm_start(self, serialized: Any, prompts: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, "model")
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_tool_start(self, serialized: Any, input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, "tool")
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
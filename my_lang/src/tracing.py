@@ -0,0 +1,657 @@
+"""
+Rastreamento (tracing) de turnos do chat, ferramentas, armazenamento e tarefas em segundo plano.
+
+Cada turno de `chat()` abre um span raiz; dentro dele, o `TracingCallbackHandler`
+cria spans para os passos do agente ReAct, as chamadas ao modelo e as ferramentas
+de memória, e o `TracedStore` cria spans para as operações do armazenamento. O
+contexto do turno segue para o processamento em segundo plano no `configurable`
+da tarefa (`traceparent`, no formato W3C), de modo que o span da tarefa aponta
+para o turno que a originou.
+
+Os spans terminados são exportados em lotes, por uma thread própria, para um
+arquivo JSON Lines local (`TRACING_EXPORTER=file`) ou para um coletor OTLP/HTTP
+(`TRACING_EXPORTER=otlp`). Com `TRACING_ENABLED=false` nenhum span é criado.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.store.base import BaseStore, GetOp, ListNamespacesOp, PutOp, SearchOp
+
+from src.config import (
+    TRACING_ENABLED,
+    TRACING_EXPORTER,
+    TRACING_FILE,
+    TRACING_OTLP_ENDPOINT,
+    TRACING_SERVICE_NAME,
+    TRACING_EXPORT_INTERVAL,
+    TRACING_BATCH_SIZE,
+    TRACING_MAX_QUEUE,
+)
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Span ativo no contexto atual
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+# Tamanho máximo dos atributos de texto (consultas, entradas de ferramentas)
+MAX_ATTRIBUTE_LENGTH = 256
+
+
+def _truncate(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > MAX_ATTRIBUTE_LENGTH:
+        return value[:MAX_ATTRIBUTE_LENGTH] + "..."
+    return value
+
+
+class Span:
+    """Um intervalo de trabalho dentro de um rastro."""
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        trace_id: str,
+        parent_span_id: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent_span_id
+        self.attributes: Dict[str, Any] = {}
+        self.status = "ok"
+        self.status_message = ""
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns: Optional[int] = None
+        for key, value in (attributes or {}).items():
+            self.set_attribute(key, value)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = _truncate(value if isinstance(value, (str, bool, int, float)) else str(value))
+
+    def record_exception(self, error: BaseException) -> None:
+        """Marca o span como falho e registra o tipo e a mensagem do erro."""
+        self.status = "error"
+        self.status_message = _truncate(f"{type(error).__name__}: {error}")
+        self.set_attribute("exception.type", type(error).__name__)
+
+    def end(self) -> None:
+        """Encerra o span e o entrega ao exportador (apenas na primeira chamada)."""
+        if self.end_time_ns is not None:
+            return
+        self.end_time_ns = time.time_ns()
+        self.tracer._on_end(self)
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_time_ns is None:
+            return None
+        return (self.end_time_ns - self.start_time_ns) / 1e6
+
+    @property
+    def traceparent(self) -> str:
+        """Contexto do span no formato W3C `traceparent`."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "start_time_ns": self.start_time_ns,
+            "end_time_ns": self.end_time_ns,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "status_message": self.status_message,
+            "attributes": dict(self.attributes),
+        }
+
+
+def parse_traceparent(traceparent: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Lê um contexto no formato W3C `traceparent`.
+
+    Args:
+        traceparent (Optional[str]): Valor como "00-<trace_id>-<span_id>-01"
+
+    Returns:
+        Optional[Tuple[str, str]]: (trace_id, span_id) ou None se inválido
+    """
+    if not traceparent:
+        return None
+    parts = traceparent.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+def current_span() -> Optional[Span]:
+    """Retorna o span ativo no contexto atual, se houver."""
+    return _current_span.get()
+
+
+def current_traceparent() -> Optional[str]:
+    """Retorna o `traceparent` do span ativo, para propagar o contexto a outra thread ou processo."""
+    span = _current_span.get()
+    return span.traceparent if span is not None else None
+
+
+class InMemoryExporter:
+    """Guarda os spans exportados em memória (coletor local para testes)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spans: List[Dict[str, Any]] = []
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self.spans.extend(spans)
+
+    def shutdown(self) -> None:
+        pass
+
+
+class JsonFileExporter:
+    """Acrescenta os spans a um arquivo JSON Lines local (um span por linha)."""
+
+    def __init__(self, path: str = TRACING_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(span, ensure_ascii=False) + "\n" for span in spans)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(lines)
+
+    def shutdown(self) -> None:
+        pass
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class OTLPHttpExporter:
+    """Envia os spans a um coletor OpenTelemetry via OTLP/HTTP com corpo JSON."""
+
+    def __init__(
+        self,
+        endpoint: str = TRACING_OTLP_ENDPOINT,
+        service_name: str = TRACING_SERVICE_NAME,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 5.0,
+    ):
+        """
+        Args:
+            endpoint (str): URL do coletor (ex.: "http://localhost:4318/v1/traces")
+            service_name (str): Valor do atributo `service.name` do recurso
+            headers (Optional[Dict[str, str]]): Cabeçalhos adicionais (ex.: autenticação)
+            timeout (float): Tempo máximo de cada envio em segundos
+        """
+        import httpx
+
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._client = httpx.Client(timeout=timeout, headers=headers)
+
+    def to_otlp(self, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Converte os spans para o corpo `ExportTraceServiceRequest` em JSON."""
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                "traceId": span["trace_id"],
+                "spanId": span["span_id"],
+                "name": span["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(span["start_time_ns"]),
+                "endTimeUnixNano": str(span["end_time_ns"]),
+                "attributes": _otlp_attributes(span["attributes"]),
+                "status": {"code": 2, "message": span["status_message"]} if span["status"] == "error" else {"code": 1},
+            }
+            if span["parent_span_id"]:
+                otlp_span["parentSpanId"] = span["parent_span_id"]
+            otlp_spans.append(otlp_span)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                    "scopeSpans": [{"scope": {"name": "src.tracing"}, "spans": otlp_spans}],
+                }
+            ]
+        }
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        response = self._client.post(self.endpoint, json=self.to_otlp(spans))
+        response.raise_for_status()
+
+    def shutdown(self) -> None:
+        self._client.close()
+
+
+class Tracer:
+    """Cria spans e os exporta em lotes por uma thread em segundo plano."""
+
+    def __init__(
+        self,
+        exporter: Any = None,
+        enabled: bool = True,
+        batch_size: int = TRACING_BATCH_SIZE,
+        export_interval: float = TRACING_EXPORT_INTERVAL,
+        max_queue: int = TRACING_MAX_QUEUE,
+    ):
+        """
+        Args:
+            exporter: Destino dos spans (com `export(spans)` e `shutdown()`)
+            enabled (bool): Se False, nenhum span é criado
+            batch_size (int): Spans acumulados que disparam uma exportação imediata
+            export_interval (float): Intervalo máximo entre exportações em segundos
+            max_queue (int): Spans pendentes acima dos quais novos spans são descartados
+        """
+        self.exporter = exporter
+        self.enabled = enabled and exporter is not None
+        self.batch_size = batch_size
+        self.export_interval = export_interval
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._cond = threading.Condition()
+        self._pending: List[Span] = []
+        self._worker: Optional[threading.Thread] = None
+        self._running = True
+
+    def start_span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Union[Span, str, None] = None,
+    ) -> Optional[Span]:
+        """
+        Cria um span (sem torná-lo o span ativo).
+
+        Args:
+            name (str): Nome do span
+            attributes (Optional[Dict[str, Any]]): Atributos iniciais
+            parent (Union[Span, str, None]): Span pai ou `traceparent`; padrão: o span ativo
+
+        Returns:
+            Optional[Span]: O span, ou None se o rastreamento está desativado
+        """
+        if not self.enabled:
+            return None
+        if parent is None:
+            parent = _current_span.get()
+        if isinstance(parent, Span):
+            return Span(self, name, parent.trace_id, parent.span_id, attributes)
+        context = parse_traceparent(parent) if isinstance(parent, str) else None
+        if context is not None:
+            return Span(self, name, context[0], context[1], attributes)
+        return Span(self, name, f"{random.getrandbits(128):032x}", None, attributes)
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Union[Span, str, None] = None,
+    ) -> Iterator[Optional[Span]]:
+        """
+        Executa o bloco dentro de um span ativo, registrando erros que o atravessem.
+
+        Args:
+            name (str): Nome do span
+            attributes (Optional[Dict[str, Any]]): Atributos iniciais
+            parent (Union[Span, str, None]): Span pai ou `traceparent`; padrão: o span ativo
+
+        Yields:
+            Optional[Span]: O span, ou None se o rastreamento está desativado
+        """
+        span = self.start_span(name, attributes, parent)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def _on_end(self, span: Span) -> None:
+        with self._cond:
+            if len(self._pending) >= self.max_queue:
+                self.dropped += 1
+                return
+            self._pending.append(span)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._worker.start()
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def _export(self, spans: List[Span]) -> None:
+        if not spans:
+            return
+        try:
+            self.exporter.export([span.to_dict() for span in spans])
+        except Exception as e:
+            logger.error(f"Erro ao exportar {len(spans)} spans: {str(e)}")
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if self._running and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.export_interval)
+                spans, self._pending = self._pending, []
+                running = self._running
+            self._export(spans)
+            if not running:
+                return
+
+    def flush(self) -> None:
+        """Exporta imediatamente os spans pendentes."""
+        with self._cond:
+            spans, self._pending = self._pending, []
+        self._export(spans)
+
+    def shutdown(self) -> None:
+        """Exporta os spans pendentes e encerra o exportador."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self.flush()
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Cria spans para os passos do agente, as chamadas ao modelo e as ferramentas.
+
+    Os spans são filhos do span ativo na criação do handler (o turno) e seguem a
+    hierarquia de execuções do LangChain. Enquanto um span do handler está aberto
+    ele é o span ativo, de modo que as operações do `TracedStore` feitas pelas
+    ferramentas aparecem dentro dele.
+    """
+
+    def __init__(self, tracer: "Tracer", parent: Optional[Span] = None):
+        self.tracer = tracer
+        self.root = parent or _current_span.get()
+        self._lock = threading.Lock()
+        self._parents: Dict[UUID, Optional[UUID]] = {}
+        self._spans: Dict[UUID, Tuple[Span, Any]] = {}
+
+    def _parent_span(self, parent_run_id: Optional[UUID]) -> Optional[Span]:
+        # Sobe pela hierarquia até a execução mais próxima que tem span
+        with self._lock:
+            run_id = parent_run_id
+            while run_id is not None:
+                if run_id in self._spans:
+                    return self._spans[run_id][0]
+                run_id = self._parents.get(run_id)
+        return self.root
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, attributes: Dict[str, Any]) -> None:
+        span = self.tracer.start_span(name, attributes, parent=self._parent_span(parent_run_id))
+        if span is None:
+            return
+        previous = _current_span.get()
+        _current_span.set(span)
+        with self._lock:
+            self._spans[run_id] = (span, previous)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, attributes: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            self._parents.pop(run_id, None)
+            entry = self._spans.pop(run_id, None)
+        if entry is None:
+            return
+        span, previous = entry
+        for key, value in (attributes or {}).items():
+            span.set_attribute(key, value)
+        if error is not None:
+            span.record_exception(error)
+        if _current_span.get() is span:
+            _current_span.set(previous)
+        span.end()
+
+    def on_chain_start(
+        self,
+        serialized: Any,
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        # Só o runnable do próprio nó vira um passo do agente
+        if node is not None and kwargs.get("name") == node:
+            self._start(run_id, parent_run_id, "agent.step", {"node": node, "step": metadata.get("langgraph_step")})
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+    def on_chat_model_start(
+        self,
+        serialized: Any,
+        messages: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+        self._start(run_id, parent_run_id, "llm", {"model": (metadata or {}).get("ls_model_name")})
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        attributes = {}
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                for key in ("input_tokens", "output_tokens"):
+                    if key in usage:
+                        attributes[f"usage.{key}"] = attributes.get(f"usage.{key}", 0) + usage[key]
+        self._end(run_id, attributes=attributes)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+    def on_tool_start(
+        self,
+        serialized: Dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        self._start(run_id, parent_run_id, f"tool.{name}", {"tool": name, "input": input_str})
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+
+def _operation_attributes(op: Any) -> Tuple[str, Dict[str, Any]]:
+    if isinstance(op, SearchOp):
+        return "store.search", {"namespace": "/".join(op.namespace_prefix), "query": op.query, "limit": op.limit}
+    if isinstance(op, GetOp):
+        return "store.get", {"namespace": "/".join(op.namespace), "key": op.key}
+    if isinstance(op, PutOp):
+        operation = "store.delete" if op.value is None else "store.put"
+        return operation, {"namespace": "/".join(op.namespace), "key": op.key}
+    if isinstance(op, ListNamespacesOp):
+        return "store.list_namespaces", {"limit": op.limit}
+    return "store.batch", {}
+
+
+class TracedStore(BaseStore):
+    """
+    Armazenamento que cria um span para cada operação feita dentro de um rastro.
+
+    Operações fora de um rastro (sem span ativo) não geram spans. Os demais
+    atributos são delegados ao armazenamento envolvido.
+    """
+
+    def __init__(self, store: BaseStore, tracer: Optional["Tracer"] = None):
+        """
+        Args:
+            store (BaseStore): Armazenamento envolvido
+            tracer (Optional[Tracer]): Rastreador (padrão: o do processo)
+        """
+        self.store = store
+        self._tracer = tracer
+
+    @property
+    def tracer(self) -> "Tracer":
+        return self._tracer or get_tracer()
+
+    @property
+    def backend_name(self) -> str:
+        return type(self.store).__name__
+
+    @property
+    def supports_ttl(self) -> bool:
+        return self.store.supports_ttl
+
+    @property
+    def ttl_config(self) -> Any:
+        return self.store.ttl_config
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.store, name)
+
+    def _spans(self, ops: List[Any]) -> List[Optional[Span]]:
+        if _current_span.get() is None:
+            return []
+        spans = []
+        for op in ops:
+            name, attributes = _operation_attributes(op)
+            attributes["backend"] = self.backend_name
+            spans.append(self.tracer.start_span(name, attributes))
+        return spans
+
+    @staticmethod
+    def _finish(spans: List[Optional[Span]], results: Optional[List[Any]], error: Optional[BaseException]) -> None:
+        for index, span in enumerate(spans):
+            if span is None:
+                continue
+            if error is not None:
+                span.record_exception(error)
+            elif results is not None and isinstance(results[index], list):
+                span.set_attribute("results", len(results[index]))
+            span.end()
+
+    def batch(self, ops: Iterable[Any]) -> List[Any]:
+        ops = list(ops)
+        spans = self._spans(ops)
+        try:
+            results = self.store.batch(ops)
+        except Exception as e:
+            self._finish(spans, None, e)
+            raise
+        self._finish(spans, results, None)
+        return results
+
+    async def abatch(self, ops: Iterable[Any]) -> List[Any]:
+        ops = list(ops)
+        spans = self._spans(ops)
+        try:
+            results = await self.store.abatch(ops)
+        except Exception as e:
+            self._finish(spans, None, e)
+            raise
+        self._finish(spans, results, None)
+        return results
+
+
+def create_exporter(kind: str = TRACING_EXPORTER) -> Any:
+    """
+    Cria o exportador de spans configurado.
+
+    Args:
+        kind (str): "file" (JSON Lines em TRACING_FILE) ou "otlp" (TRACING_OTLP_ENDPOINT)
+
+    Returns:
+        Exportador de spans
+    """
+    if kind == "otlp":
+        return OTLPHttpExporter()
+    if kind == "file":
+        return JsonFileExporter(os.path.abspath(TRACING_FILE))
+    raise ValueError(f"Exportador de rastros desconhecido: {kind}")
+
+
+_lock = threading.Lock()
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """
+    Retorna o rastreador do processo, criando-o no primeiro uso.
+
+    Returns:
+        Tracer: Rastreador compartilhado (desativado se TRACING_ENABLED=false)
+    """
+    global _tracer
+    with _lock:
+        if _tracer is None:
+            _tracer = Tracer(create_exporter()) if TRACING_ENABLED else Tracer(enabled=False)
+        return _tracer
+
+
+def set_tracer(tracer: Optional[Tracer]) -> Optional[Tracer]:
+    """
+    Substitui o rastreador do processo (por exemplo, por um com `InMemoryExporter`).
+
+    Args:
+        tracer (Optional[Tracer]): Novo rastreador (None recria o configurado no próximo uso)
+
+    Returns:
+        Optional[Tracer]: Rastreador anterior
+    """
+    global _tracer
+    with _lock:
+        previous, _tracer = _tracer, tracer
+        return previous
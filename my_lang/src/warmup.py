@@ -0,0 +1,254 @@
+"""
+Aquecimento do worker antes de receber tráfego.
+
+Sem aquecimento, as primeiras requisições de um worker novo pagam o handshake TLS
+com o provedor do modelo, a abertura das conexões do armazenamento e caches
+vazios. `run_warmup` abre as conexões do armazenamento, faz uma chamada mínima ao
+modelo e aos embeddings (deixando as conexões keep-alive abertas) e pré-carrega
+memórias e perfis dos usuários ativos mais recentemente. O `WarmupState`
+acompanha o progresso e alimenta o endpoint de prontidão `/ready`.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.config import MEMORY_NAMESPACE, PROFILE_NAMESPACE, WARMUP_PRELOAD_USERS, WARMUP_SCAN_NAMESPACES
+from src.memory.profile_index import _latest_profile
+from src.memory.retrieval import get_memory_retriever
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+class WarmupState:
+    """
+    Estado do aquecimento de um worker, compartilhado com a API.
+
+    O worker só é considerado pronto quando o aquecimento termina; falhas em uma
+    etapa são registradas mas não impedem as seguintes, já que o aquecimento só
+    antecipa trabalho que as requisições fariam de qualquer forma.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self.status = "pending"
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def ready(self) -> bool:
+        """Se o aquecimento terminou."""
+        return self._ready.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Aguarda o fim do aquecimento.
+
+        Args:
+            timeout (Optional[float]): Tempo máximo de espera em segundos
+
+        Returns:
+            bool: Se o aquecimento terminou dentro do prazo
+        """
+        return self._ready.wait(timeout)
+
+    def start(self) -> None:
+        with self._lock:
+            self.status = "running"
+            self.started_at = time.time()
+
+    def record(self, step: str, duration: float, error: Optional[str] = None, **details: Any) -> None:
+        with self._lock:
+            self.steps[step] = {"duration_ms": round(duration * 1000, 1), "error": error, **details}
+
+    def finish(self) -> None:
+        with self._lock:
+            self.status = "ready"
+            self.finished_at = time.time()
+        self._ready.set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Retorna o estado atual do aquecimento.
+
+        Returns:
+            Dict[str, Any]: Status, duração total e resultado de cada etapa
+        """
+        with self._lock:
+            duration = None
+            if self.started_at is not None:
+                duration = round(((self.finished_at or time.time()) - self.started_at) * 1000, 1)
+            return {
+                "status": self.status,
+                "duration_ms": duration,
+                "steps": {step: dict(result) for step, result in self.steps.items()},
+            }
+
+
+def _namespace_prefix(template: Tuple[str, ...]) -> Tuple[str, ...]:
+    return tuple(part for part in template if "{" not in part)
+
+
+def _user_activity(store: Any, prefix: Tuple[str, ...], page_size: int, max_namespaces: int) -> Iterator[Tuple[Any, str]]:
+    """Gera (última atualização, usuário) para até `max_namespaces` namespaces de usuário sob o prefixo."""
+    offset = 0
+    while offset < max_namespaces:
+        limit = min(page_size, max_namespaces - offset)
+        namespaces = store.list_namespaces(prefix=prefix, limit=limit, offset=offset)
+        for namespace in namespaces:
+            if len(namespace) <= len(prefix):
+                continue
+            items = store.search(namespace, limit=page_size)
+            if items:
+                yield max(item.updated_at for item in items), namespace[len(prefix)]
+        if len(namespaces) < limit:
+            break
+        offset += limit
+
+
+def recent_user_ids(
+    store: Any,
+    limit: int,
+    page_size: int = 1000,
+    max_namespaces: int = WARMUP_SCAN_NAMESPACES,
+) -> List[str]:
+    """
+    Encontra os usuários ativos mais recentemente.
+
+    A atividade de um usuário é a última atualização entre suas memórias e seu
+    perfil, que são reescritos a cada turno processado. Cada namespace custa uma
+    busca, então só os primeiros `max_namespaces` de cada tipo são examinados.
+
+    Args:
+        store: Armazenamento (InMemoryStore ou compatível)
+        limit (int): Número de usuários
+        page_size (int): Tamanho da página da listagem de namespaces
+        max_namespaces (int): Namespaces examinados por tipo (memórias e perfis)
+
+    Returns:
+        List[str]: IDs dos usuários, do mais recente para o menos recente
+    """
+    if limit <= 0:
+        return []
+
+    latest: Dict[str, Any] = {}
+    for prefix in (_namespace_prefix(MEMORY_NAMESPACE), _namespace_prefix(PROFILE_NAMESPACE)):
+        for updated_at, user_id in _user_activity(store, prefix, page_size, max_namespaces):
+            if user_id not in latest or updated_at > latest[user_id]:
+                latest[user_id] = updated_at
+
+    return [user_id for user_id, _ in heapq.nlargest(limit, latest.items(), key=lambda entry: entry[1])]
+
+
+def preload_users(store: Any, user_ids: List[str], profile_index: Any = None, memory_cache: Any = None) -> int:
+    """
+    Pré-carrega memórias e perfis de usuários.
+
+    Lê os mesmos namespaces que o primeiro turno de cada usuário consulta, mas sem
+    texto de busca (a mensagem do turno ainda não é conhecida): abre as conexões e
+    aquece os caches de páginas do backend, sem gerar embeddings. As memórias lidas
+    abastecem o cache de reserva da busca de memórias, usado quando a busca do
+    turno estoura o orçamento.
+
+    Args:
+        store: Armazenamento (InMemoryStore ou compatível)
+        user_ids (List[str]): Usuários a pré-carregar
+        profile_index: Índice de perfis a atualizar com os perfis lidos
+        memory_cache (Optional[MemoryCache]): Cache de reserva a preencher
+
+    Returns:
+        int: Número de itens lidos
+    """
+    loaded = 0
+    for user_id in user_ids:
+        memory_namespace = tuple(part.format(user_id=user_id) for part in MEMORY_NAMESPACE)
+        memories = store.search(memory_namespace, limit=5)
+        loaded += len(memories)
+        if memory_cache is not None and memories:
+            memory_cache.put(memory_namespace, memories)
+
+        profile_namespace = tuple(part.format(user_id=user_id) for part in PROFILE_NAMESPACE)
+        profile_items = store.search(profile_namespace, limit=10)
+        loaded += len(profile_items)
+        profile = _latest_profile(profile_items)
+        if profile is not None and profile_index is not None:
+            profile_index.update(user_id, profile)
+    return loaded
+
+
+def _run_step(state: WarmupState, step: str, fn) -> None:
+    start_time = time.perf_counter()
+    try:
+        details = fn() or {}
+    except Exception as e:
+        logger.warning(f"Etapa de aquecimento '{step}' falhou: {str(e)}")
+        state.record(step, time.perf_counter() - start_time, error=str(e))
+        return
+    duration = time.perf_counter() - start_time
+    logger.info(f"Etapa de aquecimento '{step}' concluída em {duration * 1000:.0f} ms")
+    state.record(step, duration, **details)
+
+
+def run_warmup(
+    store: Any,
+    model: Any = None,
+    embeddings: Any = None,
+    profile_index: Any = None,
+    preload_user_count: int = WARMUP_PRELOAD_USERS,
+    state: Optional[WarmupState] = None,
+) -> WarmupState:
+    """
+    Aquece o worker: armazenamento, modelo, embeddings e usuários ativos.
+
+    Args:
+        store: Armazenamento compartilhado
+        model: Modelo de chat do agente (recebe uma chamada de um token)
+        embeddings: Modelo de embeddings (padrão: o do índice do armazenamento)
+        profile_index: Índice de perfis atualizado com os perfis pré-carregados
+        preload_user_count (int): Usuários recentes a pré-carregar (0 desativa)
+        state (Optional[WarmupState]): Estado a atualizar (padrão: um novo)
+
+    Returns:
+        WarmupState: Estado do aquecimento, já concluído
+    """
+    state = state or WarmupState()
+    state.start()
+    logger.info("Iniciando aquecimento do worker")
+
+    if embeddings is None:
+        embeddings = getattr(store, "embeddings", None)
+
+    # Abre as conexões do armazenamento
+    _run_step(state, "store", lambda: {"namespaces": len(store.list_namespaces(limit=1))})
+
+    # Estabelece as conexões keep-alive com o provedor
+    if model is not None:
+        def ping_model():
+            model.invoke([{"role": "user", "content": "ping"}], max_tokens=1)
+
+        _run_step(state, "model", ping_model)
+    if embeddings is not None:
+        _run_step(state, "embeddings", lambda: {"dims": len(embeddings.embed_query("ping"))})
+
+    # Pré-carrega os usuários ativos mais recentemente
+    if preload_user_count > 0:
+        def preload():
+            user_ids = recent_user_ids(store, preload_user_count)
+            items = preload_users(
+                store,
+                user_ids,
+                profile_index=profile_index,
+                memory_cache=get_memory_retriever().cache,
+            )
+            return {"users": len(user_ids), "items": items}
+
+        _run_step(state, "preload_users", preload)
+
+    state.finish()
+    logger.info(f"Aquecimento concluído em {state.snapshot()['duration_ms']} ms")
+    return state